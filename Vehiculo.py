@@ -8,1155 +8,176 @@
 pip install opencv-python pytesseract numpy pandas matplotlib pillow psycopg2-binary
 """
 
-import cv2
-import pytesseract
-import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from PIL import Image, ImageTk, ImageEnhance, ImageFilter
-import io
+from datetime import datetime
 import time
-import re
-import os
-import sys
 import tkinter as tk
-from tkinter import messagebox, simpledialog, ttk, filedialog
-import threading
-import psycopg2
-from psycopg2 import sql, Error
-from psycopg2.extras import RealDictCursor
-import shutil
+from tkinter import messagebox, ttk, filedialog
+import json
 
-# Configurar pytesseract (ajustar ruta según tu instalación)
-def _find_tesseract():
-    # 1) Respect environment variables if provided
-    env = os.environ.get('TESSERACT_CMD') or os.environ.get('TESSERACT_PATH')
-    if env and os.path.exists(env):
-        return env
+from tarifas import CLASE_GENERAL, US_POR_HORA, microsegundos, validar_plan
+from repositorio import PATRON_PLACA, RepositorioMemoria, crear_repositorio, crear_repositorio_memoria
+from acceso_async import AccesoDatosAsync
+from transferencia import exportar_historial, importar_residentes
+from ventana_historial import VentanaHistorial
+from ventana_parqueaderos import VentanaParqueaderos
+from ventana_tarifas import VentanaTarifas
 
-    # 2) Check PATH
-    which = shutil.which('tesseract')
-    if which:
-        return which
+# Una escritura (entrada o salida) no se abandona por tiempo: la consulta seguiría y
+# confirmaría en la base de datos aunque la interfaz la diera por fallida. Pasado este
+# tiempo solo se avisa que sigue en proceso
+AVISO_ESCRITURA_MS = 3000
 
-    # 3) Common installation locations
-    if os.name == 'nt':
-        candidates = [r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-                      r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe']
-    else:
-        candidates = ['/usr/bin/tesseract', '/usr/local/bin/tesseract']
-
-    for c in candidates:
-        if os.path.exists(c):
-            return c
-
-    return None
-
-tesseract_path = _find_tesseract()
-if tesseract_path:
-    pytesseract.pytesseract.tesseract_cmd = tesseract_path
-else:
-    print('WARNING: tesseract binary not found. Install Tesseract and/or set the TESSERACT_CMD environment variable.')
-    if os.name == 'nt':
-        pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+# Las clases de cámara viven en ventana_camara (carga OpenCV y Tesseract al usarse)
+def __getattr__(nombre):
+    if nombre in ('ProcesadorPlacas', 'CapturadorPlaca'):
+        import ventana_camara
+        return getattr(ventana_camara, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 # =============================================================================
-# CLASE PARA PROCESAR IMÁGENES Y DETECTAR PLACAS (MEJORADA)
+# SISTEMA PRINCIPAL
 # =============================================================================
 
-class ProcesadorPlacas:
-    """Clase para procesar imágenes y detectar placas con múltiples métodos"""
-    
-    @staticmethod
-    def preprocesar_imagen(img):
+class SistemaControlAccesoPostgreSQL:
+    def __init__(self, db_config=None):
         """
-        Aplica múltiples preprocesamientos a la imagen para mejorar OCR
+        Inicializa el sistema con base de datos PostgreSQL
+        db_config: configuración de conexión
         """
-        resultados = []
-        
-        # Convertir a escala de grises si es necesario
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = img.copy()
-        
-        # Método 1: Umbral adaptativo
-        thresh1 = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                        cv2.THRESH_BINARY, 11, 2)
-        resultados.append(('adaptive', thresh1))
-        
-        # Método 2: Umbral Otsu
-        _, thresh2 = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        resultados.append(('otsu', thresh2))
-        
-        # Método 3: Ecualización del histograma
-        equ = cv2.equalizeHist(gray)
-        resultados.append(('equalized', equ))
-        
-        # Método 4: Filtro bilateral (reduce ruido, preserva bordes)
-        bilateral = cv2.bilateralFilter(gray, 9, 75, 75)
-        _, thresh3 = cv2.threshold(bilateral, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        resultados.append(('bilateral', thresh3))
-        
-        # Método 5: Aumento de contraste
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        clahe_img = clahe.apply(gray)
-        resultados.append(('clahe', clahe_img))
+        self.repo = None
+        self.db_config = db_config or {}
+        self.capturador = None
+        self.ultima_clasificacion = None
+        self.consulta_placa = None  # placa de la última clasificación pedida (descarta respuestas viejas)
+        self.accion_en_curso = False  # una entrada o salida esperando respuesta
+        self.estadisticas_en_curso = False
+        # Resúmenes de días cerrados ya leídos (no cambian); se crea al abrir el primer reporte
+        self.cache_reportes = None
+        
+        # Las consultas de fondo (estadísticas, directorio) usan su propio pool de
+        # repositorios; solo se usa cuando el repositorio es remoto
+        self.acceso = AccesoDatosAsync(lambda: self.repo.clonar()).iniciar()
+        
+        # Crear ventana principal de inmediato; la conexión se establece en segundo plano
+        self.crear_interfaz()
         
-        return resultados, gray
-    
-    @staticmethod
-    def detectar_placa_por_contornos(gray):
-        """
-        Detecta posibles regiones de placa por contornos
-        """
-        try:
-            # Aplicar desenfoque para reducir ruido
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            
-            # Detectar bordes
-            edged = cv2.Canny(blurred, 30, 200)
-            
-            # Dilatar para conectar bordes
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            dilated = cv2.dilate(edged, kernel, iterations=1)
-            
-            # Buscar contornos
-            contours, _ = cv2.findContours(dilated, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-            contours = sorted(contours, key=cv2.contourArea, reverse=True)[:20]
-            
-            placas_encontradas = []
-            
-            for contour in contours:
-                # Aproximar el contorno
-                peri = cv2.arcLength(contour, True)
-                approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
-                
-                # Si tiene 4 lados, podría ser una placa
-                if len(approx) == 4:
-                    # Obtener el área delimitadora
-                    x, y, w, h = cv2.boundingRect(contour)
-                    
-                    # Verificar proporciones (las placas suelen ser rectangulares)
-                    aspect_ratio = w / float(h)
-                    area = w * h
-                    area_total = gray.shape[0] * gray.shape[1]
-                    
-                    # Criterios: proporción entre 2 y 5, área entre 1% y 30% de la imagen total
-                    if 2 < aspect_ratio < 5 and area > 0.01 * area_total and area < 0.3 * area_total:
-                        # Extraer ROI
-                        roi = gray[y:y+h, x:x+w]
-                        
-                        # Asegurar que el ROI no está vacío
-                        if roi.size > 0:
-                            # Redimensionar para mejorar OCR
-                            roi = cv2.resize(roi, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-                            
-                            # Aplicar umbral
-                            _, roi = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                            
-                            placas_encontradas.append((roi, (x, y, w, h)))
-            
-            return placas_encontradas
-            
-        except Exception as e:
-            print(f"Error detectando contornos: {e}")
-            return []
-    
-    @staticmethod
-    def aplicar_ocr(imagen):
-        """
-        Aplica OCR a una imagen y retorna el texto detectado
-        """
-        try:
-            # Configuraciones de OCR para probar
-            configuraciones = [
-                '--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',  # Palabra única
-                '--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',  # Línea única
-                '--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',  # Bloque uniforme
-            ]
-            
-            mejores_resultados = []
-            
-            for config in configuraciones:
-                try:
-                    texto = pytesseract.image_to_string(imagen, config=config).strip()
-                    texto = re.sub(r'[^A-Z0-9]', '', texto.upper())
-                    if len(texto) >= 4:
-                        mejores_resultados.append(texto)
-                except:
-                    continue
-            
-            # Si hay resultados, devolver el más largo (probablemente el mejor)
-            if mejores_resultados:
-                return max(mejores_resultados, key=len)
-            
-            return None
-            
-        except Exception as e:
-            print(f"Error en OCR: {e}")
-            return None
-    
-    @staticmethod
-    def procesar_imagen_para_ocr(imagen_path):
-        """
-        Procesa una imagen para mejorar la detección OCR
-        Retorna la placa detectada y la imagen procesada
-        """
-        try:
-            # Cargar imagen
-            if isinstance(imagen_path, str):
-                img = cv2.imread(imagen_path)
-                if img is None:
-                    # Intentar con PIL si OpenCV falla
-                    pil_img = Image.open(imagen_path)
-                    # Convertir a RGB y luego a BGR para OpenCV
-                    img = np.array(pil_img.convert('RGB'))
-                    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-            else:
-                img = imagen_path
-            
-            # Guardar imagen original para visualización
-            img_original = img.copy()
-            
-            # Aplicar múltiples preprocesamientos
-            imagenes_procesadas, gray = ProcesadorPlacas.preprocesar_imagen(img)
-            
-            # Intentar detectar por contornos primero
-            posibles_placas = ProcesadorPlacas.detectar_placa_por_contornos(gray)
-            
-            todas_las_detecciones = []
-            
-            # Procesar cada posible placa encontrada por contornos
-            for roi, bbox in posibles_placas:
-                texto = ProcesadorPlacas.aplicar_ocr(roi)
-                if texto:
-                    todas_las_detecciones.append((texto, len(texto)))
-                    
-                    # Dibujar rectángulo en la imagen original
-                    x, y, w, h = bbox
-                    cv2.rectangle(img_original, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    cv2.putText(img_original, texto, (x, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-            
-            # Si no se detectó por contornos, probar OCR en toda la imagen
-            if not todas_las_detecciones:
-                for nombre, img_proc in imagenes_procesadas:
-                    texto = ProcesadorPlacas.aplicar_ocr(img_proc)
-                    if texto:
-                        todas_las_detecciones.append((texto, len(texto)))
-            
-            # Seleccionar la mejor detección (la más larga y con formato de placa)
-            mejor_placa = None
-            if todas_las_detecciones:
-                # Ordenar por longitud (las más largas primero)
-                todas_las_detecciones.sort(key=lambda x: x[1], reverse=True)
-                
-                # Buscar la que tenga formato de placa (3 letras + números)
-                for placa, _ in todas_las_detecciones:
-                    if re.match(r'[A-Z]{3}\d{3,4}', placa):
-                        mejor_placa = placa
-                        break
-                
-                # Si no hay con formato, tomar la más larga
-                if not mejor_placa:
-                    mejor_placa = todas_las_detecciones[0][0]
-            
-            return mejor_placa, img_original
-            
-        except Exception as e:
-            print(f"Error procesando imagen: {e}")
-            import traceback
-            traceback.print_exc()
-            return None, None
-    
-    @staticmethod
-    def mostrar_imagen_procesada(imagen, placa_detectada, parent):
-        """Muestra la imagen procesada en una ventana"""
-        ventana_img = tk.Toplevel(parent)
-        ventana_img.title("📸 Imagen Procesada")
-        ventana_img.geometry("900x700")
-        ventana_img.configure(bg='#2c3e50')
-        
-        # Frame superior
-        top_frame = tk.Frame(ventana_img, bg='#3498db', height=80)
-        top_frame.pack(fill='x')
-        top_frame.pack_propagate(False)
-        
-        tk.Label(top_frame, text=f"PLACA DETECTADA: {placa_detectada}", 
-                font=('Arial', 18, 'bold'), bg='#3498db', fg='white').pack(expand=True)
-        
-        # Frame para la imagen
-        img_frame = tk.Frame(ventana_img, bg='white', relief='solid', bd=2)
-        img_frame.pack(expand=True, fill='both', padx=20, pady=20)
-        
-        # Convertir imagen para mostrar
-        if len(imagen.shape) == 3:
-            img_rgb = cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB)
+        print("\n" + "="*60)
+        if self.db_config.get('motor') == 'sqlite':
+            print("ABRIENDO SQLITE")
+            print("="*60)
+            print(f"Archivo: {self.db_config.get('ruta', 'control_acceso.db')}")
+        elif self.db_config.get('motor') == 'api':
+            print("CONECTANDO AL SERVICIO API")
+            print("="*60)
+            print(f"URL: {self.db_config.get('url', 'http://localhost:8080')}")
         else:
-            img_rgb = cv2.cvtColor(imagen, cv2.COLOR_GRAY2RGB)
-            
-        img_pil = Image.fromarray(img_rgb)
-        
-        # Redimensionar manteniendo aspecto
-        img_pil.thumbnail((800, 500), Image.Resampling.LANCZOS)
-        
-        img_tk = ImageTk.PhotoImage(img_pil)
-        
-        # Mostrar imagen
-        img_label = tk.Label(img_frame, image=img_tk, bg='white')
-        img_label.image = img_tk
-        img_label.pack(expand=True)
-        
-        # Frame de botones
-        btn_frame = tk.Frame(ventana_img, bg='#2c3e50')
-        btn_frame.pack(fill='x', pady=10)
-        
-        tk.Button(btn_frame, text="✅ Aceptar y Usar", 
-                 command=lambda: [ventana_img.destroy(), parent.focus_force()],
-                 bg='#27ae60', fg='white', font=('Arial', 11, 'bold'),
-                 padx=20, pady=8, cursor='hand2').pack(side='left', expand=True, padx=5)
-        
-        tk.Button(btn_frame, text="❌ Cerrar", 
-                 command=ventana_img.destroy,
-                 bg='#e74c3c', fg='white', font=('Arial', 11, 'bold'),
-                 padx=20, pady=8, cursor='hand2').pack(side='left', expand=True, padx=5)
-
-# =============================================================================
-# CLASE PARA CAPTURA DE CÁMARA Y RECONOCIMIENTO DE PLACAS
-# =============================================================================
-
-class CapturadorPlaca:
-    """Clase para capturar imagen de la cámara y reconocer placas"""
-    
-    def __init__(self, parent):
-        self.parent = parent
-        self.capturando = False
-        self.cap = None
-        self.placa_detectada = None
-        
-    def abrir_ventana_captura(self, callback):
-        """
-        Abre una ventana para capturar imagen de la cámara
-        callback: función que recibe la placa detectada
-        """
-        self.callback = callback
-        
-        # Crear ventana de captura
-        self.ventana_cam = tk.Toplevel(self.parent)
-        self.ventana_cam.title("📸 Capturar Placa con Cámara")
-        self.ventana_cam.geometry("800x650")
-        self.ventana_cam.resizable(False, False)
-        self.ventana_cam.configure(bg='#2c3e50')
-        
-        # Centrar ventana
-        self.ventana_cam.transient(self.parent)
-        self.ventana_cam.grab_set()
-        
-        # Encabezado
-        header = tk.Frame(self.ventana_cam, bg='#3498db', height=60)
-        header.pack(fill='x')
-        header.pack_propagate(False)
-        
-        tk.Label(header, text="📸 CAPTURA DE PLACA CON CÁMARA", 
-                font=('Arial', 16, 'bold'), bg='#3498db', fg='white').pack(pady=15)
-        
-        # Frame principal
-        canvas = tk.Canvas(self.ventana_cam, bg='#2c3e50')
-        scrollbar = tk.Scrollbar(self.ventana_cam, orient="vertical", command=canvas.yview)
-
-        scrollable_frame = tk.Frame(canvas, bg='#2c3e50')
-
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-
-        main_frame = scrollable_frame
-    
-        # Frame para el video
-        self.video_frame = tk.Frame(main_frame, bg='black', width=640, height=480)
-        self.video_frame.pack(pady=10)
-        self.video_frame.pack_propagate(False)
-        
-        # Label para mostrar el video
-        self.video_label = tk.Label(self.video_frame, bg='black')
-        self.video_label.pack()
-        
-        # Frame para resultados
-        resultado_frame = tk.Frame(main_frame, bg='#34495e', relief='solid', bd=2)
-        resultado_frame.pack(fill='x', pady=10)
-        
-        tk.Label(resultado_frame, text="🔤 PLACA DETECTADA:", 
-                font=('Arial', 11, 'bold'), bg='#34495e', fg='white').pack(pady=(10, 5))
-        
-        self.label_placa_detectada = tk.Label(resultado_frame, text="---", 
-                                             font=('Arial', 18, 'bold'), 
-                                             bg='#34495e', fg='#f39c12', height=2)
-        self.label_placa_detectada.pack()
-        
-        # Frame de botones
-        btn_frame = tk.Frame(main_frame, bg='#2c3e50')
-        btn_frame.pack(fill='x', pady=10)
-        
-        btn_capturar = tk.Button(btn_frame, text="📸 CAPTURAR Y RECONOCER", 
-                                command=self.capturar_y_reconocer,
-                                bg='#27ae60', fg='white', font=('Arial', 11, 'bold'),
-                                relief='flat', bd=0, padx=20, pady=10,
-                                activebackground='#229954', cursor='hand2')
-        btn_capturar.pack(side='left', fill='both', expand=True, padx=5)
-        
-        btn_aceptar = tk.Button(btn_frame, text="✅ ACEPTAR PLACA", 
-                               command=self.aceptar_placa,
-                               bg='#3498db', fg='white', font=('Arial', 11, 'bold'),
-                               relief='flat', bd=0, padx=20, pady=10,
-                               activebackground='#2980b9', cursor='hand2',
-                               state='disabled')
-        btn_aceptar.pack(side='left', fill='both', expand=True, padx=5)
-        self.btn_aceptar = btn_aceptar
-        
-        btn_cancelar = tk.Button(btn_frame, text="❌ CANCELAR", 
-                                command=self.cerrar_ventana,
-                                bg='#e74c3c', fg='white', font=('Arial', 11, 'bold'),
-                                relief='flat', bd=0, padx=20, pady=10,
-                                activebackground='#c0392b', cursor='hand2')
-        btn_cancelar.pack(side='left', fill='both', expand=True, padx=5)
-        
-        # Instrucciones
-        instrucciones = tk.Label(main_frame, 
-                                 text="💡 Instrucciones: Coloque la placa frente a la cámara y presione 'CAPTURAR'",
-                                 font=('Arial', 10), bg='#2c3e50', fg='#bdc3c7')
-        instrucciones.pack(pady=5)
-        
-        # Iniciar captura
-        self.iniciar_captura()
-        
-    def iniciar_captura(self):
-        """Inicia la captura de video"""
-        self.capturando = True
-        self.cap = cv2.VideoCapture(0)
-        
-        if not self.cap.isOpened():
-            messagebox.showerror("Error", "No se pudo abrir la cámara")
-            self.cerrar_ventana()
-            return
+            print("CONECTANDO A POSTGRESQL")
+            print("="*60)
+            print(f"Host: {self.db_config.get('host', 'localhost')}")
+            print(f"Database: {self.db_config.get('database', 'control_acceso')}")
+            print(f"User: {self.db_config.get('user', 'postgres')}")
+        print("="*60)
         
-        self.actualizar_video()
-    
-    def actualizar_video(self):
-        """Actualiza el frame de video"""
-        if self.capturando and self.cap is not None:
-            ret, frame = self.cap.read()
-            if ret:
-                # Convertir frame para tkinter
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame_pil = Image.fromarray(frame_rgb)
-                
-                # Redimensionar manteniendo aspecto
-                frame_pil.thumbnail((640, 480), Image.Resampling.LANCZOS)
-                
-                # Convertir a ImageTk
-                img_tk = ImageTk.PhotoImage(frame_pil)
-                
-                # Actualizar label
-                self.video_label.config(image=img_tk)
-                self.video_label.image = img_tk
-            
-            # Programar siguiente actualización
-            if self.capturando:
-                self.ventana_cam.after(30, self.actualizar_video)
+        # Sin timeout propio: la conexión está acotada por connect_timeout y la
+        # primera ejecución puede incluir migraciones
+        self.acceso.ejecutar(crear_repositorio, self.db_config,
+                             callback=self.conexion_establecida, timeout=None)
     
-    def capturar_y_reconocer(self):
-        """Captura el frame actual y reconoce la placa"""
-        if self.cap is None:
-            return
-        
-        ret, frame = self.cap.read()
-        if not ret:
-            messagebox.showerror("Error", "No se pudo capturar la imagen")
-            return
-        
-        # Usar el procesador mejorado
-        placa, imagen_procesada = ProcesadorPlacas.procesar_imagen_para_ocr(frame)
+    def conexion_establecida(self, repo, error):
+        """Callback (hilo de Tk) con el repositorio creado al iniciar"""
+        if error:
+            print(f"❌ Error conectando a la base de datos: {error}")
+        self.repo = repo or crear_repositorio_memoria(self.db_config)
         
-        if placa:
-            self.placa_detectada = placa
-            self.label_placa_detectada.config(text=placa, fg='#27ae60')
-            self.btn_aceptar.config(state='normal')
-            
-            # Mostrar imagen procesada si está disponible
-            if imagen_procesada is not None:
-                ProcesadorPlacas.mostrar_imagen_procesada(imagen_procesada, placa, self.ventana_cam)
-            
-            messagebox.showinfo("Placa Detectada", f"✅ Placa detectada: {placa}")
+        if isinstance(self.repo, RepositorioMemoria):
+            print("⚠️ Usando datos en memoria como fallback")
         else:
-            self.label_placa_detectada.config(text="No se pudo detectar", fg='#e74c3c')
-            self.btn_aceptar.config(state='disabled')
-            messagebox.showwarning("Sin Detección", "No se pudo detectar una placa válida. Intente de nuevo con mejor iluminación.")
-    
-    def aceptar_placa(self):
-        """Acepta la placa detectada y la envía al callback"""
-        if self.placa_detectada:
-            self.callback(self.placa_detectada)
-            self.cerrar_ventana()
-    
-    def cerrar_ventana(self):
-        """Cierra la ventana de captura"""
-        self.capturando = False
-        if self.cap is not None:
-            self.cap.release()
-        if hasattr(self, 'ventana_cam') and self.ventana_cam:
-            self.ventana_cam.destroy()
-
-# =============================================================================
-# GESTOR DE BASE DE DATOS POSTGRESQL
-# =============================================================================
-
-class PostgreSQLManager:
-    """Gestor de base de datos PostgreSQL con manejo de errores mejorado"""
-    
-    def __init__(self, config=None):
-        """
-        Inicializa el gestor de base de datos PostgreSQL
-        config: diccionario con configuración de conexión
-        """
-        self.config = config or {}
-        self.connection = None
-        self.cursor = None
-        self.conectado = False
-        
-        # Configuración por defecto
-        self.db_config = {
-            'host': config.get('host', 'localhost'),
-            'database': config.get('database', 'control_acceso'),
-            'user': config.get('user', 'postgres'),
-            'password': config.get('password', ''),
-            'port': config.get('port', 5432)
-        }
+            print(f"✅ Usando base de datos {self.repo.nombre}")
         
-        # Intentar conectar
-        if self.conectar():
-            self.crear_estructura_bd()
-            self.insertar_datos_iniciales()
-    
-    def conectar(self):
-        """Establece conexión con la base de datos PostgreSQL"""
-        try:
-            self.connection = psycopg2.connect(**self.db_config)
-            self.connection.autocommit = False
-            self.cursor = self.connection.cursor(cursor_factory=RealDictCursor)
-            self.conectado = True
-            print(f"✅ Conectado a PostgreSQL en {self.db_config['host']}/{self.db_config['database']}")
-            return True
-        except Exception as e:
-            print(f"❌ Error conectando a PostgreSQL: {e}")
-            self.conectado = False
-            self.connection = None
-            self.cursor = None
-            return False
-    
-    def verificar_conexion(self):
-        """Verifica si la conexión está activa"""
-        if not self.conectado or not self.connection or not self.cursor:
-            return False
-        try:
-            self.cursor.execute("SELECT 1")
-            return True
-        except:
-            self.conectado = False
-            return False
-    
-    def crear_estructura_bd(self):
-        """Crea la estructura de la base de datos"""
-        if not self.verificar_conexion():
-            print("⚠️ No hay conexión a la base de datos para crear estructura")
-            return False
+        if self.repo.remoto:
+            # Carga inicial del directorio de placas en el pool de fondo
+            self.acceso.enviar('refrescar', callback=self.directorio_cargado)
         
-        try:
-            # Tabla residentes
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS residentes (
-                    id SERIAL PRIMARY KEY,
-                    nombre VARCHAR(100) NOT NULL,
-                    apartamento VARCHAR(20) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabla parqueaderos
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS parqueaderos (
-                    id SERIAL PRIMARY KEY,
-                    numero INTEGER UNIQUE NOT NULL,
-                    estado VARCHAR(10) CHECK (estado IN ('LIBRE','OCUPADO')) DEFAULT 'LIBRE',
-                    residente_id INTEGER UNIQUE,
-                    FOREIGN KEY (residente_id) REFERENCES residentes(id)
-                )
-            """)
-            
-            # Tabla placas
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS placas (
-                    id SERIAL PRIMARY KEY,
-                    residente_id INTEGER NOT NULL,
-                    placa VARCHAR(10) UNIQUE NOT NULL,
-                    FOREIGN KEY (residente_id) REFERENCES residentes(id) ON DELETE CASCADE
-                )
-            """)
-            
-            # Tabla registros_visitantes
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS registros_visitantes (
-                    id SERIAL PRIMARY KEY,
-                    placa VARCHAR(10) NOT NULL,
-                    parqueadero_id INTEGER NOT NULL,
-                    hora_entrada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    hora_salida TIMESTAMP,
-                    total_horas NUMERIC(5,2),
-                    valor_pagado NUMERIC(10,2),
-                    FOREIGN KEY (parqueadero_id) REFERENCES parqueaderos(id)
-                )
-            """)
-            
-            # Función para calcular el pago
-            self.cursor.execute("""
-                CREATE OR REPLACE FUNCTION calcular_pago()
-                RETURNS TRIGGER AS $$
-                DECLARE
-                    horas NUMERIC;
-                BEGIN
-                    horas := EXTRACT(EPOCH FROM (NEW.hora_salida - NEW.hora_entrada)) / 3600;
-                    NEW.total_horas := ROUND(horas,2);
-                    
-                    -- Cálculo de tarifa: primeras 5 horas a $1000/hora (o fracción), después tarifa plena de $10000
-                    IF horas <= 5 THEN
-                        NEW.valor_pagado := CEIL(horas) * 1000;
-                    ELSE
-                        NEW.valor_pagado := 10000;
-                    END IF;
-                    
-                    RETURN NEW;
-                END;
-                $$ LANGUAGE plpgsql;
-            """)
-            
-            # Trigger
-            self.cursor.execute("""
-                DROP TRIGGER IF EXISTS trigger_calculo_pago ON registros_visitantes;
-                
-                CREATE TRIGGER trigger_calculo_pago
-                BEFORE UPDATE ON registros_visitantes
-                FOR EACH ROW
-                WHEN (NEW.hora_salida IS NOT NULL)
-                EXECUTE FUNCTION calcular_pago();
-            """)
-            
-            self.connection.commit()
-            print("✅ Estructura de base de datos creada/verificada")
-            return True
-            
-        except Exception as e:
-            print(f"Error creando estructura: {e}")
-            if self.connection:
-                self.connection.rollback()
-            return False
-    
-    def insertar_datos_iniciales(self):
-        """Inserta datos iniciales de ejemplo"""
-        if not self.verificar_conexion():
-            return False
-        
-        try:
-            # Verificar si ya hay datos
-            self.cursor.execute("SELECT COUNT(*) as count FROM residentes")
-            result = self.cursor.fetchone()
-            if result and result['count'] > 0:
-                return True
-            
-            # Insertar residentes
-            residentes_data = [
-                ('Juan Pérez', '101'),
-                ('María Gómez', '202'),
-                ('Carlos López', '303'),
-                ('Ana Martínez', '404'),
-                ('Pedro Sánchez', '505')
-            ]
-            
-            placas_data = ['ABC123', 'DEF456', 'GHI789', 'JKL012', 'MNO345']
-            
-            for i, (nombre, apto) in enumerate(residentes_data):
-                # Insertar residente
-                self.cursor.execute(
-                    "INSERT INTO residentes (nombre, apartamento) VALUES (%s, %s) RETURNING id",
-                    (nombre, apto)
-                )
-                residente_id = self.cursor.fetchone()['id']
-                
-                # Insertar parqueadero para residente (números 1-5)
-                self.cursor.execute(
-                    "INSERT INTO parqueaderos (numero, residente_id) VALUES (%s, %s)",
-                    (i + 1, residente_id)
-                )
-                
-                # Insertar placa
-                self.cursor.execute(
-                    "INSERT INTO placas (residente_id, placa) VALUES (%s, %s)",
-                    (residente_id, placas_data[i])
-                )
-            
-            # Insertar parqueaderos adicionales para visitantes (números 6-10)
-            for i in range(6, 11):
-                self.cursor.execute(
-                    "INSERT INTO parqueaderos (numero) VALUES (%s)",
-                    (i,)
-                )
-            
-            self.connection.commit()
-            print("✅ Datos iniciales insertados correctamente")
-            return True
-            
-        except Exception as e:
-            print(f"Error insertando datos iniciales: {e}")
-            if self.connection:
-                self.connection.rollback()
-            return False
-    
-    # ============= CONSULTAS PRINCIPALES =============
-    
-    def verificar_placa_residente(self, placa):
-        """Verifica si una placa es de residente"""
-        if not self.verificar_conexion():
-            return None
-        
-        try:
-            query = """
-                SELECT r.nombre, r.apartamento, p.numero AS parqueadero, p.estado
-                FROM placas pl
-                JOIN residentes r ON pl.residente_id = r.id
-                JOIN parqueaderos p ON p.residente_id = r.id
-                WHERE pl.placa = %s
-            """
-            self.cursor.execute(query, (placa,))
-            return self.cursor.fetchone()
-        except Exception as e:
-            print(f"Error en verificar_placa_residente: {e}")
-            return None
-    
-    def registrar_entrada_visitante(self, placa, parqueadero_id):
-        """Registra entrada de visitante"""
-        if not self.verificar_conexion():
-            return None
-        
-        try:
-            # Insertar registro de visitante
-            self.cursor.execute("""
-                INSERT INTO registros_visitantes (placa, parqueadero_id)
-                VALUES (%s, %s)
-                RETURNING id
-            """, (placa, parqueadero_id))
-            
-            registro_id = self.cursor.fetchone()['id']
-            
-            # Actualizar estado del parqueadero
-            self.cursor.execute("""
-                UPDATE parqueaderos
-                SET estado = 'OCUPADO'
-                WHERE id = %s
-            """, (parqueadero_id,))
-            
-            self.connection.commit()
-            return registro_id
-            
-        except Exception as e:
-            print(f"Error registrando entrada: {e}")
-            if self.connection:
-                self.connection.rollback()
-            return None
-    
-    def registrar_salida_visitante(self, registro_id, parqueadero_id):
-        """Registra salida de visitante (el trigger calcula el pago automáticamente)"""
-        if not self.verificar_conexion():
-            return None
-        
-        try:
-            # Actualizar hora de salida (el trigger calculará automáticamente)
-            self.cursor.execute("""
-                UPDATE registros_visitantes
-                SET hora_salida = CURRENT_TIMESTAMP
-                WHERE id = %s
-                RETURNING total_horas, valor_pagado, hora_salida
-            """, (registro_id,))
-            
-            resultado = self.cursor.fetchone()
-            
-            # Liberar parqueadero
-            self.cursor.execute("""
-                UPDATE parqueaderos
-                SET estado = 'LIBRE'
-                WHERE id = %s
-            """, (parqueadero_id,))
-            
-            # Si el trigger no devolvió valores, intentar cálculo manual
-            if resultado is None or resultado.get('valor_pagado') is None:
-                self.cursor.execute("SELECT hora_entrada, hora_salida FROM registros_visitantes WHERE id = %s", (registro_id,))
-                fila = self.cursor.fetchone()
-                if fila and fila.get('hora_entrada') and fila.get('hora_salida'):
-                    he = fila['hora_entrada']
-                    hs = fila['hora_salida']
-                    # Asegurar tipos datetime
-                    if isinstance(he, str):
-                        he = datetime.fromisoformat(he.replace('Z', '+00:00'))
-                    if isinstance(hs, str):
-                        hs = datetime.fromisoformat(hs.replace('Z', '+00:00'))
-                    
-                    if hasattr(he, 'tzinfo') and he.tzinfo:
-                        he = he.replace(tzinfo=None)
-                    if hasattr(hs, 'tzinfo') and hs.tzinfo:
-                        hs = hs.replace(tzinfo=None)
-                    
-                    horas = (hs - he).total_seconds() / 3600
-                    if horas <= 5:
-                        valor = int(np.ceil(horas)) * 1000
-                    else:
-                        valor = 10000
-                    resultado = {'total_horas': round(horas, 2), 'valor_pagado': valor, 'hora_salida': hs}
-
-            self.connection.commit()
-            return resultado
-            
-        except Exception as e:
-            print(f"Error registrando salida: {e}")
-            if self.connection:
-                self.connection.rollback()
-            return None
-    
-    def obtener_parqueaderos_libres_visitantes(self):
-        """Obtiene parqueaderos libres para visitantes"""
-        if not self.verificar_conexion():
-            return []
-        
-        try:
-            self.cursor.execute("""
-                SELECT id, numero 
-                FROM parqueaderos 
-                WHERE residente_id IS NULL 
-                AND estado = 'LIBRE'
-                ORDER BY numero
-            """)
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Error obteniendo parqueaderos libres: {e}")
-            return []
+        self.actualizar_modo()
+        self.actualizar_estadisticas()
     
-    def marcar_parqueadero_ocupado(self, numero_parqueadero):
-        """Marca un parqueadero como OCUPADO (para residentes)"""
-        if not self.verificar_conexion():
-            return False
-        
-        try:
-            self.cursor.execute("""
-                UPDATE parqueaderos
-                SET estado = 'OCUPADO'
-                WHERE numero = %s
-            """, (numero_parqueadero,))
-            self.connection.commit()
-            return True
-        except Exception as e:
-            print(f"Error marcando parqueadero como ocupado: {e}")
-            if self.connection:
-                self.connection.rollback()
-            return False
+    def directorio_cargado(self, cargado, error):
+        """Callback (hilo de Tk) al terminar la carga inicial del directorio de placas"""
+        m = self.repo.metricas() if cargado else None
+        if m:
+            print(f"📇 Directorio de placas cargado ({m['placas']} residentes)")
+        elif error:
+            print(f"⚠️ No se pudo cargar el directorio de placas: {error}")
     
-    def marcar_parqueadero_libre(self, numero_parqueadero):
-        """Marca un parqueadero como LIBRE (para residentes)"""
-        if not self.verificar_conexion():
+    def repositorio_listo(self):
+        """Avisa si la conexión inicial aún no termina"""
+        if self.repo is None:
+            messagebox.showwarning("Advertencia", "⏳ Conectando a la base de datos, intente de nuevo en unos segundos")
             return False
-        
-        try:
-            self.cursor.execute("""
-                UPDATE parqueaderos
-                SET estado = 'LIBRE'
-                WHERE numero = %s
-            """, (numero_parqueadero,))
-            self.connection.commit()
-            return True
-        except Exception as e:
-            print(f"Error marcando parqueadero como libre: {e}")
-            if self.connection:
-                self.connection.rollback()
-            return False
-    
-    def obtener_visitante_activo_por_placa(self, placa):
-        """Obtiene un visitante activo por su placa"""
-        if not self.verificar_conexion():
-            return None
-        
-        try:
-            self.cursor.execute("""
-                SELECT rv.id, rv.placa, rv.hora_entrada, rv.parqueadero_id, p.numero as parqueadero
-                FROM registros_visitantes rv
-                JOIN parqueaderos p ON rv.parqueadero_id = p.id
-                WHERE rv.placa = %s AND rv.hora_salida IS NULL
-                ORDER BY rv.hora_entrada DESC
-                LIMIT 1
-            """, (placa,))
-            return self.cursor.fetchone()
-        except Exception as e:
-            print(f"Error obteniendo visitante activo: {e}")
-            return None
-    
-    def obtener_visitantes_activos(self):
-        """Obtiene todos los visitantes activos"""
-        if not self.verificar_conexion():
-            return []
-        
-        try:
-            self.cursor.execute("""
-                SELECT rv.id, rv.placa, rv.hora_entrada, p.numero as parqueadero
-                FROM registros_visitantes rv
-                JOIN parqueaderos p ON rv.parqueadero_id = p.id
-                WHERE rv.hora_salida IS NULL
-                ORDER BY rv.hora_entrada
-            """)
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Error obteniendo visitantes activos: {e}")
-            return []
-    
-    def obtener_historial_visitantes(self, limit=100):
-        """Obtiene el historial de visitantes"""
-        if not self.verificar_conexion():
-            return []
-        
-        try:
-            self.cursor.execute("""
-                SELECT rv.id, rv.placa, rv.hora_entrada, rv.hora_salida, 
-                       rv.total_horas, rv.valor_pagado, p.numero as parqueadero
-                FROM registros_visitantes rv
-                JOIN parqueaderos p ON rv.parqueadero_id = p.id
-                WHERE rv.hora_salida IS NOT NULL
-                ORDER BY rv.hora_salida DESC
-                LIMIT %s
-            """, (limit,))
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Error obteniendo historial: {e}")
-            return []
-    
-    def obtener_estado_parqueaderos(self):
-        """Obtiene el estado de todos los parqueaderos con datos de residentes"""
-        if not self.verificar_conexion():
-            return []
-        
-        try:
-            self.cursor.execute("""
-                SELECT p.id, p.numero, p.estado, 
-                       r.nombre as residente, r.apartamento,
-                       (SELECT pl.placa FROM placas pl 
-                        WHERE pl.residente_id = r.id LIMIT 1) as placa
-                FROM parqueaderos p
-                LEFT JOIN residentes r ON p.residente_id = r.id
-                ORDER BY p.numero
-            """)
-            return self.cursor.fetchall()
-        except Exception as e:
-            print(f"Error obteniendo estado parqueaderos: {e}")
-            return []
-    
-    def obtener_estadisticas(self):
-        """Obtiene estadísticas generales"""
-        stats = {
-            'total_parqueaderos': 0,
-            'ocupados': 0,
-            'visitantes_activos': 0,
-            'total_recaudado': 0,
-            'recaudado_hoy': 0
-        }
-        
-        if not self.verificar_conexion():
-            return stats
-        
-        try:
-            # Total parqueaderos
-            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos")
-            result = self.cursor.fetchone()
-            stats['total_parqueaderos'] = result['count'] if result else 0
-            
-            # Parqueaderos ocupados
-            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE estado = 'OCUPADO'")
-            result = self.cursor.fetchone()
-            stats['ocupados'] = result['count'] if result else 0
-            
-            # Visitantes activos
-            self.cursor.execute("SELECT COUNT(*) as count FROM registros_visitantes WHERE hora_salida IS NULL")
-            result = self.cursor.fetchone()
-            stats['visitantes_activos'] = result['count'] if result else 0
-            
-            # Total recaudado
-            self.cursor.execute("SELECT COALESCE(SUM(valor_pagado), 0) as total FROM registros_visitantes")
-            result = self.cursor.fetchone()
-            stats['total_recaudado'] = float(result['total']) if result else 0
-            
-            # Recaudado hoy
-            self.cursor.execute("""
-                SELECT COALESCE(SUM(valor_pagado), 0) as total 
-                FROM registros_visitantes 
-                WHERE DATE(hora_salida) = CURRENT_DATE
-            """)
-            result = self.cursor.fetchone()
-            stats['recaudado_hoy'] = float(result['total']) if result else 0
-            
-            return stats
-            
-        except Exception as e:
-            print(f"Error obteniendo estadísticas: {e}")
-            return stats
-    
-    def obtener_estadisticas_por_tipo(self):
-        """Obtiene estadísticas separadas por tipo de parqueadero"""
-        stats = {
-            'residentes': {
-                'total': 0,
-                'ocupados': 0,
-                'libres': 0,
-                'ingresos': 0
-            },
-            'visitantes': {
-                'total': 0,
-                'ocupados': 0,
-                'libres': 0,
-                'ingresos': 0,
-                'activos': 0
-            }
-        }
-        
-        if not self.verificar_conexion():
-            return stats
-        
-        try:
-            # PARQUEADEROS DE RESIDENTES
-            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NOT NULL")
-            result = self.cursor.fetchone()
-            stats['residentes']['total'] = result['count'] if result else 0
-            
-            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NOT NULL AND estado = 'OCUPADO'")
-            result = self.cursor.fetchone()
-            stats['residentes']['ocupados'] = result['count'] if result else 0
-            
-            stats['residentes']['libres'] = stats['residentes']['total'] - stats['residentes']['ocupados']
-            
-            # PARQUEADEROS DE VISITANTES
-            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NULL")
-            result = self.cursor.fetchone()
-            stats['visitantes']['total'] = result['count'] if result else 0
-            
-            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NULL AND estado = 'OCUPADO'")
-            result = self.cursor.fetchone()
-            stats['visitantes']['ocupados'] = result['count'] if result else 0
-            
-            stats['visitantes']['libres'] = stats['visitantes']['total'] - stats['visitantes']['ocupados']
-            
-            # Visitantes activos
-            self.cursor.execute("SELECT COUNT(*) as count FROM registros_visitantes WHERE hora_salida IS NULL")
-            result = self.cursor.fetchone()
-            stats['visitantes']['activos'] = result['count'] if result else 0
-            
-            # Ingresos por tipo
-            self.cursor.execute("""
-                SELECT COALESCE(SUM(rg.valor_pagado), 0) as total
-                FROM registros_visitantes rg
-                JOIN parqueaderos p ON rg.parqueadero_id = p.id
-                WHERE p.residente_id IS NULL
-            """)
-            result = self.cursor.fetchone()
-            stats['visitantes']['ingresos'] = float(result['total']) if result else 0
-            
-            self.cursor.execute("""
-                SELECT COALESCE(SUM(rg.valor_pagado), 0) as total
-                FROM registros_visitantes rg
-                JOIN parqueaderos p ON rg.parqueadero_id = p.id
-                WHERE p.residente_id IS NOT NULL
-            """)
-            result = self.cursor.fetchone()
-            stats['residentes']['ingresos'] = float(result['total']) if result else 0
-            
-            return stats
-            
-        except Exception as e:
-            print(f"Error obteniendo estadísticas por tipo: {e}")
-            return stats
+        return True
     
-    def cerrar(self):
-        """Cierra la conexión a la base de datos"""
-        try:
-            if self.cursor:
-                self.cursor.close()
-            if self.connection:
-                self.connection.close()
-                print("🔌 Conexión a PostgreSQL cerrada")
-        except Exception as e:
-            print(f"Error cerrando conexión: {e}")
-
-# =============================================================================
-# SISTEMA PRINCIPAL
-# =============================================================================
-
-class SistemaControlAccesoPostgreSQL:
-    def __init__(self, db_config=None):
+    def operar(self, operacion, *args, callback, escritura=False):
         """
-        Inicializa el sistema con base de datos PostgreSQL
-        db_config: configuración de conexión
+        Ejecuta una operación del repositorio y entrega (resultado, error) a callback
+        en el hilo de Tk. Con repositorio remoto va al pool de fondo: una consulta
+        lenta o una reconexión no congelan la portería
+        operacion: nombre de un método del repositorio, o función(repo, *args)
+        escritura: sin timeout de la interfaz; si tarda se avisa que sigue en proceso
         """
-        self.db = None
-        self.db_config = db_config or {}
-        self.usar_datos_memoria = False
-        self.datos_memoria = self.inicializar_datos_memoria()
-        self.capturador = None
-        
-        # Intentar conectar a PostgreSQL
-        print("\n" + "="*60)
-        print("CONECTANDO A POSTGRESQL")
-        print("="*60)
-        print(f"Host: {self.db_config.get('host', 'localhost')}")
-        print(f"Database: {self.db_config.get('database', 'control_acceso')}")
-        print(f"User: {self.db_config.get('user', 'postgres')}")
-        print("="*60)
-        
-        self.db = PostgreSQLManager(self.db_config)
+        if self.repo.remoto:
+            if not escritura:
+                self.acceso.enviar(operacion, *args, callback=callback)
+                return
+            aviso = self.ventana.after(AVISO_ESCRITURA_MS, self.mostrar_procesando)
+            
+            def terminada(resultado, error):
+                self.ventana.after_cancel(aviso)
+                if error:
+                    # No dejar el aviso de "sigue procesando" tras una falla
+                    self.label_resultado_placa.config(text=f"❌ La operación falló: {error}", fg='#e74c3c',
+                                                      font=('Arial', 14, 'bold'), justify='center')
+                callback(resultado, error)
+            
+            self.acceso.enviar(operacion, *args, callback=terminada, timeout=None)
+            return
+        try:
+            if isinstance(operacion, str):
+                resultado = getattr(self.repo, operacion)(*args)
+            else:
+                resultado = operacion(self.repo, *args)
+            error = None
+        except Exception as e:
+            resultado, error = None, e
+        callback(resultado, error)
+    
+    def accion_porteria(self, operacion, placa, terminado):
+        """Entrada o salida desde los botones: una a la vez, con el resultado en terminado(resultado)"""
+        if self.accion_en_curso:
+            return
+        self.accion_en_curso = True
         
-        if self.db and self.db.conectado:
-            print("✅ Usando base de datos PostgreSQL")
-            self.usar_datos_memoria = False
-        else:
-            print("⚠️ Usando datos en memoria como fallback")
-            self.usar_datos_memoria = True
-            self.db = None
+        def respuesta(resultado, error):
+            self.accion_en_curso = False
+            if error:
+                messagebox.showerror("Error", f"Error registrando la operación: {error}")
+                return
+            terminado(resultado)
         
-        # Crear ventana principal
-        self.crear_interfaz()
+        self.operar(operacion, placa, callback=respuesta, escritura=True)
     
-    def inicializar_datos_memoria(self):
-        """Inicializa datos en memoria como fallback"""
-        return {
-            'residentes': {
-                'ABC123': {'nombre': 'Juan Pérez', 'parqueadero': 1, 'estado': 'libre', 'apartamento': '101'},
-                'DEF456': {'nombre': 'María Gómez', 'parqueadero': 2, 'estado': 'libre', 'apartamento': '202'},
-                'GHI789': {'nombre': 'Carlos López', 'parqueadero': 3, 'estado': 'libre', 'apartamento': '303'},
-                'JKL012': {'nombre': 'Ana Martínez', 'parqueadero': 4, 'estado': 'libre', 'apartamento': '404'},
-                'MNO345': {'nombre': 'Pedro Sánchez', 'parqueadero': 5, 'estado': 'libre', 'apartamento': '505'},
-            },
-            'visitantes_activos': {},
-            'historial_visitantes': [],
-            'parqueaderos_visitantes': [6, 7, 8, 9, 10],
-            'total_parqueaderos_visitantes': 5
-        }
+    def mostrar_procesando(self):
+        """Una escritura sigue en la base de datos: no se debe repetir"""
+        self.label_resultado_placa.config(text="⏳ La base de datos sigue procesando la operación...\n"
+                                               "No la repita: el resultado aparecerá aquí",
+                                          fg='#f39c12', font=('Arial', 14, 'bold'), justify='center')
+        self.panel_resultado_placa.config(bg='#ffffff')
+    
+    def limpiar_busqueda(self):
+        """Deja el campo de placa vacío y actualiza las estadísticas tras una entrada o salida"""
+        self.entry_placa.delete(0, tk.END)
+        self.label_resultado_placa.config(text="📝 Ingrese una placa, use la cámara o cargue una foto", fg='#34495e', bg='#ffffff', font=('Arial', 14))
+        self.panel_resultado_placa.config(bg='#ffffff')
+        self.actualizar_estadisticas()
     
     def crear_interfaz(self):
         """Crea la interfaz gráfica con tkinter - ESTILO MEJORADO"""
@@ -1190,6 +211,10 @@ class SistemaControlAccesoPostgreSQL:
         menubar.add_cascade(label="📁 Archivo", menu=file_menu, background=color_primario)
         file_menu.add_command(label="⚙️ Configuración", command=self.mostrar_configuracion)
         file_menu.add_separator()
+        file_menu.add_command(label="📤 Exportar Historial...", command=self.exportar_historial)
+        file_menu.add_command(label="📥 Importar Residentes...", command=self.importar_residentes)
+        file_menu.add_command(label="💲 Cargar Plan de Tarifa...", command=self.cargar_plan_tarifa)
+        file_menu.add_separator()
         file_menu.add_command(label="🚪 Salir", command=self.ventana.quit)
         
         # Menú Parqueaderos
@@ -1198,6 +223,7 @@ class SistemaControlAccesoPostgreSQL:
         menubar.add_cascade(label="🅿️ Parqueaderos", menu=parking_menu)
         parking_menu.add_command(label="📊 Ver Estado", command=self.mostrar_estado_parqueaderos)
         parking_menu.add_command(label="📋 Ver Historial", command=self.mostrar_historial)
+        parking_menu.add_command(label="⏱️ Tablero de Tarifas", command=self.mostrar_tablero_tarifas)
         
         # Menú Reportes
         reportes_menu = tk.Menu(menubar, tearoff=0, bg=color_secundario, fg='white',
@@ -1235,8 +261,6 @@ class SistemaControlAccesoPostgreSQL:
         title_label.pack(pady=(10, 5))
         
         # Subtítulo con estado de BD
-        db_status = "PostgreSQL" if not self.usar_datos_memoria else "Memoria (Fallback)"
-        db_color = color_exito if not self.usar_datos_memoria else color_advertencia
         subtitle_frame = tk.Frame(title_container, bg=color_primario)
         subtitle_frame.pack()
         
@@ -1249,8 +273,10 @@ class SistemaControlAccesoPostgreSQL:
         tk.Label(subtitle_frame, text=f"Modo: ", font=('Arial', 11, 'bold'), 
                 bg=color_primario, fg='white').pack(side='left')
         
-        tk.Label(subtitle_frame, text=db_status, font=('Arial', 11, 'bold'), 
-                bg=db_color, fg='white', padx=8, pady=2).pack(side='left')
+        self.label_modo = tk.Label(subtitle_frame, font=('Arial', 11, 'bold'), 
+                                   fg='white', padx=8, pady=2)
+        self.label_modo.pack(side='left')
+        self.actualizar_modo()
         
         # ========== FRAME DE BÚSQUEDA Y ACCIONES ==========
         self.crear_frame_busqueda_mejorado(color_primario, color_acento, color_exito, 
@@ -1267,8 +293,27 @@ class SistemaControlAccesoPostgreSQL:
         self.crear_footer_estadisticas(color_primario, color_exito, color_peligro, 
                                        color_advertencia, color_acento)
         
-        # Actualizar estadísticas cada 2 segundos
-        self.actualizar_estadisticas()
+        # Actualizar estadísticas cada 2 segundos y atender resultados de consultas de fondo
+        self.ciclo_estadisticas()
+        self.procesar_resultados_async()
+    
+    def actualizar_modo(self):
+        """Muestra en el encabezado el modo de almacenamiento actual"""
+        sincronizacion = self.repo.estado_sincronizacion() if self.repo else None
+        if self.repo is None:
+            self.label_modo.config(text="Conectando...", bg='#7f8c8d')
+        elif sincronizacion and (not sincronizacion['en_linea'] or sincronizacion['pendientes']):
+            # Operando con la cola local: cuántas operaciones faltan por enviar al servidor
+            texto = "Sin conexión" if not sincronizacion['en_linea'] else "Sincronizando"
+            self.label_modo.config(text=f"{texto} · {sincronizacion['pendientes']} pendientes", bg='#e67e22')
+        else:
+            fallback = isinstance(self.repo, RepositorioMemoria)
+            self.label_modo.config(text=self.repo.nombre, bg='#f39c12' if fallback else '#27ae60')
+    
+    def procesar_resultados_async(self):
+        """Entrega a la interfaz los resultados de las consultas en segundo plano"""
+        self.acceso.procesar_resultados()
+        self.ventana.after(50, self.procesar_resultados_async)
     
     def crear_frame_busqueda_mejorado(self, color_primario, color_acento, color_exito, 
                                       color_advertencia, color_peligro, color_fondo):
@@ -1376,6 +421,8 @@ class SistemaControlAccesoPostgreSQL:
     
     def abrir_capturador(self):
         """Abre la ventana de captura de cámara"""
+        # OpenCV y Tesseract se cargan con la primera captura, no al iniciar
+        from ventana_camara import CapturadorPlaca
         self.capturador = CapturadorPlaca(self.ventana)
         self.capturador.abrir_ventana_captura(self.placa_capturada_callback)
     
@@ -1404,6 +451,8 @@ class SistemaControlAccesoPostgreSQL:
         mensaje = messagebox.showinfo("Procesando", "Procesando imagen y detectando placa...\nPor favor espere.")
         
         try:
+            from ventana_camara import ProcesadorPlacas
+            
             # Procesar imagen y detectar placa usando el procesador mejorado
             placa_detectada, imagen_procesada = ProcesadorPlacas.procesar_imagen_para_ocr(file_path)
             
@@ -1543,94 +592,70 @@ class SistemaControlAccesoPostgreSQL:
     
     def verificar_y_mostrar_tipo(self, placa):
         """Verifica si la placa es residente o visitante y muestra el resultado"""
+        if self.repo is None:
+            self.label_resultado_placa.config(
+                text="⏳ CONECTANDO\n\nIntente de nuevo en unos segundos", 
+                fg='#34495e',
+                font=('Arial', 14, 'bold'),
+                justify='center'
+            )
+            self.panel_resultado_placa.config(bg='#ffffff')
+            return
+        
+        self.consulta_placa = placa
+        self.label_resultado_placa.config(text=f"⏳ Consultando {placa}...", fg='#34495e',
+                                          font=('Arial', 14, 'bold'), justify='center')
+        self.panel_resultado_placa.config(bg='#ffffff')
+        self.operar('clasificar_placa', placa,
+                    callback=lambda clasificacion, error: self.mostrar_tipo(placa, clasificacion, error))
+    
+    def mostrar_tipo(self, placa, clasificacion, error):
+        """Callback (hilo de Tk) con la clasificación de la placa"""
+        if placa != self.consulta_placa:
+            # Ya se pidió otra placa
+            return
         try:
-            if self.usar_datos_memoria:
-                if placa in self.datos_memoria['residentes']:
-                    residente = self.datos_memoria['residentes'][placa]
-                    estado_visual = "🟢 LIBRE" if residente['estado'].lower() == 'libre' else "🔴 OCUPADO"
-                    texto = (f"✅ RESIDENTE IDENTIFICADO\n\n"
-                            f"Nombre: {residente['nombre']}\n"
-                            f"Apartamento: {residente['apartamento']}\n"
-                            f"Parqueadero: {residente['parqueadero']}\n"
-                            f"Estado: {estado_visual}")
-                    self.label_resultado_placa.config(
-                        text=texto, 
-                        fg='#1e3c2c',
-                        font=('Arial', 12),
-                        justify='left'
-                    )
-                    self.panel_resultado_placa.config(bg='#d4edda')
-                else:
-                    # Verificar si es visitante activo
-                    if placa in self.datos_memoria['visitantes_activos']:
-                        datos = self.datos_memoria['visitantes_activos'][placa]
-                        tiempo = datetime.now() - datos['hora_entrada']
-                        horas = tiempo.total_seconds() / 3600
-                        texto = (f"✅ VISITANTE ACTIVO\n\n"
-                                f"Parqueadero: {datos['parqueadero']}\n"
-                                f"Tiempo: {horas:.1f} horas")
-                    else:
-                        texto = (f"✅ VISITANTE NO REGISTRADO\n\n"
-                                f"Use 'ENTRADA VISITANTE' para registrar.")
-                    
-                    self.label_resultado_placa.config(
-                        text=texto, 
-                        fg='#7b4a1e',
-                        font=('Arial', 12),
-                        justify='left'
-                    )
-                    self.panel_resultado_placa.config(bg='#fff3cd')
+            if error:
+                raise error
+            if clasificacion is None:
+                raise RuntimeError("No se pudo consultar la placa en la base de datos")
+            self.ultima_clasificacion = (placa, clasificacion, time.monotonic())
+            
+            if clasificacion['tipo'] == 'RESIDENTE':
+                residente = clasificacion
+                estado_visual = "🟢 LIBRE" if residente['estado'] == 'LIBRE' else "🔴 OCUPADO"
+                texto = (f"✅ RESIDENTE IDENTIFICADO\n\n"
+                        f"Nombre: {residente['nombre']}\n"
+                        f"Apartamento: {residente['apartamento']}\n"
+                        f"Parqueadero: {residente['parqueadero']}\n"
+                        f"Estado: {estado_visual}")
+                self.label_resultado_placa.config(
+                    text=texto, 
+                    fg='#1e3c2c',
+                    font=('Arial', 12),
+                    justify='left'
+                )
+                bg = '#d4edda' if residente['estado'] == 'LIBRE' else '#f8d7da'
+                self.panel_resultado_placa.config(bg=bg)
             else:
-                # Modo PostgreSQL
-                if self.db and self.db.conectado:
-                    residente = self.db.verificar_placa_residente(placa)
-                    
-                    if residente:
-                        texto = (f"✅ RESIDENTE IDENTIFICADO\n\n"
-                                f"Nombre: {residente['nombre']}\n"
-                                f"Apartamento: {residente['apartamento']}\n"
-                                f"Parqueadero: {residente['parqueadero']}\n"
-                                f"Estado: {residente['estado']}")
-                        self.label_resultado_placa.config(
-                            text=texto, 
-                            fg='#1e3c2c',
-                            font=('Arial', 12),
-                            justify='left'
-                        )
-                        bg = '#d4edda' if residente['estado'] == 'LIBRE' else '#f8d7da'
-                        self.panel_resultado_placa.config(bg=bg)
-                    else:
-                        # Verificar si es visitante activo
-                        visitante = self.db.obtener_visitante_activo_por_placa(placa)
-                        if visitante:
-                            hora_entrada = visitante['hora_entrada']
-                            if hasattr(hora_entrada, 'strftime'):
-                                hora_str = hora_entrada.strftime('%H:%M')
-                            else:
-                                hora_str = str(hora_entrada)
-                            
-                            texto = (f"✅ VISITANTE ACTIVO\n\n"
-                                    f"Parqueadero: {visitante['parqueadero']}\n"
-                                    f"Entrada: {hora_str}")
-                        else:
-                            texto = (f"✅ VISITANTE NO REGISTRADO\n\n"
-                                    f"Use 'ENTRADA VISITANTE' para registrar.")
-                        
-                        self.label_resultado_placa.config(
-                            text=texto, 
-                            fg='#7b4a1e',
-                            font=('Arial', 12),
-                            justify='left'
-                        )
-                        self.panel_resultado_placa.config(bg='#fff3cd')
+                if clasificacion['tipo'] == 'VISITANTE':
+                    hora_entrada = clasificacion['hora_entrada']
+                    horas = (datetime.now() - hora_entrada).total_seconds() / 3600
+                    texto = (f"✅ VISITANTE ACTIVO\n\n"
+                            f"Parqueadero: {clasificacion['parqueadero']}\n"
+                            f"Entrada: {hora_entrada.strftime('%H:%M')}\n"
+                            f"Tiempo: {horas:.1f} horas")
                 else:
-                    self.label_resultado_placa.config(
-                        text="❌ ERROR DE CONEXIÓN\n\nNo hay conexión a la base de datos", 
-                        fg='#7a1f1f',
-                        font=('Arial', 14, 'bold'),
-                        justify='center'
-                    )
-                    self.panel_resultado_placa.config(bg='#f8d7da')
+                    texto = (f"✅ VISITANTE NO REGISTRADO\n\n"
+                            f"Use 'ENTRADA VISITANTE' para registrar.")
+                
+                self.label_resultado_placa.config(
+                    text=texto, 
+                    fg='#7b4a1e',
+                    font=('Arial', 12),
+                    justify='left'
+                )
+                self.panel_resultado_placa.config(bg='#fff3cd')
                     
         except Exception as e:
             self.label_resultado_placa.config(
@@ -1641,6 +666,21 @@ class SistemaControlAccesoPostgreSQL:
             )
             self.panel_resultado_placa.config(bg='#f8d7da')
     
+    def tomar_visitante_clasificado(self, placa, vigencia=60):
+        """
+        Retorna el visitante activo de la última búsqueda si corresponde a la placa
+        y es reciente, evitando repetir la consulta al abrir la liquidación
+        """
+        if not self.ultima_clasificacion:
+            return None
+        
+        placa_clasificada, clasificacion, momento = self.ultima_clasificacion
+        self.ultima_clasificacion = None
+        if (placa_clasificada != placa or clasificacion['tipo'] != 'VISITANTE'
+                or time.monotonic() - momento > vigencia):
+            return None
+        return clasificacion
+    
     def registrar_entrada_residente(self):
         """Registra la entrada de un residente (sin pago)"""
         placa = self.entry_placa.get().upper().strip()
@@ -1649,50 +689,26 @@ class SistemaControlAccesoPostgreSQL:
             messagebox.showwarning("Advertencia", "Por favor ingrese una placa")
             return
         
-        try:
-            if self.usar_datos_memoria:
-                # Modo memoria
-                if placa not in self.datos_memoria['residentes']:
-                    messagebox.showerror("Error", f"❌ La placa {placa} no corresponde a un residente registrado")
-                    return
-                
-                residente = self.datos_memoria['residentes'][placa]
-                if residente['estado'].lower() == 'ocupado':
-                    messagebox.showwarning("Advertencia", f"❌ El residente {residente['nombre']} ya tiene su parqueadero ocupado.")
-                    return
-                
-                residente['estado'] = 'ocupado'
-                messagebox.showinfo("Éxito", f"✅ ENTRADA RESIDENTE registrada:\n{residente['nombre']}\nParqueadero: {residente['parqueadero']}")
-                
-            else:
-                # Modo PostgreSQL
-                if not (self.db and self.db.conectado):
-                    messagebox.showerror("Error", "Sin conexión a la base de datos")
-                    return
-                
-                residente = self.db.verificar_placa_residente(placa)
-                if not residente:
-                    messagebox.showerror("Error", f"❌ La placa {placa} no corresponde a un residente registrado")
-                    return
-                
-                if residente['estado'] == 'OCUPADO':
-                    messagebox.showwarning("Advertencia", f"❌ El residente ya tiene su parqueadero ocupado.")
-                    return
-                
-                if self.db.marcar_parqueadero_ocupado(residente['parqueadero']):
-                    messagebox.showinfo("Éxito", f"✅ ENTRADA RESIDENTE registrada:\n{residente['nombre']}\nParqueadero: {residente['parqueadero']}")
-                else:
-                    messagebox.showerror("Error", "❌ Error actualizando estado del parqueadero")
-                    return
+        if not self.repositorio_listo():
+            return
+        
+        def terminado(entrada):
+            if entrada is None:
+                messagebox.showerror("Error", "❌ Error actualizando estado del parqueadero")
+                return
             
-            # Limpiar y actualizar
-            self.entry_placa.delete(0, tk.END)
-            self.label_resultado_placa.config(text="📝 Ingrese una placa, use la cámara o cargue una foto", fg='#34495e', bg='#ffffff', font=('Arial', 14))
-            self.panel_resultado_placa.config(bg='#ffffff')
-            self.actualizar_estadisticas()
+            if entrada['resultado'] == 'NO_RESIDENTE':
+                messagebox.showerror("Error", f"❌ La placa {placa} no corresponde a un residente registrado")
+                return
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al registrar entrada: {str(e)}")
+            if entrada['resultado'] == 'YA_OCUPADO':
+                messagebox.showwarning("Advertencia", f"❌ El residente {entrada['nombre']} ya tiene su parqueadero ocupado.")
+                return
+            
+            messagebox.showinfo("Éxito", f"✅ ENTRADA RESIDENTE registrada:\n{entrada['nombre']}\nParqueadero: {entrada['parqueadero']}")
+            self.limpiar_busqueda()
+        
+        self.accion_porteria('entrada_residente', placa, terminado)
     
     def registrar_entrada_visitante(self):
         """Registra la entrada de un visitante (asigna parqueadero)"""
@@ -1702,70 +718,31 @@ class SistemaControlAccesoPostgreSQL:
             messagebox.showwarning("Advertencia", "Por favor ingrese una placa")
             return
         
-        try:
-            if self.usar_datos_memoria:
-                # Modo memoria
-                if placa in self.datos_memoria['residentes']:
-                    messagebox.showwarning("Advertencia", "❌ Esta placa pertenece a un residente. Use 'ENTRADA RESIDENTE'")
-                    return
-                
-                if placa in self.datos_memoria['visitantes_activos']:
-                    messagebox.showwarning("Advertencia", f"❌ El visitante con placa {placa} ya se encuentra dentro.")
-                    return
-                
-                if not self.datos_memoria['parqueaderos_visitantes']:
-                    messagebox.showwarning("Advertencia", "❌ No hay parqueaderos disponibles para visitantes")
-                    return
-                
-                hora_entrada = datetime.now()
-                parqueadero = self.datos_memoria['parqueaderos_visitantes'][0]
-                self.datos_memoria['visitantes_activos'][placa] = {
-                    'hora_entrada': hora_entrada,
-                    'parqueadero': parqueadero
-                }
-                self.datos_memoria['parqueaderos_visitantes'].remove(parqueadero)
-                
-                messagebox.showinfo("Éxito", f"✅ ENTRADA VISITANTE registrada:\nPlaca: {placa}\nParqueadero: {parqueadero}")
-                
-            else:
-                # Modo PostgreSQL
-                if not (self.db and self.db.conectado):
-                    messagebox.showerror("Error", "Sin conexión a la base de datos")
-                    return
-                
-                # Verificar si es residente
-                residente = self.db.verificar_placa_residente(placa)
-                if residente:
-                    messagebox.showwarning("Advertencia", "❌ Esta placa pertenece a un residente. Use 'ENTRADA RESIDENTE'")
-                    return
-                
-                # Verificar si ya está activo
-                visitante_activo = self.db.obtener_visitante_activo_por_placa(placa)
-                if visitante_activo:
-                    messagebox.showwarning("Advertencia", f"❌ El visitante con placa {placa} ya se encuentra dentro.")
-                    return
-                
-                # Obtener parqueadero libre
-                parq_libres = self.db.obtener_parqueaderos_libres_visitantes()
-                if not parq_libres:
-                    messagebox.showwarning("Advertencia", "❌ No hay parqueaderos disponibles para visitantes")
-                    return
-                
-                registro_id = self.db.registrar_entrada_visitante(placa, parq_libres[0]['id'])
-                if registro_id:
-                    messagebox.showinfo("Éxito", f"✅ ENTRADA VISITANTE registrada:\nPlaca: {placa}\nParqueadero: {parq_libres[0]['numero']}")
-                else:
-                    messagebox.showerror("Error", "❌ Error registrando entrada")
-                    return
+        if not self.repositorio_listo():
+            return
+        
+        def terminado(entrada):
+            if entrada is None:
+                messagebox.showerror("Error", "❌ Error registrando entrada")
+                return
             
-            # Limpiar y actualizar
-            self.entry_placa.delete(0, tk.END)
-            self.label_resultado_placa.config(text="📝 Ingrese una placa, use la cámara o cargue una foto", fg='#34495e', bg='#ffffff', font=('Arial', 14))
-            self.panel_resultado_placa.config(bg='#ffffff')
-            self.actualizar_estadisticas()
+            if entrada['resultado'] == 'RESIDENTE':
+                messagebox.showwarning("Advertencia", "❌ Esta placa pertenece a un residente. Use 'ENTRADA RESIDENTE'")
+                return
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al registrar entrada: {str(e)}")
+            if entrada['resultado'] == 'ACTIVO':
+                messagebox.showwarning("Advertencia", f"❌ El visitante con placa {placa} ya se encuentra dentro.")
+                return
+            
+            if entrada['resultado'] == 'SIN_CUPO':
+                messagebox.showwarning("Advertencia", "❌ No hay parqueaderos disponibles para visitantes")
+                return
+            
+            messagebox.showinfo("Éxito", f"✅ ENTRADA VISITANTE registrada:\nPlaca: {placa}\nParqueadero: {entrada['parqueadero']}")
+            self.limpiar_busqueda()
+        
+        # Validación, asignación de parqueadero e inserción en una sola llamada
+        self.accion_porteria('entrada_visitante', placa, terminado)
     
     def registrar_salida_residente(self):
         """Registra la salida de un residente (sin pago)"""
@@ -1775,50 +752,26 @@ class SistemaControlAccesoPostgreSQL:
             messagebox.showwarning("Advertencia", "Por favor ingrese una placa")
             return
         
-        try:
-            if self.usar_datos_memoria:
-                # Modo memoria
-                if placa not in self.datos_memoria['residentes']:
-                    messagebox.showerror("Error", f"❌ La placa {placa} no corresponde a un residente registrado")
-                    return
-                
-                residente = self.datos_memoria['residentes'][placa]
-                if residente['estado'].lower() == 'libre':
-                    messagebox.showwarning("Advertencia", f"❌ El residente {residente['nombre']} no tiene su parqueadero ocupado.")
-                    return
-                
-                residente['estado'] = 'libre'
-                messagebox.showinfo("Éxito", f"✅ SALIDA RESIDENTE registrada:\n{residente['nombre']}\nParqueadero liberado")
-                
-            else:
-                # Modo PostgreSQL
-                if not (self.db and self.db.conectado):
-                    messagebox.showerror("Error", "Sin conexión a la base de datos")
-                    return
-                
-                residente = self.db.verificar_placa_residente(placa)
-                if not residente:
-                    messagebox.showerror("Error", f"❌ La placa {placa} no corresponde a un residente registrado")
-                    return
-                
-                if residente['estado'] == 'LIBRE':
-                    messagebox.showwarning("Advertencia", f"❌ El residente no tiene su parqueadero ocupado.")
-                    return
-                
-                if self.db.marcar_parqueadero_libre(residente['parqueadero']):
-                    messagebox.showinfo("Éxito", f"✅ SALIDA RESIDENTE registrada:\n{residente['nombre']}\nParqueadero liberado")
-                else:
-                    messagebox.showerror("Error", "❌ Error actualizando estado del parqueadero")
-                    return
+        if not self.repositorio_listo():
+            return
+        
+        def terminado(salida):
+            if salida is None:
+                messagebox.showerror("Error", "❌ Error actualizando estado del parqueadero")
+                return
             
-            # Limpiar y actualizar
-            self.entry_placa.delete(0, tk.END)
-            self.label_resultado_placa.config(text="📝 Ingrese una placa, use la cámara o cargue una foto", fg='#34495e', bg='#ffffff', font=('Arial', 14))
-            self.panel_resultado_placa.config(bg='#ffffff')
-            self.actualizar_estadisticas()
+            if salida['resultado'] == 'NO_RESIDENTE':
+                messagebox.showerror("Error", f"❌ La placa {placa} no corresponde a un residente registrado")
+                return
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al registrar salida: {str(e)}")
+            if salida['resultado'] == 'YA_LIBRE':
+                messagebox.showwarning("Advertencia", f"❌ El residente {salida['nombre']} no tiene su parqueadero ocupado.")
+                return
+            
+            messagebox.showinfo("Éxito", f"✅ SALIDA RESIDENTE registrada:\n{salida['nombre']}\nParqueadero liberado")
+            self.limpiar_busqueda()
+        
+        self.accion_porteria('salida_residente', placa, terminado)
     
     def abrir_ventana_liquidar(self):
         """Abre ventana para liquidar pago de visitante (SALIDA CON PAGO)"""
@@ -1895,111 +848,136 @@ class SistemaControlAccesoPostgreSQL:
         label_hora_entrada.pack(fill='x', pady=3)
         
         # Variable para guardar datos del visitante
-        datos_visitante = {'id': None, 'parqueadero_id': None, 'placa': '', 'parqueadero': None}
+        datos_visitante = {'id': None, 'parqueadero_id': None, 'placa': '', 'parqueadero': None,
+                           'hora_entrada': None}
         tarifa_calculada = {'valor': 0}
         
-        def calcular_tarifa():
-            """Calcula la tarifa según tiempo estacionado"""
+        # Visitantes activos consultados mientras la ventana está abierta: placa -> (fila, momento).
+        # Las placas no encontradas se vuelven a consultar pasados unos segundos
+        cache_visitantes = {}
+        vigencia_no_encontrado = 5
+        consulta_pendiente = {'id': None}
+        
+        def limpiar_calculo(texto_tipo="📌 Tipo de tarifa: --", texto_tarifa="💵 Valor a pagar: --"):
+            label_calculo_tiempo.config(text="⏱️ Tiempo: --")
+            label_calculo_tarifa.config(text=texto_tarifa)
+            label_calculo_tipo.config(text=texto_tipo)
+            label_hora_entrada.config(text="🕐 Hora entrada: --")
+            tarifa_calculada['valor'] = 0
+            datos_visitante['id'] = None
+            datos_visitante['parqueadero_id'] = None
+            datos_visitante['parqueadero'] = None
+            datos_visitante['hora_entrada'] = None
+        
+        def buscar_visitante(placa, entregar):
+            """
+            Entrega a entregar(fila) el visitante activo (id, parqueadero_id, parqueadero,
+            hora_entrada) o None. Sin caché la consulta va por self.operar
+            """
+            if placa in cache_visitantes:
+                fila, momento = cache_visitantes[placa]
+                if fila is not None or time.monotonic() - momento < vigencia_no_encontrado:
+                    entregar(fila)
+                    return
+            
+            def guardar(visitante):
+                fila = None
+                if visitante:
+                    fila = {'id': visitante['id'], 'parqueadero_id': visitante['parqueadero_id'],
+                            'parqueadero': visitante['parqueadero'], 'hora_entrada': visitante['hora_entrada']}
+                cache_visitantes[placa] = (fila, time.monotonic())
+                entregar(fila)
+            
+            if self.repo is None:
+                entregar(None)
+                return
+            visitante = self.tomar_visitante_clasificado(placa)
+            if visitante is not None:
+                guardar(visitante)
+                return
+            
+            def respuesta(visitante, error):
+                if error:
+                    print(f"❌ Error consultando visitante {placa}: {error}")
+                guardar(visitante)
+            
+            self.operar('visitante_activo', placa, callback=respuesta)
+        
+        def mostrar_tarifa():
+            """Recalcula localmente la tarifa a partir de la hora de entrada en caché"""
+            hora_entrada = datos_visitante['hora_entrada']
+            if hora_entrada is None:
+                return
+            
+            # Plan de la clase del parqueadero, ya compilado en el catálogo local
+            plan = self.repo.plan_tarifa(datos_visitante['parqueadero'])
+            ahora = datetime.now()
+            us = microsegundos(ahora - hora_entrada)
+            valor = plan.cobro(hora_entrada, ahora)
+            tarifa_calculada['valor'] = valor
+            
+            label_calculo_tiempo.config(text=f"⏱️ Tiempo estacionado: {us / US_POR_HORA:.2f} horas")
+            label_calculo_tarifa.config(text=f"💵 VALOR A PAGAR: ${valor:,} COP")
+            label_calculo_tipo.config(text=f"📌 {plan.descripcion(hora_entrada, ahora)}")
+        
+        def calcular_tarifa(al_terminar=None):
+            """Calcula la tarifa según tiempo estacionado; al_terminar() corre cuando hay resultado"""
+            consulta_pendiente['id'] = None
             placa = entry_placa_liq.get().upper().strip()
+            datos_visitante['placa'] = None  # sin resolver hasta que llegue la consulta
             
             if not placa:
-                label_calculo_tiempo.config(text="⏱️ Tiempo: --")
-                label_calculo_tarifa.config(text="💵 Valor a pagar: --")
-                label_calculo_tipo.config(text="📌 Tipo de tarifa: --")
-                label_hora_entrada.config(text="🕐 Hora entrada: --")
-                datos_visitante['id'] = None
-                datos_visitante['parqueadero_id'] = None
-                datos_visitante['parqueadero'] = None
+                limpiar_calculo()
                 return
             
-            if self.usar_datos_memoria:
-                if placa in self.datos_memoria['visitantes_activos']:
-                    hora_salida = datetime.now()
-                    hora_entrada = self.datos_memoria['visitantes_activos'][placa]['hora_entrada']
-                    parqueadero = self.datos_memoria['visitantes_activos'][placa]['parqueadero']
-                    
-                    datos_visitante['placa'] = placa
-                    datos_visitante['parqueadero'] = parqueadero
-                    datos_visitante['id'] = placa  # Usamos la placa como ID en modo memoria
-                    
-                    tiempo = hora_salida - hora_entrada
-                    horas = tiempo.total_seconds() / 3600
+            # No consultar placas incompletas o con caracteres inválidos
+            if not PATRON_PLACA.match(placa):
+                limpiar_calculo(texto_tipo="📌 Placa incompleta")
+                datos_visitante['placa'] = placa
+                if al_terminar:
+                    al_terminar()
+                return
+            
+            def entregar(visitante):
+                if not ventana_liq.winfo_exists() or entry_placa_liq.get().upper().strip() != placa:
+                    # Ventana cerrada o el usuario ya escribió otra placa
+                    return
+                datos_visitante['placa'] = placa
+                if not visitante:
+                    limpiar_calculo(texto_tipo="📌 ❌ Placa no encontrada o no es visitante activo",
+                                    texto_tarifa="💵 VALOR A PAGAR: $0 COP")
+                else:
+                    datos_visitante.update(visitante)
                     
                     # Mostrar hora de entrada
-                    label_hora_entrada.config(text=f"🕐 Hora entrada: {hora_entrada.strftime('%H:%M:%S')}")
-                    
-                    if horas <= 5:
-                        cobro = int(np.ceil(horas)) * 1000
-                        tipo = "Tarifa por hora ($1,000/hora)"
+                    hora_entrada = visitante['hora_entrada']
+                    if hasattr(hora_entrada, 'strftime'):
+                        label_hora_entrada.config(text=f"🕐 Hora entrada: {hora_entrada.strftime('%H:%M:%S')}")
                     else:
-                        cobro = 10000
-                        tipo = "Tarifa plena ($10,000)"
-                    
-                    tarifa_calculada['valor'] = cobro
+                        label_hora_entrada.config(text=f"🕐 Hora entrada: {str(hora_entrada)}")
                     
-                    label_calculo_tiempo.config(text=f"⏱️ Tiempo estacionado: {horas:.2f} horas")
-                    label_calculo_tarifa.config(text=f"💵 VALOR A PAGAR: ${cobro:,} COP")
-                    label_calculo_tipo.config(text=f"📌 {tipo}")
-                else:
-                    label_calculo_tiempo.config(text="⏱️ Tiempo: --")
-                    label_calculo_tarifa.config(text="💵 VALOR A PAGAR: $0 COP")
-                    label_calculo_tipo.config(text="📌 ❌ Placa no encontrada o no es visitante activo")
-                    label_hora_entrada.config(text="🕐 Hora entrada: --")
-                    tarifa_calculada['valor'] = 0
-                    datos_visitante['id'] = None
-                    datos_visitante['parqueadero'] = None
-            else:
-                if self.db and self.db.conectado:
-                    visitante = self.db.obtener_visitante_activo_por_placa(placa)
-                    if visitante:
-                        hora_entrada = visitante['hora_entrada']
-                        
-                        if isinstance(hora_entrada, str):
-                            try:
-                                hora_entrada = datetime.fromisoformat(hora_entrada.replace('Z', '+00:00'))
-                            except:
-                                hora_entrada = datetime.strptime(hora_entrada, '%Y-%m-%d %H:%M:%S')
-                        
-                        if hasattr(hora_entrada, 'tzinfo') and hora_entrada.tzinfo is not None:
-                            hora_entrada = hora_entrada.replace(tzinfo=None)
-                        
-                        datos_visitante['id'] = visitante['id']
-                        datos_visitante['parqueadero_id'] = visitante['parqueadero_id']
-                        datos_visitante['placa'] = placa
-                        
-                        # Mostrar hora de entrada
-                        if hasattr(hora_entrada, 'strftime'):
-                            label_hora_entrada.config(text=f"🕐 Hora entrada: {hora_entrada.strftime('%H:%M:%S')}")
-                        else:
-                            label_hora_entrada.config(text=f"🕐 Hora entrada: {str(hora_entrada)}")
-                        
-                        hora_salida = datetime.now()
-                        tiempo = hora_salida - hora_entrada
-                        horas = tiempo.total_seconds() / 3600
-                        
-                        if horas <= 5:
-                            cobro = int(np.ceil(horas)) * 1000
-                            tipo = "Tarifa por hora ($1,000/hora)"
-                        else:
-                            cobro = 10000
-                            tipo = "Tarifa plena ($10,000)"
-                        
-                        tarifa_calculada['valor'] = cobro
-                        
-                        label_calculo_tiempo.config(text=f"⏱️ Tiempo estacionado: {horas:.2f} horas")
-                        label_calculo_tarifa.config(text=f"💵 VALOR A PAGAR: ${cobro:,} COP")
-                        label_calculo_tipo.config(text=f"📌 {tipo}")
-                    else:
-                        label_calculo_tiempo.config(text="⏱️ Tiempo: --")
-                        label_calculo_tarifa.config(text="💵 VALOR A PAGAR: $0 COP")
-                        label_calculo_tipo.config(text="📌 ❌ Placa no encontrada o no es visitante activo")
-                        label_hora_entrada.config(text="🕐 Hora entrada: --")
-                        tarifa_calculada['valor'] = 0
-                        datos_visitante['id'] = None
-                        datos_visitante['parqueadero_id'] = None
+                    mostrar_tarifa()
+                if al_terminar:
+                    al_terminar()
+            
+            buscar_visitante(placa, entregar)
+        
+        def programar_calculo(event=None):
+            """Espera a que el usuario deje de escribir antes de consultar"""
+            if consulta_pendiente['id'] is not None:
+                ventana_liq.after_cancel(consulta_pendiente['id'])
+            consulta_pendiente['id'] = ventana_liq.after(350, calcular_tarifa)
+        
+        def refrescar_tarifa():
+            """Actualiza tiempo y valor cada segundo sin consultar la base de datos"""
+            if not ventana_liq.winfo_exists():
+                return
+            mostrar_tarifa()
+            ventana_liq.after(1000, refrescar_tarifa)
         
         # Bind para calcular cuando se ingresa placa
-        entry_placa_liq.bind('<KeyRelease>', lambda e: calcular_tarifa())
+        entry_placa_liq.bind('<KeyRelease>', programar_calculo)
+        ventana_liq.after(1000, refrescar_tarifa)
         
         # Si ya había una placa, calcular automáticamente
         if placa_inicial:
@@ -2011,80 +989,55 @@ class SistemaControlAccesoPostgreSQL:
         
         def liquidar_confirmar():
             placa = entry_placa_liq.get().upper().strip()
-            tarifa = tarifa_calculada['valor']
             
             if not placa:
                 messagebox.showwarning("Advertencia", "❌ Ingrese una placa")
                 return
             
-            if tarifa == 0 or datos_visitante['id'] is None:
+            # Resolver una búsqueda pendiente antes de cobrar
+            if consulta_pendiente['id'] is not None or datos_visitante['placa'] != placa:
+                if consulta_pendiente['id'] is not None:
+                    ventana_liq.after_cancel(consulta_pendiente['id'])
+                calcular_tarifa(al_terminar=liquidar_confirmar)
+                return
+            tarifa = tarifa_calculada['valor']
+            
+            # Un valor de $0 es válido (planes con valor_hora 0 o minutos de gracia)
+            if datos_visitante['id'] is None:
                 messagebox.showerror("Error", "❌ Placa no válida o no es un visitante activo")
                 return
             
             # Confirmar el cobro
-            if not messagebox.askyesno("Confirmar Pago", f"¿Cobrar ${tarifa:,} COP al visitante {placa}?"):
+            pregunta = (f"¿Cobrar ${tarifa:,} COP al visitante {placa}?" if tarifa
+                        else f"¿Registrar la salida sin cobro del visitante {placa}?")
+            if not messagebox.askyesno("Confirmar Pago", pregunta):
                 return
             
-            if self.usar_datos_memoria:
-                if placa in self.datos_memoria['visitantes_activos']:
-                    hora_salida = datetime.now()
-                    hora_entrada = self.datos_memoria['visitantes_activos'][placa]['hora_entrada']
-                    parqueadero = self.datos_memoria['visitantes_activos'][placa]['parqueadero']
-                    
-                    tiempo = hora_salida - hora_entrada
-                    horas = tiempo.total_seconds() / 3600
-                    
-                    # Registrar en historial
-                    self.datos_memoria['historial_visitantes'].append({
-                        'placa': placa,
-                        'hora_entrada': hora_entrada,
-                        'hora_salida': hora_salida,
-                        'horas': round(horas, 2),
-                        'cobro': tarifa,
-                        'tipo': 'Liquidado'
-                    })
-                    
-                    # Devolver parqueadero
-                    self.datos_memoria['parqueaderos_visitantes'].append(parqueadero)
-                    del self.datos_memoria['visitantes_activos'][placa]
-                    
+            def terminado(resultado, error):
+                cache_visitantes.pop(placa, None)
+                if error:
+                    print(f"❌ Error registrando salida de {placa}: {error}")
+                if not ventana_liq.winfo_exists():
+                    return
+                btn_liquidar.config(state='normal')
+                
+                if resultado:
                     messagebox.showinfo("✅ Cobro Exitoso", 
-                                      f"Placa: {placa}\nCobro: ${tarifa:,} COP\n✅ Salida registrada")
+                                      f"Placa: {placa}\n"
+                                      f"Tiempo: {resultado['total_horas']:.2f} horas\n"
+                                      f"Cobro: ${resultado['valor_pagado']:,.0f} COP\n"
+                                      f"✅ Salida registrada")
                     ventana_liq.destroy()
                 else:
-                    messagebox.showerror("Error", f"❌ Visitante {placa} ya no está activo")
-                    return
-            else:
-                if self.db and self.db.conectado:
-                    # Verificar que tenemos los datos necesarios
-                    if datos_visitante['id'] is None or datos_visitante['parqueadero_id'] is None:
-                        messagebox.showerror("Error", "❌ Datos del visitante incompletos")
-                        return
-                    
-                    resultado = self.db.registrar_salida_visitante(
-                        datos_visitante['id'], 
-                        datos_visitante['parqueadero_id']
-                    )
-                    
-                    if resultado:
-                        messagebox.showinfo("✅ Cobro Exitoso", 
-                                          f"Placa: {placa}\n"
-                                          f"Tiempo: {resultado['total_horas']:.2f} horas\n"
-                                          f"Cobro: ${resultado['valor_pagado']:,.0f} COP\n"
-                                          f"✅ Salida registrada")
-                        ventana_liq.destroy()
-                    else:
-                        messagebox.showerror("Error", "❌ Error registrando salida")
-                        return
-                else:
-                    messagebox.showerror("Error", "❌ Sin conexión a la base de datos")
+                    messagebox.showerror("Error", f"❌ No se pudo registrar la salida: el visitante {placa} ya no está activo o no hay conexión")
                     return
+                
+                # Actualizar vistas después de cerrar
+                self.limpiar_busqueda()
             
-            # Actualizar vistas después de cerrar
-            self.actualizar_estadisticas()
-            self.entry_placa.delete(0, tk.END)
-            self.label_resultado_placa.config(text="📝 Ingrese una placa, use la cámara o cargue una foto", fg='#34495e', bg='#ffffff', font=('Arial', 14))
-            self.panel_resultado_placa.config(bg='#ffffff')
+            btn_liquidar.config(state='disabled')
+            self.operar('salida_visitante', datos_visitante['id'], datos_visitante['parqueadero_id'],
+                        callback=terminado, escritura=True)
         
         btn_liquidar = tk.Button(btn_frame, text="✅ CONFIRMAR PAGO Y SALIDA", 
                                  command=liquidar_confirmar,
@@ -2101,168 +1054,11 @@ class SistemaControlAccesoPostgreSQL:
         btn_cancelar.pack(fill='x')
     
     def mostrar_estado_parqueaderos(self):
-        """Muestra ventana con estado de todos los parqueaderos - VERSIÓN CORREGIDA CON VISITANTES"""
-        ventana_estado = tk.Toplevel(self.ventana)
-        ventana_estado.title("📊 Estado de Parqueaderos")
-        ventana_estado.geometry("750x650")
-        ventana_estado.resizable(True, True)
-        ventana_estado.configure(bg='#f5f5f5')
-        
-        ventana_estado.transient(self.ventana)
-        ventana_estado.grab_set()
-        
-        header = tk.Frame(ventana_estado, bg='#9b59b6', height=60)
-        header.pack(fill='x')
-        header.pack_propagate(False)
-        tk.Label(header, text="📊 ESTADO DE TODOS LOS PARQUEADEROS", 
-                font=('Arial', 16, 'bold'), bg='#9b59b6', fg='white').pack(pady=15)
-        
-        canvas_frame = tk.Frame(ventana_estado, bg='#f5f5f5')
-        canvas_frame.pack(fill='both', expand=True, padx=20, pady=15)
-        
-        canvas = tk.Canvas(canvas_frame, bg='white', relief='solid', bd=1)
-        scrollbar = ttk.Scrollbar(canvas_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg='white')
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        if self.usar_datos_memoria:
-            # MODO MEMORIA
-            total_parq_res = len(self.datos_memoria['residentes'])
-            total_parq_vis = self.datos_memoria.get('total_parqueaderos_visitantes', 5)
-            
-            # Mostrar residentes
-            lbl_res_header = tk.Label(scrollable_frame, text="👨‍💼 PARQUEADEROS RESIDENTES", 
-                                     font=('Arial', 12, 'bold'), bg='#3498db', fg='white',
-                                     padx=15, pady=10)
-            lbl_res_header.pack(fill='x', pady=(0, 10))
-            
-            for placa, datos in self.datos_memoria['residentes'].items():
-                estado_color = '#27ae60' if datos['estado'].lower() == 'libre' else '#e74c3c'
-                estado_texto = "🟢 LIBRE" if datos['estado'].lower() == 'libre' else "🔴 OCUPADO"
-                
-                card = tk.Frame(scrollable_frame, bg=estado_color, relief='solid', bd=2)
-                card.pack(fill='x', pady=5, padx=10)
-                
-                info_text = (f"Parqueadero #{datos['parqueadero']} | {estado_texto} | "
-                            f"Residente: {datos['nombre']} (Apto {datos['apartamento']}) | Placa: {placa}")
-                
-                lbl = tk.Label(card, text=info_text, font=('Arial', 10), 
-                              bg=estado_color, fg='white', anchor='w', padx=15, pady=10)
-                lbl.pack(fill='x')
-            
-            # Mostrar visitantes
-            lbl_vis_header = tk.Label(scrollable_frame, text="👥 PARQUEADEROS VISITANTES", 
-                                     font=('Arial', 12, 'bold'), bg='#9b59b6', fg='white',
-                                     padx=15, pady=10)
-            lbl_vis_header.pack(fill='x', pady=(15, 10))
-            
-            for placa, datos in self.datos_memoria['visitantes_activos'].items():
-                tiempo = datetime.now() - datos['hora_entrada']
-                horas = tiempo.total_seconds() / 3600
-                
-                card = tk.Frame(scrollable_frame, bg='#f39c12', relief='solid', bd=2)
-                card.pack(fill='x', pady=5, padx=10)
-                
-                info_text = (f"Parqueadero #{datos['parqueadero']} | 🔴 OCUPADO | "
-                            f"Placa: {placa} | Tiempo: {horas:.1f}h")
-                
-                lbl = tk.Label(card, text=info_text, font=('Arial', 10), 
-                              bg='#f39c12', fg='white', anchor='w', padx=15, pady=10)
-                lbl.pack(fill='x')
-            
-            for parq_num in self.datos_memoria['parqueaderos_visitantes']:
-                card = tk.Frame(scrollable_frame, bg='#27ae60', relief='solid', bd=2)
-                card.pack(fill='x', pady=5, padx=10)
-                
-                info_text = f"Parqueadero #{parq_num} | 🟢 LIBRE (disponible)"
-                
-                lbl = tk.Label(card, text=info_text, font=('Arial', 10), 
-                              bg='#27ae60', fg='white', anchor='w', padx=15, pady=10)
-                lbl.pack(fill='x')
+        """Muestra el mapa con el estado de todos los parqueaderos, actualizado en vivo"""
+        if not self.repositorio_listo():
+            return
         
-        else:
-            # MODO POSTGRESQL - VERSIÓN CORREGIDA CON VISITANTES
-            if self.db and self.db.conectado:
-                # 1. Obtener todos los parqueaderos (residentes)
-                parqueaderos = self.db.obtener_estado_parqueaderos()
-                
-                # 2. Obtener visitantes activos
-                visitantes_activos = self.db.obtener_visitantes_activos()
-                
-                # Crear un diccionario para mapear número de parqueadero -> placa del visitante
-                visitantes_por_parqueadero = {}
-                for v in visitantes_activos:
-                    visitantes_por_parqueadero[v['parqueadero']] = v['placa']
-                
-                # SECCIÓN RESIDENTES
-                lbl_res_header = tk.Label(scrollable_frame, text="👨‍💼 PARQUEADEROS RESIDENTES", 
-                                         font=('Arial', 12, 'bold'), bg='#3498db', fg='white',
-                                         padx=15, pady=10)
-                lbl_res_header.pack(fill='x', pady=(0, 10))
-                
-                # Primero mostrar parqueaderos de residentes (los que tienen residente asignado)
-                for p in parqueaderos:
-                    if p['residente']:  # Tiene residente asignado
-                        estado_color = '#27ae60' if p['estado'] == 'LIBRE' else '#e74c3c'
-                        estado_texto = "🟢 LIBRE" if p['estado'] == 'LIBRE' else "🔴 OCUPADO"
-                        
-                        card = tk.Frame(scrollable_frame, bg=estado_color, relief='solid', bd=2)
-                        card.pack(fill='x', pady=5, padx=10)
-                        
-                        residente = p['residente'] 
-                        apartamento = p['apartamento'] if p['apartamento'] else ""
-                        placa = p['placa'] if p['placa'] else ""
-                        
-                        info_text = (f"Parqueadero #{p['numero']} | {estado_texto} | "
-                                    f"Residente: {residente} (Apto {apartamento}) | Placa: {placa}")
-                        
-                        lbl = tk.Label(card, text=info_text, font=('Arial', 10), 
-                                      bg=estado_color, fg='white', anchor='w', padx=15, pady=10)
-                        lbl.pack(fill='x')
-                
-                # SECCIÓN VISITANTES
-                lbl_vis_header = tk.Label(scrollable_frame, text="👥 PARQUEADEROS VISITANTES", 
-                                         font=('Arial', 12, 'bold'), bg='#9b59b6', fg='white',
-                                         padx=15, pady=10)
-                lbl_vis_header.pack(fill='x', pady=(15, 10))
-                
-                # Ahora mostrar parqueaderos de visitantes (sin residente asignado)
-                for p in parqueaderos:
-                    if not p['residente']:  # No tiene residente, es parqueadero de visitante
-                        # Verificar si este parqueadero está ocupado por algún visitante
-                        if p['numero'] in visitantes_por_parqueadero:
-                            # OCUPADO por visitante
-                            placa_visitante = visitantes_por_parqueadero[p['numero']]
-                            
-                            card = tk.Frame(scrollable_frame, bg='#f39c12', relief='solid', bd=2)
-                            card.pack(fill='x', pady=5, padx=10)
-                            
-                            info_text = (f"Parqueadero #{p['numero']} | 🔴 OCUPADO | "
-                                        f"Placa: {placa_visitante}")
-                            
-                            lbl = tk.Label(card, text=info_text, font=('Arial', 10), 
-                                          bg='#f39c12', fg='white', anchor='w', padx=15, pady=10)
-                            lbl.pack(fill='x')
-                        else:
-                            # LIBRE
-                            card = tk.Frame(scrollable_frame, bg='#27ae60', relief='solid', bd=2)
-                            card.pack(fill='x', pady=5, padx=10)
-                            
-                            info_text = f"Parqueadero #{p['numero']} | 🟢 LIBRE"
-                            
-                            lbl = tk.Label(card, text=info_text, font=('Arial', 10), 
-                                          bg='#27ae60', fg='white', anchor='w', padx=15, pady=10)
-                            lbl.pack(fill='x')
+        VentanaParqueaderos(self.ventana, self.repo, self.acceso)
     
     def mostrar_configuracion(self):
         """Muestra ventana de configuración"""
@@ -2270,15 +1066,125 @@ class SistemaControlAccesoPostgreSQL:
     
     def mostrar_historial(self):
         """Muestra el historial de visitantes"""
-        messagebox.showinfo("Historial", "Ventana de historial en desarrollo")
+        if not self.repositorio_listo():
+            return
+        VentanaHistorial(self.ventana, self.repo, self.acceso)
+    
+    def mostrar_tablero_tarifas(self):
+        """Tiempo y tarifa proyectada de todos los visitantes activos, en vivo"""
+        if not self.repositorio_listo():
+            return
+        VentanaTarifas(self.ventana, self.repo, self.acceso)
     
     def mostrar_reporte_ingresos(self):
         """Muestra reporte de ingresos"""
-        messagebox.showinfo("Reporte de Ingresos", "Ventana de reportes en desarrollo")
+        if not self.repositorio_listo():
+            return
+        # pandas y matplotlib se cargan con el primer reporte
+        from reportes import CacheResumenDiario
+        from ventana_reportes import VentanaReportes
+        if self.cache_reportes is None:
+            self.cache_reportes = CacheResumenDiario()
+        VentanaReportes(self.ventana, self.repo, self.acceso, self.cache_reportes)
     
     def mostrar_estadisticas_detalladas(self):
         """Muestra estadísticas detalladas"""
-        messagebox.showinfo("Estadísticas", "Ventana de estadísticas en desarrollo")
+        if not self.repositorio_listo():
+            return
+        from ventana_analitica import VentanaAnalitica
+        VentanaAnalitica(self.ventana, self.repo, self.acceso)
+    
+    def exportar_historial(self):
+        """Exporta el historial de salidas a CSV o Parquet para contabilidad"""
+        if not self.repositorio_listo():
+            return
+        ruta = filedialog.asksaveasfilename(
+            title="Exportar historial",
+            defaultextension=".csv",
+            initialfile=f"historial_{datetime.now():%Y%m%d}.csv",
+            filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")]
+        )
+        if not ruta:
+            return
+        
+        def terminado(filas, error):
+            if error or filas is None:
+                messagebox.showerror("Error", f"❌ No se pudo exportar el historial{': ' + str(error) if error else ''}")
+            else:
+                messagebox.showinfo("Exportación", f"✅ {filas} salidas exportadas a\n{ruta}")
+        
+        if self.repo.remoto:
+            self.acceso.enviar(exportar_historial, ruta, callback=terminado)
+        else:
+            try:
+                terminado(exportar_historial(self.repo, ruta), None)
+            except Exception as e:
+                terminado(None, e)
+    
+    def importar_residentes(self):
+        """Carga masiva de residentes, placas y parqueaderos desde CSV o Parquet"""
+        if not self.repositorio_listo():
+            return
+        ruta = filedialog.askopenfilename(
+            title="Importar residentes (parqueadero, nombre, apartamento, placa)",
+            filetypes=[("CSV o Parquet", "*.csv *.parquet"), ("Todos los archivos", "*.*")]
+        )
+        if not ruta:
+            return
+        
+        def terminado(resumen, error):
+            if error or resumen is None:
+                messagebox.showerror("Error", f"❌ No se importó ningún residente{': ' + str(error) if error else ''}")
+                return
+            messagebox.showinfo("Importación",
+                                f"✅ {resumen['filas']} filas procesadas\n\n"
+                                f"Residentes nuevos: {resumen['residentes_nuevos']}\n"
+                                f"Residentes actualizados: {resumen['residentes_actualizados']}\n"
+                                f"Parqueaderos nuevos: {resumen['parqueaderos_nuevos']}\n"
+                                f"Placas asignadas: {resumen['placas']}\n"
+                                f"Filas rechazadas: {resumen['rechazadas']}")
+        
+        if self.repo.remoto:
+            self.acceso.enviar(importar_residentes, ruta, callback=terminado)
+        else:
+            try:
+                terminado(importar_residentes(self.repo, ruta), None)
+            except Exception as e:
+                terminado(None, e)
+    
+    def cargar_plan_tarifa(self):
+        """
+        Activa un plan de tarifa desde un archivo JSON {clase, nombre, definicion}
+        (formato de la definición en tarifas.py). Las demás porterías lo
+        recargan en su siguiente refresco
+        """
+        if not self.repositorio_listo():
+            return
+        ruta = filedialog.askopenfilename(
+            title="Cargar plan de tarifa",
+            filetypes=[("JSON", "*.json"), ("Todos los archivos", "*.*")]
+        )
+        if not ruta:
+            return
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                plan = json.load(f)
+            clase, nombre, definicion = plan.get('clase', CLASE_GENERAL), plan['nombre'], plan['definicion']
+            validar_plan(definicion)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            messagebox.showerror("Error", f"❌ Plan de tarifa inválido: {e}")
+            return
+        
+        def terminado(plan_id, error):
+            if error or plan_id is None:
+                messagebox.showerror("Error", f"❌ No se guardó el plan{': ' + str(error) if error else ''}")
+            else:
+                messagebox.showinfo("Plan de tarifa", f"✅ Plan '{nombre}' activo para la clase {clase}")
+        
+        if self.repo.remoto:
+            self.acceso.enviar('guardar_plan_tarifa', clase, nombre, definicion, callback=terminado)
+        else:
+            terminado(self.repo.guardar_plan_tarifa(clase, nombre, definicion), None)
     
     def mostrar_manual(self):
         """Muestra el manual de usuario"""
@@ -2300,51 +1206,59 @@ class SistemaControlAccesoPostgreSQL:
                            "© 2024 Conjunto Residencial 'Los Alamos'\n"
                            "Desarrollado con Python y Tkinter")
     
+    def ciclo_estadisticas(self):
+        """Refresca las estadísticas cada 2 segundos"""
+        self.actualizar_estadisticas()
+        self.ventana.after(2000, self.ciclo_estadisticas)
+    
     def actualizar_estadisticas(self):
         """Actualiza las estadísticas en tiempo real"""
-        if self.usar_datos_memoria:
-            total_residentes = len(self.datos_memoria['residentes'])
-            total_parqueaderos_visitantes = self.datos_memoria.get('total_parqueaderos_visitantes', 5)
-            
-            ocupados_residentes = sum(1 for r in self.datos_memoria['residentes'].values() if r['estado'] == 'ocupado')
-            libres_residentes = total_residentes - ocupados_residentes
-            
-            ocupados_visitantes = len(self.datos_memoria['visitantes_activos'])
-            libres_visitantes = total_parqueaderos_visitantes - ocupados_visitantes
-            
-            total = total_residentes + total_parqueaderos_visitantes
-            total_historial = sum(r['cobro'] for r in self.datos_memoria['historial_visitantes'])
-            
-            libres_totales = libres_residentes + libres_visitantes
-            self.footer_labels['total_parq'].config(text=str(total))
-            self.footer_labels['disponibles'].config(text=str(libres_totales))
-            self.footer_labels['ocupados'].config(text=str(ocupados_residentes + ocupados_visitantes))
-            self.footer_labels['visitantes'].config(text=str(total_parqueaderos_visitantes))
-            self.footer_labels['recaudo'].config(text=f"${total_historial:,.0f}")
-        else:
-            if self.db and self.db.conectado:
-                stats = self.db.obtener_estadisticas()
-                
-                total_parq = stats['total_parqueaderos']
-                ocupados = stats['ocupados']
-                libres = total_parq - ocupados
-                visitantes_activos = stats['visitantes_activos']
-                recaudo_hoy = stats['recaudado_hoy']
-                
-                self.footer_labels['total_parq'].config(text=str(total_parq))
-                self.footer_labels['disponibles'].config(text=str(libres))
-                self.footer_labels['ocupados'].config(text=str(ocupados))
-                self.footer_labels['visitantes'].config(text=str(visitantes_activos))
-                self.footer_labels['recaudo'].config(text=f"${recaudo_hoy:,.0f}")
+        if self.repo is None:
+            return
+        
+        if not self.repo.remoto:
+            self.mostrar_estadisticas(self.repo.estadisticas(), None)
+        elif not self.estadisticas_en_curso:
+            # La consulta corre en el pool de fondo; no se acumulan consultas si la BD está lenta
+            self.estadisticas_en_curso = True
+            self.acceso.enviar(self.consultar_estadisticas, callback=self.mostrar_estadisticas)
+    
+    def consultar_estadisticas(self, repo):
+        """Se ejecuta en segundo plano: refresca el directorio si cambió y lee las estadísticas"""
+        repo.refrescar()
+        return repo.estadisticas()
+    
+    def mostrar_estadisticas(self, stats, error):
+        """Callback (hilo de Tk) que pinta las estadísticas en el footer"""
+        self.estadisticas_en_curso = False
+        self.actualizar_modo()
+        if error or not stats:
+            return
         
-        self.ventana.after(2000, self.actualizar_estadisticas)
+        total_parq = stats['total_parqueaderos']
+        ocupados = stats['ocupados']
+        libres = total_parq - ocupados
+        visitantes_activos = stats['visitantes_activos']
+        recaudo_hoy = stats['recaudado_hoy']
+        
+        self.footer_labels['total_parq'].config(text=str(total_parq))
+        self.footer_labels['disponibles'].config(text=str(libres))
+        self.footer_labels['ocupados'].config(text=str(ocupados))
+        self.footer_labels['visitantes'].config(text=str(visitantes_activos))
+        self.footer_labels['recaudo'].config(text=f"${recaudo_hoy:,.0f}")
     
     def ejecutar(self):
         """Ejecuta la aplicación"""
         self.ventana.mainloop()
         
-        if self.db:
-            self.db.cerrar()
+        m = self.repo.metricas() if self.repo else None
+        if m:
+            print(f"📇 Directorio de placas: {m['aciertos']} aciertos, {m['fallos']} fallos "
+                  f"({m['tasa_aciertos']:.0%}), {m['recargas']} recargas")
+        
+        self.acceso.cerrar()
+        if self.repo:
+            self.repo.cerrar()
 
 # =============================================================================
 # FUNCIÓN PRINCIPAL
@@ -2357,10 +1271,28 @@ def main():
     print("Con captura de placas por cámara y carga de fotos")
     print("="*70)
     
-    print("\nConfiguración de conexión PostgreSQL:")
+    print("\nConfiguración de la base de datos:")
     print("(Presione Enter para usar valores por defecto)")
     
     try:
+        motor = (input("Motor (postgresql/sqlite/api) [postgresql]: ") or "postgresql").strip().lower()
+        if motor in ('sqlite', 'api'):
+            if motor == 'sqlite':
+                ruta = input("Archivo [control_acceso.db]: ") or "control_acceso.db"
+                db_config = {'motor': 'sqlite', 'ruta': ruta}
+            else:
+                url = input("URL del servicio [http://localhost:8080]: ") or "http://localhost:8080"
+                token = input("Token del servicio [CONTROL_ACCESO_TOKEN]: ")
+                db_config = {'motor': 'api', 'url': url, 'token': token or None}
+            
+            print("\n" + "="*70)
+            print("INICIANDO APLICACIÓN...")
+            print("="*70)
+            
+            app = SistemaControlAccesoPostgreSQL(db_config)
+            app.ejecutar()
+            return
+        
         host = input("Host [localhost]: ") or "localhost"
         database = input("Database [control_acceso]: ") or "control_acceso"
         user = input("User [postgres]: ") or "postgres"
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Capa de acceso a datos asíncrona: ejecuta las consultas fuera del hilo de Tk"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# =============================================================================
+# ACCESO A DATOS ASÍNCRONO
+# =============================================================================
+
+class AccesoDatosAsync:
+    """
+    Mantiene un loop asyncio en un hilo de fondo y un pool de conexiones
+    (un repositorio remoto por conexión). Las operaciones se
+    envían desde la interfaz y retornan un concurrent.futures.Future; si se
+    pasa un callback, se invoca en el hilo de Tk como callback(resultado, error)
+    cuando la interfaz llama a procesar_resultados().
+    """
+
+    def __init__(self, crear_conexion, tamano_pool=2, timeout=5.0):
+        """
+        crear_conexion: función sin argumentos que retorna un repositorio conectado
+        tamano_pool: número máximo de conexiones simultáneas
+        timeout: segundos máximos de espera por operación (None para no limitar).
+            Al vencer solo se deja de esperar: la operación sigue en su hilo y puede
+            confirmar, por eso las escrituras se envían con timeout=None
+        """
+        self.crear_conexion = crear_conexion
+        self.tamano_pool = tamano_pool
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=tamano_pool, thread_name_prefix='acceso-datos')
+        self.hilo = threading.Thread(target=self._ejecutar_loop, name='loop-acceso-datos', daemon=True)
+        self._libres = queue.Queue()
+        self._creadas = 0
+        self._lock = threading.Lock()
+        self._conexiones = []
+        self._resultados = queue.Queue()
+        self._cerrando = False
+
+    def iniciar(self):
+        """Inicia el loop en segundo plano"""
+        if not self.hilo.is_alive():
+            self.hilo.start()
+        return self
+
+    def _ejecutar_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # ============= POOL DE CONEXIONES =============
+
+    def _tomar_conexion(self):
+        """Toma una conexión libre del pool, creándola si aún hay cupo"""
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            crear = self._creadas < self.tamano_pool
+            if crear:
+                self._creadas += 1
+
+        if not crear:
+            return self._libres.get()
+
+        try:
+            manager = self.crear_conexion()
+        except Exception:
+            manager = None
+        if manager is None or not manager.conectado:
+            with self._lock:
+                self._creadas -= 1
+            raise ConnectionError("No se pudo conectar a la base de datos")
+
+        with self._lock:
+            self._conexiones.append(manager)
+        return manager
+
+    def _devolver_conexion(self, manager):
+        if manager.verificar_conexion() and not self._cerrando:
+            self._libres.put(manager)
+            return
+
+        # Conexión perdida: se descarta y se creará otra en el próximo uso
+        with self._lock:
+            self._creadas -= 1
+            if manager in self._conexiones:
+                self._conexiones.remove(manager)
+        manager.cerrar()
+
+    def _con_conexion(self, operacion, args):
+        manager = self._tomar_conexion()
+        try:
+            if isinstance(operacion, str):
+                return getattr(manager, operacion)(*args)
+            return operacion(manager, *args)
+        finally:
+            self._devolver_conexion(manager)
+
+    # ============= ENVÍO DE OPERACIONES =============
+
+    async def _en_executor(self, funcion, args, timeout):
+        tarea = self.loop.run_in_executor(self.executor, funcion, *args)
+        if timeout is None:
+            return await tarea
+        return await asyncio.wait_for(tarea, timeout)
+
+    def _programar(self, funcion, args, callback, timeout):
+        timeout = self.timeout if timeout == 'defecto' else timeout
+        futuro = asyncio.run_coroutine_threadsafe(self._en_executor(funcion, args, timeout), self.loop)
+        if callback is not None:
+            futuro.add_done_callback(lambda f: self._resultados.put((callback, f)))
+        return futuro
+
+    def enviar(self, operacion, *args, callback=None, timeout='defecto'):
+        """
+        Ejecuta una operación con una conexión del pool
+        operacion: nombre de un método del repositorio, o función(repo, *args)
+        """
+        return self._programar(self._con_conexion, (operacion, args), callback, timeout)
+
+    def ejecutar(self, funcion, *args, callback=None, timeout='defecto'):
+        """Ejecuta una función bloqueante en segundo plano sin tomar conexión del pool"""
+        return self._programar(funcion, args, callback, timeout)
+
+    def procesar_resultados(self):
+        """Invoca en el hilo actual (el de Tk) los callbacks de las operaciones terminadas"""
+        while True:
+            try:
+                callback, futuro = self._resultados.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                resultado, error = futuro.result(), None
+            except asyncio.TimeoutError:
+                resultado, error = None, TimeoutError("La base de datos no respondió a tiempo")
+            except Exception as e:
+                resultado, error = None, e
+
+            try:
+                callback(resultado, error)
+            except Exception as e:
+                print(f"Error en callback de acceso a datos: {e}")
+
+    async def _detener(self):
+        pendientes = [t for t in asyncio.all_tasks(self.loop) if t is not asyncio.current_task()]
+        for tarea in pendientes:
+            tarea.cancel()
+        await asyncio.gather(*pendientes, return_exceptions=True)
+        self.loop.stop()
+
+    def cerrar(self):
+        """
+        Detiene el loop y cierra las conexiones libres del pool. Las que están
+        ejecutando una consulta se cierran al terminarla
+        """
+        self._cerrando = True
+        if self.hilo.is_alive():
+            asyncio.run_coroutine_threadsafe(self._detener(), self.loop)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        while True:
+            try:
+                self._libres.get_nowait().cerrar()
+            except queue.Empty:
+                break
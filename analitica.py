@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Analítica de ocupación de parqueaderos de visitantes a partir de intervalos de visita"""
+
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from tarifas import US_POR_HORA
+
+DIAS_SEMANA = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
+
+# =============================================================================
+# PREPARACIÓN
+# =============================================================================
+
+def _a_microsegundos(horas):
+    """
+    Lista de datetime (None -> NaT) a int64 de microsegundos desde 1970, en hora
+    local sin zona. pandas convierte la lista en C, mucho más rápido que np.array
+    """
+    return pd.DatetimeIndex(horas).as_unit('us').asi8
+
+def preparar_intervalos(intervalos, desde, hasta, ahora=None):
+    """
+    Convierte [(parqueadero, hora_entrada, hora_salida o None)] en arreglos en
+    microsegundos: {parqueadero, entrada, salida, activo} tal como vienen, e
+    {inicio, fin} recortados a [desde, hasta). Los visitantes que siguen dentro
+    se cuentan hasta `ahora`
+    """
+    inicio_rango, fin_rango, limite_activos = _a_microsegundos([desde, hasta, min(ahora or datetime.now(), hasta)])
+    if intervalos:
+        parqueaderos, entradas, salidas = zip(*intervalos)
+    else:
+        parqueaderos, entradas, salidas = (), (), ()
+
+    datos = {
+        'parqueadero': np.asarray(parqueaderos, dtype=np.int64),
+        'entrada': _a_microsegundos(entradas),
+        'salida': _a_microsegundos(salidas),
+        'activo': np.fromiter((s is None for s in salidas), dtype=bool, count=len(salidas)),
+        'inicio_rango': inicio_rango,
+        'fin_rango': fin_rango,
+    }
+    salida = np.where(datos['activo'], limite_activos, datos['salida'])
+    inicio = np.maximum(datos['entrada'], inicio_rango)
+    fin = np.minimum(salida, fin_rango)
+    validos = fin > inicio
+    datos['inicio'], datos['fin'] = inicio[validos], fin[validos]
+    datos['parqueadero_valido'] = datos['parqueadero'][validos]
+    return datos
+
+# =============================================================================
+# BARRIDO (SWEEP-LINE)
+# =============================================================================
+
+def barrido(inicio, fin):
+    """
+    Curva de visitantes simultáneos: ordena entradas (+1) y salidas (-1) y
+    acumula. Con horas iguales la salida va primero, así un parqueadero que se
+    libera y se ocupa en el mismo instante no cuenta doble.
+    Retorna (instantes, visitantes a partir de cada instante)
+    """
+    instantes = np.concatenate([inicio, fin])
+    deltas = np.concatenate([np.ones_like(inicio), -np.ones_like(fin)])
+    orden = np.lexsort((deltas, instantes))
+    return instantes[orden], np.cumsum(deltas[orden])
+
+def ocupacion_acumulada(instantes, visitantes, puntos):
+    """
+    Integral de la curva de visitantes (visitante-microsegundos) desde el primer
+    instante hasta cada punto. La curva es escalonada, así que su integral es
+    lineal por tramos y np.interp la evalúa exactamente
+    """
+    if len(instantes) == 0:
+        return np.zeros(len(puntos))
+    integral = np.concatenate([[0.0], np.cumsum(visitantes[:-1] * np.diff(instantes).astype(np.float64))])
+    return np.interp(puntos, instantes, integral)
+
+# =============================================================================
+# MAPA DE CALOR POR HORA DE LA SEMANA
+# =============================================================================
+
+def hora_de_semana(microsegundos):
+    """Índice 0..167 (lunes 00h = 0) de cada instante; el 1970-01-01 fue jueves"""
+    horas = microsegundos // US_POR_HORA
+    return ((horas // 24 + 3) % 7) * 24 + horas % 24
+
+def mapa_ocupacion_semanal(instantes, visitantes, inicio_rango, fin_rango):
+    """
+    Promedio de visitantes simultáneos por hora de la semana (7x24). Cada hora
+    del rango se integra sobre la curva del barrido y se promedia con las demás
+    horas que caen en el mismo día y hora de la semana
+    """
+    primera = -(-inicio_rango // US_POR_HORA) * US_POR_HORA  # primera hora completa
+    bordes = np.arange(primera, fin_rango + 1, US_POR_HORA)
+    if len(bordes) < 2:
+        return np.zeros((7, 24))
+    ocupacion = np.diff(ocupacion_acumulada(instantes, visitantes, bordes)) / US_POR_HORA
+    casillas = hora_de_semana(bordes[:-1])
+    suma = np.bincount(casillas, weights=ocupacion, minlength=168)
+    veces = np.bincount(casillas, minlength=168)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(veces > 0, suma / veces, 0.0).reshape(7, 24)
+
+def mapa_llegadas_semanal(entradas, semanas):
+    """Llegadas promedio por semana en cada hora de la semana (7x24)"""
+    conteo = np.bincount(hora_de_semana(entradas), minlength=168).astype(np.float64)
+    return (conteo / max(semanas, 1)).reshape(7, 24)
+
+# =============================================================================
+# ANÁLISIS
+# =============================================================================
+
+def analizar_ocupacion(intervalos, desde, hasta, parqueaderos=None, ahora=None):
+    """
+    Analítica de ocupación de visitantes en [desde, hasta)
+    intervalos: Repositorio.intervalos_visitantes(desde, hasta)
+    parqueaderos: números de parqueaderos de visitantes (para incluir los que no se usaron)
+    Retorna un diccionario con pico, ocupación promedio, utilización por parqueadero,
+    estancia y mapas de calor 7x24
+    """
+    datos = preparar_intervalos(intervalos, desde, hasta, ahora)
+    inicio, fin, numeros = datos['inicio'], datos['fin'], datos['parqueadero_valido']
+    inicio_rango, fin_rango = datos['inicio_rango'], datos['fin_rango']
+    duracion_rango = float(fin_rango - inicio_rango)
+    instantes, visitantes = barrido(inicio, fin)
+
+    if len(visitantes):
+        i = int(np.argmax(visitantes))
+        pico = {'visitantes': int(visitantes[i]),
+                'momento': datetime(1970, 1, 1) + timedelta(microseconds=int(instantes[i]))}
+    else:
+        pico = {'visitantes': 0, 'momento': None}
+
+    # Utilización: tiempo ocupado de cada parqueadero sobre la duración del rango
+    todos = np.union1d(np.asarray(parqueaderos or [], dtype=np.int64), numeros)
+    posiciones = np.searchsorted(todos, numeros)
+    ocupado = np.bincount(posiciones, weights=(fin - inicio).astype(np.float64), minlength=len(todos))
+    utilizacion = dict(zip(todos.tolist(), (ocupado / duracion_rango).tolist()))
+
+    # Estancia: visitas completas que salieron dentro del rango
+    completas = ~datos['activo'] & (datos['salida'] >= inicio_rango) & (datos['salida'] < fin_rango)
+    estancias = (datos['salida'][completas] - datos['entrada'][completas]) / US_POR_HORA
+    if len(estancias):
+        estancia = {'promedio': float(estancias.mean()), 'mediana': float(np.median(estancias)),
+                    'p90': float(np.percentile(estancias, 90)), 'visitas': len(estancias)}
+    else:
+        estancia = {'promedio': 0.0, 'mediana': 0.0, 'p90': 0.0, 'visitas': 0}
+
+    entradas_rango = datos['entrada'][(datos['entrada'] >= inicio_rango) & (datos['entrada'] < fin_rango)]
+    semanas = duracion_rango / (7 * 24 * US_POR_HORA)
+
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'visitas': int(len(entradas_rango)),
+        'pico': pico,
+        'ocupacion_promedio': float(ocupacion_acumulada(instantes, visitantes, [fin_rango])[0] / duracion_rango),
+        'utilizacion': utilizacion,
+        'utilizacion_total': float(ocupado.sum() / (duracion_rango * len(todos))) if len(todos) else 0.0,
+        'estancia': estancia,
+        'mapa_ocupacion': mapa_ocupacion_semanal(instantes, visitantes, inicio_rango, fin_rango),
+        'mapa_llegadas': mapa_llegadas_semanal(entradas_rango, semanas),
+    }
+
+# =============================================================================
+# GRÁFICOS
+# =============================================================================
+
+def graficar_ocupacion(analisis, ancho=9, alto=6, dpi=100):
+    """
+    Mapa de calor de ocupación por hora de la semana y utilización por
+    parqueadero. Figure + Agg sin pyplot (se ejecuta en un hilo de fondo).
+    Retorna la imagen PNG en bytes
+    """
+    figura = Figure(figsize=(ancho, alto), dpi=dpi)
+    FigureCanvasAgg(figura)
+    mapa_ejes, barras_ejes = figura.subplots(2, 1, gridspec_kw={'height_ratios': [3, 2]})
+
+    imagen = mapa_ejes.imshow(analisis['mapa_ocupacion'], aspect='auto', cmap='YlOrRd')
+    mapa_ejes.set_yticks(range(7))
+    mapa_ejes.set_yticklabels(DIAS_SEMANA, fontsize=8)
+    mapa_ejes.set_xticks(range(0, 24, 2))
+    mapa_ejes.set_xticklabels([f"{h:02d}h" for h in range(0, 24, 2)], fontsize=8)
+    mapa_ejes.set_title("Visitantes simultáneos promedio por hora de la semana", fontsize=10)
+    figura.colorbar(imagen, ax=mapa_ejes, fraction=0.03)
+
+    numeros = list(analisis['utilizacion'])
+    valores = [100 * analisis['utilizacion'][n] for n in numeros]
+    barras_ejes.bar([f"#{n}" for n in numeros], valores, color='#3498db')
+    barras_ejes.set_ylim(0, 100)
+    barras_ejes.set_ylabel("% del tiempo ocupado", fontsize=8)
+    barras_ejes.set_title("Utilización por parqueadero", fontsize=10)
+    barras_ejes.grid(axis='y', alpha=0.3)
+    figura.tight_layout()
+
+    salida = io.BytesIO()
+    figura.savefig(salida, format='png')
+    return salida.getvalue()
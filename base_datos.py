@@ -0,0 +1,1486 @@
+# -*- coding: utf-8 -*-
+"""Gestor de base de datos PostgreSQL del Sistema de Control de Acceso"""
+
+import re
+import select
+from datetime import date, datetime, timedelta
+
+import psycopg2
+from psycopg2.extras import Json, RealDictCursor
+
+from migraciones import VERSION_ESQUEMA, aplicar_migraciones
+from tarifas import CLASE_GENERAL, HORAS_TARIFA_POR_HORA, PlanTarifa, liquidar
+
+# Agregados de un día de salidas (resumen_diario): la tarifa por hora aplica hasta
+# HORAS_TARIFA_POR_HORA horas
+AGREGADOS_RESUMEN = f"""
+    COUNT(rv.id) AS salidas,
+    COALESCE(SUM(rv.total_horas), 0) AS horas,
+    COALESCE(SUM(rv.valor_pagado), 0) AS recaudo,
+    COUNT(rv.id) FILTER (WHERE rv.hora_salida - rv.hora_entrada <= INTERVAL '{HORAS_TARIFA_POR_HORA} hours')
+        AS salidas_por_hora,
+    COALESCE(SUM(rv.valor_pagado) FILTER (WHERE rv.hora_salida - rv.hora_entrada <= INTERVAL '{HORAS_TARIFA_POR_HORA} hours'), 0)
+        AS recaudo_por_hora,
+    COUNT(rv.id) FILTER (WHERE rv.hora_salida - rv.hora_entrada > INTERVAL '{HORAS_TARIFA_POR_HORA} hours')
+        AS salidas_tarifa_plena,
+    COALESCE(SUM(rv.valor_pagado) FILTER (WHERE rv.hora_salida - rv.hora_entrada > INTERVAL '{HORAS_TARIFA_POR_HORA} hours'), 0)
+        AS recaudo_tarifa_plena
+"""
+
+# Canal de pg_notify con el que los triggers avisan cambios de ocupación o salidas
+CANAL_ESTADISTICAS = 'estadisticas'
+# Canal con el nuevo estado de un parqueadero de residente ('numero:estado'), para el DirectorioPlacas
+CANAL_ESTADO_RESIDENTES = 'estado_residentes'
+
+# =============================================================================
+# GESTOR DE BASE DE DATOS POSTGRESQL
+# =============================================================================
+
+class PostgreSQLManager:
+    """Gestor de base de datos PostgreSQL con manejo de errores mejorado"""
+    
+    def __init__(self, config=None, conectar=True):
+        """
+        Inicializa el gestor de base de datos PostgreSQL
+        config: diccionario con configuración de conexión. Con config['solo_lectura']
+            la sesión es de solo lectura y no migra el esquema ni crea particiones
+            (tableros de estadísticas con un usuario del rol tablero_estadisticas)
+        conectar: False para crearlo sin conexión (se conecta luego con reconectar())
+        """
+        self.config = config or {}
+        self.solo_lectura = bool(self.config.get('solo_lectura'))
+        self.connection = None
+        self.cursor = None
+        self.conectado = False
+        self.mes_mantenimiento = None  # mes en que corrió mantenimiento_mensual
+        
+        # Configuración por defecto. Los timeouts evitan que un servidor caído o
+        # lento deje la aplicación esperando indefinidamente
+        self.db_config = {
+            'host': self.config.get('host', 'localhost'),
+            'database': self.config.get('database', 'control_acceso'),
+            'user': self.config.get('user', 'postgres'),
+            'password': self.config.get('password', ''),
+            'port': self.config.get('port', 5432),
+            'connect_timeout': self.config.get('connect_timeout', 5),
+            'options': f"-c statement_timeout={self.config.get('statement_timeout', 10000)}"
+        }
+        if self.solo_lectura:
+            self.db_config['options'] += " -c default_transaction_read_only=on"
+        
+        # Intentar conectar. En arranques posteriores al primero el esquema ya está
+        # al día y basta con una consulta de versión (sin DDL ni bloqueos)
+        if conectar and self.conectar() and not self.solo_lectura:
+            if self.obtener_version_esquema() < VERSION_ESQUEMA:
+                self.crear_estructura_bd()
+                self.insertar_datos_iniciales()
+            self.mantenimiento_mensual()
+    
+    def conectar(self, silencioso=False):
+        """
+        Establece conexión con la base de datos PostgreSQL
+        silencioso: no imprimir el error (reintentos periódicos de reconexión)
+        """
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            self.connection.autocommit = False
+            self.cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+            self.conectado = True
+            print(f"✅ Conectado a PostgreSQL en {self.db_config['host']}/{self.db_config['database']}")
+            return True
+        except Exception as e:
+            if not silencioso:
+                print(f"❌ Error conectando a PostgreSQL: {e}")
+            self.conectado = False
+            self.connection = None
+            self.cursor = None
+            return False
+    
+    def reconectar(self):
+        """
+        Intenta restablecer una conexión perdida (o que nunca se estableció) y
+        deja el esquema al día. Retorna True si quedó conectado
+        """
+        if self.verificar_conexion():
+            return True
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+        if not self.conectar(silencioso=True):
+            return False
+        if self.solo_lectura:
+            return True
+        if self.obtener_version_esquema() < VERSION_ESQUEMA:
+            self.crear_estructura_bd()
+            self.insertar_datos_iniciales()
+        self.mantenimiento_mensual()
+        return True
+    
+    def verificar_conexion(self):
+        """
+        Verifica si la conexión está activa sin ir al servidor: psycopg2 marca la
+        conexión como cerrada cuando una operación falla por pérdida de conexión
+        """
+        if not self.conectado or not self.connection or not self.cursor:
+            return False
+        if self.connection.closed:
+            self.conectado = False
+            return False
+        return True
+    
+    def obtener_version_esquema(self):
+        """Retorna la versión del esquema registrada en la base de datos (0 si no existe)"""
+        try:
+            self.cursor.execute("SELECT MAX(version) AS version FROM schema_migraciones")
+            result = self.cursor.fetchone()
+            self.connection.commit()
+            return (result['version'] or 0) if result else 0
+        except Exception:
+            # Base de datos nueva: la tabla de migraciones aún no existe
+            self.connection.rollback()
+            return 0
+    
+    def crear_estructura_bd(self):
+        """Crea o actualiza la estructura de la base de datos aplicando las migraciones pendientes"""
+        if not self.verificar_conexion():
+            print("⚠️ No hay conexión a la base de datos para crear estructura")
+            return False
+        
+        try:
+            version = aplicar_migraciones(self.connection)
+            print(f"✅ Estructura de base de datos creada/verificada (versión {version})")
+            return True
+            
+        except Exception as e:
+            print(f"Error creando estructura: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return False
+    
+    def mantenimiento_mensual(self):
+        """
+        Crea las particiones de registros_visitantes del mes actual y los dos
+        siguientes y acumula en recaudo_mensual los meses cerrados que falten.
+        Corre al conectar y, en procesos que siguen abiertos al cambiar de mes,
+        desde RepositorioPostgreSQL.refrescar; el resto del mes solo compara la
+        fecha. Con config['meses_en_linea'] también archiva los meses más viejos
+        """
+        mes = date.today().replace(day=1)
+        if self.mes_mantenimiento == mes or self.solo_lectura or not self.verificar_conexion():
+            return
+        try:
+            self.cursor.execute("SELECT asegurar_particiones_registros(2)")
+            self._completar_recaudo_mensual()
+            self.connection.commit()
+            self.mes_mantenimiento = mes
+        except Exception as e:
+            print(f"Error en el mantenimiento mensual de registros: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return
+        if self.config.get('meses_en_linea'):
+            self.archivar_particiones(self.config['meses_en_linea'])
+    
+    def archivar_particiones(self, meses_en_linea=12):
+        """
+        Desprende de registros_visitantes las particiones de los meses anteriores a
+        los últimos `meses_en_linea` y las mueve al esquema archivo, donde se pueden
+        respaldar (pg_dump -t 'archivo.*' | gzip) y borrar. Antes se completan
+        resumen_diario y recaudo_mensual, así reportes y estadísticas no cambian.
+        No se archiva una partición con visitantes dentro o con salidas del mes actual.
+        Retorna la lista de tablas archivadas o None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("""
+                SELECT c.relname AS particion, to_date(right(c.relname, 6), 'YYYYMM') AS mes
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'registros_visitantes'::regclass
+                  AND c.relname ~ '^registros_visitantes_[0-9]{6}$'
+                  AND to_date(right(c.relname, 6), 'YYYYMM')
+                      < date_trunc('month', LOCALTIMESTAMP) - make_interval(months => %s)
+                ORDER BY mes
+            """, (meses_en_linea,))
+            particiones = self.cursor.fetchall()
+            if not particiones:
+                self.connection.commit()
+                return []
+            
+            self._completar_resumen_diario(particiones[0]['mes'], date.today() - timedelta(days=1))
+            self._completar_recaudo_mensual()
+            archivadas = []
+            for p in particiones:
+                self.cursor.execute(f"""
+                    SELECT EXISTS (SELECT 1 FROM {p['particion']}
+                                   WHERE hora_salida IS NULL OR hora_salida >= date_trunc('month', LOCALTIMESTAMP))
+                           AS abierta
+                """)
+                if self.cursor.fetchone()['abierta']:
+                    continue
+                self.cursor.execute(f"ALTER TABLE registros_visitantes DETACH PARTITION {p['particion']}")
+                self.cursor.execute(f"ALTER TABLE {p['particion']} SET SCHEMA archivo")
+                archivadas.append(f"archivo.{p['particion']}")
+            self.connection.commit()
+            for tabla in archivadas:
+                print(f"📦 Partición archivada: {tabla}")
+            return archivadas
+        except Exception as e:
+            print(f"Error archivando particiones: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def insertar_datos_iniciales(self):
+        """Inserta datos iniciales de ejemplo"""
+        if not self.verificar_conexion():
+            return False
+        
+        try:
+            # Verificar si ya hay datos
+            self.cursor.execute("SELECT COUNT(*) as count FROM residentes")
+            result = self.cursor.fetchone()
+            if result and result['count'] > 0:
+                return True
+            
+            # Insertar residentes
+            residentes_data = [
+                ('Juan Pérez', '101'),
+                ('María Gómez', '202'),
+                ('Carlos López', '303'),
+                ('Ana Martínez', '404'),
+                ('Pedro Sánchez', '505')
+            ]
+            
+            placas_data = ['ABC123', 'DEF456', 'GHI789', 'JKL012', 'MNO345']
+            
+            for i, (nombre, apto) in enumerate(residentes_data):
+                # Insertar residente
+                self.cursor.execute(
+                    "INSERT INTO residentes (nombre, apartamento) VALUES (%s, %s) RETURNING id",
+                    (nombre, apto)
+                )
+                residente_id = self.cursor.fetchone()['id']
+                
+                # Insertar parqueadero para residente (números 1-5)
+                self.cursor.execute(
+                    "INSERT INTO parqueaderos (numero, residente_id) VALUES (%s, %s)",
+                    (i + 1, residente_id)
+                )
+                
+                # Insertar placa
+                self.cursor.execute(
+                    "INSERT INTO placas (residente_id, placa) VALUES (%s, %s)",
+                    (residente_id, placas_data[i])
+                )
+            
+            # Insertar parqueaderos adicionales para visitantes (números 6-10)
+            for i in range(6, 11):
+                self.cursor.execute(
+                    "INSERT INTO parqueaderos (numero) VALUES (%s)",
+                    (i,)
+                )
+            
+            self.connection.commit()
+            print("✅ Datos iniciales insertados correctamente")
+            return True
+            
+        except Exception as e:
+            print(f"Error insertando datos iniciales: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return False
+    
+    # ============= CONSULTAS PRINCIPALES =============
+    
+    def verificar_placa_residente(self, placa):
+        """Verifica si una placa es de residente"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            query = """
+                SELECT r.nombre, r.apartamento, p.numero AS parqueadero, p.estado
+                FROM placas pl
+                JOIN residentes r ON pl.residente_id = r.id
+                JOIN parqueaderos p ON p.residente_id = r.id
+                WHERE pl.placa = %s
+            """
+            self.cursor.execute(query, (placa,))
+            fila = self.cursor.fetchone()
+            self.connection.commit()
+            return fila
+        except Exception as e:
+            print(f"Error en verificar_placa_residente: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def clasificar_placa(self, placa):
+        """
+        Clasifica una placa en una sola consulta: RESIDENTE, VISITANTE (activo) o DESCONOCIDO
+        Retorna un diccionario con 'tipo' y los campos necesarios para mostrarla y liquidarla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("""
+                SELECT 'RESIDENTE' AS tipo, pl.placa, r.nombre, r.apartamento,
+                       p.numero AS parqueadero, p.estado,
+                       NULL::INTEGER AS id, NULL::TIMESTAMP AS hora_entrada,
+                       NULL::INTEGER AS parqueadero_id
+                FROM placas pl
+                JOIN residentes r ON pl.residente_id = r.id
+                JOIN parqueaderos p ON p.residente_id = r.id
+                WHERE pl.placa = %(placa)s
+                UNION ALL
+                (SELECT 'VISITANTE', rv.placa, NULL, NULL,
+                        p.numero, p.estado,
+                        rv.id, rv.hora_entrada,
+                        rv.parqueadero_id
+                 FROM registros_visitantes rv
+                 JOIN parqueaderos p ON rv.parqueadero_id = p.id
+                 WHERE rv.placa = %(placa)s AND rv.hora_salida IS NULL
+                 ORDER BY rv.hora_entrada DESC
+                 LIMIT 1)
+                LIMIT 1
+            """, {'placa': placa})
+            fila = self.cursor.fetchone()
+            # Cerrar la transacción: una sesión "idle in transaction" retiene bloqueos
+            # que frenan el DETACH de particiones y el VACUUM
+            self.connection.commit()
+            return fila if fila else {'tipo': 'DESCONOCIDO', 'placa': placa}
+        except Exception as e:
+            print(f"Error en clasificar_placa: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def obtener_directorio_residentes(self):
+        """
+        Obtiene todas las placas de residentes con su parqueadero
+        Retorna (version, filas) o None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            # La versión se lee primero: si algo cambia durante la carga, la
+            # siguiente verificación detecta una versión mayor y recarga
+            self.cursor.execute("SELECT version FROM directorio_version WHERE id = 1")
+            result = self.cursor.fetchone()
+            version = result['version'] if result else 0
+            
+            self.cursor.execute("""
+                SELECT pl.placa, r.nombre, r.apartamento, p.numero AS parqueadero, p.estado
+                FROM placas pl
+                JOIN residentes r ON pl.residente_id = r.id
+                JOIN parqueaderos p ON p.residente_id = r.id
+            """)
+            filas = self.cursor.fetchall()
+            self.connection.commit()
+            return version, filas
+        except Exception as e:
+            print(f"Error obteniendo directorio de residentes: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def obtener_version_directorio(self):
+        """Obtiene el contador de versión del directorio de residentes"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("SELECT version FROM directorio_version WHERE id = 1")
+            result = self.cursor.fetchone()
+            self.connection.commit()
+            return result['version'] if result else 0
+        except Exception as e:
+            print(f"Error obteniendo versión del directorio: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    # ============= PLANES DE TARIFA =============
+    
+    def obtener_planes_tarifa(self):
+        """
+        Obtiene los planes de tarifa activos y la clase de los parqueaderos que no son GENERAL
+        Retorna (version, planes, {numero: clase}) o None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            # Versión primero, como en obtener_directorio_residentes
+            self.cursor.execute("SELECT version FROM tarifas_version WHERE id = 1")
+            result = self.cursor.fetchone()
+            version = result['version'] if result else 0
+            
+            self.cursor.execute("""
+                SELECT id, clase, nombre, definicion FROM planes_tarifa WHERE activo ORDER BY clase
+            """)
+            planes = self.cursor.fetchall()
+            self.cursor.execute("SELECT numero, clase FROM parqueaderos WHERE clase <> %s", (CLASE_GENERAL,))
+            clases = {fila['numero']: fila['clase'] for fila in self.cursor.fetchall()}
+            self.connection.commit()
+            return version, planes, clases
+        except Exception as e:
+            print(f"Error obteniendo planes de tarifa: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def obtener_version_tarifas(self):
+        """Obtiene el contador de versión de los planes de tarifa"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("SELECT version FROM tarifas_version WHERE id = 1")
+            result = self.cursor.fetchone()
+            self.connection.commit()
+            return result['version'] if result else 0
+        except Exception as e:
+            print(f"Error obteniendo versión de tarifas: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def guardar_plan_tarifa(self, clase, nombre, definicion):
+        """
+        Valida y compila el plan, lo guarda como el activo de la clase (el
+        anterior queda inactivo) junto con su tabla tarifas_minuto. Aplica a
+        las salidas desde que se confirma
+        Retorna el id del plan o None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            plan = PlanTarifa(definicion, nombre=nombre, clase=clase)
+            self.cursor.execute("UPDATE planes_tarifa SET activo = FALSE WHERE clase = %s AND activo", (clase,))
+            self.cursor.execute("""
+                INSERT INTO planes_tarifa (clase, nombre, definicion) VALUES (%s, %s, %s) RETURNING id
+            """, (clase, nombre, Json(plan.definicion)))
+            plan_id = self.cursor.fetchone()['id']
+            self.cursor.execute("""
+                INSERT INTO tarifas_minuto (plan_id, minuto, acumulado)
+                SELECT %s, t.posicion - 1, t.acumulado
+                FROM unnest(%s::BIGINT[]) WITH ORDINALITY AS t(acumulado, posicion)
+            """, (plan_id, plan.acumulado.tolist()))
+            self.connection.commit()
+            return plan_id
+        except Exception as e:
+            print(f"Error guardando plan de tarifa: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def desactivar_plan_tarifa(self, clase):
+        """Deja la clase sin plan propio (cobra el GENERAL o la tarifa por defecto). Retorna bool"""
+        if not self.verificar_conexion():
+            return False
+        
+        try:
+            self.cursor.execute("UPDATE planes_tarifa SET activo = FALSE WHERE clase = %s AND activo", (clase,))
+            self.connection.commit()
+            return True
+        except Exception as e:
+            print(f"Error desactivando plan de tarifa: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return False
+    
+    def asignar_clase_parqueaderos(self, numeros, clase):
+        """Cambia la clase de tarifa de los parqueaderos. Retorna cuántos cambiaron o None si falla"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("""
+                UPDATE parqueaderos SET clase = %s WHERE numero = ANY(%s) AND clase <> %s
+            """, (clase, list(numeros), clase))
+            cambiados = self.cursor.rowcount
+            self.connection.commit()
+            return cambiados
+        except Exception as e:
+            print(f"Error asignando clase de parqueaderos: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def registrar_entrada_visitante(self, placa, parqueadero_id):
+        """Registra entrada de visitante"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            # Insertar registro de visitante
+            self.cursor.execute("""
+                INSERT INTO registros_visitantes (placa, parqueadero_id)
+                VALUES (%s, %s)
+                RETURNING id
+            """, (placa, parqueadero_id))
+            
+            registro_id = self.cursor.fetchone()['id']
+            
+            # Actualizar estado del parqueadero
+            self.cursor.execute("""
+                UPDATE parqueaderos
+                SET estado = 'OCUPADO'
+                WHERE id = %s
+            """, (parqueadero_id,))
+            
+            self.connection.commit()
+            return registro_id
+            
+        except Exception as e:
+            print(f"Error registrando entrada: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def asignar_entrada_visitante(self, placa):
+        """
+        Registra la entrada de un visitante en una sola llamada al servidor:
+        valida la placa, asigna un parqueadero libre y lo marca OCUPADO.
+        Retorna un diccionario con 'resultado' (OK, RESIDENTE, ACTIVO o SIN_CUPO)
+        y, si fue exitoso, registro_id, parqueadero_id, parqueadero y hora_entrada
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("SELECT * FROM asignar_parqueadero_visitante(%s)", (placa,))
+            resultado = self.cursor.fetchone()
+            self.connection.commit()
+            return resultado
+            
+        except Exception as e:
+            print(f"Error asignando parqueadero a visitante: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def registrar_salida_visitante(self, registro_id, parqueadero_id):
+        """Registra salida de visitante (el trigger calcula el pago automáticamente)"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            # Actualizar hora de salida (el trigger calculará automáticamente)
+            self.cursor.execute("""
+                UPDATE registros_visitantes
+                SET hora_salida = CURRENT_TIMESTAMP
+                WHERE id = %s AND hora_salida IS NULL
+                RETURNING total_horas, valor_pagado, hora_salida
+            """, (registro_id,))
+            
+            resultado = self.cursor.fetchone()
+            if resultado is None:
+                # El registro ya fue liquidado (por ejemplo, desde otra portería)
+                self.connection.rollback()
+                return None
+            
+            # Liberar parqueadero
+            self.cursor.execute("""
+                UPDATE parqueaderos
+                SET estado = 'LIBRE'
+                WHERE id = %s
+            """, (parqueadero_id,))
+            
+            # Si el trigger no devolvió valores, intentar cálculo manual con el
+            # mismo plan que elige calcular_pago (el de la clase, o el GENERAL)
+            if resultado.get('valor_pagado') is None:
+                self.cursor.execute("""
+                    SELECT rv.hora_entrada, rv.hora_salida, pt.id AS plan_id, pt.clase, pt.nombre, pt.definicion
+                    FROM registros_visitantes rv
+                    LEFT JOIN LATERAL (
+                        SELECT pt.id, pt.clase, pt.nombre, pt.definicion
+                        FROM parqueaderos p
+                        JOIN planes_tarifa pt ON pt.activo AND pt.clase IN (p.clase, %s)
+                        WHERE p.id = rv.parqueadero_id
+                        ORDER BY pt.clase = p.clase DESC
+                        LIMIT 1
+                    ) pt ON TRUE
+                    WHERE rv.id = %s
+                """, (CLASE_GENERAL, registro_id))
+                fila = self.cursor.fetchone()
+                if fila and fila.get('hora_entrada') and fila.get('hora_salida'):
+                    he = fila['hora_entrada']
+                    hs = fila['hora_salida']
+                    # Asegurar tipos datetime
+                    if isinstance(he, str):
+                        he = datetime.fromisoformat(he.replace('Z', '+00:00'))
+                    if isinstance(hs, str):
+                        hs = datetime.fromisoformat(hs.replace('Z', '+00:00'))
+                    
+                    if hasattr(he, 'tzinfo') and he.tzinfo:
+                        he = he.replace(tzinfo=None)
+                    if hasattr(hs, 'tzinfo') and hs.tzinfo:
+                        hs = hs.replace(tzinfo=None)
+                    
+                    if fila['plan_id'] is not None:
+                        plan = PlanTarifa(fila['definicion'], plan_id=fila['plan_id'],
+                                          nombre=fila['nombre'], clase=fila['clase'])
+                        resultado = dict(plan.liquidar(he, hs), hora_salida=hs)
+                    else:
+                        resultado = dict(liquidar(he, hs), hora_salida=hs)
+
+            self.connection.commit()
+            return resultado
+            
+        except Exception as e:
+            print(f"Error registrando salida: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def cambiar_estado_residente(self, placa, estado):
+        """
+        Cambia el estado del parqueadero del residente dueño de la placa en una
+        sola sentencia, solo si no estaba ya en ese estado (seguro entre porterías)
+        Retorna un diccionario con 'resultado' (OK, NO_RESIDENTE, YA_OCUPADO o YA_LIBRE),
+        nombre y parqueadero
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("""
+                WITH objetivo AS (
+                    SELECT p.id, p.numero, p.estado, r.nombre
+                    FROM placas pl
+                    JOIN residentes r ON pl.residente_id = r.id
+                    JOIN parqueaderos p ON p.residente_id = r.id
+                    WHERE pl.placa = %(placa)s
+                ), cambio AS (
+                    UPDATE parqueaderos p
+                    SET estado = %(estado)s
+                    FROM objetivo o
+                    WHERE p.id = o.id AND p.estado <> %(estado)s
+                    RETURNING p.id
+                )
+                SELECT o.nombre, o.numero AS parqueadero,
+                       (SELECT COUNT(*) FROM cambio) AS cambiados
+                FROM objetivo o
+            """, {'placa': placa, 'estado': estado})
+            fila = self.cursor.fetchone()
+            self.connection.commit()
+            
+            if fila is None:
+                return {'resultado': 'NO_RESIDENTE', 'nombre': None, 'parqueadero': None}
+            resultado = 'OK' if fila['cambiados'] else f"YA_{estado}"
+            return {'resultado': resultado, 'nombre': fila['nombre'], 'parqueadero': fila['parqueadero']}
+            
+        except Exception as e:
+            print(f"Error cambiando estado del parqueadero de residente: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def obtener_estado_operativo(self):
+        """
+        Obtiene lo necesario para operar la portería sin conexión: residentes con su
+        parqueadero, números de parqueaderos de visitantes y visitantes activos
+        Retorna un diccionario o None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("""
+                SELECT pl.placa, r.nombre, r.apartamento, p.numero AS parqueadero, p.estado
+                FROM placas pl
+                JOIN residentes r ON pl.residente_id = r.id
+                JOIN parqueaderos p ON p.residente_id = r.id
+            """)
+            residentes = {fila['placa']: dict(fila) for fila in self.cursor.fetchall()}
+            
+            self.cursor.execute("SELECT numero FROM parqueaderos WHERE residente_id IS NULL ORDER BY numero")
+            parqueaderos_visitantes = [fila['numero'] for fila in self.cursor.fetchall()]
+            
+            self.cursor.execute("""
+                SELECT rv.id, rv.placa, rv.parqueadero_id, p.numero AS parqueadero, rv.hora_entrada
+                FROM registros_visitantes rv
+                JOIN parqueaderos p ON rv.parqueadero_id = p.id
+                WHERE rv.hora_salida IS NULL
+            """)
+            visitantes = [dict(fila) for fila in self.cursor.fetchall()]
+            self.connection.commit()
+            
+            return {'residentes': residentes, 'parqueaderos_visitantes': parqueaderos_visitantes,
+                    'visitantes': visitantes}
+        except Exception as e:
+            print(f"Error obteniendo estado operativo: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def aplicar_operaciones_sincronizadas(self, operaciones):
+        """
+        Aplica en una transacción un lote de operaciones registradas sin conexión.
+        Cada operación trae una 'clave' (UUID); las que ya estaban en
+        operaciones_sincronizadas se omiten, así reenviar un lote es seguro.
+        Retorna {'aplicadas', 'duplicadas', 'conflictos'} o None si el lote falló
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        resumen = {'aplicadas': 0, 'duplicadas': 0, 'conflictos': 0}
+        try:
+            for op in operaciones:
+                self.cursor.execute("""
+                    INSERT INTO operaciones_sincronizadas (clave, tipo)
+                    VALUES (%s, %s)
+                    ON CONFLICT (clave) DO NOTHING
+                    RETURNING clave
+                """, (op['clave'], op['op']))
+                if self.cursor.fetchone() is None:
+                    resumen['duplicadas'] += 1
+                    continue
+                
+                if op['op'] == 'entrada_visitante':
+                    registro_id, conflicto = self._sincronizar_entrada(op)
+                    self.cursor.execute(
+                        "UPDATE operaciones_sincronizadas SET registro_id = %s WHERE clave = %s",
+                        (registro_id, op['clave'])
+                    )
+                elif op['op'] == 'salida_visitante':
+                    conflicto = self._sincronizar_salida(op)
+                else:
+                    self.cursor.execute("""
+                        UPDATE parqueaderos p
+                        SET estado = %s
+                        FROM placas pl
+                        WHERE pl.placa = %s AND p.residente_id = pl.residente_id
+                    """, (op['estado'], op['placa']))
+                    conflicto = self.cursor.rowcount == 0
+                
+                resumen['aplicadas'] += 1
+                resumen['conflictos'] += int(conflicto)
+            
+            self.connection.commit()
+            return resumen
+            
+        except Exception as e:
+            print(f"Error sincronizando operaciones: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def _sincronizar_entrada(self, op):
+        """Registra una entrada hecha sin conexión. Retorna (registro_id, hubo_conflicto)"""
+        # Si la placa ya figura dentro (p. ej. otra portería la registró), se reutiliza ese registro
+        self.cursor.execute(
+            "SELECT id FROM registros_visitantes WHERE placa = %s AND hora_salida IS NULL LIMIT 1",
+            (op['placa'],)
+        )
+        activo = self.cursor.fetchone()
+        if activo:
+            return activo['id'], True
+        
+        # Se respeta el parqueadero que se le indicó al conductor; si otra portería
+        # lo ocupó mientras tanto, se usa el libre de menor número
+        self.cursor.execute(
+            "SELECT id, estado FROM parqueaderos WHERE numero = %s AND residente_id IS NULL FOR UPDATE",
+            (op['parqueadero'],)
+        )
+        solicitado = self.cursor.fetchone()
+        conflicto = solicitado is None or solicitado['estado'] != 'LIBRE'
+        parqueadero_id = solicitado['id'] if solicitado else None
+        if conflicto:
+            self.cursor.execute("""
+                SELECT id FROM parqueaderos
+                WHERE residente_id IS NULL AND estado = 'LIBRE'
+                ORDER BY numero
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """)
+            libre = self.cursor.fetchone()
+            if libre:
+                parqueadero_id = libre['id']
+            elif parqueadero_id is None:
+                self.cursor.execute("SELECT id FROM parqueaderos WHERE residente_id IS NULL ORDER BY numero LIMIT 1")
+                fila = self.cursor.fetchone()
+                if fila is None:
+                    # Ya no hay parqueaderos de visitantes: la entrada queda como conflicto
+                    # sin registro (su salida también) y la cola puede avanzar
+                    return None, True
+                parqueadero_id = fila['id']
+        
+        self.cursor.execute("""
+            INSERT INTO registros_visitantes (placa, parqueadero_id, hora_entrada)
+            VALUES (%s, %s, %s)
+            RETURNING id
+        """, (op['placa'], parqueadero_id, op['hora_entrada']))
+        registro_id = self.cursor.fetchone()['id']
+        self.cursor.execute("UPDATE parqueaderos SET estado = 'OCUPADO' WHERE id = %s", (parqueadero_id,))
+        return registro_id, conflicto
+    
+    def _sincronizar_salida(self, op):
+        """Liquida una salida hecha sin conexión (el trigger recalcula el cobro). Retorna hubo_conflicto"""
+        registro_id = op['id']
+        if isinstance(registro_id, str):
+            # Entrada que también se hizo sin conexión: su id local es la clave de la operación
+            self.cursor.execute(
+                "SELECT registro_id FROM operaciones_sincronizadas WHERE clave = %s", (registro_id,)
+            )
+            fila = self.cursor.fetchone()
+            registro_id = fila['registro_id'] if fila else None
+        if registro_id is None:
+            return True
+        
+        self.cursor.execute("""
+            UPDATE registros_visitantes
+            SET hora_salida = %s
+            WHERE id = %s AND hora_salida IS NULL
+            RETURNING parqueadero_id
+        """, (op['hora_salida'], registro_id))
+        fila = self.cursor.fetchone()
+        if fila is None:
+            # Ya liquidado en otra portería
+            return True
+        self.cursor.execute("UPDATE parqueaderos SET estado = 'LIBRE' WHERE id = %s", (fila['parqueadero_id'],))
+        return False
+    
+    def obtener_parqueaderos_libres_visitantes(self):
+        """Obtiene parqueaderos libres para visitantes"""
+        if not self.verificar_conexion():
+            return []
+        
+        try:
+            self.cursor.execute("""
+                SELECT id, numero 
+                FROM parqueaderos 
+                WHERE residente_id IS NULL 
+                AND estado = 'LIBRE'
+                ORDER BY numero
+            """)
+            filas = self.cursor.fetchall()
+            self.connection.commit()
+            return filas
+        except Exception as e:
+            print(f"Error obteniendo parqueaderos libres: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return []
+    
+    def marcar_parqueadero_ocupado(self, numero_parqueadero):
+        """Marca un parqueadero como OCUPADO (para residentes)"""
+        if not self.verificar_conexion():
+            return False
+        
+        try:
+            self.cursor.execute("""
+                UPDATE parqueaderos
+                SET estado = 'OCUPADO'
+                WHERE numero = %s
+            """, (numero_parqueadero,))
+            self.connection.commit()
+            return True
+        except Exception as e:
+            print(f"Error marcando parqueadero como ocupado: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return False
+    
+    def marcar_parqueadero_libre(self, numero_parqueadero):
+        """Marca un parqueadero como LIBRE (para residentes)"""
+        if not self.verificar_conexion():
+            return False
+        
+        try:
+            self.cursor.execute("""
+                UPDATE parqueaderos
+                SET estado = 'LIBRE'
+                WHERE numero = %s
+            """, (numero_parqueadero,))
+            self.connection.commit()
+            return True
+        except Exception as e:
+            print(f"Error marcando parqueadero como libre: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return False
+    
+    def obtener_visitante_activo_por_placa(self, placa):
+        """Obtiene un visitante activo por su placa"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("""
+                SELECT rv.id, rv.placa, rv.hora_entrada, rv.parqueadero_id, p.numero as parqueadero
+                FROM registros_visitantes rv
+                JOIN parqueaderos p ON rv.parqueadero_id = p.id
+                WHERE rv.placa = %s AND rv.hora_salida IS NULL
+                ORDER BY rv.hora_entrada DESC
+                LIMIT 1
+            """, (placa,))
+            fila = self.cursor.fetchone()
+            self.connection.commit()
+            return fila
+        except Exception as e:
+            print(f"Error obteniendo visitante activo: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def obtener_visitantes_activos(self):
+        """Obtiene todos los visitantes activos"""
+        if not self.verificar_conexion():
+            return []
+        
+        try:
+            self.cursor.execute("""
+                SELECT rv.id, rv.placa, rv.hora_entrada, p.numero as parqueadero
+                FROM registros_visitantes rv
+                JOIN parqueaderos p ON rv.parqueadero_id = p.id
+                WHERE rv.hora_salida IS NULL
+                ORDER BY rv.hora_entrada
+            """)
+            filas = self.cursor.fetchall()
+            self.connection.commit()
+            return filas
+        except Exception as e:
+            print(f"Error obteniendo visitantes activos: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return []
+    
+    def obtener_historial_visitantes(self, limit=100, despues=None, placa=None, desde=None, hasta=None):
+        """
+        Obtiene una página del historial de visitantes, de la salida más reciente a la más antigua
+        despues: (hora_salida, id) de la última fila de la página anterior. La página se
+                 busca por clave (keyset) sobre idx_registros_hora_salida, así que cuesta
+                 lo mismo al principio que tras millones de filas (OFFSET las recorrería)
+        placa: prefijo de la placa; desde/hasta: fechas de salida (inclusive)
+        Retorna None si falla (una página vacía es el fin del historial)
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        condiciones, parametros = ["rv.hora_salida IS NOT NULL"], []
+        if despues:
+            condiciones.append("(rv.hora_salida, rv.id) < (%s, %s)")
+            parametros.extend(despues)
+        if placa:
+            condiciones.append("rv.placa LIKE %s")
+            parametros.append(re.sub(r'([\\%_])', r'\\\1', placa) + '%')
+        if desde:
+            condiciones.append("rv.hora_salida >= %s")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("rv.hora_salida < %s")
+            parametros.append(hasta + timedelta(days=1))
+        parametros.append(limit)
+        
+        try:
+            # Cursor con nombre (del lado del servidor): solo viajan las filas de la página
+            with self.connection.cursor(name='historial_visitantes', cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = limit
+                cursor.execute(f"""
+                    SELECT rv.id, rv.placa, rv.hora_entrada, rv.hora_salida, 
+                           rv.total_horas, rv.valor_pagado, p.numero as parqueadero
+                    FROM registros_visitantes rv
+                    JOIN parqueaderos p ON rv.parqueadero_id = p.id
+                    WHERE {' AND '.join(condiciones)}
+                    ORDER BY rv.hora_salida DESC, rv.id DESC
+                    LIMIT %s
+                """, parametros)
+                filas = cursor.fetchmany(limit)
+            self.connection.commit()
+            return filas
+        except Exception as e:
+            print(f"Error obteniendo historial: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def obtener_estado_parqueaderos(self):
+        """
+        Obtiene el estado de todos los parqueaderos en una consulta: residente
+        asignado con su primera placa o, en los de visitantes, el visitante
+        actual. Todo con joins (sin subconsultas por fila), así el costo no
+        depende de cuántos parqueaderos tenga el conjunto
+        """
+        if not self.verificar_conexion():
+            return []
+        
+        try:
+            self.cursor.execute("""
+                SELECT DISTINCT ON (p.numero)
+                       p.id, p.numero, p.estado,
+                       r.nombre as residente, r.apartamento,
+                       COALESCE(pl.placa, rv.placa) as placa, rv.hora_entrada
+                FROM parqueaderos p
+                LEFT JOIN residentes r ON p.residente_id = r.id
+                LEFT JOIN (SELECT DISTINCT ON (residente_id) residente_id, placa
+                           FROM placas
+                           ORDER BY residente_id, id) pl ON pl.residente_id = r.id
+                LEFT JOIN registros_visitantes rv ON rv.parqueadero_id = p.id
+                                                 AND rv.hora_salida IS NULL
+                                                 AND p.residente_id IS NULL
+                ORDER BY p.numero, rv.hora_entrada DESC
+            """)
+            filas = self.cursor.fetchall()
+            self.connection.commit()
+            return filas
+        except Exception as e:
+            print(f"Error obteniendo estado parqueaderos: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return []
+    
+    def obtener_estadisticas(self):
+        """Obtiene estadísticas generales"""
+        stats = {
+            'total_parqueaderos': 0,
+            'ocupados': 0,
+            'visitantes_activos': 0,
+            'total_recaudado': 0,
+            'recaudado_hoy': 0
+        }
+        
+        if not self.verificar_conexion():
+            return stats
+        
+        try:
+            # Total recaudado: meses cerrados de recaudo_mensual (los completa
+            # mantenimiento_mensual) y en vivo el mes actual y los que falten por acumular
+            self.cursor.execute("SELECT * FROM estadisticas_tablero()")
+            result = self.cursor.fetchone()
+            self.connection.commit()
+            if result:
+                stats.update({clave: result[clave] for clave in ('total_parqueaderos', 'ocupados', 'visitantes_activos')})
+                stats['total_recaudado'] = float(result['total_recaudado'])
+                stats['recaudado_hoy'] = float(result['recaudado_hoy'])
+            return stats
+            
+        except Exception as e:
+            print(f"Error obteniendo estadísticas: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return stats
+    
+    def obtener_estadisticas_tablero(self):
+        """
+        Estadísticas de los tableros en una consulta de solo lectura:
+        {total_parqueaderos, ocupados, visitantes_activos, cupos_visitantes,
+         cupos_visitantes_libres, salidas_hoy, total_recaudado, recaudado_hoy}
+        Retorna None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self.cursor.execute("SELECT * FROM estadisticas_tablero()")
+            result = dict(self.cursor.fetchone())
+            self.connection.commit()
+            result['total_recaudado'] = float(result['total_recaudado'])
+            result['recaudado_hoy'] = float(result['recaudado_hoy'])
+            return result
+        except Exception as e:
+            print(f"Error obteniendo estadísticas del tablero: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    # ============= AVISOS (LISTEN/NOTIFY) =============
+    
+    def escuchar(self, canal):
+        """Se suscribe a los avisos del canal (pg_notify). Retorna True si quedó suscrito"""
+        if not self.verificar_conexion():
+            return False
+        
+        try:
+            self.cursor.execute(f"LISTEN {canal}")
+            self.connection.commit()
+            return True
+        except Exception as e:
+            print(f"Error suscribiéndose a {canal}: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return False
+    
+    def esperar_avisos(self, timeout):
+        """
+        Espera hasta `timeout` segundos avisos de los canales escuchados, sin
+        consultas al servidor mientras no llegue ninguno. Retorna la lista de
+        canales avisados (vacía si se cumplió el tiempo) o None si se perdió la conexión
+        """
+        avisos = self.recibir_avisos(timeout)
+        return [canal for canal, _ in avisos] if avisos is not None else None
+    
+    def recibir_avisos(self, timeout):
+        """Como esperar_avisos, pero retorna la lista de (canal, payload) en orden de llegada"""
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            if not self.connection.notifies:
+                listos, _, _ = select.select([self.connection], [], [], timeout)
+                if listos:
+                    self.connection.poll()
+            avisos = [(aviso.channel, aviso.payload) for aviso in self.connection.notifies]
+            self.connection.notifies.clear()
+            return avisos
+        except Exception as e:
+            print(f"Error esperando avisos: {e}")
+            self.conectado = False
+            return None
+    
+    def obtener_intervalos_visitantes(self, desde, hasta):
+        """
+        Visitas que se cruzan con [desde, hasta): (parqueadero, hora_entrada, hora_salida),
+        hora_salida None si el visitante sigue dentro. Tuplas en lugar de diccionarios
+        porque un año de historial son decenas de miles de filas. None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT p.numero, rv.hora_entrada, rv.hora_salida
+                    FROM registros_visitantes rv
+                    JOIN parqueaderos p ON rv.parqueadero_id = p.id
+                    WHERE rv.hora_entrada < %s AND (rv.hora_salida IS NULL OR rv.hora_salida > %s)
+                """, (hasta, desde))
+                filas = cursor.fetchall()
+            self.connection.commit()
+            return filas
+        except Exception as e:
+            print(f"Error obteniendo intervalos de visitantes: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def exportar_historial_csv(self, salida, desde=None, hasta=None):
+        """
+        Escribe el historial de salidas en CSV (con encabezado) en el archivo binario
+        `salida` con COPY ... TO STDOUT: el servidor genera el CSV y psycopg2 lo
+        pasa al archivo por bloques, sin armar filas en Python
+        desde/hasta: fechas de salida (inclusive)
+        Retorna el número de filas exportadas o None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        condiciones, parametros = ["rv.hora_salida IS NOT NULL"], []
+        if desde:
+            condiciones.append("rv.hora_salida >= %s")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("rv.hora_salida < %s")
+            parametros.append(hasta + timedelta(days=1))
+        
+        try:
+            # COPY no acepta parámetros: la consulta se arma con mogrify
+            consulta = self.cursor.mogrify(f"""
+                SELECT rv.id, rv.placa, p.numero AS parqueadero, rv.hora_entrada, rv.hora_salida,
+                       rv.total_horas, rv.valor_pagado
+                FROM registros_visitantes rv
+                JOIN parqueaderos p ON rv.parqueadero_id = p.id
+                WHERE {' AND '.join(condiciones)}
+                ORDER BY rv.hora_salida DESC, rv.id DESC
+            """, parametros).decode()
+            self.cursor.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true)", salida)
+            filas = self.cursor.rowcount
+            self.connection.commit()
+            return filas
+        except Exception as e:
+            print(f"Error exportando historial: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def importar_residentes_csv(self, entrada):
+        """
+        Carga masiva de parqueaderos, residentes y placas desde un CSV con
+        encabezado parqueadero,nombre,apartamento,placa (archivo binario).
+        El archivo se copia con COPY FROM STDIN a una tabla temporal y desde ahí
+        se actualiza todo con unas pocas sentencias en una transacción:
+            - cada parqueadero que no exista se crea (sin nombre: de visitantes)
+            - el primer nombre/apartamento de cada parqueadero es su residente:
+              se actualiza si ya tenía uno, si no se crea y se le asigna
+            - cada placa queda asociada al residente de su parqueadero
+        Se rechazan las filas sin parqueadero, las que asignarían un residente a
+        un parqueadero ocupado por un visitante y las placas sin residente.
+        Retorna {filas, parqueaderos_nuevos, residentes_nuevos, residentes_actualizados,
+        placas, rechazadas} o None si falla (no se aplica nada)
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        resumen = {}
+        try:
+            self.cursor.execute("""
+                CREATE TEMP TABLE carga_residentes (
+                    orden BIGINT GENERATED ALWAYS AS IDENTITY,
+                    parqueadero INTEGER, nombre TEXT, apartamento TEXT, placa TEXT
+                ) ON COMMIT DROP
+            """)
+            self.cursor.copy_expert(
+                "COPY carga_residentes (parqueadero, nombre, apartamento, placa) "
+                "FROM STDIN WITH (FORMAT csv, HEADER true)", entrada)
+            resumen['filas'] = self.cursor.rowcount
+            
+            self.cursor.execute("""
+                INSERT INTO parqueaderos (numero)
+                SELECT DISTINCT parqueadero FROM carga_residentes WHERE parqueadero IS NOT NULL
+                ON CONFLICT (numero) DO NOTHING
+            """)
+            resumen['parqueaderos_nuevos'] = self.cursor.rowcount
+            
+            # Titular de cada parqueadero; los residentes nuevos reservan su id de la secuencia
+            self.cursor.execute("""
+                CREATE TEMP TABLE carga_titulares ON COMMIT DROP AS
+                SELECT DISTINCT ON (c.parqueadero)
+                       c.parqueadero, p.id AS parqueadero_id, p.residente_id,
+                       trim(c.nombre) AS nombre, COALESCE(trim(c.apartamento), '') AS apartamento,
+                       CASE WHEN p.residente_id IS NULL
+                            THEN nextval(pg_get_serial_sequence('residentes', 'id')) END AS nuevo_id
+                FROM carga_residentes c
+                JOIN parqueaderos p ON p.numero = c.parqueadero
+                WHERE NULLIF(trim(c.nombre), '') IS NOT NULL
+                  AND (p.residente_id IS NOT NULL OR NOT EXISTS (
+                        SELECT 1 FROM registros_visitantes rv
+                        WHERE rv.parqueadero_id = p.id AND rv.hora_salida IS NULL))
+                ORDER BY c.parqueadero, c.orden
+            """)
+            
+            self.cursor.execute("""
+                UPDATE residentes r
+                SET nombre = t.nombre, apartamento = t.apartamento
+                FROM carga_titulares t
+                WHERE r.id = t.residente_id
+                  AND (r.nombre, r.apartamento) IS DISTINCT FROM (t.nombre, t.apartamento)
+            """)
+            resumen['residentes_actualizados'] = self.cursor.rowcount
+            
+            self.cursor.execute("""
+                INSERT INTO residentes (id, nombre, apartamento)
+                SELECT nuevo_id, nombre, apartamento FROM carga_titulares WHERE nuevo_id IS NOT NULL
+            """)
+            resumen['residentes_nuevos'] = self.cursor.rowcount
+            self.cursor.execute("""
+                UPDATE parqueaderos p
+                SET residente_id = t.nuevo_id
+                FROM carga_titulares t
+                WHERE p.id = t.parqueadero_id AND t.nuevo_id IS NOT NULL
+            """)
+            
+            self.cursor.execute("""
+                INSERT INTO placas (residente_id, placa)
+                SELECT DISTINCT ON (upper(trim(c.placa))) COALESCE(t.residente_id, t.nuevo_id), upper(trim(c.placa))
+                FROM carga_residentes c
+                JOIN carga_titulares t ON t.parqueadero = c.parqueadero
+                WHERE NULLIF(trim(c.placa), '') IS NOT NULL
+                ORDER BY upper(trim(c.placa)), c.orden
+                ON CONFLICT (placa) DO UPDATE SET residente_id = EXCLUDED.residente_id
+                WHERE placas.residente_id <> EXCLUDED.residente_id
+            """)
+            resumen['placas'] = self.cursor.rowcount
+            
+            self.cursor.execute("""
+                SELECT COUNT(*) AS rechazadas
+                FROM carga_residentes c
+                WHERE c.parqueadero IS NULL
+                   OR (COALESCE(NULLIF(trim(c.nombre), ''), NULLIF(trim(c.placa), '')) IS NOT NULL
+                       AND NOT EXISTS (SELECT 1 FROM carga_titulares t WHERE t.parqueadero = c.parqueadero))
+            """)
+            resumen['rechazadas'] = self.cursor.fetchone()['rechazadas']
+            
+            self.connection.commit()
+            return resumen
+        except Exception as e:
+            print(f"Error importando residentes: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def obtener_estadisticas_por_tipo(self):
+        """Obtiene estadísticas separadas por tipo de parqueadero"""
+        stats = {
+            'residentes': {
+                'total': 0,
+                'ocupados': 0,
+                'libres': 0,
+                'ingresos': 0
+            },
+            'visitantes': {
+                'total': 0,
+                'ocupados': 0,
+                'libres': 0,
+                'ingresos': 0,
+                'activos': 0
+            }
+        }
+        
+        if not self.verificar_conexion():
+            return stats
+        
+        try:
+            # PARQUEADEROS DE RESIDENTES
+            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NOT NULL")
+            result = self.cursor.fetchone()
+            stats['residentes']['total'] = result['count'] if result else 0
+            
+            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NOT NULL AND estado = 'OCUPADO'")
+            result = self.cursor.fetchone()
+            stats['residentes']['ocupados'] = result['count'] if result else 0
+            
+            stats['residentes']['libres'] = stats['residentes']['total'] - stats['residentes']['ocupados']
+            
+            # PARQUEADEROS DE VISITANTES
+            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NULL")
+            result = self.cursor.fetchone()
+            stats['visitantes']['total'] = result['count'] if result else 0
+            
+            self.cursor.execute("SELECT COUNT(*) as count FROM parqueaderos WHERE residente_id IS NULL AND estado = 'OCUPADO'")
+            result = self.cursor.fetchone()
+            stats['visitantes']['ocupados'] = result['count'] if result else 0
+            
+            stats['visitantes']['libres'] = stats['visitantes']['total'] - stats['visitantes']['ocupados']
+            
+            # Visitantes activos
+            self.cursor.execute("SELECT COUNT(*) as count FROM registros_visitantes WHERE hora_salida IS NULL")
+            result = self.cursor.fetchone()
+            stats['visitantes']['activos'] = result['count'] if result else 0
+            
+            # Ingresos por tipo: meses cerrados de recaudo_mensual y en vivo el mes actual
+            # y los meses cerrados que aún no estén acumulados (como estadisticas_tablero)
+            self.cursor.execute("""
+                WITH faltantes AS (
+                    SELECT m::date AS mes
+                    FROM generate_series(
+                        (SELECT date_trunc('month', MIN(hora_salida)) FROM registros_visitantes
+                         WHERE hora_salida IS NOT NULL),
+                        date_trunc('month', LOCALTIMESTAMP) - INTERVAL '1 month',
+                        INTERVAL '1 month') m
+                    WHERE NOT EXISTS (SELECT 1 FROM recaudo_mensual_meses r WHERE r.mes = m::date)
+                )
+                SELECT COALESCE(SUM(t.recaudo) FILTER (WHERE p.residente_id IS NULL), 0) AS visitantes,
+                       COALESCE(SUM(t.recaudo) FILTER (WHERE p.residente_id IS NOT NULL), 0) AS residentes
+                FROM (SELECT parqueadero_id, recaudo FROM recaudo_mensual
+                      UNION ALL
+                      SELECT parqueadero_id, valor_pagado FROM registros_visitantes
+                      WHERE hora_salida >= date_trunc('month', LOCALTIMESTAMP)
+                      UNION ALL
+                      SELECT rv.parqueadero_id, rv.valor_pagado FROM faltantes f
+                      JOIN registros_visitantes rv
+                        ON rv.hora_salida >= f.mes AND rv.hora_salida < f.mes + INTERVAL '1 month') t
+                JOIN parqueaderos p ON t.parqueadero_id = p.id
+            """)
+            result = self.cursor.fetchone()
+            stats['visitantes']['ingresos'] = float(result['visitantes']) if result else 0
+            stats['residentes']['ingresos'] = float(result['residentes']) if result else 0
+            
+            self.connection.commit()
+            return stats
+            
+        except Exception as e:
+            print(f"Error obteniendo estadísticas por tipo: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return stats
+    
+    def obtener_resumen_diario(self, desde, hasta):
+        """
+        Ingresos por día de salida entre desde y hasta (date, inclusive): salidas, horas,
+        recaudo y su división entre tarifa por hora (hasta 5 horas) y tarifa plena.
+        Los días cerrados se leen de resumen_diario, calculando antes los que falten;
+        solo el día de hoy se agrega en vivo sobre registros_visitantes.
+        Retorna una lista con los días que tuvieron salidas, o None si falla
+        """
+        if not self.verificar_conexion():
+            return None
+        
+        try:
+            self._completar_resumen_diario(desde, hasta)
+            self.cursor.execute(f"""
+                SELECT fecha, salidas, horas, recaudo, salidas_por_hora, recaudo_por_hora,
+                       salidas_tarifa_plena, recaudo_tarifa_plena
+                FROM resumen_diario
+                WHERE fecha BETWEEN %(desde)s AND %(hasta)s AND fecha < CURRENT_DATE AND salidas > 0
+                UNION ALL
+                SELECT CURRENT_DATE, {AGREGADOS_RESUMEN}
+                FROM registros_visitantes rv
+                WHERE rv.hora_salida >= CURRENT_DATE AND rv.hora_salida < CURRENT_DATE + 1
+                  AND CURRENT_DATE BETWEEN %(desde)s AND %(hasta)s
+                HAVING COUNT(rv.id) > 0
+                ORDER BY fecha
+            """, {'desde': desde, 'hasta': hasta})
+            filas = self.cursor.fetchall()
+            self.connection.commit()
+            return filas
+        except Exception as e:
+            print(f"Error obteniendo resumen diario: {e}")
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+            return None
+    
+    def _completar_resumen_diario(self, desde, hasta):
+        """
+        Calcula los días cerrados entre desde y hasta que aún no están en
+        resumen_diario (cada uno recorre solo sus salidas). No confirma la transacción
+        """
+        self.cursor.execute(f"""
+            INSERT INTO resumen_diario
+            SELECT d.fecha, {AGREGADOS_RESUMEN}
+            FROM (SELECT dia::date AS fecha
+                  FROM generate_series(%s::date, LEAST(%s::date, CURRENT_DATE - 1), INTERVAL '1 day') dia
+                  WHERE NOT EXISTS (SELECT 1 FROM resumen_diario r WHERE r.fecha = dia::date)) d
+            LEFT JOIN registros_visitantes rv
+                ON rv.hora_salida >= d.fecha AND rv.hora_salida < d.fecha + 1
+            GROUP BY d.fecha
+            ON CONFLICT (fecha) DO NOTHING
+        """, (desde, hasta))
+    
+    def _completar_recaudo_mensual(self):
+        """
+        Calcula el recaudo por parqueadero de los meses cerrados que falten en
+        recaudo_mensual (normalmente ninguno: uno al cambiar de mes o tras
+        sincronizar una salida de un mes cerrado, que las estadísticas suman en
+        vivo hasta el siguiente mantenimiento_mensual). No confirma la transacción
+        """
+        self.cursor.execute("""
+            WITH nuevos AS (
+                INSERT INTO recaudo_mensual_meses (mes)
+                SELECT m::date
+                FROM generate_series(
+                    (SELECT date_trunc('month', MIN(hora_salida)) FROM registros_visitantes
+                     WHERE hora_salida IS NOT NULL),
+                    date_trunc('month', LOCALTIMESTAMP) - INTERVAL '1 month',
+                    INTERVAL '1 month') m
+                WHERE NOT EXISTS (SELECT 1 FROM recaudo_mensual_meses r WHERE r.mes = m::date)
+                ON CONFLICT (mes) DO NOTHING
+                RETURNING mes
+            )
+            INSERT INTO recaudo_mensual (mes, parqueadero_id, salidas, recaudo)
+            SELECT n.mes, rv.parqueadero_id, COUNT(*), COALESCE(SUM(rv.valor_pagado), 0)
+            FROM nuevos n
+            JOIN registros_visitantes rv
+                ON rv.hora_salida >= n.mes AND rv.hora_salida < n.mes + INTERVAL '1 month'
+            GROUP BY n.mes, rv.parqueadero_id
+        """)
+    
+    def cerrar(self):
+        """Cierra la conexión a la base de datos"""
+        try:
+            if self.cursor:
+                self.cursor.close()
+            if self.connection:
+                self.connection.close()
+                print("🔌 Conexión a PostgreSQL cerrada")
+        except Exception as e:
+            print(f"Error cerrando conexión: {e}")
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Repositorio que opera contra el servicio HTTP/JSON (servicio_api.py) de otra máquina"""
+
+import http.client
+import json
+import os
+from datetime import date
+from urllib.parse import quote, urlencode, urlsplit
+
+from repositorio import Repositorio, normalizar_hora
+from tarifas import CatalogoTarifas
+
+# Mismo nombre que en servicio_api (no se importa: arrastraría el servidor)
+VARIABLE_TOKEN = 'CONTROL_ACCESO_TOKEN'
+
+CAMPOS_HORA = ('hora_entrada', 'hora_salida', 'hora_consulta')
+
+def _horas(datos):
+    """Convierte las horas de una respuesta (texto ISO) en datetime"""
+    if isinstance(datos, list):
+        return [_horas(d) for d in datos]
+    if isinstance(datos, dict):
+        return {clave: normalizar_hora(valor) if clave in CAMPOS_HORA and valor else _horas(valor)
+                for clave, valor in datos.items()}
+    return datos
+
+class RepositorioRemoto(Repositorio):
+    """
+    Repositorio sobre el servicio API: cada instancia mantiene una conexión
+    HTTP/1.1 persistente (una por hilo, con clonar()). Los planes de tarifa se
+    replican en un CatalogoTarifas local, así las proyecciones de cobro no
+    consultan al servidor; el resto de operaciones son una petición cada una.
+    """
+
+    nombre = 'API'
+    remoto = True
+
+    def __init__(self, url, tarifas=None, timeout=10, token=None):
+        """
+        url: dirección del servicio, por ejemplo http://porteria:8080
+        tarifas: CatalogoTarifas compartido entre los clones del repositorio
+        token: token compartido de las escrituras (por defecto CONTROL_ACCESO_TOKEN)
+        """
+        partes = urlsplit(url if '://' in url else f'http://{url}')
+        self.url = url
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self.timeout = timeout
+        self.token = token or os.environ.get(VARIABLE_TOKEN)
+        self.conexion = None
+        self._conectado = False
+        self.tarifas = tarifas or CatalogoTarifas(self)
+
+    # ============= HTTP =============
+
+    def _pedir(self, metodo, ruta, datos=None, cuerpo=None, tipo='application/json'):
+        """
+        Retorna (estado, respuesta JSON). Reintenta una vez si el servidor cerró
+        la conexión persistente; (None, None) si el servicio no responde
+        """
+        if datos is not None:
+            cuerpo = json.dumps(datos, default=str).encode('utf-8')
+        cabeceras = {'Content-Type': tipo} if cuerpo is not None else {}
+        if self.token:
+            cabeceras['Authorization'] = f'Bearer {self.token}'
+        for intento in range(2):
+            try:
+                if self.conexion is None:
+                    self.conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+                self.conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                respuesta = self.conexion.getresponse()
+                contenido = respuesta.read()
+                self._conectado = True
+                return respuesta.status, json.loads(contenido) if contenido else None
+            except (http.client.HTTPException, ConnectionError, OSError, ValueError) as e:
+                if self.conexion is not None:
+                    self.conexion.close()
+                    self.conexion = None
+                if intento:
+                    print(f"Error en {metodo} {ruta} contra {self.url}: {e}")
+                    self._conectado = False
+        return None, None
+
+    def _datos(self, metodo, ruta, datos=None, consulta=None):
+        """Respuesta con las horas convertidas, o None si el servicio respondió con error"""
+        if consulta:
+            ruta += '?' + urlencode({clave: valor.isoformat() if hasattr(valor, 'isoformat') else valor
+                                     for clave, valor in consulta.items() if valor is not None})
+        estado, respuesta = self._pedir(metodo, ruta, datos)
+        if estado != 200:
+            if estado in (401, 403) or (estado is not None and estado >= 500):
+                print(f"⚠️ {metodo} {ruta}: {respuesta.get('error') if respuesta else estado}")
+            return None
+        return _horas(respuesta)
+
+    # ============= CONEXIÓN Y CACHÉS =============
+
+    @property
+    def conectado(self):
+        return self._conectado
+
+    def verificar_conexion(self):
+        estado, _ = self._pedir('GET', '/salud')
+        return estado == 200
+
+    def clonar(self):
+        """Abre otra conexión al servicio que comparte el catálogo de tarifas"""
+        return RepositorioRemoto(self.url, self.tarifas, self.timeout, self.token)
+
+    def refrescar(self):
+        return self.tarifas.refrescar_si_cambio(self)
+
+    def metricas_servicio(self):
+        """{servicio, repositorio}: peticiones y latencia del servicio y métricas de sus cachés"""
+        return self._datos('GET', '/metricas')
+
+    def plan_tarifa(self, parqueadero=None):
+        return self.tarifas.plan(parqueadero)
+
+    def catalogo_tarifas(self):
+        return self.tarifas
+
+    # Fuente de datos del CatalogoTarifas, con la forma de PostgreSQLManager
+
+    def obtener_planes_tarifa(self):
+        respuesta = self._datos('GET', '/tarifas')
+        if respuesta is None:
+            return None
+        return respuesta['version'], respuesta['planes'], {int(numero): clase for numero, clase
+                                                           in respuesta['clases'].items()}
+
+    def obtener_version_tarifas(self):
+        respuesta = self._datos('GET', '/tarifas/version')
+        return respuesta['version'] if respuesta else None
+
+    # ============= OPERACIONES =============
+
+    def clasificar_placa(self, placa):
+        return self._datos('GET', f'/placas/{quote(placa)}')
+
+    def entrada_residente(self, placa):
+        return self._datos('POST', f'/residentes/{quote(placa)}/entrada')
+
+    def salida_residente(self, placa):
+        return self._datos('POST', f'/residentes/{quote(placa)}/salida')
+
+    def entrada_visitante(self, placa):
+        return self._datos('POST', '/visitantes', {'placa': placa})
+
+    def visitante_activo(self, placa):
+        return self._datos('GET', f'/visitantes/{quote(placa)}')
+
+    def liquidacion(self, placa):
+        """Lo que pagaría el visitante si saliera ahora (según el servidor), o None"""
+        return self._datos('GET', f'/visitantes/{quote(placa)}/liquidacion')
+
+    def salida_visitante(self, registro_id, parqueadero_id):
+        return self._datos('POST', f'/registros/{registro_id}/salida', {'parqueadero_id': parqueadero_id})
+
+    def visitantes_activos(self):
+        return self._datos('GET', '/visitantes') or []
+
+    def estado_parqueaderos(self):
+        return self._datos('GET', '/parqueaderos') or []
+
+    def estadisticas(self):
+        return self._datos('GET', '/estadisticas')
+
+    def pagina_historial(self, despues=None, tamano=100, placa=None, desde=None, hasta=None):
+        despues_hora, despues_id = despues or (None, None)
+        return self._datos('GET', '/historial', consulta={
+            'despues_hora': despues_hora, 'despues_id': despues_id, 'tamano': tamano,
+            'placa': placa, 'desde': desde, 'hasta': hasta})
+
+    def resumen_diario(self, desde, hasta):
+        filas = self._datos('GET', '/resumen-diario', consulta={'desde': desde, 'hasta': hasta})
+        if filas is None:
+            return None
+        return [dict(f, fecha=date.fromisoformat(f['fecha'])) for f in filas]
+
+    def intervalos_visitantes(self, desde, hasta):
+        filas = self._datos('GET', '/intervalos', consulta={'desde': desde, 'hasta': hasta})
+        if filas is None:
+            return None
+        return [(parqueadero, normalizar_hora(entrada), normalizar_hora(salida) if salida else None)
+                for parqueadero, entrada, salida in filas]
+
+    def guardar_plan_tarifa(self, clase, nombre, definicion):
+        respuesta = self._datos('POST', '/tarifas', {'clase': clase, 'nombre': nombre, 'definicion': definicion})
+        if respuesta is None:
+            return None
+        self.refrescar()
+        return respuesta['id']
+
+    def reconocer_placa(self, imagen):
+        """
+        Envía la foto (bytes JPEG/PNG) al servicio para reconocer la placa
+        Retorna {placa, clasificacion} (placa None si no se detectó) o None si falla
+        """
+        estado, respuesta = self._pedir('POST', '/ocr', cuerpo=imagen, tipo='application/octet-stream')
+        return _horas(respuesta) if estado == 200 else None
+
+    def cerrar(self):
+        if self.conexion is not None:
+            self.conexion.close()
+            self.conexion = None
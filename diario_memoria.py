@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Diario de escritura anticipada (append-only) para el modo de datos en memoria"""
+
+import json
+import os
+import threading
+
+# =============================================================================
+# LECTURA DE ARCHIVOS DE EVENTOS
+# =============================================================================
+
+def leer_eventos(ruta):
+    """
+    Lee un archivo con un evento JSON por línea (diario o cola sin conexión) y
+    lo deja listo para seguir agregando. Un evento solo está completo si su
+    línea termina en '\n': una última línea sin él es de un cierre inesperado a
+    mitad de escritura (nunca se confirmó) y se recorta del archivo, para que
+    lo que se escriba después empiece en una línea propia. Una línea completa
+    que no se puede leer se reporta y se omite sin perder las siguientes.
+    Retorna la lista de eventos en orden
+    """
+    eventos, valido = [], 0
+    if not os.path.exists(ruta):
+        return eventos
+    with open(ruta, 'rb') as f:
+        for numero, linea in enumerate(f, 1):
+            if not linea.endswith(b'\n'):
+                break
+            valido += len(linea)
+            try:
+                eventos.append(json.loads(linea))
+            except ValueError:
+                print(f"⚠️ {ruta}: la línea {numero} está dañada y se omite")
+    with open(ruta, 'r+b') as f:
+        f.truncate(valido)
+    return eventos
+
+# =============================================================================
+# DIARIO DE ESCRITURA ANTICIPADA
+# =============================================================================
+
+class DiarioMemoria:
+    """
+    Registra cada cambio del repositorio en memoria (entradas, salidas con su
+    cobro y cambios de estado de residentes) como una línea JSON en un archivo
+    que solo crece. Cada evento se escribe y se entrega al sistema operativo
+    antes de aplicarse, así que sobrevive a un cierre inesperado del programa;
+    el fsync a disco se agrupa en un hilo de fondo cada `intervalo_fsync`
+    segundos (los cobros se sincronizan de inmediato).
+
+    Cada `eventos_por_snapshot` eventos se guarda el estado completo en un
+    snapshot y el diario se vacía, de modo que la recuperación al iniciar lee
+    un snapshot y unos pocos eventos.
+    """
+
+    def __init__(self, ruta, intervalo_fsync=0.1, eventos_por_snapshot=1000):
+        """
+        ruta: archivo del diario; el snapshot se guarda en ruta + '.snapshot'
+        intervalo_fsync: segundos máximos que un evento puede quedar sin sincronizar a disco
+        eventos_por_snapshot: eventos en el diario antes de compactarlo en un snapshot
+        """
+        self.ruta = ruta
+        self.ruta_snapshot = ruta + '.snapshot'
+        self.intervalo_fsync = intervalo_fsync
+        self.eventos_por_snapshot = eventos_por_snapshot
+        self.seq = 0
+        self.eventos_desde_snapshot = 0
+        self._archivo = None
+        self._pendiente_fsync = False
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._sincronizar_periodicamente,
+                                      name='fsync-diario', daemon=True)
+
+    # ============= RECUPERACIÓN =============
+
+    def recuperar(self):
+        """
+        Lee el snapshot y los eventos posteriores, y deja el diario abierto para escribir
+        Retorna (estado del snapshot o None, lista de eventos a reaplicar en orden)
+        """
+        estado, seq_snapshot = None, 0
+        if os.path.exists(self.ruta_snapshot):
+            with open(self.ruta_snapshot, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            estado, seq_snapshot = snapshot['estado'], snapshot['seq']
+
+        # Se omiten los eventos ya incluidos en el snapshot (cierre entre snapshot y vaciado)
+        eventos = [e for e in leer_eventos(self.ruta) if e['seq'] > seq_snapshot]
+
+        self.seq = eventos[-1]['seq'] if eventos else seq_snapshot
+        self.eventos_desde_snapshot = len(eventos)
+        self._archivo = open(self.ruta, 'ab')
+        self._hilo.start()
+        return estado, eventos
+
+    # ============= ESCRITURA =============
+
+    def escribir(self, evento, sincronizar=False):
+        """
+        Agrega un evento al diario antes de aplicarlo en memoria
+        sincronizar: hacer fsync antes de retornar (para cobros)
+        """
+        with self._lock:
+            self.seq += 1
+            evento['seq'] = self.seq
+            self._archivo.write(json.dumps(evento, ensure_ascii=False).encode('utf-8') + b'\n')
+            self._archivo.flush()
+            self.eventos_desde_snapshot += 1
+            if sincronizar:
+                os.fsync(self._archivo.fileno())
+                self._pendiente_fsync = False
+            else:
+                self._pendiente_fsync = True
+        return evento
+
+    def necesita_snapshot(self):
+        return self.eventos_desde_snapshot >= self.eventos_por_snapshot
+
+    def guardar_snapshot(self, estado):
+        """Guarda el estado completo de forma atómica y vacía el diario"""
+        with self._lock:
+            temporal = self.ruta_snapshot + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'seq': self.seq, 'estado': estado}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.ruta_snapshot)
+            self._sincronizar_directorio()
+
+            # Los eventos hasta self.seq ya están en el snapshot
+            self._archivo.truncate(0)
+            os.fsync(self._archivo.fileno())
+            self._pendiente_fsync = False
+            self.eventos_desde_snapshot = 0
+
+    def _sincronizar_directorio(self):
+        """Persiste el renombrado del snapshot (no disponible en Windows)"""
+        if os.name == 'nt':
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.ruta_snapshot)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # ============= SINCRONIZACIÓN =============
+
+    def sincronizar(self):
+        """fsync de los eventos escritos desde la última sincronización"""
+        with self._lock:
+            if self._pendiente_fsync and self._archivo:
+                os.fsync(self._archivo.fileno())
+                self._pendiente_fsync = False
+
+    def _sincronizar_periodicamente(self):
+        while not self._detener.wait(self.intervalo_fsync):
+            try:
+                self.sincronizar()
+            except Exception as e:
+                print(f"Error sincronizando diario: {e}")
+
+    def cerrar(self):
+        """Sincroniza lo pendiente y cierra el diario"""
+        self._detener.set()
+        if self._hilo.is_alive():
+            self._hilo.join()
+        self.sincronizar()
+        with self._lock:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Directorio en memoria de placas de residentes con invalidación por versión"""
+
+import threading
+
+# =============================================================================
+# DIRECTORIO DE PLACAS
+# =============================================================================
+
+class DirectorioPlacas:
+    """
+    Índice local placa -> residente (nombre, apartamento, parqueadero, estado).
+    Se carga al iniciar y se recarga solo cuando cambia el contador
+    directorio_version, que los triggers incrementan al modificar residentes,
+    placas o el titular o número de un parqueadero. Así la clasificación en la
+    portería es una búsqueda en un diccionario y la base de datos solo se
+    consulta para escrituras y placas desconocidas. Las entradas y salidas no
+    cambian la versión: el estado se actualiza con los avisos del canal
+    estado_residentes que se aplican en cada refresco (o, sin suscripción, es
+    el de la última carga o escritura propia). Las escrituras verifican el
+    estado en la base de datos, así que uno desactualizado no causa errores.
+    """
+
+    def __init__(self, db):
+        """
+        db: PostgreSQLManager con obtener_directorio_residentes() y obtener_version_directorio()
+        """
+        self.db = db
+        self.placas = {}
+        self.version = None
+        self.cargado = False
+        self._lock = threading.Lock()
+        self.suscripcion = None  # conexión que escucha estado_residentes
+        self._lock_avisos = threading.Lock()
+        self._metricas = {'aciertos': 0, 'fallos': 0, 'recargas': 0, 'verificaciones': 0, 'avisos_estado': 0}
+
+    def cargar(self, db=None):
+        """
+        Carga el directorio completo desde la base de datos
+        db: conexión alternativa (por ejemplo, del pool de fondo)
+        """
+        datos = (db or self.db).obtener_directorio_residentes()
+        if datos is None:
+            return False
+
+        version, filas = datos
+        placas = {fila['placa']: dict(fila) for fila in filas}
+        with self._lock:
+            self.placas = placas
+            self.version = version
+            self.cargado = True
+            self._metricas['recargas'] += 1
+        return True
+
+    def refrescar_si_cambio(self, db=None, suscribir=None):
+        """
+        Consulta el contador de versión y recarga el directorio si cambió; después
+        aplica los avisos de estado recibidos. Retorna True si recargó
+        suscribir: función que abre la suscripción al canal estado_residentes
+            (PostgreSQLManager escuchando, o None) si aún no hay una abierta
+        """
+        if suscribir is not None:
+            self._abrir_suscripcion(suscribir)
+        version = (db or self.db).obtener_version_directorio()
+        self._metricas['verificaciones'] += 1
+        if version is None:
+            return False
+        recargado = False
+        if not self.cargado or version != self.version:
+            recargado = self.cargar(db)
+        self.aplicar_avisos_estado()
+        return recargado
+
+    def _abrir_suscripcion(self, suscribir):
+        with self._lock_avisos:
+            if self.suscripcion is not None:
+                return
+            self.suscripcion = suscribir()
+        # Los cambios anteriores a la suscripción no llegaron como aviso: se recarga
+        if self.suscripcion is not None:
+            self.invalidar()
+
+    def aplicar_avisos_estado(self):
+        """Aplica los avisos 'numero:estado' pendientes sin esperar. Si se perdió la suscripción la cierra"""
+        with self._lock_avisos:
+            if self.suscripcion is None:
+                return
+            avisos = self.suscripcion.recibir_avisos(0)
+            if avisos is None:
+                # Se reabre (y se recarga el directorio) en el próximo refresco
+                self.suscripcion.cerrar()
+                self.suscripcion = None
+                return
+        for _, payload in avisos:
+            numero, _, estado = payload.partition(':')
+            with self._lock:
+                for residente in self.placas.values():
+                    if str(residente['parqueadero']) == numero:
+                        residente['estado'] = estado
+                self._metricas['avisos_estado'] += 1
+
+    def invalidar(self):
+        """Fuerza la recarga en la próxima verificación"""
+        with self._lock:
+            self.version = None
+
+    def buscar(self, placa):
+        """
+        Retorna los datos del residente dueño de la placa, o None si no es residente
+        (o si el directorio no se ha podido cargar)
+        """
+        with self._lock:
+            residente = self.placas.get(placa)
+            if residente is not None:
+                self._metricas['aciertos'] += 1
+                return dict(residente)
+            self._metricas['fallos'] += 1
+            return None
+
+    def actualizar_estado(self, placa, estado):
+        """Actualiza localmente el estado del parqueadero tras una escritura propia"""
+        with self._lock:
+            if placa in self.placas:
+                self.placas[placa]['estado'] = estado
+
+    def cerrar(self):
+        """Cierra la suscripción a los avisos de estado"""
+        with self._lock_avisos:
+            if self.suscripcion is not None:
+                self.suscripcion.cerrar()
+                self.suscripcion = None
+
+    def metricas(self):
+        """Retorna las métricas de uso del directorio"""
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['placas'] = len(self.placas)
+            metricas['version'] = self.version
+        consultas = metricas['aciertos'] + metricas['fallos']
+        metricas['tasa_aciertos'] = metricas['aciertos'] / consultas if consultas else 0.0
+        return metricas
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Estado compacto del repositorio en memoria: registros con __slots__, mapa de
+ocupación de parqueaderos en un bytearray e historial de salidas en columnas
+NumPy. Los contadores se mantienen al aplicar cada cambio, así las
+estadísticas no recorren residentes ni historial.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+from tarifas import es_tarifa_plena
+
+# Placas de hasta 10 caracteres (PATRON_PLACA)
+TIPO_PLACA = 'U10'
+
+# =============================================================================
+# REGISTROS
+# =============================================================================
+
+class Residente:
+    """Residente con su parqueadero asignado"""
+
+    __slots__ = ('nombre', 'apartamento', 'parqueadero', 'estado')
+
+    def __init__(self, nombre, apartamento, parqueadero, estado='LIBRE'):
+        self.nombre = nombre
+        self.apartamento = apartamento
+        self.parqueadero = parqueadero
+        self.estado = estado
+
+    def como_dict(self):
+        return {'nombre': self.nombre, 'parqueadero': self.parqueadero, 'estado': self.estado,
+                'apartamento': self.apartamento}
+
+class RegistroActivo:
+    """Visitante dentro del conjunto"""
+
+    __slots__ = ('id', 'placa', 'parqueadero_id', 'parqueadero', 'hora_entrada')
+
+    def __init__(self, id, placa, parqueadero_id, parqueadero, hora_entrada):
+        self.id = id
+        self.placa = placa
+        self.parqueadero_id = parqueadero_id
+        self.parqueadero = parqueadero
+        self.hora_entrada = hora_entrada
+
+    def como_dict(self):
+        return {'id': self.id, 'placa': self.placa, 'parqueadero_id': self.parqueadero_id,
+                'parqueadero': self.parqueadero, 'hora_entrada': self.hora_entrada}
+
+# =============================================================================
+# OCUPACIÓN DE PARQUEADEROS
+# =============================================================================
+
+class OcupacionParqueaderos:
+    """
+    Parqueaderos de visitantes ordenados por número con un byte de ocupación
+    cada uno. Ocupar o liberar cualquiera es O(1); el libre de menor número
+    (el que asigna PostgreSQL) se busca con bytearray.find, un memchr que con
+    10.000 parqueaderos tarda microsegundos
+    """
+
+    def __init__(self, numeros=()):
+        self.numeros = sorted(numeros)
+        self.posicion = {numero: i for i, numero in enumerate(self.numeros)}
+        self.ocupado = bytearray(len(self.numeros))
+        self.ocupados = 0
+
+    def __len__(self):
+        return len(self.numeros)
+
+    def __iter__(self):
+        return iter(self.numeros)
+
+    def __contains__(self, numero):
+        return numero in self.posicion
+
+    @property
+    def libres(self):
+        return len(self.numeros) - self.ocupados
+
+    def primero_libre(self):
+        """Número del parqueadero libre más bajo, o None si todos están ocupados"""
+        i = self.ocupado.find(0)
+        return self.numeros[i] if i >= 0 else None
+
+    def ocupar(self, numero):
+        # Un número desconocido (asignado por el servidor) no cambia la ocupación local
+        i = self.posicion.get(numero)
+        if i is not None and not self.ocupado[i]:
+            self.ocupado[i] = 1
+            self.ocupados += 1
+
+    def liberar(self, numero):
+        i = self.posicion.get(numero)
+        if i is not None and self.ocupado[i]:
+            self.ocupado[i] = 0
+            self.ocupados -= 1
+
+    def esta_ocupado(self, numero):
+        i = self.posicion.get(numero)
+        return i is not None and bool(self.ocupado[i])
+
+# =============================================================================
+# HISTORIAL COLUMNAR
+# =============================================================================
+
+class HistorialColumnar:
+    """
+    Salidas de visitantes en arreglos NumPy (uno por campo) que duplican su
+    capacidad al llenarse. Lleva el recaudo total y por día al agregar cada
+    salida; las páginas, resúmenes e intervalos filtran con máscaras sobre las
+    columnas y solo convierten a diccionarios las filas que retornan
+    """
+
+    CAPACIDAD_INICIAL = 1024
+    COLUMNAS = ('ids', 'placas', 'parqueaderos', 'entradas', 'salidas', 'horas', 'valores')
+
+    def __init__(self, filas=()):
+        self.n = 0
+        self._reservar(self.CAPACIDAD_INICIAL)
+        self.total_recaudado = 0.0
+        self.recaudo_por_dia = {}  # date -> recaudo de las salidas de ese día
+        for fila in filas:
+            self.agregar(fila['id'], fila['placa'], fila['parqueadero'], fila['hora_entrada'],
+                         fila['hora_salida'], fila['total_horas'], fila['valor_pagado'])
+
+    def _reservar(self, capacidad):
+        columnas = {
+            'ids': np.empty(capacidad, dtype=object),  # enteros, o UUID en el espejo sin conexión
+            'placas': np.empty(capacidad, dtype=TIPO_PLACA),
+            'parqueaderos': np.empty(capacidad, dtype=np.int32),
+            'entradas': np.empty(capacidad, dtype='datetime64[us]'),
+            'salidas': np.empty(capacidad, dtype='datetime64[us]'),
+            'horas': np.empty(capacidad, dtype=np.float64),
+            'valores': np.empty(capacidad, dtype=np.float64),
+        }
+        for nombre, columna in columnas.items():
+            if self.n:
+                columna[:self.n] = getattr(self, nombre)[:self.n]
+            setattr(self, nombre, columna)
+
+    def __len__(self):
+        return self.n
+
+    def agregar(self, registro_id, placa, parqueadero, hora_entrada, hora_salida, total_horas, valor_pagado):
+        if self.n == len(self.ids):
+            self._reservar(2 * len(self.ids))
+        i = self.n
+        self.ids[i] = registro_id
+        self.placas[i] = placa
+        self.parqueaderos[i] = parqueadero
+        self.entradas[i] = hora_entrada
+        self.salidas[i] = hora_salida
+        self.horas[i] = total_horas
+        self.valores[i] = valor_pagado
+        self.n += 1
+        # Los cobros replicados del servidor llegan como Decimal
+        self.total_recaudado += float(valor_pagado)
+        fecha = hora_salida.date()
+        self.recaudo_por_dia[fecha] = self.recaudo_por_dia.get(fecha, 0.0) + float(valor_pagado)
+
+    def recortar(self, maximo):
+        """Conserva solo las `maximo` salidas más recientes (espejo sin conexión)"""
+        if self.n <= maximo:
+            return
+        inicio = self.n - maximo
+        for nombre in self.COLUMNAS:
+            columna = getattr(self, nombre)
+            columna[:maximo] = columna[inicio:self.n]
+        self.n = maximo
+        self.total_recaudado = float(self.valores[:self.n].sum())
+        fechas, dia = np.unique(self.salidas[:self.n].astype('datetime64[D]'), return_inverse=True)
+        recaudos = np.bincount(dia, self.valores[:self.n], minlength=len(fechas))
+        self.recaudo_por_dia = {fecha.item(): float(recaudo) for fecha, recaudo in zip(fechas, recaudos)}
+
+    def fila(self, i):
+        return {'id': self.ids[i], 'placa': str(self.placas[i]), 'parqueadero': int(self.parqueaderos[i]),
+                'hora_entrada': self.entradas[i].item(), 'hora_salida': self.salidas[i].item(),
+                'total_horas': float(self.horas[i]), 'valor_pagado': float(self.valores[i])}
+
+    def filas(self):
+        return [self.fila(i) for i in range(self.n)]
+
+    # ============= CONSULTAS =============
+
+    def pagina(self, despues=None, tamano=100, placa=None, desde=None, hasta=None):
+        """
+        Salidas ordenadas por (hora_salida, id) descendente, como pagina_historial.
+        Los ids pueden ser enteros o UUID (espejo sin conexión): los UUID van después
+        """
+        def clave(hora_salida, registro_id):
+            return (hora_salida, isinstance(registro_id, str), registro_id)
+
+        salidas = self.salidas[:self.n]
+        mascara = np.ones(self.n, dtype=bool)
+        if despues:
+            hora_limite = np.datetime64(despues[0], 'us')
+            mascara &= salidas <= hora_limite
+            # Con la misma hora de salida que la última fila de la página anterior decide el id
+            limite = clave(*despues)
+            for i in np.flatnonzero(mascara & (salidas == hora_limite)):
+                if clave(despues[0], self.ids[i]) >= limite:
+                    mascara[i] = False
+        if placa:
+            mascara &= np.char.startswith(self.placas[:self.n], placa)
+        if desde:
+            mascara &= salidas >= np.datetime64(desde, 'D')
+        if hasta:
+            mascara &= salidas < np.datetime64(hasta + timedelta(days=1), 'D')
+        indices = np.flatnonzero(mascara)
+        orden = indices[np.argsort(salidas[indices], kind='stable')[::-1]]
+        if len(orden) > tamano:
+            # Solo hace falta ordenar por id las filas hasta la hora de salida de la última de la página
+            orden = orden[salidas[orden] >= salidas[orden[tamano - 1]]]
+        filas = sorted((self.fila(i) for i in orden), key=lambda f: clave(f['hora_salida'], f['id']),
+                       reverse=True)
+        return filas[:tamano]
+
+    def resumen_diario(self, desde, hasta):
+        salidas = self.salidas[:self.n]
+        dias = salidas.astype('datetime64[D]')
+        seleccion = np.flatnonzero((dias >= np.datetime64(desde, 'D')) & (dias <= np.datetime64(hasta, 'D')))
+        fechas, dia = np.unique(dias[seleccion], return_inverse=True)
+        us = (salidas[seleccion] - self.entradas[seleccion]).astype(np.int64)
+        plena = es_tarifa_plena(us)
+        valores = self.valores[seleccion]
+
+        def por_dia(pesos=None, filtro=None):
+            if filtro is not None:
+                return np.bincount(dia[filtro], None if pesos is None else pesos[filtro], minlength=len(fechas))
+            return np.bincount(dia, pesos, minlength=len(fechas))
+
+        columnas = {
+            'salidas': por_dia(), 'horas': por_dia(self.horas[seleccion]), 'recaudo': por_dia(valores),
+            'salidas_por_hora': por_dia(filtro=~plena), 'recaudo_por_hora': por_dia(valores, ~plena),
+            'salidas_tarifa_plena': por_dia(filtro=plena), 'recaudo_tarifa_plena': por_dia(valores, plena),
+        }
+        return [dict({'fecha': fecha.item()},
+                     **{clave: int(columna[i]) if clave.startswith('salidas') else float(columna[i])
+                        for clave, columna in columnas.items()})
+                for i, fecha in enumerate(fechas)]
+
+    def intervalos(self, desde, hasta):
+        """(parqueadero, hora_entrada, hora_salida) de las salidas que se cruzan con [desde, hasta)"""
+        entradas, salidas = self.entradas[:self.n], self.salidas[:self.n]
+        seleccion = np.flatnonzero((entradas < np.datetime64(hasta, 'us')) & (salidas > np.datetime64(desde, 'us')))
+        return [(int(self.parqueaderos[i]), entradas[i].item(), salidas[i].item()) for i in seleccion]
+
+    def recaudo_del_dia(self, fecha):
+        return self.recaudo_por_dia.get(fecha, 0.0)
@@ -16,7 +16,8 @@ def instalar_todo():
         "pandas==2.0.3",
         "matplotlib==3.7.2",
         "pillow==10.0.1",
-        "psycopg2-binary==2.9.9"
+        "psycopg2-binary==2.9.9",
+        "pyarrow==12.0.1"  # Opcional: exportar/importar Parquet
     ]
     
     print("\n📋 Librerías a instalar:")
@@ -50,7 +51,8 @@ def instalar_todo():
         ("pandas", "pandas"),
         ("matplotlib.pyplot", "matplotlib"),
         ("PIL", "pillow"),
-        ("psycopg2", "psycopg2-binary")
+        ("psycopg2", "psycopg2-binary"),
+        ("pyarrow", "pyarrow")
     ]
     
     todo_ok = True
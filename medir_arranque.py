@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Mide el tiempo de importación de la aplicación con `python -X importtime` y
+verifica el presupuesto de arranque: OpenCV, Tesseract, pandas, matplotlib y
+PIL solo se cargan al abrir la cámara, una foto o los reportes.
+
+Uso:
+    python medir_arranque.py                      # run_app, presupuesto por defecto
+    python medir_arranque.py --modulo Vehiculo --presupuesto 300
+Termina con código 1 si se excede el presupuesto o se importa un módulo pesado.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Presupuesto de la importación en frío de run_app (medido en ~170 ms, con psycopg2 y numpy)
+PRESUPUESTO_MS = 400
+# Módulos que no deben cargarse al iniciar (incluye los que los importan)
+MODULOS_PESADOS = ('cv2', 'pytesseract', 'pandas', 'matplotlib', 'PIL',
+                   'ocr_placas', 'ventana_camara', 'reportes', 'analitica')
+
+def medir_importacion(modulo='run_app', repeticiones=3):
+    """
+    Importa `modulo` en procesos nuevos y retorna (ms de la mejor repetición,
+    {módulo: ms acumulados} de esa repetición). La primera repetición puede
+    incluir la compilación a .pyc; por eso se toma la mínima
+    """
+    mejor = None
+    for _ in range(repeticiones):
+        proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                                 cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 capture_output=True, text=True)
+        if proceso.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+        tiempos = {}
+        for linea in proceso.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not linea.startswith('import time:') or 'cumulative' in linea:
+                continue
+            _, acumulado, nombre = linea[len('import time:'):].split('|')
+            tiempos[nombre.strip()] = int(acumulado) / 1000
+        total = tiempos.get(modulo, 0.0)
+        if mejor is None or total < mejor[0]:
+            mejor = (total, tiempos)
+    return mejor
+
+def verificar_arranque(modulo='run_app', presupuesto_ms=PRESUPUESTO_MS):
+    """Retorna (total_ms, problemas, tiempos); problemas vacío si cumple el presupuesto"""
+    total, tiempos = medir_importacion(modulo)
+    problemas = []
+    if total > presupuesto_ms:
+        problemas.append(f"importar {modulo} tomó {total:.0f} ms (presupuesto {presupuesto_ms} ms)")
+    for nombre in MODULOS_PESADOS:
+        if nombre in tiempos:
+            problemas.append(f"{nombre} se importa al iniciar ({tiempos[nombre]:.0f} ms)")
+    return total, problemas, tiempos
+
+def main():
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de arranque de la aplicación")
+    parser.add_argument('--modulo', default='run_app')
+    parser.add_argument('--presupuesto', type=float, default=PRESUPUESTO_MS, help="milisegundos")
+    args = parser.parse_args()
+
+    total, problemas, tiempos = verificar_arranque(args.modulo, args.presupuesto)
+    print(f"⏱️ import {args.modulo}: {total:.0f} ms (presupuesto {args.presupuesto:.0f} ms)")
+    # Módulos de primer nivel (sin punto) más costosos
+    principales = sorted(((ms, nombre) for nombre, ms in tiempos.items()
+                          if '.' not in nombre and nombre != args.modulo), reverse=True)[:10]
+    for ms, nombre in principales:
+        print(f"   {nombre:<30}{ms:>8.1f} ms")
+    if problemas:
+        for problema in problemas:
+            print(f"❌ {problema}")
+        sys.exit(1)
+    print("✅ Arranque dentro del presupuesto")
+
+if __name__ == "__main__":
+    main()
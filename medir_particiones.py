@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Mide las estadísticas de PostgreSQL a medida que crece el historial de
+registros_visitantes particionado por mes (migración 9).
+
+Llena meses cerrados hacia atrás con `--salidas-mes` salidas cada uno (placas
+BMKnnnnnn en los parqueaderos de visitantes existentes, cada mes en su
+partición) y con cada tamaño de `--meses` toma la mediana de
+obtener_estadisticas y obtener_estadisticas_por_tipo:
+    acumulado: los meses cerrados salen de recaudo_mensual (lo normal)
+    en vivo: sin recaudo_mensual, se suma todo el historial (como antes del acumulado)
+
+Por defecto usa la base de datos control_acceso_benchmark: contra la de la
+aplicación exige --permitir-produccion. Al terminar borra las salidas que creó
+y los resúmenes y el recaudo mensual de esos meses (quedan las particiones
+vacías); --conservar-datos los deja.
+
+Uso:
+    python medir_particiones.py                                  # 6, 12, 24 y 48 meses de 40.000 salidas
+    python medir_particiones.py --meses 3,6 --salidas-mes 10000 --repeticiones 5
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from base_datos import PostgreSQLManager
+
+BASE_PRODUCCION = 'control_acceso'
+PREFIJO_PLACA = 'BMK'
+
+# =============================================================================
+# DATOS
+# =============================================================================
+
+def llenar_meses(manager, desde, hasta, salidas_mes, semilla=0.2026):
+    """
+    Crea las particiones de los meses cerrados desde..hasta-1 (contando hacia
+    atrás desde el actual: 1 es el mes pasado) y les inserta salidas_mes salidas
+    de 1 a 5 horas. Confirma la transacción
+    """
+    cursor = manager.cursor
+    try:
+        cursor.execute("SELECT ARRAY_AGG(id ORDER BY numero) AS ids FROM parqueaderos WHERE residente_id IS NULL")
+        parqueaderos = cursor.fetchone()['ids']
+        if not parqueaderos:
+            raise RuntimeError("no hay parqueaderos de visitantes")
+        cursor.execute("SELECT setseed(%s)", (semilla,))
+        for atras in range(desde, hasta):
+            cursor.execute("""
+                SELECT (date_trunc('month', LOCALTIMESTAMP) - make_interval(months => %s))::date AS mes
+            """, (atras,))
+            mes = cursor.fetchone()['mes']
+            cursor.execute("SELECT crear_particion_registros(%s)", (mes,))
+            cursor.execute("""
+                INSERT INTO registros_visitantes (placa, parqueadero_id, hora_entrada, hora_salida,
+                                                  total_horas, valor_pagado)
+                SELECT %(prefijo)s || lpad((g %% 1000000)::text, 6, '0'),
+                       (%(parqueaderos)s::int[])[1 + g %% cardinality(%(parqueaderos)s::int[])],
+                       e.entrada, e.entrada + e.estadia,
+                       round(extract(epoch FROM e.estadia) / 3600, 2),
+                       1000 * ceil(extract(epoch FROM e.estadia) / 3600)
+                FROM generate_series(1, %(salidas)s) g,
+                     LATERAL (SELECT %(mes)s::timestamp + random() * INTERVAL '27 days' AS entrada,
+                                     INTERVAL '1 hour' + random() * INTERVAL '4 hours' AS estadia
+                              OFFSET 0) e
+            """, {'prefijo': PREFIJO_PLACA, 'parqueaderos': parqueaderos, 'salidas': salidas_mes, 'mes': mes})
+        manager.connection.commit()
+        cursor.execute("ANALYZE registros_visitantes")
+        manager.connection.commit()
+    except Exception:
+        manager.connection.rollback()
+        raise
+
+def quitar_recaudo_mensual(manager):
+    """Vacía recaudo_mensual: las estadísticas suman en vivo todos los meses cerrados"""
+    manager.cursor.execute("DELETE FROM recaudo_mensual")
+    manager.cursor.execute("DELETE FROM recaudo_mensual_meses")
+    manager.connection.commit()
+
+def acumular_recaudo_mensual(manager):
+    """Corre mantenimiento_mensual aunque ya haya corrido este mes"""
+    manager.mes_mantenimiento = None
+    manager.mantenimiento_mensual()
+
+def limpiar_datos(manager):
+    """Borra las salidas de la prueba y los resúmenes de sus días y meses. Retorna cuántas borró"""
+    cursor = manager.cursor
+    try:
+        cursor.execute("""
+            DELETE FROM registros_visitantes WHERE placa LIKE %s
+            RETURNING hora_salida
+        """, (PREFIJO_PLACA + '%',))
+        salidas = [f['hora_salida'] for f in cursor.fetchall()]
+        dias = sorted({h.date() for h in salidas})
+        meses = sorted({h.date().replace(day=1) for h in salidas})
+        cursor.execute("DELETE FROM resumen_diario WHERE fecha = ANY(%s)", (dias,))
+        cursor.execute("DELETE FROM recaudo_mensual WHERE mes = ANY(%s)", (meses,))
+        cursor.execute("DELETE FROM recaudo_mensual_meses WHERE mes = ANY(%s)", (meses,))
+        manager.connection.commit()
+        return len(salidas)
+    except Exception:
+        manager.connection.rollback()
+        raise
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+def mediana_ms(funcion, repeticiones):
+    """Mediana en milisegundos de `repeticiones` llamadas (después de una de calentamiento)"""
+    funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def medir(manager, repeticiones):
+    """(estadísticas, por tipo) en ms"""
+    return (mediana_ms(manager.obtener_estadisticas, repeticiones),
+            mediana_ms(manager.obtener_estadisticas_por_tipo, repeticiones))
+
+def main():
+    parser = argparse.ArgumentParser(description="Estadísticas con el historial particionado por mes")
+    parser.add_argument('--db-host', default='localhost')
+    parser.add_argument('--db-puerto', type=int, default=5432)
+    parser.add_argument('--db-nombre', default='control_acceso_benchmark')
+    parser.add_argument('--db-usuario', default='postgres')
+    parser.add_argument('--meses', default='6,12,24,48', help="meses cerrados de historial a medir")
+    parser.add_argument('--salidas-mes', type=int, default=40000)
+    parser.add_argument('--repeticiones', type=int, default=15)
+    parser.add_argument('--conservar-datos', action='store_true',
+                        help="no borrar las salidas de prueba al terminar")
+    parser.add_argument('--permitir-produccion', action='store_true',
+                        help=f"correr contra {BASE_PRODUCCION}")
+    args = parser.parse_args()
+
+    if args.db_nombre == BASE_PRODUCCION and not args.permitir_produccion:
+        print(f"❌ {args.db_nombre} es la base de datos de la aplicación: la medición escribe y borra "
+              f"registros. Use una base de datos de pruebas o --permitir-produccion")
+        return
+    try:
+        tamanos = sorted({int(m) for m in args.meses.split(',')})
+    except ValueError:
+        print("❌ --meses debe ser una lista de enteros separados por comas")
+        return
+
+    manager = PostgreSQLManager({'host': args.db_host, 'port': args.db_puerto, 'database': args.db_nombre,
+                                 'user': args.db_usuario, 'password': os.environ.get('PGPASSWORD', ''),
+                                 'statement_timeout': 0})
+    if not manager.conectado:
+        return
+    try:
+        print(f"📊 {args.salidas_mes:,} salidas por mes, mediana de {args.repeticiones} llamadas (ms)")
+        print(f"{'meses':>6}{'filas':>12}{'en vivo (stats / tipo)':>28}{'acumulado':>18}")
+        llenos = 0
+        for meses in tamanos:
+            llenar_meses(manager, llenos + 1, meses + 1, args.salidas_mes)
+            llenos = meses
+            manager.cursor.execute("SELECT COUNT(*) AS filas FROM registros_visitantes")
+            filas = manager.cursor.fetchone()['filas']
+            manager.connection.commit()
+
+            quitar_recaudo_mensual(manager)
+            vivo = medir(manager, args.repeticiones)
+            acumular_recaudo_mensual(manager)
+            acumulado = medir(manager, args.repeticiones)
+            print(f"{meses:>6}{filas:>12,}{vivo[0]:>17.0f} / {vivo[1]:<8.0f}{acumulado[0]:>7.0f} / {acumulado[1]:.0f}")
+    finally:
+        if not args.conservar_datos:
+            print(f"🧹 {limpiar_datos(manager):,} salidas de prueba borradas")
+            acumular_recaudo_mensual(manager)
+        manager.cerrar()
+
+if __name__ == "__main__":
+    main()
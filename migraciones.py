@@ -0,0 +1,740 @@
+# -*- coding: utf-8 -*-
+"""Migraciones versionadas del esquema PostgreSQL del Sistema de Control de Acceso"""
+
+# =============================================================================
+# MIGRACIONES
+# =============================================================================
+# Cada migración es (version, descripcion, sql). Se aplican una sola vez, en
+# orden, y quedan registradas en la tabla schema_migraciones. Nunca editar una
+# migración ya publicada: agregar una nueva al final de la lista.
+
+MIGRACIONES = [
+    (1, "Estructura base: tablas, función calcular_pago y trigger", """
+        CREATE TABLE IF NOT EXISTS residentes (
+            id SERIAL PRIMARY KEY,
+            nombre VARCHAR(100) NOT NULL,
+            apartamento VARCHAR(20) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS parqueaderos (
+            id SERIAL PRIMARY KEY,
+            numero INTEGER UNIQUE NOT NULL,
+            estado VARCHAR(10) CHECK (estado IN ('LIBRE','OCUPADO')) DEFAULT 'LIBRE',
+            residente_id INTEGER UNIQUE,
+            FOREIGN KEY (residente_id) REFERENCES residentes(id)
+        );
+
+        CREATE TABLE IF NOT EXISTS placas (
+            id SERIAL PRIMARY KEY,
+            residente_id INTEGER NOT NULL,
+            placa VARCHAR(10) UNIQUE NOT NULL,
+            FOREIGN KEY (residente_id) REFERENCES residentes(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS registros_visitantes (
+            id SERIAL PRIMARY KEY,
+            placa VARCHAR(10) NOT NULL,
+            parqueadero_id INTEGER NOT NULL,
+            hora_entrada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            hora_salida TIMESTAMP,
+            total_horas NUMERIC(5,2),
+            valor_pagado NUMERIC(10,2),
+            FOREIGN KEY (parqueadero_id) REFERENCES parqueaderos(id)
+        );
+
+        CREATE OR REPLACE FUNCTION calcular_pago()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            horas NUMERIC;
+        BEGIN
+            horas := EXTRACT(EPOCH FROM (NEW.hora_salida - NEW.hora_entrada)) / 3600;
+            NEW.total_horas := ROUND(horas,2);
+
+            -- Cálculo de tarifa: primeras 5 horas a $1000/hora (o fracción), después tarifa plena de $10000
+            IF horas <= 5 THEN
+                NEW.valor_pagado := CEIL(horas) * 1000;
+            ELSE
+                NEW.valor_pagado := 10000;
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_calculo_pago ON registros_visitantes;
+
+        CREATE TRIGGER trigger_calculo_pago
+        BEFORE UPDATE ON registros_visitantes
+        FOR EACH ROW
+        WHEN (NEW.hora_salida IS NOT NULL)
+        EXECUTE FUNCTION calcular_pago();
+    """),
+
+    (2, "Índices parciales y de expresión para consultas frecuentes", """
+        -- Visitante activo por placa (obtener_visitante_activo_por_placa) y conteo de activos
+        CREATE INDEX IF NOT EXISTS idx_registros_activos_placa
+            ON registros_visitantes (placa, hora_entrada DESC)
+            WHERE hora_salida IS NULL;
+
+        -- Historial ordenado por salida (obtener_historial_visitantes)
+        CREATE INDEX IF NOT EXISTS idx_registros_hora_salida
+            ON registros_visitantes (hora_salida DESC, id DESC)
+            WHERE hora_salida IS NOT NULL;
+
+        -- Recaudo del día (DATE(hora_salida) = CURRENT_DATE)
+        CREATE INDEX IF NOT EXISTS idx_registros_fecha_salida
+            ON registros_visitantes ((DATE(hora_salida)));
+
+        -- Ingresos por tipo de parqueadero (join por parqueadero_id)
+        CREATE INDEX IF NOT EXISTS idx_registros_parqueadero
+            ON registros_visitantes (parqueadero_id);
+
+        -- Conteos de residentes/visitantes por estado
+        CREATE INDEX IF NOT EXISTS idx_parqueaderos_residente_estado
+            ON parqueaderos (residente_id, estado);
+
+        -- Parqueaderos libres para visitantes (obtener_parqueaderos_libres_visitantes)
+        CREATE INDEX IF NOT EXISTS idx_parqueaderos_visitantes_libres
+            ON parqueaderos (numero)
+            WHERE residente_id IS NULL AND estado = 'LIBRE';
+
+        -- Placa de un residente (estado de parqueaderos)
+        CREATE INDEX IF NOT EXISTS idx_placas_residente
+            ON placas (residente_id);
+    """),
+
+    (3, "Asignación atómica de parqueadero a visitantes", """
+        -- Valida la placa, toma el primer parqueadero libre de visitantes con
+        -- FOR UPDATE SKIP LOCKED, lo marca OCUPADO e inserta el registro en una
+        -- sola llamada. Dos porterías nunca reciben el mismo parqueadero.
+        CREATE OR REPLACE FUNCTION asignar_parqueadero_visitante(p_placa VARCHAR)
+        RETURNS TABLE (resultado VARCHAR, registro_id INTEGER, parqueadero_id INTEGER,
+                       parqueadero INTEGER, hora_entrada TIMESTAMP) AS $$
+        #variable_conflict use_column
+        DECLARE
+            v_parqueadero_id INTEGER;
+            v_numero INTEGER;
+        BEGIN
+            -- Serializa entradas simultáneas de la misma placa
+            PERFORM pg_advisory_xact_lock(hashtext('entrada_visitante:' || p_placa));
+
+            IF EXISTS (SELECT 1 FROM placas pl WHERE pl.placa = p_placa) THEN
+                RETURN QUERY SELECT 'RESIDENTE'::VARCHAR, NULL::INTEGER, NULL::INTEGER,
+                                    NULL::INTEGER, NULL::TIMESTAMP;
+                RETURN;
+            END IF;
+
+            IF EXISTS (SELECT 1 FROM registros_visitantes rv
+                       WHERE rv.placa = p_placa AND rv.hora_salida IS NULL) THEN
+                RETURN QUERY SELECT 'ACTIVO'::VARCHAR, NULL::INTEGER, NULL::INTEGER,
+                                    NULL::INTEGER, NULL::TIMESTAMP;
+                RETURN;
+            END IF;
+
+            SELECT p.id, p.numero INTO v_parqueadero_id, v_numero
+            FROM parqueaderos p
+            WHERE p.residente_id IS NULL AND p.estado = 'LIBRE'
+            ORDER BY p.numero
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED;
+
+            IF v_parqueadero_id IS NULL THEN
+                RETURN QUERY SELECT 'SIN_CUPO'::VARCHAR, NULL::INTEGER, NULL::INTEGER,
+                                    NULL::INTEGER, NULL::TIMESTAMP;
+                RETURN;
+            END IF;
+
+            UPDATE parqueaderos SET estado = 'OCUPADO' WHERE id = v_parqueadero_id;
+
+            RETURN QUERY
+            INSERT INTO registros_visitantes (placa, parqueadero_id)
+            VALUES (p_placa, v_parqueadero_id)
+            RETURNING 'OK'::VARCHAR, registros_visitantes.id, registros_visitantes.parqueadero_id,
+                      v_numero, registros_visitantes.hora_entrada;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+
+    (4, "Contador de versión del directorio de placas de residentes", """
+        CREATE TABLE IF NOT EXISTS directorio_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0
+        );
+        INSERT INTO directorio_version (id, version) VALUES (1, 0)
+        ON CONFLICT (id) DO NOTHING;
+
+        CREATE OR REPLACE FUNCTION incrementar_version_directorio()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE directorio_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_directorio_residentes ON residentes;
+        CREATE TRIGGER trigger_directorio_residentes
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON residentes
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION incrementar_version_directorio();
+
+        DROP TRIGGER IF EXISTS trigger_directorio_placas ON placas;
+        CREATE TRIGGER trigger_directorio_placas
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON placas
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION incrementar_version_directorio();
+
+        DROP TRIGGER IF EXISTS trigger_directorio_parqueaderos ON parqueaderos;
+        CREATE TRIGGER trigger_directorio_parqueaderos
+        AFTER INSERT OR DELETE OR TRUNCATE ON parqueaderos
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION incrementar_version_directorio();
+
+        -- Solo los cambios en parqueaderos de residentes invalidan el directorio;
+        -- la rotación de visitantes no lo afecta
+        DROP TRIGGER IF EXISTS trigger_directorio_parqueaderos_residentes ON parqueaderos;
+        CREATE TRIGGER trigger_directorio_parqueaderos_residentes
+        AFTER UPDATE ON parqueaderos
+        FOR EACH ROW
+        WHEN (OLD.residente_id IS NOT NULL OR NEW.residente_id IS NOT NULL)
+        EXECUTE FUNCTION incrementar_version_directorio();
+    """),
+
+    (5, "Claves de idempotencia de operaciones sincronizadas desde estaciones sin conexión", """
+        -- Tabla aparte (y no una columna de registros_visitantes) para que la
+        -- restricción de unicidad no dependa de cómo se particione el historial
+        CREATE TABLE IF NOT EXISTS operaciones_sincronizadas (
+            clave UUID PRIMARY KEY,
+            tipo VARCHAR(30) NOT NULL,
+            registro_id INTEGER,
+            aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+
+    (6, "Índice para buscar el historial por prefijo de placa", """
+        -- Páginas del historial filtradas por placa (obtener_historial_visitantes):
+        -- varchar_pattern_ops permite LIKE 'ABC%' y el resto de la clave conserva
+        -- el orden de la paginación por (hora_salida, id)
+        CREATE INDEX IF NOT EXISTS idx_registros_historial_placa
+            ON registros_visitantes (placa varchar_pattern_ops, hora_salida DESC, id DESC)
+            WHERE hora_salida IS NOT NULL;
+    """),
+
+    (7, "Resumen diario de ingresos para reportes", """
+        -- Un registro por día cerrado (anterior a hoy), calculado una sola vez por
+        -- obtener_resumen_diario. Los días sin salidas se guardan con ceros para
+        -- no volver a calcularlos
+        CREATE TABLE IF NOT EXISTS resumen_diario (
+            fecha DATE PRIMARY KEY,
+            salidas INTEGER NOT NULL,
+            horas NUMERIC(12,2) NOT NULL,
+            recaudo NUMERIC(14,2) NOT NULL,
+            salidas_por_hora INTEGER NOT NULL,
+            recaudo_por_hora NUMERIC(14,2) NOT NULL,
+            salidas_tarifa_plena INTEGER NOT NULL,
+            recaudo_tarifa_plena NUMERIC(14,2) NOT NULL
+        );
+
+        -- Una salida con fecha de un día ya cerrado (sincronizada desde una
+        -- portería que estuvo sin conexión) invalida el resumen de ese día
+        CREATE OR REPLACE FUNCTION invalidar_resumen_diario()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM resumen_diario
+            WHERE fecha IN (DATE(OLD.hora_salida), DATE(NEW.hora_salida));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_invalidar_resumen ON registros_visitantes;
+
+        CREATE TRIGGER trigger_invalidar_resumen
+        AFTER UPDATE OF hora_salida ON registros_visitantes
+        FOR EACH ROW
+        WHEN (DATE(NEW.hora_salida) < CURRENT_DATE OR DATE(OLD.hora_salida) < CURRENT_DATE)
+        EXECUTE FUNCTION invalidar_resumen_diario();
+    """),
+
+    (8, "Versión del directorio una vez por sentencia en parqueaderos de residentes", """
+        -- El trigger por fila de la migración 4 actualizaba la misma fila de
+        -- directorio_version una vez por parqueadero: en una carga masiva de
+        -- residentes eran miles de versiones de la fila en una transacción.
+        -- Con tablas de transición se incrementa una sola vez por sentencia
+        CREATE OR REPLACE FUNCTION incrementar_version_directorio_parqueaderos()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM parqueaderos_anteriores WHERE residente_id IS NOT NULL)
+               OR EXISTS (SELECT 1 FROM parqueaderos_nuevos WHERE residente_id IS NOT NULL) THEN
+                UPDATE directorio_version SET version = version + 1 WHERE id = 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_directorio_parqueaderos_residentes ON parqueaderos;
+        CREATE TRIGGER trigger_directorio_parqueaderos_residentes
+        AFTER UPDATE ON parqueaderos
+        REFERENCING OLD TABLE AS parqueaderos_anteriores NEW TABLE AS parqueaderos_nuevos
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION incrementar_version_directorio_parqueaderos();
+    """),
+
+    (9, "Particiones mensuales de registros_visitantes y recaudo mensual acumulado", """
+        -- registros_visitantes pasa a ser una tabla particionada por mes de
+        -- hora_entrada: los visitantes activos y las salidas recientes quedan en
+        -- las particiones nuevas (pequeñas y en caché) y los meses viejos se
+        -- pueden desprender con archivar_particiones sin reescribir nada.
+        -- La clave primaria debe incluir la columna de partición
+        ALTER TABLE registros_visitantes RENAME TO registros_visitantes_anterior;
+        ALTER INDEX registros_visitantes_pkey RENAME TO registros_visitantes_anterior_pkey;
+        ALTER SEQUENCE registros_visitantes_id_seq OWNED BY NONE;
+
+        CREATE TABLE registros_visitantes (
+            id INTEGER NOT NULL DEFAULT nextval('registros_visitantes_id_seq'),
+            placa VARCHAR(10) NOT NULL,
+            parqueadero_id INTEGER NOT NULL,
+            hora_entrada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            hora_salida TIMESTAMP,
+            total_horas NUMERIC(5,2),
+            valor_pagado NUMERIC(10,2),
+            PRIMARY KEY (id, hora_entrada),
+            FOREIGN KEY (parqueadero_id) REFERENCES parqueaderos(id)
+        ) PARTITION BY RANGE (hora_entrada);
+        ALTER SEQUENCE registros_visitantes_id_seq OWNED BY registros_visitantes.id;
+
+        -- Recibe las filas de meses sin partición (p. ej. si nadie creó la del mes a tiempo)
+        CREATE TABLE registros_visitantes_default PARTITION OF registros_visitantes DEFAULT;
+
+        -- Crea la partición del mes de p_mes. Si la partición por defecto ya tiene
+        -- filas de ese mes, se mueven a la nueva antes de adjuntarla
+        CREATE OR REPLACE FUNCTION crear_particion_registros(p_mes DATE)
+        RETURNS TEXT AS $$
+        DECLARE
+            v_inicio DATE := date_trunc('month', p_mes)::date;
+            v_fin DATE := (date_trunc('month', p_mes) + INTERVAL '1 month')::date;
+            v_nombre TEXT := 'registros_visitantes_' || to_char(p_mes, 'YYYYMM');
+        BEGIN
+            IF to_regclass(v_nombre) IS NOT NULL THEN
+                RETURN v_nombre;
+            END IF;
+            -- Dos estaciones que cambian de mes a la vez no crean la misma partición
+            PERFORM pg_advisory_xact_lock(hashtext('crear_particion_registros'));
+            IF to_regclass(v_nombre) IS NOT NULL THEN
+                RETURN v_nombre;
+            END IF;
+
+            EXECUTE format('CREATE TABLE %I (LIKE registros_visitantes INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                           v_nombre);
+            EXECUTE format('WITH movidas AS (DELETE FROM registros_visitantes_default
+                                             WHERE hora_entrada >= %L AND hora_entrada < %L RETURNING *)
+                            INSERT INTO %I SELECT * FROM movidas', v_inicio, v_fin, v_nombre);
+            EXECUTE format('ALTER TABLE registros_visitantes ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           v_nombre, v_inicio, v_fin);
+            RETURN v_nombre;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Particiones del mes actual y de los p_meses siguientes
+        CREATE OR REPLACE FUNCTION asegurar_particiones_registros(p_meses INTEGER DEFAULT 2)
+        RETURNS VOID AS $$
+        BEGIN
+            PERFORM crear_particion_registros((date_trunc('month', LOCALTIMESTAMP) + make_interval(months => n))::date)
+            FROM generate_series(0, p_meses) n;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        SELECT crear_particion_registros(mes::date)
+        FROM generate_series(
+            (SELECT date_trunc('month', COALESCE(MIN(hora_entrada), LOCALTIMESTAMP)) FROM registros_visitantes_anterior),
+            date_trunc('month', LOCALTIMESTAMP) + INTERVAL '2 months',
+            INTERVAL '1 month') mes;
+
+        INSERT INTO registros_visitantes (id, placa, parqueadero_id, hora_entrada, hora_salida, total_horas, valor_pagado)
+        SELECT id, placa, parqueadero_id, hora_entrada, hora_salida, total_horas, valor_pagado
+        FROM registros_visitantes_anterior;
+
+        DROP TABLE registros_visitantes_anterior;
+
+        -- Los mismos índices de las migraciones 2 y 6, ahora en cada partición
+        CREATE INDEX idx_registros_activos_placa
+            ON registros_visitantes (placa, hora_entrada DESC)
+            WHERE hora_salida IS NULL;
+        CREATE INDEX idx_registros_hora_salida
+            ON registros_visitantes (hora_salida DESC, id DESC)
+            WHERE hora_salida IS NOT NULL;
+        CREATE INDEX idx_registros_fecha_salida
+            ON registros_visitantes ((DATE(hora_salida)));
+        CREATE INDEX idx_registros_parqueadero
+            ON registros_visitantes (parqueadero_id);
+        CREATE INDEX idx_registros_historial_placa
+            ON registros_visitantes (placa varchar_pattern_ops, hora_salida DESC, id DESC)
+            WHERE hora_salida IS NOT NULL;
+        -- Salida por id (registrar_salida_visitante): sin hora_entrada no hay poda de
+        -- particiones, pero en cada una el índice solo contiene a los que siguen dentro
+        CREATE INDEX idx_registros_activos_id
+            ON registros_visitantes (id)
+            WHERE hora_salida IS NULL;
+
+        -- Recaudo de los meses cerrados por parqueadero: las estadísticas suman
+        -- esta tabla y solo recorren en vivo las salidas del mes actual
+        CREATE TABLE IF NOT EXISTS recaudo_mensual (
+            mes DATE NOT NULL,
+            parqueadero_id INTEGER NOT NULL REFERENCES parqueaderos(id),
+            salidas INTEGER NOT NULL,
+            recaudo NUMERIC(14,2) NOT NULL,
+            PRIMARY KEY (mes, parqueadero_id)
+        );
+        -- Meses ya calculados (incluye los que no tuvieron salidas)
+        CREATE TABLE IF NOT EXISTS recaudo_mensual_meses (
+            mes DATE PRIMARY KEY
+        );
+
+        -- Una salida sincronizada con fecha de un día o mes cerrado invalida sus resúmenes
+        CREATE OR REPLACE FUNCTION invalidar_resumen_diario()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM resumen_diario
+            WHERE fecha IN (DATE(OLD.hora_salida), DATE(NEW.hora_salida));
+            DELETE FROM recaudo_mensual_meses
+            WHERE mes IN (date_trunc('month', OLD.hora_salida)::date, date_trunc('month', NEW.hora_salida)::date);
+            DELETE FROM recaudo_mensual
+            WHERE mes IN (date_trunc('month', OLD.hora_salida)::date, date_trunc('month', NEW.hora_salida)::date);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER trigger_calculo_pago
+        BEFORE UPDATE ON registros_visitantes
+        FOR EACH ROW
+        WHEN (NEW.hora_salida IS NOT NULL)
+        EXECUTE FUNCTION calcular_pago();
+
+        CREATE TRIGGER trigger_invalidar_resumen
+        AFTER UPDATE OF hora_salida ON registros_visitantes
+        FOR EACH ROW
+        WHEN (DATE(NEW.hora_salida) < CURRENT_DATE OR DATE(OLD.hora_salida) < CURRENT_DATE)
+        EXECUTE FUNCTION invalidar_resumen_diario();
+
+        -- Destino de archivar_particiones
+        CREATE SCHEMA IF NOT EXISTS archivo;
+
+        -- Estadísticas del planificador para las particiones recién cargadas
+        ANALYZE registros_visitantes;
+    """),
+
+    (10, "calcular_pago generada desde tarifas.py (duración en microsegundos enteros)", """
+        CREATE OR REPLACE FUNCTION calcular_pago()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            us BIGINT;
+        BEGIN
+            us := (EXTRACT(EPOCH FROM (NEW.hora_salida - NEW.hora_entrada)) * 1000000)::BIGINT;
+            NEW.total_horas := ROUND(us / 3600000000.0, 2);
+
+            -- Primeras 5 horas a $1000/hora (o fracción), después tarifa plena de $10000
+            IF us <= 18000000000 THEN
+                NEW.valor_pagado := CEIL(us / 3600000000.0) * 1000;
+            ELSE
+                NEW.valor_pagado := 10000;
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+
+    (11, "Planes de tarifa por clase de parqueadero compilados a tablas por minuto", """
+        ALTER TABLE parqueaderos ADD COLUMN IF NOT EXISTS clase VARCHAR(20) NOT NULL DEFAULT 'GENERAL';
+
+        -- Un plan no se modifica: guardar uno nuevo desactiva el anterior de la clase
+        CREATE TABLE IF NOT EXISTS planes_tarifa (
+            id SERIAL PRIMARY KEY,
+            clase VARCHAR(20) NOT NULL,
+            nombre VARCHAR(100) NOT NULL,
+            definicion JSONB NOT NULL,
+            activo BOOLEAN NOT NULL DEFAULT TRUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_planes_tarifa_activo
+            ON planes_tarifa (clase) WHERE activo;
+
+        -- Tabla semanal compilada por tarifas.compilar_plan: acumulado del valor
+        -- por hora de los minutos 0..minuto-1 desde el lunes 00:00
+        CREATE TABLE IF NOT EXISTS tarifas_minuto (
+            plan_id INTEGER NOT NULL REFERENCES planes_tarifa(id) ON DELETE CASCADE,
+            minuto INTEGER NOT NULL,
+            acumulado BIGINT NOT NULL,
+            PRIMARY KEY (plan_id, minuto)
+        );
+
+        -- Contador que las porterías consultan para recargar sus planes (CatalogoTarifas)
+        CREATE TABLE IF NOT EXISTS tarifas_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0
+        );
+        INSERT INTO tarifas_version (id, version) VALUES (1, 0)
+        ON CONFLICT (id) DO NOTHING;
+
+        CREATE OR REPLACE FUNCTION incrementar_version_tarifas()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            UPDATE tarifas_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_tarifas_planes ON planes_tarifa;
+        CREATE TRIGGER trigger_tarifas_planes
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON planes_tarifa
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION incrementar_version_tarifas();
+
+        DROP TRIGGER IF EXISTS trigger_tarifas_clase_parqueadero ON parqueaderos;
+        CREATE TRIGGER trigger_tarifas_clase_parqueadero
+        AFTER UPDATE OF clase ON parqueaderos
+        FOR EACH ROW
+        WHEN (OLD.clase IS DISTINCT FROM NEW.clase)
+        EXECUTE FUNCTION incrementar_version_tarifas();
+
+        CREATE OR REPLACE FUNCTION valor_tramo_tarifa(p_plan INTEGER, p_minuto BIGINT, p_minutos BIGINT)
+        RETURNS NUMERIC AS $$
+        DECLARE
+            a BIGINT := p_minuto + 4320;
+            b BIGINT := p_minuto + p_minutos + 4320;
+            ra INTEGER := ((a % 10080) + 10080) % 10080;
+            rb INTEGER := ((b % 10080) + 10080) % 10080;
+            semana BIGINT;
+            acumulado_a BIGINT;
+            acumulado_b BIGINT;
+        BEGIN
+            SELECT acumulado INTO semana FROM tarifas_minuto WHERE plan_id = p_plan AND minuto = 10080;
+            SELECT acumulado INTO acumulado_a FROM tarifas_minuto WHERE plan_id = p_plan AND minuto = ra;
+            SELECT acumulado INTO acumulado_b FROM tarifas_minuto WHERE plan_id = p_plan AND minuto = rb;
+            RETURN CEIL((((b - rb) - (a - ra)) / 10080 * semana::NUMERIC
+                         + acumulado_b - acumulado_a) / 60.0);
+        END;
+        $$ LANGUAGE plpgsql STABLE;
+
+        CREATE OR REPLACE FUNCTION cobro_plan_tarifa(p_plan INTEGER, p_definicion JSONB,
+                                                     p_entrada TIMESTAMP, p_salida TIMESTAMP)
+        RETURNS NUMERIC AS $$
+        DECLARE
+            us BIGINT := (EXTRACT(EPOCH FROM (p_salida - p_entrada)) * 1000000)::BIGINT;
+            minuto BIGINT := FLOOR(EXTRACT(EPOCH FROM p_entrada) / 60)::BIGINT;
+            fraccion BIGINT := (p_definicion->>'fraccion_minutos')::BIGINT;
+            horas_plena BIGINT := (p_definicion->>'horas_tarifa_plena')::BIGINT;
+            tarifa_plena NUMERIC := (p_definicion->>'tarifa_plena')::NUMERIC;
+            tope NUMERIC := (p_definicion->>'tope_diario')::NUMERIC;
+            bloques BIGINT := 1;
+            tramo BIGINT;
+            valor NUMERIC;
+            total NUMERIC := 0;
+        BEGIN
+            IF tope IS NOT NULL AND us > 0 THEN
+                bloques := CEIL(us / 86400000000.0);
+            END IF;
+            FOR k IN 0 .. bloques - 1 LOOP
+                tramo := CASE WHEN tope IS NULL THEN us ELSE LEAST(us - k * 86400000000, 86400000000) END;
+                valor := valor_tramo_tarifa(p_plan, minuto + k * 1440,
+                                            CEIL(tramo / (fraccion * 60000000.0))::BIGINT * fraccion);
+                IF horas_plena IS NOT NULL AND tramo > horas_plena * 3600000000 THEN
+                    valor := tarifa_plena;
+                END IF;
+                IF tope IS NOT NULL THEN
+                    valor := LEAST(valor, tope);
+                END IF;
+                total := total + valor;
+            END LOOP;
+            RETURN total;
+        END;
+        $$ LANGUAGE plpgsql STABLE;
+
+        CREATE OR REPLACE FUNCTION calcular_pago()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            us BIGINT;
+            v_plan INTEGER;
+            v_definicion JSONB;
+        BEGIN
+            us := (EXTRACT(EPOCH FROM (NEW.hora_salida - NEW.hora_entrada)) * 1000000)::BIGINT;
+            NEW.total_horas := ROUND(us / 3600000000.0, 2);
+
+            SELECT pt.id, pt.definicion INTO v_plan, v_definicion
+            FROM parqueaderos p
+            JOIN planes_tarifa pt ON pt.activo AND pt.clase IN (p.clase, 'GENERAL')
+            WHERE p.id = NEW.parqueadero_id
+            ORDER BY pt.clase = p.clase DESC
+            LIMIT 1;
+
+            IF v_plan IS NOT NULL THEN
+                NEW.valor_pagado := cobro_plan_tarifa(v_plan, v_definicion, NEW.hora_entrada, NEW.hora_salida);
+                RETURN NEW;
+            END IF;
+
+            -- Primeras 5 horas a $1000/hora (o fracción), después tarifa plena de $10000
+            IF us <= 18000000000 THEN
+                NEW.valor_pagado := CEIL(us / 3600000000.0) * 1000;
+            ELSE
+                NEW.valor_pagado := 10000;
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+
+    (12, "Estadísticas en una consulta, avisos NOTIFY y rol de solo lectura para tableros", """
+        -- Todas las cifras del pie de la aplicación y de los tableros en un viaje al
+        -- servidor. Los meses cerrados salen de recaudo_mensual; si alguno aún no está
+        -- acumulado (nadie con permisos de escritura lo ha completado) se suma en vivo.
+        -- SECURITY DEFINER: el rol de los tableros no necesita leer las tablas
+        CREATE OR REPLACE FUNCTION estadisticas_tablero()
+        RETURNS TABLE (total_parqueaderos BIGINT, ocupados BIGINT, visitantes_activos BIGINT,
+                       cupos_visitantes BIGINT, cupos_visitantes_libres BIGINT,
+                       salidas_hoy BIGINT, total_recaudado NUMERIC, recaudado_hoy NUMERIC) AS $$
+            WITH faltantes AS (
+                SELECT m::date AS mes
+                FROM generate_series(
+                    (SELECT date_trunc('month', MIN(hora_salida)) FROM registros_visitantes
+                     WHERE hora_salida IS NOT NULL),
+                    date_trunc('month', LOCALTIMESTAMP) - INTERVAL '1 month',
+                    INTERVAL '1 month') m
+                WHERE NOT EXISTS (SELECT 1 FROM recaudo_mensual_meses r WHERE r.mes = m::date)
+            )
+            SELECT p.total, p.ocupados,
+                   (SELECT COUNT(*) FROM registros_visitantes WHERE hora_salida IS NULL),
+                   p.cupos, p.cupos_libres, hoy.salidas,
+                   (SELECT COALESCE(SUM(recaudo), 0) FROM recaudo_mensual)
+                   + (SELECT COALESCE(SUM(valor_pagado), 0) FROM registros_visitantes
+                      WHERE hora_salida >= date_trunc('month', LOCALTIMESTAMP))
+                   + (SELECT COALESCE(SUM(rv.valor_pagado), 0) FROM faltantes f
+                      JOIN registros_visitantes rv
+                        ON rv.hora_salida >= f.mes AND rv.hora_salida < f.mes + INTERVAL '1 month'),
+                   hoy.recaudo
+            FROM (SELECT COUNT(*) AS total,
+                         COUNT(*) FILTER (WHERE estado = 'OCUPADO') AS ocupados,
+                         COUNT(*) FILTER (WHERE residente_id IS NULL) AS cupos,
+                         COUNT(*) FILTER (WHERE residente_id IS NULL AND estado = 'LIBRE') AS cupos_libres
+                  FROM parqueaderos) p,
+                 (SELECT COUNT(*) AS salidas, COALESCE(SUM(valor_pagado), 0) AS recaudo
+                  FROM registros_visitantes
+                  WHERE DATE(hora_salida) = CURRENT_DATE) hoy
+        $$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public, pg_temp;
+
+        -- Aviso por sentencia (no por fila) a los tableros que hacen LISTEN estadisticas;
+        -- PostgreSQL lo entrega al confirmar y une los repetidos de una transacción
+        CREATE OR REPLACE FUNCTION avisar_cambio_estadisticas()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM pg_notify('estadisticas', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trigger_avisar_parqueaderos ON parqueaderos;
+        CREATE TRIGGER trigger_avisar_parqueaderos
+        AFTER INSERT OR DELETE OR UPDATE OF estado, residente_id ON parqueaderos
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION avisar_cambio_estadisticas();
+
+        DROP TRIGGER IF EXISTS trigger_avisar_registros ON registros_visitantes;
+        CREATE TRIGGER trigger_avisar_registros
+        AFTER INSERT OR DELETE OR UPDATE OF hora_salida ON registros_visitantes
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION avisar_cambio_estadisticas();
+
+        -- Rol sin login para los tableros: solo ejecuta estadisticas_tablero(). Cada
+        -- pantalla usa un usuario propio miembro del rol (ver tablero_estadisticas.py).
+        -- Si el usuario que migra no puede crear roles, la migración sigue sin él
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'tablero_estadisticas') THEN
+                CREATE ROLE tablero_estadisticas NOLOGIN;
+            END IF;
+            EXECUTE format('GRANT CONNECT ON DATABASE %I TO tablero_estadisticas', current_database());
+            GRANT USAGE ON SCHEMA public TO tablero_estadisticas;
+            GRANT EXECUTE ON FUNCTION estadisticas_tablero() TO tablero_estadisticas;
+        EXCEPTION WHEN insufficient_privilege THEN
+            RAISE NOTICE 'Sin permiso para crear el rol tablero_estadisticas: debe crearlo un administrador';
+        END;
+        $$;
+    """),
+
+    (13, "Versión del directorio solo al cambiar el titular o el número de un parqueadero", """
+        -- La migración 8 incrementaba la versión con cualquier UPDATE de un
+        -- parqueadero de residente, también al cambiar su estado: cada entrada o
+        -- salida de un residente recargaba el directorio en todas las porterías.
+        -- El estado ya no es parte del directorio (se consulta al clasificar) y
+        -- PostgreSQL no admite tablas de transición con lista de columnas, así que
+        -- el trigger incrementa una vez por sentencia que asigne esas columnas
+        DROP TRIGGER IF EXISTS trigger_directorio_parqueaderos_residentes ON parqueaderos;
+        DROP FUNCTION IF EXISTS incrementar_version_directorio_parqueaderos();
+        CREATE TRIGGER trigger_directorio_parqueaderos_residentes
+        AFTER UPDATE OF residente_id, numero ON parqueaderos
+        FOR EACH STATEMENT
+        EXECUTE FUNCTION incrementar_version_directorio();
+    """),
+
+    (14, "Aviso con el nuevo estado de los parqueaderos de residentes", """
+        -- Los directorios de placas de las porterías guardan el estado de cada
+        -- parqueadero de residente y lo actualizan con este aviso en lugar de
+        -- consultarlo al clasificar. Uno por fila: el payload lleva el número
+        DROP TRIGGER IF EXISTS trigger_avisar_estado_residentes ON parqueaderos;
+        CREATE OR REPLACE FUNCTION avisar_estado_residente()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM pg_notify('estado_residentes', NEW.numero || ':' || NEW.estado);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER trigger_avisar_estado_residentes
+        AFTER UPDATE OF estado ON parqueaderos
+        FOR EACH ROW
+        WHEN (NEW.residente_id IS NOT NULL AND OLD.estado IS DISTINCT FROM NEW.estado)
+        EXECUTE FUNCTION avisar_estado_residente();
+    """),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+# Llave del advisory lock que serializa las migraciones entre estaciones
+LLAVE_BLOQUEO_MIGRACIONES = 7301
+
+# =============================================================================
+# APLICACIÓN DE MIGRACIONES
+# =============================================================================
+
+def aplicar_migraciones(connection):
+    """
+    Aplica en orden las migraciones pendientes dentro de una transacción
+    Retorna la versión del esquema después de migrar
+    """
+    with connection.cursor() as cursor:
+        # Si varias estaciones arrancan a la vez, solo una migra; las demás esperan
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (LLAVE_BLOQUEO_MIGRACIONES,))
+        # Crear índices sobre tablas grandes puede superar el statement_timeout de la sesión
+        cursor.execute("SET LOCAL statement_timeout = 0")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migraciones (
+                version INTEGER PRIMARY KEY,
+                descripcion VARCHAR(200) NOT NULL,
+                aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migraciones")
+        version_actual = cursor.fetchone()[0]
+
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version <= version_actual:
+                continue
+            cursor.execute(sentencias)
+            cursor.execute(
+                "INSERT INTO schema_migraciones (version, descripcion) VALUES (%s, %s)",
+                (version, descripcion)
+            )
+            version_actual = version
+            print(f"✅ Migración {version:03d} aplicada: {descripcion}")
+
+    connection.commit()
+    return version_actual
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Reconocimiento de placas en imágenes (OpenCV + Tesseract), sin interfaz gráfica"""
+
+import os
+import re
+import shutil
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+# Configurar pytesseract (ajustar ruta según tu instalación)
+def _find_tesseract():
+    # 1) Respect environment variables if provided
+    env = os.environ.get('TESSERACT_CMD') or os.environ.get('TESSERACT_PATH')
+    if env and os.path.exists(env):
+        return env
+
+    # 2) Check PATH
+    which = shutil.which('tesseract')
+    if which:
+        return which
+
+    # 3) Common installation locations
+    if os.name == 'nt':
+        candidates = [r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+                      r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe']
+    else:
+        candidates = ['/usr/bin/tesseract', '/usr/local/bin/tesseract']
+
+    for c in candidates:
+        if os.path.exists(c):
+            return c
+
+    return None
+
+tesseract_path = None
+_tesseract_configurado = False
+
+def configurar_tesseract():
+    """Busca el binario de Tesseract la primera vez que se hace OCR (no al importar)"""
+    global tesseract_path, _tesseract_configurado
+    if _tesseract_configurado:
+        return
+    _tesseract_configurado = True
+    tesseract_path = _find_tesseract()
+    if tesseract_path:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+    else:
+        print('WARNING: tesseract binary not found. Install Tesseract and/or set the TESSERACT_CMD environment variable.')
+        if os.name == 'nt':
+            pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+# =============================================================================
+# CLASE PARA PROCESAR IMÁGENES Y DETECTAR PLACAS (MEJORADA)
+# =============================================================================
+
+class ProcesadorPlacas:
+    """Clase para procesar imágenes y detectar placas con múltiples métodos"""
+    
+    @staticmethod
+    def preprocesar_imagen(img):
+        """
+        Aplica múltiples preprocesamientos a la imagen para mejorar OCR
+        """
+        resultados = []
+        
+        # Convertir a escala de grises si es necesario
+        if len(img.shape) == 3:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = img.copy()
+        
+        # Método 1: Umbral adaptativo
+        thresh1 = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                        cv2.THRESH_BINARY, 11, 2)
+        resultados.append(('adaptive', thresh1))
+        
+        # Método 2: Umbral Otsu
+        _, thresh2 = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        resultados.append(('otsu', thresh2))
+        
+        # Método 3: Ecualización del histograma
+        equ = cv2.equalizeHist(gray)
+        resultados.append(('equalized', equ))
+        
+        # Método 4: Filtro bilateral (reduce ruido, preserva bordes)
+        bilateral = cv2.bilateralFilter(gray, 9, 75, 75)
+        _, thresh3 = cv2.threshold(bilateral, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        resultados.append(('bilateral', thresh3))
+        
+        # Método 5: Aumento de contraste
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        clahe_img = clahe.apply(gray)
+        resultados.append(('clahe', clahe_img))
+        
+        return resultados, gray
+    
+    @staticmethod
+    def detectar_placa_por_contornos(gray):
+        """
+        Detecta posibles regiones de placa por contornos
+        """
+        try:
+            # Aplicar desenfoque para reducir ruido
+            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            
+            # Detectar bordes
+            edged = cv2.Canny(blurred, 30, 200)
+            
+            # Dilatar para conectar bordes
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+            dilated = cv2.dilate(edged, kernel, iterations=1)
+            
+            # Buscar contornos
+            contours, _ = cv2.findContours(dilated, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+            contours = sorted(contours, key=cv2.contourArea, reverse=True)[:20]
+            
+            placas_encontradas = []
+            
+            for contour in contours:
+                # Aproximar el contorno
+                peri = cv2.arcLength(contour, True)
+                approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
+                
+                # Si tiene 4 lados, podría ser una placa
+                if len(approx) == 4:
+                    # Obtener el área delimitadora
+                    x, y, w, h = cv2.boundingRect(contour)
+                    
+                    # Verificar proporciones (las placas suelen ser rectangulares)
+                    aspect_ratio = w / float(h)
+                    area = w * h
+                    area_total = gray.shape[0] * gray.shape[1]
+                    
+                    # Criterios: proporción entre 2 y 5, área entre 1% y 30% de la imagen total
+                    if 2 < aspect_ratio < 5 and area > 0.01 * area_total and area < 0.3 * area_total:
+                        # Extraer ROI
+                        roi = gray[y:y+h, x:x+w]
+                        
+                        # Asegurar que el ROI no está vacío
+                        if roi.size > 0:
+                            # Redimensionar para mejorar OCR
+                            roi = cv2.resize(roi, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+                            
+                            # Aplicar umbral
+                            _, roi = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                            
+                            placas_encontradas.append((roi, (x, y, w, h)))
+            
+            return placas_encontradas
+            
+        except Exception as e:
+            print(f"Error detectando contornos: {e}")
+            return []
+    
+    @staticmethod
+    def aplicar_ocr(imagen):
+        """
+        Aplica OCR a una imagen y retorna el texto detectado
+        """
+        configurar_tesseract()
+        try:
+            # Configuraciones de OCR para probar
+            configuraciones = [
+                '--psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',  # Palabra única
+                '--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',  # Línea única
+                '--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',  # Bloque uniforme
+            ]
+            
+            mejores_resultados = []
+            
+            for config in configuraciones:
+                try:
+                    texto = pytesseract.image_to_string(imagen, config=config).strip()
+                    texto = re.sub(r'[^A-Z0-9]', '', texto.upper())
+                    if len(texto) >= 4:
+                        mejores_resultados.append(texto)
+                except:
+                    continue
+            
+            # Si hay resultados, devolver el más largo (probablemente el mejor)
+            if mejores_resultados:
+                return max(mejores_resultados, key=len)
+            
+            return None
+            
+        except Exception as e:
+            print(f"Error en OCR: {e}")
+            return None
+    
+    @staticmethod
+    def procesar_imagen_para_ocr(imagen_path):
+        """
+        Procesa una imagen para mejorar la detección OCR
+        Retorna la placa detectada y la imagen procesada
+        """
+        try:
+            # Cargar imagen
+            if isinstance(imagen_path, str):
+                img = cv2.imread(imagen_path)
+                if img is None:
+                    # Intentar con PIL si OpenCV falla
+                    pil_img = Image.open(imagen_path)
+                    # Convertir a RGB y luego a BGR para OpenCV
+                    img = np.array(pil_img.convert('RGB'))
+                    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+            else:
+                img = imagen_path
+            
+            # Guardar imagen original para visualización
+            img_original = img.copy()
+            
+            # Aplicar múltiples preprocesamientos
+            imagenes_procesadas, gray = ProcesadorPlacas.preprocesar_imagen(img)
+            
+            # Intentar detectar por contornos primero
+            posibles_placas = ProcesadorPlacas.detectar_placa_por_contornos(gray)
+            
+            todas_las_detecciones = []
+            
+            # Procesar cada posible placa encontrada por contornos
+            for roi, bbox in posibles_placas:
+                texto = ProcesadorPlacas.aplicar_ocr(roi)
+                if texto:
+                    todas_las_detecciones.append((texto, len(texto)))
+                    
+                    # Dibujar rectángulo en la imagen original
+                    x, y, w, h = bbox
+                    cv2.rectangle(img_original, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                    cv2.putText(img_original, texto, (x, y-10), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+            
+            # Si no se detectó por contornos, probar OCR en toda la imagen
+            if not todas_las_detecciones:
+                for nombre, img_proc in imagenes_procesadas:
+                    texto = ProcesadorPlacas.aplicar_ocr(img_proc)
+                    if texto:
+                        todas_las_detecciones.append((texto, len(texto)))
+            
+            # Seleccionar la mejor detección (la más larga y con formato de placa)
+            mejor_placa = None
+            if todas_las_detecciones:
+                # Ordenar por longitud (las más largas primero)
+                todas_las_detecciones.sort(key=lambda x: x[1], reverse=True)
+                
+                # Buscar la que tenga formato de placa (3 letras + números)
+                for placa, _ in todas_las_detecciones:
+                    if re.match(r'[A-Z]{3}\d{3,4}', placa):
+                        mejor_placa = placa
+                        break
+                
+                # Si no hay con formato, tomar la más larga
+                if not mejor_placa:
+                    mejor_placa = todas_las_detecciones[0][0]
+            
+            return mejor_placa, img_original
+            
+        except Exception as e:
+            print(f"Error procesando imagen: {e}")
+            import traceback
+            traceback.print_exc()
+            return None, None
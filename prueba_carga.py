@@ -0,0 +1,621 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga: simula N porterías atendiendo vehículos al mismo tiempo.
+
+Cada portería es un hilo con su propio repositorio (repo.clonar(), una
+conexión como en la aplicación) que recibe llegadas de Poisson. Los
+visitantes se quedan un tiempo con distribución log-normal y salen por
+cualquier portería con el mismo flujo de la aplicación (visitante_activo,
+proyección con el plan de tarifa, salida_visitante). Los residentes entran y
+salen de su parqueadero, y cada portería consulta las estadísticas
+periódicamente como el pie de la ventana principal.
+
+El tiempo simulado corre `escala` veces más rápido que el real: con
+--escala 60 un minuto de estadía dura un segundo.
+
+Al final se reportan el throughput, los percentiles de latencia por
+operación, las esperas por bloqueos (muestreadas en pg_stat_activity) y los
+conflictos de asignación de parqueaderos.
+
+Por defecto usa la base de datos control_acceso_carga: contra la de producción
+(control_acceso o control_acceso.db) exige --permitir-produccion. Al terminar
+borra lo que creó: los registros de sus visitantes (y los resúmenes y el
+recaudo mensual que los incluían), los parqueaderos desde el 10001 y sus
+residentes de prueba (placas RCnnnnn). --conservar-datos los deja.
+
+Uso:
+    python prueba_carga.py --estaciones 16 --duracion 120 --parqueaderos-visitantes 500
+    python prueba_carga.py --motor sqlite --ruta carga.db --estaciones 4
+"""
+
+import argparse
+import heapq
+import io
+import json
+import math
+import os
+import random
+import string
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from repositorio import COLUMNAS_IMPORTACION, RepositorioMemoria, crear_repositorio
+
+NUMERO_INICIAL_CARGA = 10001  # parqueaderos creados por la prueba (no se cruzan con los reales)
+# Bases de datos de la aplicación, que la prueba no toca sin --permitir-produccion
+BASES_PRODUCCION = {'postgresql': 'control_acceso', 'sqlite': 'control_acceso.db'}
+PERCENTILES = (50, 95, 99)
+
+# =============================================================================
+# PREPARACIÓN
+# =============================================================================
+
+def preparar_parqueaderos(repo, visitantes, residentes):
+    """
+    Crea parqueaderos de visitantes y residentes de prueba (placa RCnnnnn) con
+    la carga masiva de residentes. Reutiliza los que ya existan de corridas anteriores
+    """
+    if not visitantes and not residentes:
+        return True
+    texto = io.StringIO()
+    texto.write(','.join(COLUMNAS_IMPORTACION) + '\n')
+    numero = NUMERO_INICIAL_CARGA
+    for i in range(residentes):
+        texto.write(f"{numero},Residente carga {i + 1},C-{i + 1},RC{i + 1:05d}\n")
+        numero += 1
+    for _ in range(visitantes):
+        texto.write(f"{numero},,,\n")
+        numero += 1
+    resumen = repo.importar_residentes_csv(io.BytesIO(texto.getvalue().encode('utf-8')))
+    if resumen is None:
+        return False
+    print(f"🅿️ Parqueaderos de prueba: {resumen['parqueaderos_nuevos']} nuevos, "
+          f"{resumen['residentes_nuevos']} residentes nuevos")
+    return True
+
+# =============================================================================
+# LIMPIEZA
+# =============================================================================
+
+def limpiar_datos_prueba(repo, registros):
+    """
+    Borra los registros de visitantes de la simulación (ids en `registros` y
+    todos los de los parqueaderos de prueba), los parqueaderos desde
+    NUMERO_INICIAL_CARGA y sus residentes (las placas se borran en cascada).
+    En PostgreSQL también descarta los resúmenes diarios y el recaudo mensual
+    de los días y meses de esas salidas, que se recalculan sin ellas.
+    Retorna {registros, parqueaderos, residentes} o None si falla
+    """
+    repo = getattr(repo, 'primario', repo)
+    ids = [r for r in registros if isinstance(r, int)]
+    try:
+        if hasattr(repo, 'manager'):
+            return _limpiar_postgresql(repo.manager, ids)
+        with repo._transaccion() as cur:
+            return _limpiar_sqlite(cur, ids)
+    except Exception as e:
+        print(f"❌ Error borrando los datos de la prueba: {e}")
+        return None
+
+def _limpiar_postgresql(manager, ids):
+    cursor = manager.cursor
+    try:
+        cursor.execute("""
+            DELETE FROM registros_visitantes rv USING parqueaderos p
+            WHERE rv.parqueadero_id = p.id AND (rv.id = ANY(%(ids)s) OR p.numero >= %(numero)s)
+            RETURNING rv.id, rv.hora_salida
+        """, {'ids': ids, 'numero': NUMERO_INICIAL_CARGA})
+        borrados = cursor.fetchall()
+        salidas = [r['hora_salida'] for r in borrados if r['hora_salida'] is not None]
+        dias = sorted({h.date() for h in salidas})
+        meses = sorted({h.date().replace(day=1) for h in salidas})
+        cursor.execute("DELETE FROM resumen_diario WHERE fecha = ANY(%s)", (dias,))
+        cursor.execute("""
+            DELETE FROM recaudo_mensual
+            WHERE mes = ANY(%(meses)s)
+               OR parqueadero_id IN (SELECT id FROM parqueaderos WHERE numero >= %(numero)s)
+        """, {'meses': meses, 'numero': NUMERO_INICIAL_CARGA})
+        cursor.execute("DELETE FROM recaudo_mensual_meses WHERE mes = ANY(%s)", (meses,))
+        cursor.execute("DELETE FROM operaciones_sincronizadas WHERE registro_id = ANY(%s)",
+                       ([r['id'] for r in borrados],))
+        cursor.execute("""
+            WITH borrados AS (
+                DELETE FROM parqueaderos WHERE numero >= %s RETURNING residente_id
+            )
+            SELECT COUNT(*) AS parqueaderos, ARRAY_AGG(residente_id) FILTER (WHERE residente_id IS NOT NULL) AS residentes
+            FROM borrados
+        """, (NUMERO_INICIAL_CARGA,))
+        fila = cursor.fetchone()
+        residentes = fila['residentes'] or []
+        cursor.execute("DELETE FROM residentes WHERE id = ANY(%s)", (residentes,))
+        manager.connection.commit()
+    except Exception:
+        manager.connection.rollback()
+        raise
+    return {'registros': len(borrados), 'parqueaderos': fila['parqueaderos'], 'residentes': len(residentes)}
+
+def _limpiar_sqlite(cur, ids):
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS registros_carga (id INTEGER PRIMARY KEY)")
+    cur.execute("DELETE FROM registros_carga")
+    cur.executemany("INSERT INTO registros_carga (id) VALUES (?)", [(i,) for i in ids])
+    cur.execute("""
+        DELETE FROM registros_visitantes
+        WHERE id IN (SELECT id FROM registros_carga)
+           OR parqueadero_id IN (SELECT id FROM parqueaderos WHERE numero >= ?)
+    """, (NUMERO_INICIAL_CARGA,))
+    registros = cur.rowcount
+    residentes = [r[0] for r in cur.execute(
+        "SELECT residente_id FROM parqueaderos WHERE numero >= ? AND residente_id IS NOT NULL",
+        (NUMERO_INICIAL_CARGA,)).fetchall()]
+    cur.execute("DELETE FROM parqueaderos WHERE numero >= ?", (NUMERO_INICIAL_CARGA,))
+    parqueaderos = cur.rowcount
+    cur.execute("DELETE FROM placas WHERE residente_id IN (SELECT value FROM json_each(?))", (json.dumps(residentes),))
+    cur.execute("DELETE FROM residentes WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(residentes),))
+    cur.execute("DROP TABLE registros_carga")
+    return {'registros': registros, 'parqueaderos': parqueaderos, 'residentes': len(residentes)}
+
+# =============================================================================
+# MONITOR DE BLOQUEOS Y CONFLICTOS
+# =============================================================================
+
+SQL_ESPERAS_PG = """
+    SELECT COUNT(*) FILTER (WHERE wait_event_type = 'Lock') AS esperando,
+           COUNT(*) FILTER (WHERE state = 'active') AS activas
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()
+"""
+
+SQL_CONTADORES_PG = """
+    SELECT deadlocks, xact_rollback FROM pg_stat_database WHERE datname = current_database()
+"""
+
+# Parqueaderos con más de un visitante dentro: no debería pasar nunca
+SQL_ASIGNACIONES_DOBLES = """
+    SELECT COUNT(*) AS dobles FROM (
+        SELECT parqueadero_id FROM registros_visitantes
+        WHERE hora_salida IS NULL
+        GROUP BY parqueadero_id HAVING COUNT(*) > 1
+    ) d
+"""
+
+class MonitorBloqueos:
+    """
+    Muestrea cada `intervalo` segundos, con su propia conexión, cuántas
+    sesiones esperan un bloqueo (solo PostgreSQL) y si hay parqueaderos
+    asignados a dos visitantes a la vez
+    """
+
+    def __init__(self, repo, intervalo=0.1):
+        # Con RepositorioSincronizado se observa su repositorio primario
+        self.repo = getattr(repo, 'primario', repo).clonar()
+        self.intervalo = intervalo
+        self.postgresql = hasattr(self.repo, 'manager')
+        self.muestras = 0
+        self.esperando = []
+        self.dobles_max = 0
+        self.contadores_inicio = None
+        self.contadores_fin = None
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar, name='monitor-carga', daemon=True)
+
+    def _consultar(self, sql):
+        if self.postgresql:
+            cursor = self.repo.manager.cursor
+            cursor.execute(sql)
+            fila = cursor.fetchone()
+            self.repo.manager.connection.commit()
+            return dict(fila)
+        with self.repo._lock:
+            cursor = self.repo.connection.execute(sql)
+            return dict(zip([c[0] for c in cursor.description], cursor.fetchone()))
+
+    def _ejecutar(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                if self.postgresql:
+                    self.esperando.append(self._consultar(SQL_ESPERAS_PG)['esperando'])
+                self.dobles_max = max(self.dobles_max, self._consultar(SQL_ASIGNACIONES_DOBLES)['dobles'])
+                self.muestras += 1
+            except Exception as e:
+                print(f"⚠️ Error en el monitor de bloqueos: {e}")
+                return
+
+    def iniciar(self):
+        if self.postgresql:
+            self.contadores_inicio = self._consultar(SQL_CONTADORES_PG)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+        if self.postgresql:
+            self.contadores_fin = self._consultar(SQL_CONTADORES_PG)
+        self.dobles_max = max(self.dobles_max, self._consultar(SQL_ASIGNACIONES_DOBLES)['dobles'])
+        self.repo.cerrar()
+
+    def reporte(self):
+        reporte = {'muestras': self.muestras, 'asignaciones_dobles_max': self.dobles_max}
+        if self.postgresql:
+            esperando = np.array(self.esperando or [0])
+            reporte.update({
+                'sesiones_esperando_max': int(esperando.max()),
+                'sesiones_esperando_promedio': float(esperando.mean()),
+                'muestras_con_espera': float((esperando > 0).mean()),
+                # Integral de sesiones en espera por el tiempo: segundos-sesión bloqueados
+                'segundos_sesion_en_espera': float(esperando.sum() * self.intervalo),
+                'deadlocks': self.contadores_fin['deadlocks'] - self.contadores_inicio['deadlocks'],
+                'rollbacks': self.contadores_fin['xact_rollback'] - self.contadores_inicio['xact_rollback'],
+            })
+        return reporte
+
+# =============================================================================
+# SIMULACIÓN
+# =============================================================================
+
+class SimulacionCarga:
+    """
+    Estado compartido por las porterías: salidas programadas (montículo por
+    hora real), residentes fuera y visitantes dentro. Cada portería guarda sus
+    latencias y resultados sin bloqueos y se consolidan al final
+    """
+
+    def __init__(self, repo, estaciones=8, duracion=60.0, llegadas_hora=30.0, escala=60.0,
+                 estadia_visitante=90.0, dispersion=0.8, estadia_residente=600.0,
+                 fraccion_residentes=0.4, estadisticas_cada=5.0, semilla=None):
+        """
+        llegadas_hora: llegadas por hora simulada en cada portería (proceso de Poisson)
+        escala: segundos simulados por segundo real
+        estadia_visitante / estadia_residente: mediana de la estadía en minutos simulados (log-normal)
+        dispersion: sigma de la log-normal
+        estadisticas_cada: segundos reales entre consultas de estadísticas de cada portería
+        """
+        self.repo = repo
+        self.estaciones = estaciones
+        self.duracion = duracion
+        self.tasa_real = llegadas_hora / 3600 * escala  # llegadas por segundo real y portería
+        self.escala = escala
+        self.estadia_visitante = estadia_visitante * 60 / escala
+        self.estadia_residente = estadia_residente * 60 / escala
+        self.dispersion = dispersion
+        self.fraccion_residentes = fraccion_residentes
+        self.estadisticas_cada = estadisticas_cada
+        self.semilla = semilla
+
+        self._lock = threading.Lock()
+        self.salidas = []  # (hora real, secuencia, tipo, placa)
+        self._secuencia = 0
+        self.residentes_fuera = []
+        self.visitantes_dentro = 0
+        self.cupos_visitantes = 0
+        self.inicio = None
+        self.fin = None
+        self.registros = []  # ids de los registros de visitantes creados (para limpiar)
+        self.latencias = []  # por portería: {operacion: [segundos]}
+        self.resultados = []  # por portería: Counter
+        self.errores = []
+
+    # ============= ESTADO COMPARTIDO =============
+
+    def cargar_parqueaderos(self):
+        """Cupos de visitantes y residentes fuera al empezar; se llama antes de ejecutar()"""
+        parqueaderos = self.repo.estado_parqueaderos()
+        self.cupos_visitantes = sum(1 for p in parqueaderos if not p['residente'])
+        self.visitantes_dentro = sum(1 for p in parqueaderos if not p['residente'] and p['estado'] == 'OCUPADO')
+        self.residentes_fuera = [p['placa'] for p in parqueaderos
+                                 if p['residente'] and p['placa'] and p['estado'] == 'LIBRE']
+
+    def _programar_salida(self, hora, tipo, placa):
+        with self._lock:
+            self._secuencia += 1
+            heapq.heappush(self.salidas, (hora, self._secuencia, tipo, placa))
+
+    def _proxima_salida(self, ahora):
+        with self._lock:
+            if self.salidas and self.salidas[0][0] <= ahora:
+                return heapq.heappop(self.salidas)
+            return None
+
+    def _tomar_residente(self, azar):
+        with self._lock:
+            if not self.residentes_fuera:
+                return None
+            i = azar.randrange(len(self.residentes_fuera))
+            self.residentes_fuera[i], self.residentes_fuera[-1] = self.residentes_fuera[-1], self.residentes_fuera[i]
+            return self.residentes_fuera.pop()
+
+    def _estadia(self, azar, mediana):
+        return azar.lognormvariate(math.log(mediana), self.dispersion)
+
+    def ocupacion_esperada(self):
+        """Visitantes dentro en régimen estable por la ley de Little (llegadas x estadía media)"""
+        estadia_media = self.estadia_visitante * math.exp(self.dispersion ** 2 / 2)
+        return self.estaciones * self.tasa_real * (1 - self.fraccion_residentes) * estadia_media
+
+    # ============= PORTERÍA =============
+
+    def _porteria(self, numero):
+        repo = self.repo.clonar()
+        azar = random.Random(None if self.semilla is None else self.semilla + numero)
+        latencias = defaultdict(list)
+        resultados = Counter()
+
+        def medir(operacion, funcion, *args):
+            t = time.perf_counter()
+            try:
+                resultado = funcion(*args)
+            except Exception as e:
+                resultado = None
+                self.errores.append(f"{operacion}: {e}")
+            latencias[operacion].append(time.perf_counter() - t)
+            return resultado
+
+        def llegada(ahora):
+            placa = self._tomar_residente(azar) if azar.random() < self.fraccion_residentes else None
+            if placa is None:
+                placa = (''.join(azar.choices(string.ascii_uppercase, k=3)) +
+                         ''.join(azar.choices(string.digits, k=3)))
+            clasificacion = medir('clasificar_placa', repo.clasificar_placa, placa)
+            if clasificacion is None:
+                resultados['errores'] += 1
+                return
+            if clasificacion['tipo'] == 'RESIDENTE':
+                entrada = medir('entrada_residente', repo.entrada_residente, placa)
+                resultados[f"entrada_residente:{entrada['resultado'] if entrada else 'ERROR'}"] += 1
+                if entrada and entrada['resultado'] == 'OK':
+                    self._programar_salida(ahora + self._estadia(azar, self.estadia_residente), 'R', placa)
+                else:
+                    with self._lock:
+                        self.residentes_fuera.append(placa)
+                return
+            if clasificacion['tipo'] == 'VISITANTE':
+                resultados['entrada_visitante:YA_DENTRO'] += 1
+                return
+
+            entrada = medir('entrada_visitante', repo.entrada_visitante, placa)
+            resultado = entrada['resultado'] if entrada else 'ERROR'
+            resultados[f"entrada_visitante:{resultado}"] += 1
+            if resultado == 'OK':
+                with self._lock:
+                    self.visitantes_dentro += 1
+                    self.registros.append(entrada['registro_id'])
+                self._programar_salida(ahora + self._estadia(azar, self.estadia_visitante), 'V', placa)
+            elif resultado == 'SIN_CUPO':
+                with self._lock:
+                    libres = self.cupos_visitantes - self.visitantes_dentro
+                if libres > self.estaciones:
+                    # Había más cupos libres que entradas en curso: el rechazo vino de la
+                    # contención (otra portería tenía bloqueado el parqueadero, SKIP LOCKED)
+                    resultados['conflicto:SIN_CUPO_CON_CUPO'] += 1
+
+        def salida(tipo, placa):
+            if tipo == 'R':
+                resultado = medir('salida_residente', repo.salida_residente, placa)
+                resultados[f"salida_residente:{resultado['resultado'] if resultado else 'ERROR'}"] += 1
+                with self._lock:
+                    self.residentes_fuera.append(placa)
+                return
+            # Mismo flujo que la pestaña de salida: buscar, mostrar la liquidación, registrar
+            visitante = medir('visitante_activo', repo.visitante_activo, placa)
+            if not visitante:
+                resultados['salida_visitante:NO_ENCONTRADO'] += 1
+                return
+            repo.plan_tarifa(visitante['parqueadero']).liquidar(visitante['hora_entrada'], datetime.now())
+            liquidacion = medir('salida_visitante', repo.salida_visitante,
+                                visitante['id'], visitante['parqueadero_id'])
+            resultados[f"salida_visitante:{'OK' if liquidacion else 'YA_LIQUIDADO'}"] += 1
+            if liquidacion:
+                with self._lock:
+                    self.visitantes_dentro -= 1
+
+        proxima_llegada = self.inicio + azar.expovariate(self.tasa_real)
+        proximas_estadisticas = self.inicio + azar.uniform(0, self.estadisticas_cada)
+        try:
+            while True:
+                ahora = time.perf_counter()
+                if ahora >= self.fin:
+                    break
+                pendiente = self._proxima_salida(ahora)
+                if pendiente:
+                    salida(pendiente[2], pendiente[3])
+                    continue
+                if ahora >= proxima_llegada:
+                    llegada(ahora)
+                    proxima_llegada += azar.expovariate(self.tasa_real)
+                    continue
+                if ahora >= proximas_estadisticas:
+                    if medir('estadisticas', repo.estadisticas) is None:
+                        resultados['errores'] += 1
+                    proximas_estadisticas += self.estadisticas_cada
+                    continue
+                with self._lock:
+                    siguiente_salida = self.salidas[0][0] if self.salidas else self.fin
+                # Dormir hasta el próximo evento (máximo 50 ms: otra portería puede programar salidas)
+                time.sleep(max(0.0, min(proxima_llegada, proximas_estadisticas, siguiente_salida,
+                                        ahora + 0.05, self.fin) - ahora))
+        finally:
+            self.latencias.append(latencias)
+            self.resultados.append(resultados)
+            if repo is not self.repo:
+                repo.cerrar()
+
+    # ============= EJECUCIÓN =============
+
+    def ejecutar(self):
+        self.inicio = time.perf_counter()
+        self.fin = self.inicio + self.duracion
+        hilos = [threading.Thread(target=self._porteria, args=(i,), name=f'porteria-{i}')
+                 for i in range(self.estaciones)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return time.perf_counter() - self.inicio
+
+    def vaciar(self):
+        """Registra la salida de los vehículos que dejó la simulación (sin medir)"""
+        pendientes, self.salidas = self.salidas, []
+        for _, _, tipo, placa in pendientes:
+            if tipo == 'R':
+                self.repo.salida_residente(placa)
+            else:
+                visitante = self.repo.visitante_activo(placa)
+                if visitante:
+                    self.repo.salida_visitante(visitante['id'], visitante['parqueadero_id'])
+        return len(pendientes)
+
+    def reporte(self, segundos):
+        latencias = defaultdict(list)
+        for porteria in self.latencias:
+            for operacion, valores in porteria.items():
+                latencias[operacion].extend(valores)
+        resultados = sum(self.resultados, Counter())
+
+        operaciones = {}
+        for operacion, valores in sorted(latencias.items()):
+            ms = np.array(valores) * 1000
+            operaciones[operacion] = {
+                'n': len(ms), 'por_segundo': len(ms) / segundos,
+                **{f'p{p}_ms': float(v) for p, v in zip(PERCENTILES, np.percentile(ms, PERCENTILES))},
+                'max_ms': float(ms.max()),
+            }
+        total = sum(o['n'] for o in operaciones.values())
+        vehiculos = sum(n for clave, n in resultados.items()
+                        if clave.startswith(('entrada_visitante:OK', 'entrada_residente:OK')))
+        return {
+            'segundos': segundos, 'estaciones': self.estaciones,
+            'operaciones_por_segundo': total / segundos,
+            'entradas_por_segundo': vehiculos / segundos,
+            'operaciones': operaciones, 'resultados': dict(sorted(resultados.items())),
+            'excepciones': len(self.errores),
+        }
+
+# =============================================================================
+# REPORTE
+# =============================================================================
+
+def imprimir_reporte(reporte):
+    print("\n" + "="*78)
+    print(f"📊 RESULTADOS: {reporte['estaciones']} porterías durante {reporte['segundos']:.1f} s")
+    print("="*78)
+    print(f"Throughput: {reporte['operaciones_por_segundo']:.1f} operaciones/s, "
+          f"{reporte['entradas_por_segundo']:.1f} entradas/s")
+    print(f"\n{'Operación':<20}{'n':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}")
+    for operacion, o in reporte['operaciones'].items():
+        print(f"{operacion:<20}{o['n']:>8}{o['por_segundo']:>9.1f}{o['p50_ms']:>9.2f}"
+              f"{o['p95_ms']:>9.2f}{o['p99_ms']:>9.2f}{o['max_ms']:>9.2f}")
+
+    print("\nResultados:")
+    for clave, n in reporte['resultados'].items():
+        print(f"  {clave:<40}{n:>8}")
+
+    bloqueos = reporte['bloqueos']
+    print("\nBloqueos y conflictos:")
+    if 'sesiones_esperando_max' in bloqueos:
+        print(f"  Sesiones esperando un bloqueo: máx {bloqueos['sesiones_esperando_max']}, "
+              f"promedio {bloqueos['sesiones_esperando_promedio']:.2f} "
+              f"({bloqueos['muestras_con_espera']:.1%} de {bloqueos['muestras']} muestras)")
+        print(f"  Tiempo en espera de bloqueos: ~{bloqueos['segundos_sesion_en_espera']:.2f} segundos-sesión")
+        print(f"  Deadlocks: {bloqueos['deadlocks']}, rollbacks: {bloqueos['rollbacks']}")
+    else:
+        print("  Esperas de bloqueo: no observables en SQLite (quedan dentro de la latencia, busy_timeout)")
+    print(f"  SIN_CUPO habiendo cupo: {reporte['resultados'].get('conflicto:SIN_CUPO_CON_CUPO', 0)}")
+    print(f"  Salidas ya liquidadas por otra portería: "
+          f"{reporte['resultados'].get('salida_visitante:YA_LIQUIDADO', 0)}")
+    print(f"  Parqueaderos con dos visitantes a la vez (máx): {bloqueos['asignaciones_dobles_max']}")
+    if reporte['excepciones']:
+        print(f"  ⚠️ Excepciones: {reporte['excepciones']}")
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con porterías simuladas")
+    parser.add_argument('--motor', choices=['postgresql', 'sqlite'], default='postgresql')
+    parser.add_argument('--ruta', default='control_acceso_carga.db', help="archivo SQLite")
+    parser.add_argument('--db-host', default='localhost')
+    parser.add_argument('--db-puerto', type=int, default=5432)
+    parser.add_argument('--db-nombre', default='control_acceso_carga')
+    parser.add_argument('--db-usuario', default='postgres')
+    parser.add_argument('--sincronizacion', action='store_true',
+                        help="usar RepositorioSincronizado como la aplicación (por defecto PostgreSQL directo)")
+    parser.add_argument('--estaciones', type=int, default=8)
+    parser.add_argument('--duracion', type=float, default=60.0, help="segundos reales")
+    parser.add_argument('--llegadas-hora', type=float, default=30.0, help="llegadas por hora simulada por portería")
+    parser.add_argument('--escala', type=float, default=60.0, help="segundos simulados por segundo real")
+    parser.add_argument('--estadia-visitante', type=float, default=90.0, help="mediana en minutos simulados")
+    parser.add_argument('--estadia-residente', type=float, default=600.0, help="mediana en minutos simulados")
+    parser.add_argument('--dispersion', type=float, default=0.8, help="sigma de la log-normal de estadías")
+    parser.add_argument('--residentes', type=float, default=0.4, help="fracción de llegadas que son residentes")
+    parser.add_argument('--estadisticas-cada', type=float, default=5.0, help="segundos reales por portería")
+    parser.add_argument('--parqueaderos-visitantes', type=int, default=0,
+                        help="parqueaderos de visitantes de prueba a crear antes de empezar")
+    parser.add_argument('--residentes-prueba', type=int, default=0,
+                        help="residentes de prueba a crear antes de empezar")
+    parser.add_argument('--semilla', type=int)
+    parser.add_argument('--sin-vaciar', action='store_true',
+                        help="dejar dentro los vehículos al terminar (implica --conservar-datos)")
+    parser.add_argument('--conservar-datos', action='store_true',
+                        help="no borrar los registros, parqueaderos y residentes de prueba al terminar")
+    parser.add_argument('--permitir-produccion', action='store_true',
+                        help="correr contra control_acceso / control_acceso.db")
+    parser.add_argument('--json', help="guardar el reporte en este archivo")
+    args = parser.parse_args()
+
+    destino = args.db_nombre if args.motor == 'postgresql' else os.path.basename(args.ruta)
+    if destino == BASES_PRODUCCION[args.motor] and not args.permitir_produccion:
+        print(f"❌ {destino} es la base de datos de la aplicación: la prueba escribe y borra registros. "
+              f"Use una base de datos de pruebas o --permitir-produccion")
+        return
+
+    config = {'motor': args.motor, 'ruta': args.ruta, 'host': args.db_host, 'port': args.db_puerto,
+              'database': args.db_nombre, 'user': args.db_usuario,
+              'password': os.environ.get('PGPASSWORD', ''), 'sincronizacion': args.sincronizacion}
+    repo = crear_repositorio(config)
+    if isinstance(repo, RepositorioMemoria):
+        print("❌ No se pudo abrir la base de datos; la prueba de carga no corre en memoria")
+        return
+    try:
+        if not preparar_parqueaderos(repo, args.parqueaderos_visitantes, args.residentes_prueba):
+            print("❌ No se pudieron crear los parqueaderos de prueba")
+            return
+
+        simulacion = SimulacionCarga(repo, args.estaciones, args.duracion, args.llegadas_hora, args.escala,
+                                     args.estadia_visitante, args.dispersion, args.estadia_residente,
+                                     args.residentes, args.estadisticas_cada, args.semilla)
+        simulacion.cargar_parqueaderos()
+        print(f"🚗 {args.estaciones} porterías, {simulacion.tasa_real * args.estaciones:.1f} llegadas/s, "
+              f"{simulacion.cupos_visitantes} parqueaderos de visitantes "
+              f"(ocupación esperada en régimen: {simulacion.ocupacion_esperada():.0f})")
+        if simulacion.ocupacion_esperada() > simulacion.cupos_visitantes:
+            print("⚠️ Hay menos parqueaderos de visitantes que la ocupación esperada: "
+                  "muchas entradas terminarán en SIN_CUPO (ver --parqueaderos-visitantes)")
+
+        monitor = MonitorBloqueos(repo)
+        monitor.iniciar()
+        segundos = simulacion.ejecutar()
+        monitor.detener()
+
+        reporte = simulacion.reporte(segundos)
+        reporte['bloqueos'] = monitor.reporte()
+        imprimir_reporte(reporte)
+        if not args.sin_vaciar:
+            print(f"\n🧹 {simulacion.vaciar()} vehículos de la simulación registraron su salida")
+            if not args.conservar_datos:
+                borrados = limpiar_datos_prueba(repo, simulacion.registros)
+                if borrados:
+                    print(f"🧹 Datos de prueba borrados: {borrados['registros']} registros, "
+                          f"{borrados['parqueaderos']} parqueaderos, {borrados['residentes']} residentes")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as archivo:
+                json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+            print(f"💾 Reporte guardado en {args.json}")
+    finally:
+        repo.cerrar()
+
+if __name__ == "__main__":
+    main()
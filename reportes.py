@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Reportes de ingresos diarios, semanales y mensuales sobre el resumen diario"""
+
+import io
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+COLUMNAS_RESUMEN = ['salidas', 'horas', 'recaudo', 'salidas_por_hora', 'recaudo_por_hora',
+                    'salidas_tarifa_plena', 'recaudo_tarifa_plena']
+
+# Periodos de agregación: nombre -> frecuencia de pandas.Period
+PERIODOS = {'Diario': 'D', 'Semanal': 'W', 'Mensual': 'M'}
+
+# =============================================================================
+# CACHÉ DEL RESUMEN DIARIO
+# =============================================================================
+
+class CacheResumenDiario:
+    """
+    Guarda el resumen de los días cerrados (anteriores a hoy), que ya no
+    cambian: un reporte solo pide al repositorio los días que no ha visto y
+    el día de hoy. Los días sin salidas también se guardan, con ceros.
+    """
+
+    def __init__(self):
+        self._dias = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, repo, desde, hasta):
+        """Lista de resúmenes por día entre desde y hasta, o None si el repositorio falla"""
+        hoy = date.today()
+        dias = pd.date_range(desde, hasta, freq='D').date
+        with self._lock:
+            faltantes = [d for d in dias if d >= hoy or d not in self._dias]
+        if not faltantes:
+            return self._filas(dias)
+
+        filas = repo.resumen_diario(faltantes[0], faltantes[-1])
+        if filas is None:
+            return None
+        leidos = {f['fecha']: f for f in filas}
+        with self._lock:
+            for d in faltantes:
+                fila = leidos.get(d) or dict.fromkeys(COLUMNAS_RESUMEN, 0)
+                fila = dict({c: fila[c] for c in COLUMNAS_RESUMEN}, fecha=d)
+                if d < hoy:
+                    self._dias[d] = fila
+            hoy_fila = leidos.get(hoy)
+        return self._filas(dias, hoy_fila)
+
+    def _filas(self, dias, hoy_fila=None):
+        hoy = date.today()
+        with self._lock:
+            filas = [self._dias[d] for d in dias if d < hoy]
+        if hoy_fila is not None and dias[0] <= hoy <= dias[-1]:
+            filas.append(dict({c: hoy_fila[c] for c in COLUMNAS_RESUMEN}, fecha=hoy))
+        return filas
+
+    def invalidar(self):
+        with self._lock:
+            self._dias.clear()
+
+# =============================================================================
+# AGREGACIÓN
+# =============================================================================
+
+def tabla_diaria(filas, desde, hasta):
+    """DataFrame con un registro por día entre desde y hasta (ceros en días sin salidas)"""
+    indice = pd.date_range(desde, hasta, freq='D', name='fecha')
+    if not filas:
+        return pd.DataFrame(0.0, index=indice, columns=COLUMNAS_RESUMEN)
+    df = pd.DataFrame(filas)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return (df.set_index('fecha')[COLUMNAS_RESUMEN].astype(float)
+            .reindex(indice, fill_value=0.0))
+
+def agregar(diario, periodo='Diario'):
+    """
+    Suma la tabla diaria por periodo ('Diario', 'Semanal' o 'Mensual') y agrega
+    ticket promedio y participación de la tarifa plena en el recaudo
+    """
+    tabla = diario.groupby(diario.index.to_period(PERIODOS[periodo])).sum()
+    salidas = tabla['salidas'].to_numpy()
+    recaudo = tabla['recaudo'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tabla['ticket_promedio'] = np.where(salidas > 0, recaudo / salidas, 0.0)
+        tabla['porcentaje_tarifa_plena'] = np.where(
+            recaudo > 0, 100 * tabla['recaudo_tarifa_plena'].to_numpy() / recaudo, 0.0)
+    tabla.index.name = 'periodo'
+    return tabla
+
+def etiqueta_periodo(periodo):
+    """Texto de un pandas.Period para tablas y gráficos"""
+    if periodo.freqstr.startswith('W'):
+        return f"{periodo.start_time:%Y-%m-%d} (sem)"
+    if periodo.freqstr.startswith('M'):
+        return f"{periodo.start_time:%Y-%m}"
+    return f"{periodo.start_time:%Y-%m-%d}"
+
+# =============================================================================
+# GRÁFICOS
+# =============================================================================
+
+def graficar(tabla, titulo, ancho=8, alto=3.5, dpi=100):
+    """
+    Barras apiladas de recaudo por hora / tarifa plena. Usa Figure con el
+    backend Agg directamente (sin pyplot), así que puede ejecutarse en un hilo
+    de fondo. Retorna la imagen PNG en bytes
+    """
+    figura = Figure(figsize=(ancho, alto), dpi=dpi)
+    FigureCanvasAgg(figura)
+    ejes = figura.add_subplot(111)
+
+    posiciones = np.arange(len(tabla))
+    por_hora = tabla['recaudo_por_hora'].to_numpy()
+    plena = tabla['recaudo_tarifa_plena'].to_numpy()
+    ejes.bar(posiciones, por_hora, color='#3498db', label='Tarifa por hora')
+    ejes.bar(posiciones, plena, bottom=por_hora, color='#e67e22', label='Tarifa plena')
+
+    etiquetas = [etiqueta_periodo(p) for p in tabla.index]
+    paso = max(1, len(etiquetas) // 12)
+    ejes.set_xticks(posiciones[::paso])
+    ejes.set_xticklabels(etiquetas[::paso], rotation=30, ha='right', fontsize=8)
+    ejes.yaxis.set_major_formatter(lambda valor, _: f"${valor:,.0f}")
+    ejes.set_title(titulo, fontsize=11)
+    ejes.legend(fontsize=8)
+    ejes.grid(axis='y', alpha=0.3)
+    figura.tight_layout()
+
+    salida = io.BytesIO()
+    figura.savefig(salida, format='png')
+    return salida.getvalue()
+
+# =============================================================================
+# REPORTE
+# =============================================================================
+
+def generar_reporte(filas, desde, hasta, periodo='Diario'):
+    """
+    Arma el reporte a partir de los resúmenes diarios (CacheResumenDiario.obtener)
+    Retorna (tabla agregada, totales, PNG del gráfico)
+    """
+    tabla = agregar(tabla_diaria(filas, desde, hasta), periodo)
+    totales = tabla[COLUMNAS_RESUMEN].sum().to_dict()
+    imagen = graficar(tabla, f"Ingresos {periodo.lower()} {desde:%Y-%m-%d} a {hasta:%Y-%m-%d}")
+    return tabla, totales, imagen
+
+def rango_por_defecto(periodo):
+    """Rango (desde, hasta) inicial de la ventana de reportes según el periodo"""
+    hoy = date.today()
+    dias = {'Diario': 30, 'Semanal': 7 * 12, 'Mensual': 365}[periodo]
+    return hoy - timedelta(days=dias - 1), hoy
@@ -0,0 +1,689 @@
+# -*- coding: utf-8 -*-
+"""Repositorio de datos del Sistema de Control de Acceso: interfaz común y sus implementaciones"""
+
+import csv
+import io
+import re
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from base_datos import CANAL_ESTADISTICAS, CANAL_ESTADO_RESIDENTES, PostgreSQLManager
+from directorio_placas import DirectorioPlacas
+from diario_memoria import DiarioMemoria
+from estado_memoria import HistorialColumnar, OcupacionParqueaderos, RegistroActivo, Residente
+from tarifas import PLAN_POR_DEFECTO, CatalogoTarifas
+
+# Formato mínimo de una placa: 4 a 10 caracteres alfanuméricos con letras y números
+PATRON_PLACA = re.compile(r'^(?=.*[A-Z])(?=.*\d)[A-Z0-9]{4,10}$')
+# Columnas del CSV de historial para contabilidad
+COLUMNAS_EXPORTACION = ['id', 'placa', 'parqueadero', 'hora_entrada', 'hora_salida',
+                        'total_horas', 'valor_pagado']
+TAMANO_BLOQUE_EXPORTACION = 5000
+# Columnas del CSV de carga masiva de residentes
+COLUMNAS_IMPORTACION = ['parqueadero', 'nombre', 'apartamento', 'placa']
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+def _decimal(valor):
+    """Número con dos decimales como lo escribe COPY para NUMERIC(_,2); vacío si es NULL"""
+    return '' if valor is None else f"{float(valor):.2f}"
+
+def normalizar_hora(valor):
+    """Convierte una hora leída de la base de datos en datetime sin zona horaria"""
+    if isinstance(valor, str):
+        try:
+            valor = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+        except ValueError:
+            valor = datetime.strptime(valor, '%Y-%m-%d %H:%M:%S')
+    if getattr(valor, 'tzinfo', None) is not None:
+        valor = valor.replace(tzinfo=None)
+    return valor
+
+# =============================================================================
+# INTERFAZ DEL REPOSITORIO
+# =============================================================================
+
+class Repositorio(ABC):
+    """
+    Operaciones de la portería independientes del almacenamiento. Todas las
+    implementaciones retornan los mismos diccionarios y códigos de resultado;
+    None indica una falla del almacenamiento (no una regla de negocio).
+
+    Códigos de resultado:
+        entrada_residente / salida_residente: OK, NO_RESIDENTE, YA_OCUPADO, YA_LIBRE
+        entrada_visitante: OK, RESIDENTE, ACTIVO, SIN_CUPO
+    """
+
+    nombre = ''
+    remoto = False  # True si las operaciones van por red y deben salir del hilo de Tk
+
+    @property
+    def conectado(self):
+        return True
+
+    def verificar_conexion(self):
+        return self.conectado
+
+    def clonar(self):
+        """Retorna un repositorio equivalente para usar desde otro hilo"""
+        return self
+
+    def refrescar(self):
+        """Actualiza cachés locales si los datos compartidos cambiaron"""
+        return False
+
+    def metricas(self):
+        """Métricas de cachés locales (None si no aplica)"""
+        return None
+
+    def estado_sincronizacion(self):
+        """{'en_linea', 'pendientes', ...} si opera con cola sin conexión; None si no aplica"""
+        return None
+
+    def suscribir_cambios(self):
+        """
+        Suscripción a los avisos de cambios de ocupación, con esperar_avisos(timeout)
+        (lista de avisos, vacía si no hubo, None si se perdió) y cerrar(). Abre su
+        propia conexión; None si el motor no avisa cambios y hay que consultar periódicamente
+        """
+        return None
+
+    def plan_tarifa(self, parqueadero=None):
+        """PlanTarifa con el que se cobra la salida del parqueadero (número)"""
+        return PLAN_POR_DEFECTO
+
+    def catalogo_tarifas(self):
+        """CatalogoTarifas con los planes cargados (None si el motor no tiene planes)"""
+        return None
+
+    @abstractmethod
+    def clasificar_placa(self, placa):
+        """
+        Retorna {'tipo': 'RESIDENTE', placa, nombre, apartamento, parqueadero, estado},
+        {'tipo': 'VISITANTE', placa, id, parqueadero_id, parqueadero, hora_entrada}
+        o {'tipo': 'DESCONOCIDO', placa}
+        """
+
+    @abstractmethod
+    def entrada_residente(self, placa):
+        """Ocupa el parqueadero del residente. Retorna {resultado, nombre, parqueadero}"""
+
+    @abstractmethod
+    def salida_residente(self, placa):
+        """Libera el parqueadero del residente. Retorna {resultado, nombre, parqueadero}"""
+
+    @abstractmethod
+    def entrada_visitante(self, placa):
+        """
+        Valida la placa y asigna un parqueadero libre de visitantes
+        Retorna {resultado, registro_id, parqueadero_id, parqueadero, hora_entrada}
+        """
+
+    @abstractmethod
+    def visitante_activo(self, placa):
+        """Retorna {id, placa, parqueadero_id, parqueadero, hora_entrada} o None si no está dentro"""
+
+    @abstractmethod
+    def salida_visitante(self, registro_id, parqueadero_id):
+        """
+        Liquida la salida y libera el parqueadero
+        Retorna {total_horas, valor_pagado, hora_salida}, o None si ya fue liquidado
+        """
+
+    @abstractmethod
+    def visitantes_activos(self):
+        """Lista de {id, placa, hora_entrada, parqueadero} ordenada por hora de entrada"""
+
+    @abstractmethod
+    def estado_parqueaderos(self):
+        """
+        Lista de {numero, estado, residente, apartamento, placa, hora_entrada} ordenada por número.
+        En parqueaderos de visitantes residente es None y placa/hora_entrada son del visitante actual
+        """
+
+    @abstractmethod
+    def estadisticas(self):
+        """Retorna {total_parqueaderos, ocupados, visitantes_activos, total_recaudado, recaudado_hoy}"""
+
+    @abstractmethod
+    def pagina_historial(self, despues=None, tamano=100, placa=None, desde=None, hasta=None):
+        """
+        Salidas ordenadas por (hora_salida, id) descendente:
+        {id, placa, hora_entrada, hora_salida, total_horas, valor_pagado, parqueadero}
+        despues: (hora_salida, id) de la última fila de la página anterior (None para la primera)
+        placa: prefijo de placa; desde/hasta: date de salida (inclusive). None si falla
+        """
+
+    def historial(self, limite=100):
+        """Últimas salidas"""
+        return self.pagina_historial(tamano=limite)
+
+    @abstractmethod
+    def resumen_diario(self, desde, hasta):
+        """
+        Ingresos por día de salida entre desde y hasta (date, inclusive), solo días con salidas:
+        {fecha, salidas, horas, recaudo, salidas_por_hora, recaudo_por_hora,
+         salidas_tarifa_plena, recaudo_tarifa_plena}. None si falla
+        """
+
+    @abstractmethod
+    def intervalos_visitantes(self, desde, hasta):
+        """
+        Visitas que se cruzan con [desde, hasta) (datetime): lista de
+        (parqueadero, hora_entrada, hora_salida), hora_salida None si sigue dentro. None si falla
+        """
+
+    # ============= TRANSFERENCIA MASIVA =============
+
+    def exportar_historial_csv(self, salida, desde=None, hasta=None):
+        """
+        Escribe las salidas entre desde y hasta (date, inclusive) en el archivo
+        binario `salida` como CSV con encabezado, en el mismo formato que
+        COPY ... TO STDOUT de PostgreSQL. Esta versión recorre pagina_historial
+        por bloques; los motores con exportación nativa la reemplazan.
+        Retorna el número de filas o None si falla
+        """
+        texto = io.TextIOWrapper(salida, encoding='utf-8', newline='', write_through=True)
+        try:
+            escritor = csv.writer(texto, lineterminator='\n')
+            escritor.writerow(COLUMNAS_EXPORTACION)
+            filas, despues = 0, None
+            while True:
+                pagina = self.pagina_historial(despues, TAMANO_BLOQUE_EXPORTACION, desde=desde, hasta=hasta)
+                if pagina is None:
+                    return None
+                escritor.writerows(
+                    (r['id'], r['placa'], r['parqueadero'],
+                     r['hora_entrada'].isoformat(sep=' '), r['hora_salida'].isoformat(sep=' '),
+                     _decimal(r['total_horas']), _decimal(r['valor_pagado']))
+                    for r in pagina)
+                filas += len(pagina)
+                if len(pagina) < TAMANO_BLOQUE_EXPORTACION:
+                    return filas
+                despues = (pagina[-1]['hora_salida'], pagina[-1]['id'])
+        except Exception as e:
+            print(f"Error exportando historial: {e}")
+            return None
+        finally:
+            texto.detach()
+
+    def importar_residentes_csv(self, entrada):
+        """
+        Carga masiva desde un CSV (archivo binario) con encabezado
+        parqueadero,nombre,apartamento,placa. Crea los parqueaderos que no
+        existan, crea o actualiza el residente de cada parqueadero y asocia sus
+        placas. Todo o nada.
+        Retorna {filas, parqueaderos_nuevos, residentes_nuevos, residentes_actualizados,
+        placas, rechazadas} o None si falla o el motor no lo permite
+        """
+        print(f"⚠️ La importación de residentes no está disponible en {self.nombre}")
+        return None
+
+    # ============= PLANES DE TARIFA =============
+
+    def guardar_plan_tarifa(self, clase, nombre, definicion):
+        """
+        Guarda el plan de tarifa activo de la clase de parqueadero (ver
+        tarifas.validar_plan). Retorna el id del plan o None si falla o el
+        motor no lo permite
+        """
+        print(f"⚠️ Los planes de tarifa no están disponibles en {self.nombre}")
+        return None
+
+    def cerrar(self):
+        """Libera los recursos del repositorio"""
+
+# =============================================================================
+# REPOSITORIO EN MEMORIA
+# =============================================================================
+
+class RepositorioMemoria(Repositorio):
+    """
+    Datos en memoria como fallback cuando no hay base de datos. Con un
+    DiarioMemoria cada cambio se registra como evento antes de aplicarse y el
+    estado se reconstruye al iniciar (snapshot + eventos); sin diario los datos
+    se pierden al cerrar.
+
+    El estado es compacto (ver estado_memoria): residentes y visitantes activos
+    con __slots__, ocupación de parqueaderos en un bytearray e historial en
+    columnas NumPy. Los contadores de ocupación y recaudo se actualizan al
+    aplicar cada evento, así estadisticas() no depende del tamaño del conjunto.
+
+    clonar() retorna el mismo objeto (el servicio HTTP lo comparte entre hilos):
+    las operaciones que consultan y luego cambian el estado toman un lock.
+    """
+
+    nombre = 'Memoria (Fallback)'
+
+    def __init__(self, diario=None):
+        """
+        diario: DiarioMemoria opcional para sobrevivir a reinicios
+        """
+        self._lock = threading.RLock()
+        self._inicializar({
+            'ABC123': Residente('Juan Pérez', '101', 1),
+            'DEF456': Residente('María Gómez', '202', 2),
+            'GHI789': Residente('Carlos López', '303', 3),
+            'JKL012': Residente('Ana Martínez', '404', 4),
+            'MNO345': Residente('Pedro Sánchez', '505', 5),
+        }, [6, 7, 8, 9, 10])
+        self.historial_visitantes = HistorialColumnar()
+        self.siguiente_id = 1
+        # Sin base de datos cobra la tarifa por defecto; el espejo sin conexión
+        # comparte el catálogo del repositorio PostgreSQL
+        self.tarifas = CatalogoTarifas()
+
+        self.diario = diario
+        if diario is not None:
+            self._recuperar()
+
+    def _inicializar(self, residentes, parqueaderos_visitantes):
+        """Reemplaza residentes y parqueaderos de visitantes, todos estos libres y sin visitantes"""
+        self.residentes = residentes  # placa -> Residente
+        self.residentes_ocupados = sum(1 for r in residentes.values() if r.estado == 'OCUPADO')
+        self.parqueaderos_visitantes = OcupacionParqueaderos(parqueaderos_visitantes)
+        self.visitantes = {}  # placa -> RegistroActivo
+        self.registros = {}   # id -> RegistroActivo
+
+    # ============= EVENTOS Y DIARIO =============
+
+    def _registrar(self, evento, sincronizar=False):
+        """Escribe el evento en el diario (si hay) y luego lo aplica en memoria"""
+        if self.diario is not None:
+            self.diario.escribir(evento, sincronizar)
+        self._aplicar(evento)
+        if self.diario is not None and self.diario.necesita_snapshot():
+            self.diario.guardar_snapshot(self._estado())
+
+    def _aplicar(self, evento):
+        """Aplica un evento; es la única función que modifica el estado (también al recuperar)"""
+        op = evento['op']
+        if op == 'estado_residente':
+            residente = self.residentes[evento['placa']]
+            if residente.estado != evento['estado']:
+                self.residentes_ocupados += 1 if evento['estado'] == 'OCUPADO' else -1
+                residente.estado = evento['estado']
+
+        elif op == 'entrada_visitante':
+            parqueadero = evento['parqueadero']
+            self.parqueaderos_visitantes.ocupar(parqueadero)
+            registro = RegistroActivo(evento['id'], evento['placa'], evento.get('parqueadero_id', parqueadero),
+                                      parqueadero, normalizar_hora(evento['hora_entrada']))
+            self.visitantes[registro.placa] = registro
+            self.registros[registro.id] = registro
+            if isinstance(registro.id, int):
+                self.siguiente_id = max(self.siguiente_id, registro.id + 1)
+
+        elif op == 'salida_visitante':
+            registro = self.registros.pop(evento['id'])
+            del self.visitantes[registro.placa]
+            self.parqueaderos_visitantes.liberar(registro.parqueadero)
+            self.historial_visitantes.agregar(registro.id, registro.placa, registro.parqueadero,
+                                              registro.hora_entrada, normalizar_hora(evento['hora_salida']),
+                                              evento['total_horas'], evento['valor_pagado'])
+
+    def _estado(self):
+        """Estado completo serializable para el snapshot del diario"""
+        def serializar(registro):
+            return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in registro.items()}
+        return {
+            'residentes': {placa: r.estado for placa, r in self.residentes.items()},
+            'visitantes': [serializar(r.como_dict()) for r in self.registros.values()],
+            'historial': [serializar(r) for r in self.historial_visitantes.filas()],
+            'siguiente_id': self.siguiente_id,
+        }
+
+    def _recuperar(self):
+        """Carga el último snapshot y reaplica los eventos posteriores del diario"""
+        estado, eventos = self.diario.recuperar()
+        if estado is not None:
+            for placa, estado_residente in estado['residentes'].items():
+                if placa in self.residentes:
+                    self._aplicar({'op': 'estado_residente', 'placa': placa, 'estado': estado_residente})
+            for registro in estado['visitantes']:
+                self._aplicar(dict(registro, op='entrada_visitante'))
+            self.historial_visitantes = HistorialColumnar(
+                dict(r, hora_entrada=normalizar_hora(r['hora_entrada']),
+                     hora_salida=normalizar_hora(r['hora_salida']))
+                for r in estado['historial'])
+            self.siguiente_id = max(self.siguiente_id, estado['siguiente_id'])
+
+        for evento in eventos:
+            self._aplicar(evento)
+        if estado is not None or eventos:
+            print(f"📒 Datos en memoria recuperados del diario: {len(self.visitantes)} visitantes activos, "
+                  f"{len(self.historial_visitantes)} salidas ({len(eventos)} eventos reaplicados)")
+
+    def _nuevo_id(self):
+        return self.siguiente_id
+
+    # ============= OPERACIONES =============
+
+    def clasificar_placa(self, placa):
+        if placa in self.residentes:
+            return dict(self.residentes[placa].como_dict(), tipo='RESIDENTE', placa=placa)
+        if placa in self.visitantes:
+            return dict(self.visitantes[placa].como_dict(), tipo='VISITANTE')
+        return {'tipo': 'DESCONOCIDO', 'placa': placa}
+
+    def _cambiar_estado_residente(self, placa, estado):
+        residente = self.residentes.get(placa)
+        if residente is None:
+            return {'resultado': 'NO_RESIDENTE', 'nombre': None, 'parqueadero': None}
+        with self._lock:
+            if residente.estado == estado:
+                resultado = f"YA_{estado}"
+            else:
+                resultado = 'OK'
+                self._registrar({'op': 'estado_residente', 'placa': placa, 'estado': estado})
+        return {'resultado': resultado, 'nombre': residente.nombre, 'parqueadero': residente.parqueadero}
+
+    def entrada_residente(self, placa):
+        return self._cambiar_estado_residente(placa, 'OCUPADO')
+
+    def salida_residente(self, placa):
+        return self._cambiar_estado_residente(placa, 'LIBRE')
+
+    def entrada_visitante(self, placa):
+        if placa in self.residentes:
+            return {'resultado': 'RESIDENTE'}
+        with self._lock:
+            if placa in self.visitantes:
+                return {'resultado': 'ACTIVO'}
+            parqueadero = self.parqueaderos_visitantes.primero_libre()
+            if parqueadero is None:
+                return {'resultado': 'SIN_CUPO'}
+
+            self._registrar({'op': 'entrada_visitante', 'id': self._nuevo_id(), 'placa': placa,
+                             'parqueadero': parqueadero, 'hora_entrada': datetime.now().isoformat()})
+            registro = self.visitantes[placa]
+        return {'resultado': 'OK', 'registro_id': registro.id, 'parqueadero_id': parqueadero,
+                'parqueadero': parqueadero, 'hora_entrada': registro.hora_entrada}
+
+    def visitante_activo(self, placa):
+        registro = self.visitantes.get(placa)
+        return registro.como_dict() if registro else None
+
+    def salida_visitante(self, registro_id, parqueadero_id):
+        with self._lock:
+            registro = self.registros.get(registro_id)
+            if registro is None:
+                return None
+
+            hora_salida = datetime.now()
+            salida = dict(self.tarifas.liquidar(registro.parqueadero, registro.hora_entrada, hora_salida),
+                          hora_salida=hora_salida)
+            # El cobro se sincroniza a disco antes de confirmarlo en pantalla
+            self._registrar({'op': 'salida_visitante', 'id': registro_id,
+                             'hora_salida': hora_salida.isoformat(),
+                             'total_horas': salida['total_horas'],
+                             'valor_pagado': salida['valor_pagado']}, sincronizar=True)
+        return salida
+
+    def plan_tarifa(self, parqueadero=None):
+        return self.tarifas.plan(parqueadero)
+
+    def catalogo_tarifas(self):
+        return self.tarifas
+
+    def visitantes_activos(self):
+        activos = sorted(self.visitantes.values(), key=lambda r: r.hora_entrada)
+        return [{'id': r.id, 'placa': r.placa, 'hora_entrada': r.hora_entrada,
+                 'parqueadero': r.parqueadero} for r in activos]
+
+    def estado_parqueaderos(self):
+        filas = [{'numero': r.parqueadero, 'estado': r.estado, 'residente': r.nombre,
+                  'apartamento': r.apartamento, 'placa': placa, 'hora_entrada': None}
+                 for placa, r in self.residentes.items()]
+
+        por_parqueadero = {r.parqueadero: r for r in self.visitantes.values()}
+        for numero in self.parqueaderos_visitantes:
+            visitante = por_parqueadero.get(numero)
+            filas.append({'numero': numero, 'estado': 'OCUPADO' if visitante else 'LIBRE',
+                          'residente': None, 'apartamento': None,
+                          'placa': visitante.placa if visitante else None,
+                          'hora_entrada': visitante.hora_entrada if visitante else None})
+        return sorted(filas, key=lambda f: f['numero'])
+
+    def estadisticas(self):
+        return {
+            'total_parqueaderos': len(self.residentes) + len(self.parqueaderos_visitantes),
+            'ocupados': self.residentes_ocupados + len(self.visitantes),
+            'visitantes_activos': len(self.visitantes),
+            'total_recaudado': self.historial_visitantes.total_recaudado,
+            'recaudado_hoy': self.historial_visitantes.recaudo_del_dia(datetime.now().date()),
+        }
+
+    # Las columnas del historial se reemplazan al crecer: se leen con el lock
+
+    def pagina_historial(self, despues=None, tamano=100, placa=None, desde=None, hasta=None):
+        with self._lock:
+            return self.historial_visitantes.pagina(despues, tamano, placa, desde, hasta)
+
+    def resumen_diario(self, desde, hasta):
+        with self._lock:
+            return self.historial_visitantes.resumen_diario(desde, hasta)
+
+    def intervalos_visitantes(self, desde, hasta):
+        with self._lock:
+            visitas = self.historial_visitantes.intervalos(desde, hasta)
+            visitas += [(r.parqueadero, r.hora_entrada, None) for r in self.registros.values()
+                        if r.hora_entrada < hasta]
+        return visitas
+
+    def cerrar(self):
+        if self.diario is not None:
+            self.diario.cerrar()
+
+# =============================================================================
+# REPOSITORIO POSTGRESQL
+# =============================================================================
+
+class RepositorioPostgreSQL(Repositorio):
+    """
+    Repositorio sobre PostgreSQLManager. Las placas de residentes se resuelven
+    con el DirectorioPlacas local y los planes de tarifa con el CatalogoTarifas;
+    las escrituras van siempre al servidor.
+    """
+
+    nombre = 'PostgreSQL'
+    remoto = True
+
+    def __init__(self, manager, directorio=None, tarifas=None):
+        """
+        manager: PostgreSQLManager conectado
+        directorio: DirectorioPlacas compartido entre los clones del repositorio
+        tarifas: CatalogoTarifas compartido entre los clones del repositorio
+        """
+        self.manager = manager
+        # Los clones comparten el directorio; lo cierra el repositorio que lo creó
+        self._directorio_propio = directorio is None
+        self.directorio = directorio or DirectorioPlacas(manager)
+        self.tarifas = tarifas or CatalogoTarifas(manager)
+
+    @property
+    def conectado(self):
+        return self.manager.conectado
+
+    def verificar_conexion(self):
+        return self.manager.verificar_conexion()
+
+    def clonar(self):
+        """Abre otra conexión que comparte el directorio de placas"""
+        return RepositorioPostgreSQL(PostgreSQLManager(self.manager.config), self.directorio, self.tarifas)
+
+    def refrescar(self):
+        # Particiones y recaudo_mensual al cambiar de mes; el resto del mes solo compara la fecha
+        self.manager.mantenimiento_mensual()
+        tarifas = self.tarifas.refrescar_si_cambio(self.manager)
+        return self.directorio.refrescar_si_cambio(self.manager, self._suscribir_estado_residentes) or tarifas
+
+    def plan_tarifa(self, parqueadero=None):
+        return self.tarifas.plan(parqueadero)
+
+    def catalogo_tarifas(self):
+        return self.tarifas
+
+    def metricas(self):
+        return self.directorio.metricas()
+
+    def _escuchar(self, canal):
+        """Conexión de solo lectura aparte suscrita al canal, o None si no se pudo abrir"""
+        manager = PostgreSQLManager(dict(self.manager.config, solo_lectura=True), conectar=False)
+        if manager.reconectar() and manager.escuchar(canal):
+            return manager
+        manager.cerrar()
+        return None
+
+    def suscribir_cambios(self):
+        """Conexión de solo lectura aparte que escucha los avisos de los triggers de ocupación"""
+        return self._escuchar(CANAL_ESTADISTICAS)
+
+    def _suscribir_estado_residentes(self):
+        return self._escuchar(CANAL_ESTADO_RESIDENTES)
+
+    def _buscar_residente(self, placa):
+        if self.directorio.cargado:
+            return self.directorio.buscar(placa)
+        residente = self.manager.verificar_placa_residente(placa)
+        return dict(residente) if residente else None
+
+    def clasificar_placa(self, placa):
+        # Residentes desde el directorio local; solo las placas desconocidas van a la base de datos
+        residente = self._buscar_residente(placa)
+        if residente is not None:
+            return dict(residente, tipo='RESIDENTE')
+
+        clasificacion = self.manager.clasificar_placa(placa)
+        if clasificacion is None:
+            return None
+        clasificacion = dict(clasificacion)
+        if clasificacion['tipo'] == 'VISITANTE':
+            clasificacion['hora_entrada'] = normalizar_hora(clasificacion['hora_entrada'])
+        return clasificacion
+
+    def _cambiar_estado_residente(self, placa, estado):
+        resultado = self.manager.cambiar_estado_residente(placa, estado)
+        if resultado and resultado['resultado'] != 'NO_RESIDENTE':
+            self.directorio.actualizar_estado(placa, estado)
+        return resultado
+
+    def entrada_residente(self, placa):
+        return self._cambiar_estado_residente(placa, 'OCUPADO')
+
+    def salida_residente(self, placa):
+        return self._cambiar_estado_residente(placa, 'LIBRE')
+
+    def entrada_visitante(self, placa):
+        entrada = self.manager.asignar_entrada_visitante(placa)
+        return dict(entrada) if entrada else None
+
+    def visitante_activo(self, placa):
+        visitante = self.manager.obtener_visitante_activo_por_placa(placa)
+        if not visitante:
+            return None
+        return dict(visitante, hora_entrada=normalizar_hora(visitante['hora_entrada']))
+
+    def salida_visitante(self, registro_id, parqueadero_id):
+        salida = self.manager.registrar_salida_visitante(registro_id, parqueadero_id)
+        return dict(salida) if salida else None
+
+    def visitantes_activos(self):
+        return [dict(v, hora_entrada=normalizar_hora(v['hora_entrada']))
+                for v in self.manager.obtener_visitantes_activos()]
+
+    def estado_parqueaderos(self):
+        return [{'numero': p['numero'], 'estado': p['estado'], 'residente': p['residente'],
+                 'apartamento': p['apartamento'], 'placa': p['placa'],
+                 'hora_entrada': normalizar_hora(p['hora_entrada']) if p['hora_entrada'] else None}
+                for p in self.manager.obtener_estado_parqueaderos()]
+
+    def estadisticas(self):
+        return self.manager.obtener_estadisticas()
+
+    def pagina_historial(self, despues=None, tamano=100, placa=None, desde=None, hasta=None):
+        filas = self.manager.obtener_historial_visitantes(tamano, despues, placa, desde, hasta)
+        return [dict(r) for r in filas] if filas is not None else None
+
+    def resumen_diario(self, desde, hasta):
+        filas = self.manager.obtener_resumen_diario(desde, hasta)
+        return [dict(f) for f in filas] if filas is not None else None
+
+    def intervalos_visitantes(self, desde, hasta):
+        return self.manager.obtener_intervalos_visitantes(desde, hasta)
+
+    def exportar_historial_csv(self, salida, desde=None, hasta=None):
+        return self.manager.exportar_historial_csv(salida, desde, hasta)
+
+    def importar_residentes_csv(self, entrada):
+        resumen = self.manager.importar_residentes_csv(entrada)
+        if resumen is not None:
+            self.refrescar()
+        return resumen
+
+    def guardar_plan_tarifa(self, clase, nombre, definicion):
+        plan_id = self.manager.guardar_plan_tarifa(clase, nombre, definicion)
+        if plan_id is not None:
+            self.refrescar()
+        return plan_id
+
+    def cerrar(self):
+        if self._directorio_propio:
+            self.directorio.cerrar()
+        self.manager.cerrar()
+
+# =============================================================================
+# FÁBRICA
+# =============================================================================
+
+def crear_repositorio(config=None):
+    """
+    Crea el repositorio según config['motor']:
+        'sqlite': archivo local config['ruta'] (por defecto control_acceso.db)
+        'api': servicio HTTP/JSON (servicio_api.py) en config['url'], con config['token']
+            (o CONTROL_ACCESO_TOKEN) para las escrituras
+        'postgresql' (por defecto): servidor PostgreSQL. Con config['sincronizacion']
+            (activo por defecto) sigue operando sin conexión y encola las operaciones
+            en config['cola'] para enviarlas al reconectar. Con config['meses_en_linea']
+            los meses más viejos del historial se archivan al cambiar de mes
+    Si no se puede abrir, retorna el repositorio en memoria con diario
+    """
+    config = config or {}
+    if config.get('motor') == 'sqlite':
+        from repositorio_sqlite import RepositorioSQLite
+        repo = RepositorioSQLite(config.get('ruta', 'control_acceso.db'))
+        return repo if repo.conectado else crear_repositorio_memoria(config)
+    if config.get('motor') == 'api':
+        from cliente_api import RepositorioRemoto
+        repo = RepositorioRemoto(config.get('url', 'http://localhost:8080'), token=config.get('token'))
+        return repo if repo.verificar_conexion() else crear_repositorio_memoria(config)
+    
+    manager = PostgreSQLManager(config)
+    if config.get('sincronizacion', True):
+        from sincronizacion import RepositorioSincronizado, Sincronizador
+        try:
+            return RepositorioSincronizado(RepositorioPostgreSQL(manager),
+                                           Sincronizador(config, en_linea=manager.conectado))
+        except Exception as e:
+            print(f"⚠️ No se pudo abrir la cola de sincronización: {e}")
+    if manager.conectado:
+        return RepositorioPostgreSQL(manager)
+    return crear_repositorio_memoria(config)
+
+def crear_repositorio_memoria(config=None):
+    """
+    Repositorio en memoria con diario en config['diario'] (por defecto
+    control_acceso_memoria.diario); config['diario'] = None lo desactiva
+    """
+    config = config or {}
+    ruta = config.get('diario', 'control_acceso_memoria.diario')
+    if not ruta:
+        return RepositorioMemoria()
+    try:
+        return RepositorioMemoria(DiarioMemoria(ruta))
+    except Exception as e:
+        print(f"⚠️ No se pudo abrir el diario {ruta}, los datos en memoria no se guardarán: {e}")
+        return RepositorioMemoria()
@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+"""Repositorio SQLite embebido para instalaciones de una sola portería"""
+
+import csv
+import io
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from repositorio import Repositorio, normalizar_hora
+from tarifas import LIMITE_TARIFA_POR_HORA_US, sql_cobro_sqlite
+
+# =============================================================================
+# ESQUEMA SQLITE
+# =============================================================================
+
+VERSION_ESQUEMA_SQLITE = 4
+
+def _sql_duracion_us(entrada, salida):
+    """
+    Duración en microsegundos enteros entre dos horas de texto ISO: segundos de
+    strftime más la fracción del texto, para que el techo de horas coincida con
+    PostgreSQL aun con salidas de pocos milisegundos
+    """
+    return (f"(strftime('%s', {salida}) - strftime('%s', {entrada})) * 1000000 "
+            f"+ CAST(ROUND((COALESCE(CAST(substr({salida}, 20) AS REAL), 0) "
+            f"- COALESCE(CAST(substr({entrada}, 20) AS REAL), 0)) * 1000000) AS INTEGER)")
+
+SQL_TOTAL_HORAS, SQL_VALOR_PAGADO = sql_cobro_sqlite('us')
+
+# Equivalente del esquema PostgreSQL (migraciones 1-3 y 6). Las horas se guardan como
+# texto ISO en hora local, igual que TIMESTAMP sin zona horaria en PostgreSQL
+ESQUEMA_SQLITE = """
+    CREATE TABLE IF NOT EXISTS residentes (
+        id INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        apartamento TEXT NOT NULL,
+        created_at TEXT DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+    );
+
+    CREATE TABLE IF NOT EXISTS parqueaderos (
+        id INTEGER PRIMARY KEY,
+        numero INTEGER UNIQUE NOT NULL,
+        estado TEXT CHECK (estado IN ('LIBRE','OCUPADO')) DEFAULT 'LIBRE',
+        residente_id INTEGER UNIQUE REFERENCES residentes(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS placas (
+        id INTEGER PRIMARY KEY,
+        residente_id INTEGER NOT NULL REFERENCES residentes(id) ON DELETE CASCADE,
+        placa TEXT UNIQUE NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS registros_visitantes (
+        id INTEGER PRIMARY KEY,
+        placa TEXT NOT NULL,
+        parqueadero_id INTEGER REFERENCES parqueaderos(id),
+        hora_entrada TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')),
+        hora_salida TEXT,
+        total_horas REAL,
+        valor_pagado INTEGER
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_registros_activos_placa
+        ON registros_visitantes (placa, hora_entrada DESC) WHERE hora_salida IS NULL;
+    CREATE INDEX IF NOT EXISTS idx_registros_hora_salida
+        ON registros_visitantes (hora_salida DESC, id DESC) WHERE hora_salida IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS idx_registros_historial_placa
+        ON registros_visitantes (placa, hora_salida DESC, id DESC) WHERE hora_salida IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS idx_registros_fecha_salida
+        ON registros_visitantes (date(hora_salida));
+    CREATE INDEX IF NOT EXISTS idx_registros_parqueadero
+        ON registros_visitantes (parqueadero_id);
+    CREATE INDEX IF NOT EXISTS idx_parqueaderos_visitantes_libres
+        ON parqueaderos (numero) WHERE residente_id IS NULL AND estado = 'LIBRE';
+    CREATE INDEX IF NOT EXISTS idx_placas_residente
+        ON placas (residente_id);
+
+    -- Mismo cálculo que la función calcular_pago de PostgreSQL (tarifas.py)
+    DROP TRIGGER IF EXISTS trigger_calculo_pago;
+    CREATE TRIGGER trigger_calculo_pago
+    AFTER UPDATE OF hora_salida ON registros_visitantes
+    WHEN NEW.hora_salida IS NOT NULL
+    BEGIN
+        UPDATE registros_visitantes
+        SET total_horas = {total_horas},
+            valor_pagado = {valor_pagado}
+        FROM (SELECT {duracion} AS us)
+        WHERE id = NEW.id;
+    END;
+
+    -- Recaudo total mantenido por triggers: las estadísticas del pie de la ventana
+    -- (cada 2 segundos) no suman todo el historial. Al crearlo se parte de la suma actual
+    CREATE TABLE IF NOT EXISTS recaudo_total (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO recaudo_total (id, total)
+    SELECT 1, COALESCE(SUM(valor_pagado), 0) FROM registros_visitantes;
+
+    DROP TRIGGER IF EXISTS trigger_recaudo_total_insercion;
+    CREATE TRIGGER trigger_recaudo_total_insercion
+    AFTER INSERT ON registros_visitantes
+    WHEN NEW.valor_pagado IS NOT NULL
+    BEGIN
+        UPDATE recaudo_total SET total = total + NEW.valor_pagado WHERE id = 1;
+    END;
+
+    DROP TRIGGER IF EXISTS trigger_recaudo_total_cobro;
+    CREATE TRIGGER trigger_recaudo_total_cobro
+    AFTER UPDATE OF valor_pagado ON registros_visitantes
+    WHEN COALESCE(NEW.valor_pagado, 0) != COALESCE(OLD.valor_pagado, 0)
+    BEGIN
+        UPDATE recaudo_total
+        SET total = total + COALESCE(NEW.valor_pagado, 0) - COALESCE(OLD.valor_pagado, 0)
+        WHERE id = 1;
+    END;
+
+    DROP TRIGGER IF EXISTS trigger_recaudo_total_borrado;
+    CREATE TRIGGER trigger_recaudo_total_borrado
+    AFTER DELETE ON registros_visitantes
+    WHEN OLD.valor_pagado IS NOT NULL
+    BEGIN
+        UPDATE recaudo_total SET total = total - OLD.valor_pagado WHERE id = 1;
+    END;
+""".format(total_horas=SQL_TOTAL_HORAS, valor_pagado=SQL_VALOR_PAGADO,
+           duracion=_sql_duracion_us('NEW.hora_entrada', 'NEW.hora_salida'))
+
+# Datos iniciales: los mismos de PostgreSQLManager.insertar_datos_iniciales
+RESIDENTES_INICIALES = [
+    ('Juan Pérez', '101', 'ABC123'),
+    ('María Gómez', '202', 'DEF456'),
+    ('Carlos López', '303', 'GHI789'),
+    ('Ana Martínez', '404', 'JKL012'),
+    ('Pedro Sánchez', '505', 'MNO345'),
+]
+PARQUEADEROS_VISITANTES_INICIALES = range(6, 11)
+
+# =============================================================================
+# CONSULTAS
+# =============================================================================
+# Cadenas constantes: sqlite3 guarda cada sentencia preparada en la caché de la
+# conexión y la reutiliza en las siguientes llamadas
+
+SQL_RESIDENTE = """
+    SELECT p.id, p.numero AS parqueadero, p.estado, r.nombre, r.apartamento
+    FROM placas pl
+    JOIN residentes r ON pl.residente_id = r.id
+    JOIN parqueaderos p ON p.residente_id = r.id
+    WHERE pl.placa = ?
+"""
+
+SQL_VISITANTE_ACTIVO = """
+    SELECT rv.id, rv.placa, rv.hora_entrada, rv.parqueadero_id, p.numero AS parqueadero
+    FROM registros_visitantes rv
+    JOIN parqueaderos p ON rv.parqueadero_id = p.id
+    WHERE rv.placa = ? AND rv.hora_salida IS NULL
+    ORDER BY rv.hora_entrada DESC
+    LIMIT 1
+"""
+
+SQL_PARQUEADERO_LIBRE = """
+    SELECT id, numero FROM parqueaderos
+    WHERE residente_id IS NULL AND estado = 'LIBRE'
+    ORDER BY numero
+    LIMIT 1
+"""
+
+SQL_VISITANTES_ACTIVOS = """
+    SELECT rv.id, rv.placa, rv.hora_entrada, p.numero AS parqueadero
+    FROM registros_visitantes rv
+    JOIN parqueaderos p ON rv.parqueadero_id = p.id
+    WHERE rv.hora_salida IS NULL
+    ORDER BY rv.hora_entrada
+"""
+
+SQL_ESTADO_PARQUEADEROS = """
+    SELECT p.numero, p.estado, r.nombre AS residente, r.apartamento,
+           COALESCE(pl.placa, rv.placa) AS placa, rv.hora_entrada
+    FROM parqueaderos p
+    LEFT JOIN residentes r ON p.residente_id = r.id
+    LEFT JOIN (SELECT residente_id, MIN(id) AS id FROM placas GROUP BY residente_id) primera
+           ON primera.residente_id = r.id
+    LEFT JOIN placas pl ON pl.id = primera.id
+    LEFT JOIN registros_visitantes rv ON rv.parqueadero_id = p.id AND rv.hora_salida IS NULL
+    ORDER BY p.numero
+"""
+
+SQL_ESTADISTICAS = """
+    SELECT (SELECT COUNT(*) FROM parqueaderos) AS total_parqueaderos,
+           (SELECT COUNT(*) FROM parqueaderos WHERE estado = 'OCUPADO') AS ocupados,
+           (SELECT COUNT(*) FROM registros_visitantes WHERE hora_salida IS NULL) AS visitantes_activos,
+           (SELECT total FROM recaudo_total WHERE id = 1) AS total_recaudado,
+           (SELECT COALESCE(SUM(valor_pagado), 0) FROM registros_visitantes
+            WHERE date(hora_salida) = date('now', 'localtime')) AS recaudado_hoy
+"""
+
+# Página del historial por clave (hora_salida, id). Los filtros se agregan solo si
+# se usan para que el planificador elija el índice; cada combinación queda en la
+# caché de sentencias. GLOB distingue mayúsculas y puede usar el índice por placa
+SQL_HISTORIAL = """
+    SELECT rv.id, rv.placa, rv.hora_entrada, rv.hora_salida,
+           rv.total_horas, rv.valor_pagado, p.numero AS parqueadero
+    FROM registros_visitantes rv
+    JOIN parqueaderos p ON rv.parqueadero_id = p.id
+    WHERE rv.hora_salida IS NOT NULL {filtros}
+    ORDER BY rv.hora_salida DESC, rv.id DESC
+    LIMIT :limite
+"""
+
+FILTROS_HISTORIAL = {
+    'hora_salida': "AND (rv.hora_salida, rv.id) < (:hora_salida, :id)",
+    'placa': "AND rv.placa GLOB :placa",
+    'desde': "AND rv.hora_salida >= :desde",
+    'hasta': "AND rv.hora_salida < :hasta",
+}
+
+# Ingresos por día; la duración se mide en microsegundos enteros como en el trigger
+# para clasificar igual que PostgreSQL las salidas de exactamente 5 horas
+SQL_RESUMEN_DIARIO = f"""
+    SELECT fecha, COUNT(*) AS salidas, COALESCE(SUM(total_horas), 0) AS horas,
+           COALESCE(SUM(valor_pagado), 0) AS recaudo,
+           SUM(us <= {LIMITE_TARIFA_POR_HORA_US}) AS salidas_por_hora,
+           COALESCE(SUM(CASE WHEN us <= {LIMITE_TARIFA_POR_HORA_US} THEN valor_pagado END), 0) AS recaudo_por_hora,
+           SUM(us > {LIMITE_TARIFA_POR_HORA_US}) AS salidas_tarifa_plena,
+           COALESCE(SUM(CASE WHEN us > {LIMITE_TARIFA_POR_HORA_US} THEN valor_pagado END), 0) AS recaudo_tarifa_plena
+    FROM (SELECT date(hora_salida) AS fecha, total_horas, valor_pagado,
+                 {_sql_duracion_us('hora_entrada', 'hora_salida')} AS us
+          FROM registros_visitantes
+          WHERE hora_salida >= :desde AND hora_salida < :hasta)
+    GROUP BY fecha
+    ORDER BY fecha
+"""
+
+SQL_INTERVALOS_VISITANTES = """
+    SELECT p.numero, rv.hora_entrada, rv.hora_salida
+    FROM registros_visitantes rv
+    JOIN parqueaderos p ON rv.parqueadero_id = p.id
+    WHERE rv.hora_entrada < :hasta AND (rv.hora_salida IS NULL OR rv.hora_salida > :desde)
+"""
+
+def _ahora():
+    """Hora local en el formato de texto que usan las columnas de horas"""
+    return _texto_hora(datetime.now())
+
+def _texto_hora(hora):
+    return hora.isoformat(sep=' ', timespec='microseconds')
+
+# =============================================================================
+# REPOSITORIO SQLITE
+# =============================================================================
+
+class RepositorioSQLite(Repositorio):
+    """
+    Almacenamiento en un archivo SQLite local: sin servidor, durable y con el
+    mismo comportamiento que PostgreSQL. Usa WAL para que las lecturas no
+    bloqueen las escrituras y BEGIN IMMEDIATE para que dos hilos no asignen el
+    mismo parqueadero.
+    """
+
+    nombre = 'SQLite'
+
+    def __init__(self, ruta='control_acceso.db'):
+        self.ruta = ruta
+        self.connection = None
+        self._lock = threading.Lock()
+        self.conectar()
+
+    @property
+    def conectado(self):
+        return self.connection is not None
+
+    def conectar(self):
+        """Abre el archivo y crea el esquema si es una base de datos nueva"""
+        try:
+            # isolation_level=None: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+            self.connection = sqlite3.connect(self.ruta, isolation_level=None,
+                                              check_same_thread=False, cached_statements=64)
+            self.connection.row_factory = sqlite3.Row
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            # FULL: cada COMMIT sincroniza el WAL a disco; un cobro confirmado no se pierde
+            # ni por un corte de energía (el volumen de escrituras de una portería es bajo)
+            self.connection.execute("PRAGMA synchronous = FULL")
+            self.connection.execute("PRAGMA foreign_keys = ON")
+            self.connection.execute("PRAGMA busy_timeout = 5000")
+
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version < VERSION_ESQUEMA_SQLITE:
+                self.crear_estructura_bd()
+            print(f"✅ Base de datos SQLite abierta en {self.ruta}")
+            return True
+        except Exception as e:
+            print(f"❌ Error abriendo SQLite: {e}")
+            self.connection = None
+            return False
+
+    def crear_estructura_bd(self):
+        """Crea tablas, índices y trigger, e inserta los datos iniciales"""
+        with self._transaccion() as cur:
+            cur.execute("PRAGMA user_version")
+            if cur.fetchone()[0] >= VERSION_ESQUEMA_SQLITE:
+                return
+            for sentencia in _dividir_script(ESQUEMA_SQLITE):
+                cur.execute(sentencia)
+
+            cur.execute("SELECT COUNT(*) FROM residentes")
+            if cur.fetchone()[0] == 0:
+                for i, (nombre, apto, placa) in enumerate(RESIDENTES_INICIALES):
+                    cur.execute("INSERT INTO residentes (nombre, apartamento) VALUES (?, ?)", (nombre, apto))
+                    residente_id = cur.lastrowid
+                    cur.execute("INSERT INTO parqueaderos (numero, residente_id) VALUES (?, ?)",
+                                (i + 1, residente_id))
+                    cur.execute("INSERT INTO placas (residente_id, placa) VALUES (?, ?)",
+                                (residente_id, placa))
+                cur.executemany("INSERT INTO parqueaderos (numero) VALUES (?)",
+                                [(n,) for n in PARQUEADEROS_VISITANTES_INICIALES])
+            cur.execute(f"PRAGMA user_version = {VERSION_ESQUEMA_SQLITE}")
+        print(f"✅ Estructura SQLite creada (versión {VERSION_ESQUEMA_SQLITE})")
+
+    @contextmanager
+    def _transaccion(self):
+        """Transacción de escritura: toma el bloqueo del archivo desde el inicio"""
+        with self._lock:
+            cur = self.connection.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            else:
+                cur.execute("COMMIT")
+            finally:
+                cur.close()
+
+    def _consultar(self, sql, parametros=(), uno=False):
+        with self._lock:
+            cur = self.connection.execute(sql, parametros)
+            return cur.fetchone() if uno else cur.fetchall()
+
+    def clonar(self):
+        """Otra conexión al mismo archivo (WAL permite lectores concurrentes)"""
+        return RepositorioSQLite(self.ruta)
+
+    # ============= OPERACIONES =============
+
+    def clasificar_placa(self, placa):
+        try:
+            residente = self._consultar(SQL_RESIDENTE, (placa,), uno=True)
+            if residente:
+                return {'tipo': 'RESIDENTE', 'placa': placa, 'nombre': residente['nombre'],
+                        'apartamento': residente['apartamento'],
+                        'parqueadero': residente['parqueadero'], 'estado': residente['estado']}
+            visitante = self.visitante_activo(placa)
+            if visitante:
+                return dict(visitante, tipo='VISITANTE')
+            return {'tipo': 'DESCONOCIDO', 'placa': placa}
+        except Exception as e:
+            print(f"Error en clasificar_placa: {e}")
+            return None
+
+    def _cambiar_estado_residente(self, placa, estado):
+        try:
+            with self._transaccion() as cur:
+                residente = cur.execute(SQL_RESIDENTE, (placa,)).fetchone()
+                if residente is None:
+                    return {'resultado': 'NO_RESIDENTE', 'nombre': None, 'parqueadero': None}
+                cur.execute("UPDATE parqueaderos SET estado = ? WHERE id = ? AND estado <> ?",
+                            (estado, residente['id'], estado))
+                resultado = 'OK' if cur.rowcount else f"YA_{estado}"
+                return {'resultado': resultado, 'nombre': residente['nombre'],
+                        'parqueadero': residente['parqueadero']}
+        except Exception as e:
+            print(f"Error cambiando estado del parqueadero de residente: {e}")
+            return None
+
+    def entrada_residente(self, placa):
+        return self._cambiar_estado_residente(placa, 'OCUPADO')
+
+    def salida_residente(self, placa):
+        return self._cambiar_estado_residente(placa, 'LIBRE')
+
+    def entrada_visitante(self, placa):
+        try:
+            with self._transaccion() as cur:
+                if cur.execute(SQL_RESIDENTE, (placa,)).fetchone():
+                    return {'resultado': 'RESIDENTE'}
+                if cur.execute(SQL_VISITANTE_ACTIVO, (placa,)).fetchone():
+                    return {'resultado': 'ACTIVO'}
+                libre = cur.execute(SQL_PARQUEADERO_LIBRE).fetchone()
+                if libre is None:
+                    return {'resultado': 'SIN_CUPO'}
+
+                hora_entrada = _ahora()
+                cur.execute("INSERT INTO registros_visitantes (placa, parqueadero_id, hora_entrada) "
+                            "VALUES (?, ?, ?)", (placa, libre['id'], hora_entrada))
+                registro_id = cur.lastrowid
+                cur.execute("UPDATE parqueaderos SET estado = 'OCUPADO' WHERE id = ?", (libre['id'],))
+            return {'resultado': 'OK', 'registro_id': registro_id, 'parqueadero_id': libre['id'],
+                    'parqueadero': libre['numero'], 'hora_entrada': normalizar_hora(hora_entrada)}
+        except Exception as e:
+            print(f"Error asignando parqueadero a visitante: {e}")
+            return None
+
+    def visitante_activo(self, placa):
+        try:
+            fila = self._consultar(SQL_VISITANTE_ACTIVO, (placa,), uno=True)
+        except Exception as e:
+            print(f"Error obteniendo visitante activo: {e}")
+            return None
+        if fila is None:
+            return None
+        return dict(fila, hora_entrada=normalizar_hora(fila['hora_entrada']))
+
+    def salida_visitante(self, registro_id, parqueadero_id):
+        try:
+            with self._transaccion() as cur:
+                # El trigger calcula total_horas y valor_pagado
+                cur.execute("UPDATE registros_visitantes SET hora_salida = ? "
+                            "WHERE id = ? AND hora_salida IS NULL", (_ahora(), registro_id))
+                if cur.rowcount == 0:
+                    # El registro ya fue liquidado
+                    return None
+                cur.execute("UPDATE parqueaderos SET estado = 'LIBRE' WHERE id = ?", (parqueadero_id,))
+                fila = cur.execute("SELECT total_horas, valor_pagado, hora_salida "
+                                   "FROM registros_visitantes WHERE id = ?", (registro_id,)).fetchone()
+            return {'total_horas': fila['total_horas'], 'valor_pagado': fila['valor_pagado'],
+                    'hora_salida': normalizar_hora(fila['hora_salida'])}
+        except Exception as e:
+            print(f"Error registrando salida: {e}")
+            return None
+
+    def visitantes_activos(self):
+        try:
+            filas = self._consultar(SQL_VISITANTES_ACTIVOS)
+        except Exception as e:
+            print(f"Error obteniendo visitantes activos: {e}")
+            return []
+        return [dict(f, hora_entrada=normalizar_hora(f['hora_entrada'])) for f in filas]
+
+    def estado_parqueaderos(self):
+        try:
+            filas = self._consultar(SQL_ESTADO_PARQUEADEROS)
+        except Exception as e:
+            print(f"Error obteniendo estado parqueaderos: {e}")
+            return []
+        return [dict(f, hora_entrada=normalizar_hora(f['hora_entrada']) if f['hora_entrada'] else None)
+                for f in filas]
+
+    def estadisticas(self):
+        try:
+            fila = self._consultar(SQL_ESTADISTICAS, uno=True)
+        except Exception as e:
+            print(f"Error obteniendo estadísticas: {e}")
+            # Como PostgreSQLManager.obtener_estadisticas: cifras en cero, no None
+            return {'total_parqueaderos': 0, 'ocupados': 0, 'visitantes_activos': 0,
+                    'total_recaudado': 0.0, 'recaudado_hoy': 0.0}
+        stats = dict(fila)
+        stats['total_recaudado'] = float(stats['total_recaudado'])
+        stats['recaudado_hoy'] = float(stats['recaudado_hoy'])
+        return stats
+
+    def pagina_historial(self, despues=None, tamano=100, placa=None, desde=None, hasta=None):
+        parametros = {
+            'hora_salida': _texto_hora(despues[0]) if despues else None,
+            'id': despues[1] if despues else None,
+            'placa': re.sub(r'([*?\[])', r'[\1]', placa) + '*' if placa else None,
+            'desde': desde.isoformat() if desde else None,
+            'hasta': (hasta + timedelta(days=1)).isoformat() if hasta else None,
+            'limite': tamano,
+        }
+        filtros = ' '.join(sql for nombre, sql in FILTROS_HISTORIAL.items() if parametros[nombre] is not None)
+        try:
+            filas = self._consultar(SQL_HISTORIAL.format(filtros=filtros), parametros)
+        except Exception as e:
+            print(f"Error obteniendo historial: {e}")
+            return None
+        return [dict(f, hora_entrada=normalizar_hora(f['hora_entrada']),
+                     hora_salida=normalizar_hora(f['hora_salida'])) for f in filas]
+
+    def resumen_diario(self, desde, hasta):
+        try:
+            filas = self._consultar(SQL_RESUMEN_DIARIO, {'desde': desde.isoformat(),
+                                                         'hasta': (hasta + timedelta(days=1)).isoformat()})
+        except Exception as e:
+            print(f"Error obteniendo resumen diario: {e}")
+            return None
+        return [dict(f, fecha=datetime.strptime(f['fecha'], '%Y-%m-%d').date()) for f in filas]
+
+    def intervalos_visitantes(self, desde, hasta):
+        try:
+            filas = self._consultar(SQL_INTERVALOS_VISITANTES, {'desde': _texto_hora(desde),
+                                                                'hasta': _texto_hora(hasta)})
+        except Exception as e:
+            print(f"Error obteniendo intervalos de visitantes: {e}")
+            return None
+        return [(numero, datetime.fromisoformat(entrada), datetime.fromisoformat(salida) if salida else None)
+                for numero, entrada, salida in filas]
+
+    def importar_residentes_csv(self, entrada):
+        """
+        Misma carga que PostgreSQLManager.importar_residentes_csv, fila a fila
+        dentro de una sola transacción (en un archivo local no hay viajes de red
+        que ahorrar)
+        """
+        try:
+            texto = io.TextIOWrapper(entrada, encoding='utf-8-sig', newline='')
+            try:
+                filas = [(int(f['parqueadero']) if (f.get('parqueadero') or '').strip() else None,
+                          (f.get('nombre') or '').strip(), (f.get('apartamento') or '').strip(),
+                          (f.get('placa') or '').strip().upper())
+                         for f in csv.DictReader(texto)]
+            finally:
+                texto.detach()
+
+            resumen = {'filas': len(filas), 'residentes_nuevos': 0, 'residentes_actualizados': 0, 'placas': 0}
+            with self._transaccion() as cur:
+                numeros = sorted({f[0] for f in filas if f[0] is not None})
+                cur.executemany("INSERT INTO parqueaderos (numero) VALUES (?) ON CONFLICT (numero) DO NOTHING",
+                                [(n,) for n in numeros])
+                resumen['parqueaderos_nuevos'] = cur.rowcount
+                parqueaderos = {f['numero']: f for f in
+                                cur.execute("SELECT id, numero, residente_id FROM parqueaderos").fetchall()}
+                ocupados = {f[0] for f in cur.execute(
+                    "SELECT parqueadero_id FROM registros_visitantes WHERE hora_salida IS NULL").fetchall()}
+
+                # Titular de cada parqueadero: la primera fila con nombre
+                titulares = {}
+                for numero, nombre, apartamento, _ in filas:
+                    if numero is None or not nombre or numero in titulares:
+                        continue
+                    parqueadero = parqueaderos[numero]
+                    residente_id = parqueadero['residente_id']
+                    if residente_id is not None:
+                        cur.execute("UPDATE residentes SET nombre = ?, apartamento = ? "
+                                    "WHERE id = ? AND (nombre <> ? OR apartamento <> ?)",
+                                    (nombre, apartamento, residente_id, nombre, apartamento))
+                        resumen['residentes_actualizados'] += cur.rowcount
+                    elif parqueadero['id'] in ocupados:
+                        continue
+                    else:
+                        cur.execute("INSERT INTO residentes (nombre, apartamento) VALUES (?, ?)",
+                                    (nombre, apartamento))
+                        residente_id = cur.lastrowid
+                        cur.execute("UPDATE parqueaderos SET residente_id = ? WHERE id = ?",
+                                    (residente_id, parqueadero['id']))
+                        resumen['residentes_nuevos'] += 1
+                    titulares[numero] = residente_id
+
+                placas = {}
+                for numero, _, _, placa in filas:
+                    if placa and numero in titulares:
+                        placas.setdefault(placa, titulares[numero])
+                cur.executemany("""
+                    INSERT INTO placas (residente_id, placa) VALUES (?, ?)
+                    ON CONFLICT (placa) DO UPDATE SET residente_id = excluded.residente_id
+                    WHERE residente_id <> excluded.residente_id
+                """, [(residente_id, placa) for placa, residente_id in placas.items()])
+                resumen['placas'] = cur.rowcount
+
+            resumen['rechazadas'] = sum(1 for numero, nombre, _, placa in filas
+                                        if numero is None or ((nombre or placa) and numero not in titulares))
+            return resumen
+        except Exception as e:
+            print(f"Error importando residentes: {e}")
+            return None
+
+    def cerrar(self):
+        try:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+                print("🔌 Base de datos SQLite cerrada")
+        except Exception as e:
+            print(f"Error cerrando SQLite: {e}")
+
+def _dividir_script(script):
+    """Separa el script en sentencias completas (los triggers contienen ';' internos)"""
+    sentencias, actual = [], ''
+    for linea in script.strip().splitlines():
+        if linea.strip().startswith('--'):
+            continue
+        actual += linea + '\n'
+        if sqlite3.complete_statement(actual):
+            sentencias.append(actual.strip())
+            actual = ''
+    return sentencias
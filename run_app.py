@@ -1,50 +1,45 @@
 # -*- coding: utf-8 -*-
 """Script para ejecutar el Sistema de Control Vehicular - Modo Simplificado (Solo Estadísticas)"""
 
-import sys
-from Vehiculo import SistemaControlAccesoPostgreSQL
+import os
+from tablero_estadisticas import FuenteEstadisticas, TableroEstadisticas
 
 def main():
-    """Ejecuta la aplicación"""
+    """Ejecuta el tablero de estadísticas"""
     print("="*70)
     print("🚗 SISTEMA DE CONTROL DE ACCESO VEHICULAR - MODO SOLO ESTADÍSTICAS")
     print("Conjunto Residencial 'Los Alamos'")
     print("="*70)
     print("\n📊 La aplicación mostrará SOLO ESTADÍSTICAS en tiempo real")
-    print("   Las opciones de entrada/salida han sido deshabilitadas\n")
+    print("   Sesión de solo lectura: no registra entradas/salidas ni modifica la base de datos\n")
+    
+    # Un usuario del rol tablero_estadisticas basta (ver tablero_estadisticas.py); no se
+    # asume un superusuario por defecto
+    if not os.environ.get('PGUSER'):
+        print("❌ Defina PGUSER con el usuario de esta pantalla (miembro del rol tablero_estadisticas):")
+        print("   CREATE ROLE pantalla_porteria LOGIN PASSWORD '...' IN ROLE tablero_estadisticas;")
+        return
     
     try:
-        # Intentar conexión con valores por defecto
-        print("Intentando conectar a PostgreSQL con configuración por defecto...")
-        print("(host=localhost, database=control_acceso, user=postgres)\n")
-        
         db_config = {
-            'host': 'localhost',
-            'database': 'control_acceso',
-            'user': 'postgres',
-            'password': '',
-            'port': 5432
+            'host': os.environ.get('PGHOST', 'localhost'),
+            'database': os.environ.get('PGDATABASE', 'control_acceso'),
+            'user': os.environ['PGUSER'],
+            'password': os.environ.get('PGPASSWORD', ''),
+            'port': int(os.environ.get('PGPORT', 5432))
         }
+        print(f"Conectando a {db_config['host']}/{db_config['database']} como {db_config['user']}...")
+        print("(variables PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGPORT)\n")
         
-        # Crear y ejecutar la aplicación
-        app = SistemaControlAccesoPostgreSQL(db_config)
-        app.ejecutar()
+        # Sin conexión el tablero lo indica y reintenta; no hay modo en memoria
+        TableroEstadisticas(FuenteEstadisticas(db_config)).ejecutar()
         
     except KeyboardInterrupt:
         print("\n\n👋 Aplicación terminada por el usuario")
     except Exception as e:
         print(f"\n❌ Error: {e}")
-        print("\n💡 Si PostgreSQL no está disponible, la aplicación usará modo fallback con datos en memoria")
-        
-        # Forzar modo fallback
-        print("\nIniciando en MODO FALLBACK (Memoria)...\n")
-        try:
-            app = SistemaControlAccesoPostgreSQL({})
-            app.ejecutar()
-        except Exception as e2:
-            print(f"Error en modo fallback: {e2}")
-            import traceback
-            traceback.print_exc()
+        import traceback
+        traceback.print_exc()
 
 if __name__ == "__main__":
     main()
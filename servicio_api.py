@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio HTTP/JSON sin interfaz gráfica con las operaciones de la portería.
+
+Un loop asyncio atiende las conexiones (HTTP/1.1 con keep-alive) y las
+operaciones corren en un pool de hilos, cada uno con su propio repositorio
+(repo.clonar(), una conexión por hilo). El reconocimiento de placas va en un
+pool aparte para que las fotos no frenen las entradas y salidas.
+
+Por defecto solo escucha en 127.0.0.1. Las rutas POST (entradas, salidas,
+planes de tarifa y OCR) exigen la cabecera "Authorization: Bearer <token>"
+con el token compartido de CONTROL_ACCESO_TOKEN (o --token); sin token el
+servicio es de solo lectura.
+
+Uso:
+    CONTROL_ACCESO_TOKEN=... python servicio_api.py --host 0.0.0.0 --puerto 8080 --db-host localhost
+    python servicio_api.py --motor sqlite --ruta control_acceso.db
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from repositorio import PATRON_PLACA, crear_repositorio
+from tarifas import microsegundos, total_horas
+
+MAX_CABECERA = 64 * 1024
+MAX_CUERPO = 10 * 1024 * 1024  # fotos de placas
+# Token compartido para las rutas de escritura (servicio y cliente_api)
+VARIABLE_TOKEN = 'CONTROL_ACCESO_TOKEN'
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+class ErrorAPI(Exception):
+    """Error con código HTTP que se responde como {'error': mensaje}"""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+def _json_default(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=' ')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"No se puede convertir {type(valor).__name__} a JSON")
+
+def a_json(datos):
+    return json.dumps(datos, default=_json_default, ensure_ascii=False).encode('utf-8')
+
+def _placa(texto):
+    placa = unquote(texto).upper().strip()
+    if not PATRON_PLACA.match(placa):
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, f"Placa inválida: {placa}")
+    return placa
+
+def _fecha(consulta, clave, obligatoria=False):
+    texto = consulta.get(clave)
+    if not texto:
+        if obligatoria:
+            raise ErrorAPI(HTTPStatus.BAD_REQUEST, f"Falta el parámetro {clave}")
+        return None
+    try:
+        return (datetime.fromisoformat(texto) if 'T' in texto or ' ' in texto
+                else date.fromisoformat(texto))
+    except ValueError:
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, f"Fecha inválida en {clave}: {texto}")
+
+def _momento(consulta, clave, obligatoria=False):
+    """Como _fecha, pero siempre datetime: una fecha sola es su medianoche"""
+    valor = _fecha(consulta, clave, obligatoria)
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.combine(valor, datetime.min.time())
+
+def _entero(consulta, clave, defecto):
+    texto = consulta.get(clave)
+    if not texto:
+        return defecto
+    try:
+        return int(texto)
+    except ValueError:
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, f"{clave} debe ser un número entero: {texto}")
+
+def _objeto(cuerpo):
+    """Cuerpo JSON de una escritura: un objeto (vacío si no hay cuerpo)"""
+    if cuerpo is None:
+        return {}
+    if not isinstance(cuerpo, dict):
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON")
+    return cuerpo
+
+def _resultado(valor):
+    """None del repositorio es una falla del almacenamiento, no una regla de negocio"""
+    if valor is None:
+        raise ErrorAPI(HTTPStatus.SERVICE_UNAVAILABLE, "Almacenamiento no disponible")
+    return valor
+
+def _salida(valor):
+    """salida_visitante también retorna None si el registro ya fue liquidado"""
+    if valor is None:
+        raise ErrorAPI(HTTPStatus.CONFLICT, "El registro ya fue liquidado o no se pudo liquidar")
+    return valor
+
+# =============================================================================
+# OPERACIONES
+# =============================================================================
+# Cada operación recibe (repo, parámetros de la ruta, consulta, cuerpo JSON) y se
+# ejecuta en un hilo del pool con el repositorio de ese hilo.
+
+def salud(repo, ruta, consulta, cuerpo):
+    return {'estado': 'OK', 'motor': repo.nombre, 'conectado': repo.verificar_conexion()}
+
+def clasificar_placa(repo, ruta, consulta, cuerpo):
+    return _resultado(repo.clasificar_placa(_placa(ruta['placa'])))
+
+def entrada_residente(repo, ruta, consulta, cuerpo):
+    return _resultado(repo.entrada_residente(_placa(ruta['placa'])))
+
+def salida_residente(repo, ruta, consulta, cuerpo):
+    return _resultado(repo.salida_residente(_placa(ruta['placa'])))
+
+def entrada_visitante(repo, ruta, consulta, cuerpo):
+    return _resultado(repo.entrada_visitante(_placa(str(_objeto(cuerpo).get('placa', '')))))
+
+def visitantes_activos(repo, ruta, consulta, cuerpo):
+    return repo.visitantes_activos()
+
+def _visitante(repo, placa):
+    visitante = repo.visitante_activo(placa)
+    if not visitante:
+        raise ErrorAPI(HTTPStatus.NOT_FOUND, f"{placa} no es un visitante activo")
+    return visitante
+
+def visitante_activo(repo, ruta, consulta, cuerpo):
+    return _visitante(repo, _placa(ruta['placa']))
+
+def liquidacion(repo, ruta, consulta, cuerpo):
+    """Valor que pagaría el visitante si saliera ahora, con el plan de su parqueadero"""
+    visitante = _visitante(repo, _placa(ruta['placa']))
+    plan = repo.plan_tarifa(visitante['parqueadero'])
+    ahora = datetime.now()
+    return dict(visitante, hora_consulta=ahora,
+                total_horas=total_horas(microsegundos(ahora - visitante['hora_entrada'])),
+                valor=plan.cobro(visitante['hora_entrada'], ahora),
+                tarifa=plan.descripcion(visitante['hora_entrada'], ahora))
+
+def salida_por_placa(repo, ruta, consulta, cuerpo):
+    visitante = _visitante(repo, _placa(ruta['placa']))
+    salida = _salida(repo.salida_visitante(visitante['id'], visitante['parqueadero_id']))
+    return dict(visitante, **salida)
+
+def salida_por_registro(repo, ruta, consulta, cuerpo):
+    try:
+        parqueadero_id = _objeto(cuerpo)['parqueadero_id']
+    except KeyError:
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, "Falta parqueadero_id")
+    registro = ruta['id']
+    return _salida(repo.salida_visitante(int(registro) if registro.isdigit() else registro, parqueadero_id))
+
+def estado_parqueaderos(repo, ruta, consulta, cuerpo):
+    return repo.estado_parqueaderos()
+
+def estadisticas(repo, ruta, consulta, cuerpo):
+    return _resultado(repo.estadisticas())
+
+def pagina_historial(repo, ruta, consulta, cuerpo):
+    despues = None
+    if consulta.get('despues_hora'):
+        despues = (_momento(consulta, 'despues_hora'), _entero(consulta, 'despues_id', 0))
+    tamano = _entero(consulta, 'tamano', 100)
+    if not 1 <= tamano <= 5000:
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, f"tamano debe estar entre 1 y 5000: {tamano}")
+    return _resultado(repo.pagina_historial(despues, tamano, consulta.get('placa', '').upper() or None,
+                                            _fecha(consulta, 'desde'), _fecha(consulta, 'hasta')))
+
+def resumen_diario(repo, ruta, consulta, cuerpo):
+    return _resultado(repo.resumen_diario(_fecha(consulta, 'desde', True), _fecha(consulta, 'hasta', True)))
+
+def intervalos_visitantes(repo, ruta, consulta, cuerpo):
+    desde, hasta = _momento(consulta, 'desde', True), _momento(consulta, 'hasta', True)
+    if desde >= hasta:
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, "desde debe ser anterior a hasta")
+    return _resultado(repo.intervalos_visitantes(desde, hasta))
+
+def planes_tarifa(repo, ruta, consulta, cuerpo):
+    catalogo = repo.catalogo_tarifas()
+    if catalogo is None:
+        return {'version': 0, 'planes': [], 'clases': {}}
+    if not catalogo.cargado:
+        repo.refrescar()
+    version, planes, clases = catalogo.exportar()
+    return {'version': version or 0, 'planes': planes, 'clases': clases}
+
+def version_tarifas(repo, ruta, consulta, cuerpo):
+    catalogo = repo.catalogo_tarifas()
+    return {'version': (catalogo.version or 0) if catalogo is not None else 0}
+
+def guardar_plan_tarifa(repo, ruta, consulta, cuerpo):
+    cuerpo = _objeto(cuerpo)
+    try:
+        clase, nombre, definicion = cuerpo.get('clase', 'GENERAL'), cuerpo['nombre'], cuerpo['definicion']
+    except KeyError:
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, "Se espera {clase, nombre, definicion}")
+    return {'id': _resultado(repo.guardar_plan_tarifa(clase, nombre, definicion))}
+
+RUTAS = [
+    ('GET', r'/salud', salud),
+    ('GET', r'/placas/(?P<placa>[^/]+)', clasificar_placa),
+    ('POST', r'/residentes/(?P<placa>[^/]+)/entrada', entrada_residente),
+    ('POST', r'/residentes/(?P<placa>[^/]+)/salida', salida_residente),
+    ('GET', r'/visitantes', visitantes_activos),
+    ('POST', r'/visitantes', entrada_visitante),
+    ('GET', r'/visitantes/(?P<placa>[^/]+)', visitante_activo),
+    ('GET', r'/visitantes/(?P<placa>[^/]+)/liquidacion', liquidacion),
+    ('POST', r'/visitantes/(?P<placa>[^/]+)/salida', salida_por_placa),
+    ('POST', r'/registros/(?P<id>[^/]+)/salida', salida_por_registro),
+    ('GET', r'/parqueaderos', estado_parqueaderos),
+    ('GET', r'/estadisticas', estadisticas),
+    ('GET', r'/historial', pagina_historial),
+    ('GET', r'/resumen-diario', resumen_diario),
+    ('GET', r'/intervalos', intervalos_visitantes),
+    ('GET', r'/tarifas', planes_tarifa),
+    ('GET', r'/tarifas/version', version_tarifas),
+    ('POST', r'/tarifas', guardar_plan_tarifa),
+]
+
+def reconocer_placa(imagen):
+    """Placa en la foto (bytes JPEG/PNG) o None. Se ejecuta en el pool de OCR"""
+    import cv2
+    import numpy as np
+    from ocr_placas import ProcesadorPlacas
+
+    img = cv2.imdecode(np.frombuffer(imagen, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ErrorAPI(HTTPStatus.BAD_REQUEST, "La imagen no se pudo leer")
+    placa, _ = ProcesadorPlacas.procesar_imagen_para_ocr(img)
+    return placa
+
+# =============================================================================
+# SERVIDOR
+# =============================================================================
+
+class ServicioAPI:
+    """
+    Servidor HTTP sobre asyncio.start_server. El loop solo lee y escribe
+    sockets; cada operación va al pool de `hilos` hilos, que abre un
+    repositorio por hilo la primera vez que lo usa. Cada `refresco` segundos
+    se recargan el directorio de placas y los planes de tarifa si cambiaron.
+    """
+
+    def __init__(self, repo, host='127.0.0.1', puerto=8080, hilos=8, hilos_ocr=2,
+                 refresco=5.0, inactividad=30.0, token=None):
+        """
+        repo: repositorio principal (crear_repositorio); los hilos usan clones
+        token: token compartido que exigen las rutas POST; None las rechaza todas
+        """
+        self.repo = repo
+        self.host = host
+        self.puerto = puerto
+        self.token = token
+        self.refresco = refresco
+        self.inactividad = inactividad
+        self.rutas = [(metodo, re.compile(patron + '$'), operacion) for metodo, patron, operacion in RUTAS]
+        self.ejecutor = ThreadPoolExecutor(hilos, thread_name_prefix='api')
+        self.ejecutor_ocr = ThreadPoolExecutor(hilos_ocr, thread_name_prefix='api-ocr')
+        self._local = threading.local()
+        self._repos = []
+        self._lock = threading.Lock()
+        self._metricas = {'peticiones': 0, 'errores': 0, 'conexiones': 0, 'segundos': 0.0}
+        self.servidor = None
+
+    # ============= REPOSITORIO POR HILO =============
+
+    def _repo_hilo(self):
+        repo = getattr(self._local, 'repo', None)
+        if repo is None:
+            repo = self.repo.clonar()
+            self._local.repo = repo
+            with self._lock:
+                self._repos.append(repo)
+        return repo
+
+    def _ejecutar(self, operacion, ruta, consulta, cuerpo):
+        return operacion(self._repo_hilo(), ruta, consulta, cuerpo)
+
+    def _ocr(self, imagen):
+        placa = reconocer_placa(imagen)
+        clasificacion = self._repo_hilo().clasificar_placa(placa) if placa else None
+        return {'placa': placa, 'clasificacion': clasificacion}
+
+    # ============= HTTP =============
+
+    def _autorizar(self, cabeceras):
+        """Las rutas de escritura exigen Authorization: Bearer <token>"""
+        if not self.token:
+            raise ErrorAPI(HTTPStatus.FORBIDDEN, f"Servicio de solo lectura: defina {VARIABLE_TOKEN}")
+        esquema, _, token = cabeceras.get('authorization', '').partition(' ')
+        if esquema.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), self.token.encode()):
+            raise ErrorAPI(HTTPStatus.UNAUTHORIZED, "Token inválido o ausente")
+
+    async def _despachar(self, metodo, destino, cabeceras, cuerpo):
+        partes = urlsplit(destino)
+        ruta = partes.path.rstrip('/') or '/'
+        consulta = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+        loop = asyncio.get_running_loop()
+        if metodo != 'GET':
+            self._autorizar(cabeceras)
+
+        if ruta == '/metricas' and metodo == 'GET':
+            repositorio = await loop.run_in_executor(self.ejecutor, lambda: self._repo_hilo().metricas())
+            return {'servicio': self.metricas(), 'repositorio': repositorio}
+        if ruta == '/ocr':
+            if metodo != 'POST':
+                raise ErrorAPI(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST con la imagen en el cuerpo")
+            if not cuerpo:
+                raise ErrorAPI(HTTPStatus.BAD_REQUEST, "Falta la imagen")
+            return await loop.run_in_executor(self.ejecutor_ocr, self._ocr, cuerpo)
+
+        permitido = False
+        for metodo_ruta, patron, operacion in self.rutas:
+            encontrada = patron.match(ruta)
+            if not encontrada:
+                continue
+            if metodo_ruta != metodo:
+                permitido = True
+                continue
+            datos = None
+            if cuerpo:
+                try:
+                    datos = json.loads(cuerpo)
+                except ValueError:
+                    raise ErrorAPI(HTTPStatus.BAD_REQUEST, "El cuerpo no es JSON válido")
+            return await loop.run_in_executor(self.ejecutor, self._ejecutar, operacion,
+                                              encontrada.groupdict(), consulta, datos)
+        if permitido:
+            raise ErrorAPI(HTTPStatus.METHOD_NOT_ALLOWED, f"Método {metodo} no permitido en {ruta}")
+        raise ErrorAPI(HTTPStatus.NOT_FOUND, f"No existe {ruta}")
+
+    async def _responder(self, metodo, destino, cabeceras, cuerpo):
+        inicio = time.perf_counter()
+        try:
+            estado, datos = HTTPStatus.OK, await self._despachar(metodo, destino, cabeceras, cuerpo)
+        except ErrorAPI as e:
+            estado, datos = e.estado, {'error': str(e)}
+        except Exception as e:
+            print(f"❌ Error atendiendo {metodo} {destino}: {e}")
+            estado, datos = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+        self._metricas['peticiones'] += 1
+        self._metricas['errores'] += estado >= 500
+        self._metricas['segundos'] += time.perf_counter() - inicio
+        return estado, datos
+
+    @staticmethod
+    def _mensaje(estado, datos, mantener):
+        cuerpo = a_json(datos)
+        cabecera = (f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+        return cabecera.encode('latin-1') + cuerpo
+
+    async def _atender(self, reader, writer):
+        """Atiende las peticiones de una conexión en orden hasta que se cierre"""
+        self._metricas['conexiones'] += 1
+        try:
+            while True:
+                try:
+                    bloque = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.inactividad)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    writer.write(self._mensaje(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                               {'error': "Cabecera demasiado grande"}, False))
+                    return
+
+                try:
+                    linea, *lineas = bloque[:-4].decode('latin-1').split('\r\n')
+                    metodo, destino, version = linea.split(' ', 2)
+                    cabeceras = {}
+                    for texto in lineas:
+                        nombre, _, valor = texto.partition(':')
+                        cabeceras[nombre.strip().lower()] = valor.strip()
+                    largo = int(cabeceras.get('content-length', 0))
+                except ValueError:
+                    writer.write(self._mensaje(HTTPStatus.BAD_REQUEST, {'error': "Petición mal formada"}, False))
+                    return
+                if 'chunked' in cabeceras.get('transfer-encoding', '').lower():
+                    writer.write(self._mensaje(HTTPStatus.LENGTH_REQUIRED, {'error': "Envíe Content-Length"}, False))
+                    return
+                if largo > MAX_CUERPO:
+                    writer.write(self._mensaje(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "Cuerpo demasiado grande"}, False))
+                    return
+                try:
+                    cuerpo = await reader.readexactly(largo) if largo else b''
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                conexion = cabeceras.get('connection', '').lower()
+                mantener = conexion == 'keep-alive' if version == 'HTTP/1.0' else conexion != 'close'
+                estado, datos = await self._responder(metodo.upper(), destino, cabeceras, cuerpo)
+                writer.write(self._mensaje(estado, datos, mantener))
+                await writer.drain()
+                if not mantener:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _refrescar_periodicamente(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(self.ejecutor, lambda: self._repo_hilo().refrescar())
+            except Exception as e:
+                print(f"⚠️ Error refrescando cachés: {e}")
+            await asyncio.sleep(self.refresco)
+
+    async def servir(self):
+        self.servidor = await asyncio.start_server(self._atender, self.host, self.puerto, limit=MAX_CABECERA)
+        refresco = asyncio.create_task(self._refrescar_periodicamente())
+        print(f"✅ Servicio API en http://{self.host}:{self.puerto} ({self.repo.nombre})")
+        try:
+            async with self.servidor:
+                await self.servidor.serve_forever()
+        finally:
+            refresco.cancel()
+
+    def metricas(self):
+        metricas = dict(self._metricas)
+        metricas['latencia_promedio_ms'] = (1000 * metricas['segundos'] / metricas['peticiones']
+                                            if metricas['peticiones'] else 0.0)
+        return metricas
+
+    def cerrar(self):
+        self.ejecutor.shutdown(wait=True)
+        self.ejecutor_ocr.shutdown(wait=True)
+        with self._lock:
+            for repo in self._repos:
+                if repo is not self.repo:
+                    repo.cerrar()
+        self.repo.cerrar()
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON del Sistema de Control de Acceso")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="dirección en que escucha (0.0.0.0 para atender otras máquinas)")
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--hilos', type=int, default=8, help="hilos (y conexiones) para las operaciones")
+    parser.add_argument('--hilos-ocr', type=int, default=2)
+    parser.add_argument('--motor', choices=['postgresql', 'sqlite'], default='postgresql')
+    parser.add_argument('--ruta', default='control_acceso.db', help="archivo SQLite")
+    parser.add_argument('--db-host', default='localhost')
+    parser.add_argument('--db-puerto', type=int, default=5432)
+    parser.add_argument('--db-nombre', default='control_acceso')
+    parser.add_argument('--db-usuario', default='postgres')
+    parser.add_argument('--token', default=os.environ.get(VARIABLE_TOKEN),
+                        help=f"token de las rutas de escritura (por defecto {VARIABLE_TOKEN})")
+    args = parser.parse_args()
+    if not args.token:
+        print(f"⚠️ Sin {VARIABLE_TOKEN}: el servicio solo atenderá consultas")
+
+    config = {'motor': args.motor, 'ruta': args.ruta, 'host': args.db_host, 'port': args.db_puerto,
+              'database': args.db_nombre, 'user': args.db_usuario,
+              'password': os.environ.get('PGPASSWORD', '')}
+    servicio = ServicioAPI(crear_repositorio(config), args.host, args.puerto, args.hilos, args.hilos_ocr,
+                           token=args.token)
+    try:
+        asyncio.run(servicio.servir())
+    except KeyboardInterrupt:
+        print("\n👋 Servicio detenido")
+    finally:
+        servicio.cerrar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+"""Operación sin conexión: cola local de operaciones y sincronización con PostgreSQL"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from base_datos import PostgreSQLManager
+from diario_memoria import leer_eventos
+from estado_memoria import Residente
+from repositorio import Repositorio, RepositorioMemoria, RepositorioPostgreSQL
+
+# =============================================================================
+# COLA PERSISTENTE DE OPERACIONES
+# =============================================================================
+
+class ColaSincronizacion:
+    """
+    Operaciones hechas sin conexión, en orden, una línea JSON por operación.
+    Cada línea se sincroniza a disco al agregarse. Lo ya enviado se marca en
+    ruta + '.confirmado' (última secuencia aplicada en el servidor) y el
+    archivo se vacía cuando no queda nada pendiente.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.ruta_confirmado = ruta + '.confirmado'
+        self.seq = 0
+        self._pendientes = []
+        self._lock = threading.Lock()
+        self._cargar()
+        self._archivo = open(self.ruta, 'ab')
+
+    def _cargar(self):
+        confirmado = 0
+        if os.path.exists(self.ruta_confirmado):
+            with open(self.ruta_confirmado, 'r', encoding='utf-8') as f:
+                confirmado = int(f.read().strip() or 0)
+
+        # Mismas reglas que el diario en memoria: una última línea sin '\n' se recorta
+        self._pendientes = [e for e in leer_eventos(self.ruta) if e['seq'] > confirmado]
+
+        self.seq = self._pendientes[-1]['seq'] if self._pendientes else confirmado
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def agregar(self, evento):
+        """Agrega una operación y la sincroniza a disco antes de retornar"""
+        with self._lock:
+            self.seq += 1
+            evento['seq'] = self.seq
+            self._archivo.write(json.dumps(evento, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+            self._pendientes.append(evento)
+        return evento
+
+    def lote(self, tamano=None):
+        """Primeras operaciones pendientes (todas si tamano es None)"""
+        with self._lock:
+            return list(self._pendientes[:tamano])
+
+    def confirmar(self, seq):
+        """Marca como aplicadas en el servidor las operaciones hasta seq (inclusive)"""
+        with self._lock:
+            self._pendientes = [e for e in self._pendientes if e['seq'] > seq]
+
+            temporal = self.ruta_confirmado + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(str(seq))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.ruta_confirmado)
+
+            if not self._pendientes:
+                self._archivo.truncate(0)
+                os.fsync(self._archivo.fileno())
+
+    def recaudo_pendiente(self):
+        """Valor cobrado en salidas que aún no llegan al servidor"""
+        with self._lock:
+            return sum(e['valor_pagado'] for e in self._pendientes if e['op'] == 'salida_visitante')
+
+    def cerrar(self):
+        with self._lock:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
+
+# =============================================================================
+# ESPEJO LOCAL
+# =============================================================================
+
+class EspejoLocal(RepositorioMemoria):
+    """
+    Copia en memoria del estado operativo del servidor (residentes, parqueaderos
+    de visitantes y visitantes activos). Sin conexión, atiende las operaciones
+    con las mismas reglas que RepositorioMemoria y cada evento va a la cola en
+    lugar de a un diario. Las entradas locales usan un UUID como id, que es
+    también la clave de idempotencia de la operación.
+    """
+
+    nombre = 'Sin conexión'
+    max_historial = 100
+
+    def __init__(self, cola, ruta_estado):
+        # Semilla por defecto: los mismos datos iniciales que crea PostgreSQLManager
+        super().__init__()
+        self.cola = cola
+        self.ruta_estado = ruta_estado
+        self._estado_guardado = None
+
+        # Último estado leído del servidor y, encima, lo que quedó pendiente en la cola
+        if os.path.exists(ruta_estado):
+            with open(ruta_estado, 'r', encoding='utf-8') as f:
+                self._estado_guardado = f.read()
+            self.cargar_estado(json.loads(self._estado_guardado), guardar=False)
+        for evento in cola.lote():
+            self._aplicar(evento)
+
+    def _nuevo_id(self):
+        return str(uuid.uuid4())
+
+    def _registrar(self, evento, sincronizar=False):
+        evento['clave'] = evento['id'] if evento['op'] == 'entrada_visitante' else str(uuid.uuid4())
+        self.cola.agregar(evento)
+        self._aplicar(evento)
+
+    def replicar(self, evento):
+        """Aplica un cambio ya hecho en el servidor (no se encola)"""
+        self._aplicar(evento)
+
+    def cargar_estado(self, estado, guardar=True):
+        """
+        Reemplaza el estado con el leído del servidor (PostgreSQLManager.obtener_estado_operativo)
+        guardar: persistirlo para poder arrancar sin conexión
+        """
+        self._inicializar({placa: Residente(r['nombre'], r['apartamento'], r['parqueadero'], r['estado'])
+                           for placa, r in estado['residentes'].items()},
+                          estado['parqueaderos_visitantes'])
+        for v in estado['visitantes']:
+            self._aplicar(dict(v, op='entrada_visitante'))
+        self.historial_visitantes.recortar(self.max_historial)
+
+        if guardar:
+            texto = json.dumps(estado, ensure_ascii=False, default=str, sort_keys=True)
+            if texto != self._estado_guardado:
+                temporal = self.ruta_estado + '.tmp'
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    f.write(texto)
+                os.replace(temporal, self.ruta_estado)
+                self._estado_guardado = texto
+
+# =============================================================================
+# SINCRONIZADOR
+# =============================================================================
+
+class Sincronizador:
+    """
+    Estado compartido por el repositorio principal y sus clones: espejo local,
+    cola, bandera en_linea y un hilo que, mientras haya operaciones pendientes,
+    intenta reconectar cada `intervalo` segundos y las envía en lotes.
+
+    En línea, lo que hace esta estación ya se replica en el espejo; lo que hacen
+    las demás se copia del servidor (una lectura de todo el estado operativo)
+    solo si la base de datos avisó cambios (LISTEN), como máximo cada
+    `intervalo_espejo_avisos` segundos, o cada `intervalo_espejo` sin avisos.
+    """
+
+    def __init__(self, config, en_linea):
+        self.config = config
+        self.intervalo = config.get('intervalo_reconexion', 5)
+        self.tamano_lote = config.get('tamano_lote', 100)
+        self.intervalo_espejo = config.get('intervalo_espejo', 300)
+        self.intervalo_espejo_avisos = config.get('intervalo_espejo_avisos', 30)
+        self.cola = ColaSincronizacion(config.get('cola', 'control_acceso_pendientes.cola'))
+        self.espejo = EspejoLocal(self.cola, self.cola.ruta + '.estado')
+        self.lock = threading.RLock()
+        self.en_linea = en_linea and len(self.cola) == 0
+        self.ultimas_estadisticas = None
+        self.resumen = {'aplicadas': 0, 'duplicadas': 0, 'conflictos': 0}
+        self.manager = None  # conexión propia para reenviar la cola
+        self.suscripcion = None  # avisos de cambios del servidor para el espejo
+        self.avisos_pendientes = False
+        self.ultima_copia = None  # time.monotonic() de la última copia del estado al espejo
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name='sincronizacion', daemon=True)
+        self._hilo.start()
+
+    def desconectar(self):
+        """Pasa a operar localmente"""
+        with self.lock:
+            if self.en_linea:
+                self.en_linea = False
+                print("⚠️ Conexión con PostgreSQL perdida: las operaciones se guardan localmente")
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            if self.en_linea and len(self.cola) == 0:
+                continue
+            try:
+                self.sincronizar()
+            except Exception as e:
+                print(f"Error sincronizando operaciones pendientes: {e}")
+
+    def sincronizar(self):
+        """
+        Reconecta, envía la cola en lotes y, cuando queda vacía, recarga el espejo
+        y vuelve a operar en línea. Retorna True si quedó en línea
+        """
+        if self.manager is None:
+            self.manager = PostgreSQLManager(self.config)
+        if not self.manager.reconectar():
+            return False
+
+        enviadas = 0
+        while True:
+            lote = self.cola.lote(self.tamano_lote)
+            if lote:
+                resultado = self.manager.aplicar_operaciones_sincronizadas(lote)
+                if resultado is None:
+                    return False
+                # Si la confirmación local se pierde, reenviar el lote no duplica nada
+                self.cola.confirmar(lote[-1]['seq'])
+                for clave in self.resumen:
+                    self.resumen[clave] += resultado[clave]
+                enviadas += len(lote)
+                continue
+
+            estado = self.manager.obtener_estado_operativo()
+            if estado is None:
+                return False
+            with self.lock:
+                # Una operación local pudo llegar mientras se leía el estado
+                if len(self.cola):
+                    continue
+                self.espejo.cargar_estado(estado)
+                self.espejo_copiado()
+                reconectado = not self.en_linea
+                self.en_linea = True
+            break
+
+        if reconectado:
+            print(f"✅ Conexión con PostgreSQL restablecida: {enviadas} operaciones sincronizadas "
+                  f"({self.resumen['conflictos']} conflictos)")
+        return True
+
+    def espejo_desactualizado(self, primario, forzar=False):
+        """
+        True si hay que volver a copiar el estado del servidor al espejo. La
+        suscripción a avisos se abre (o se reabre si se perdió) junto con la
+        copia periódica, así no se intenta conectar en cada consulta
+        """
+        with self.lock:
+            if self.suscripcion is not None:
+                avisos = self.suscripcion.esperar_avisos(0)
+                if avisos is None:
+                    self.suscripcion.cerrar()
+                    self.suscripcion = None
+                elif avisos:
+                    self.avisos_pendientes = True
+            transcurrido = None if self.ultima_copia is None else time.monotonic() - self.ultima_copia
+            periodica = forzar or transcurrido is None or transcurrido >= self.intervalo_espejo
+            if not periodica:
+                return self.avisos_pendientes and transcurrido >= self.intervalo_espejo_avisos
+            suscribir = self.suscripcion is None
+
+        if suscribir:
+            # Conectar puede tardar: fuera del lock que usan las operaciones
+            suscripcion = primario.suscribir_cambios()
+            with self.lock:
+                if self.suscripcion is None:
+                    self.suscripcion, suscripcion = suscripcion, None
+            if suscripcion is not None:
+                suscripcion.cerrar()
+        return True
+
+    def espejo_copiado(self):
+        with self.lock:
+            self.ultima_copia = time.monotonic()
+            self.avisos_pendientes = False
+
+    def cerrar(self):
+        self._detener.set()
+        self._hilo.join()
+        self.cola.cerrar()
+        if self.manager:
+            self.manager.cerrar()
+        if self.suscripcion:
+            self.suscripcion.cerrar()
+
+# =============================================================================
+# REPOSITORIO CON SINCRONIZACIÓN
+# =============================================================================
+
+class RepositorioSincronizado(Repositorio):
+    """
+    RepositorioPostgreSQL que no se detiene si la base de datos se cae: si una
+    operación falla por pérdida de conexión, esa y las siguientes se atienden
+    con el espejo local y se encolan; el Sincronizador las reenvía al volver la
+    conexión. Mientras haya operaciones en la cola, todo se sigue atendiendo
+    localmente para conservar el orden.
+    """
+
+    remoto = True
+
+    def __init__(self, primario, sincronizador, propietario=True):
+        """
+        primario: RepositorioPostgreSQL (puede estar sin conexión)
+        sincronizador: Sincronizador compartido entre clones
+        propietario: si cerrar() también detiene el sincronizador
+        """
+        self.primario = primario
+        self.sinc = sincronizador
+        self.propietario = propietario
+        # Sin conexión el espejo cobra con los últimos planes cargados del servidor
+        self.sinc.espejo.tarifas = primario.tarifas
+
+    @property
+    def nombre(self):
+        return self.primario.nombre if self.sinc.en_linea else EspejoLocal.nombre
+
+    def clonar(self):
+        # Sin conexión el clon no intenta conectar: lo hace al volver a estar en línea
+        manager = PostgreSQLManager(self.primario.manager.config, conectar=self.sinc.en_linea)
+        clon = RepositorioPostgreSQL(manager, self.primario.directorio, self.primario.tarifas)
+        return RepositorioSincronizado(clon, self.sinc, propietario=False)
+
+    def metricas(self):
+        return self.primario.metricas()
+
+    def plan_tarifa(self, parqueadero=None):
+        return self.primario.plan_tarifa(parqueadero)
+
+    def catalogo_tarifas(self):
+        return self.primario.tarifas
+
+    def estado_sincronizacion(self):
+        return dict(self.sinc.resumen, en_linea=self.sinc.en_linea, pendientes=len(self.sinc.cola))
+
+    def suscribir_cambios(self):
+        # Solo avisa lo que pasa en el servidor: sin conexión los cambios quedan en el espejo
+        # (ver estado_sincronizacion) y quien escucha debe volver a consultar periódicamente
+        return self.primario.suscribir_cambios()
+
+    def _usar_primario(self):
+        with self.sinc.lock:
+            if not self.sinc.en_linea or len(self.sinc.cola):
+                return False
+        if self.primario.verificar_conexion() or self.primario.manager.reconectar():
+            return True
+        self.sinc.desconectar()
+        return False
+
+    def _operar(self, operacion, *args, al_aplicar=None):
+        """
+        Ejecuta la operación en PostgreSQL o, sin conexión, en el espejo local
+        al_aplicar: función(resultado) que replica en el espejo un cambio hecho en el servidor
+        """
+        if self._usar_primario():
+            resultado = getattr(self.primario, operacion)(*args)
+            if self.primario.verificar_conexion():
+                if al_aplicar is not None and resultado:
+                    with self.sinc.lock:
+                        al_aplicar(resultado)
+                return resultado
+            self.sinc.desconectar()
+
+        with self.sinc.lock:
+            return getattr(self.sinc.espejo, operacion)(*args)
+
+    # ============= OPERACIONES =============
+
+    def refrescar(self):
+        if not self._usar_primario():
+            return False
+        cambio = self.primario.refrescar()
+        # Copia completa del estado solo si cambió el directorio o las tarifas, hubo avisos o venció el intervalo
+        if not self.sinc.espejo_desactualizado(self.primario, forzar=cambio):
+            return cambio
+        estado = self.primario.manager.obtener_estado_operativo()
+        if estado is not None:
+            with self.sinc.lock:
+                if self.sinc.en_linea and not len(self.sinc.cola):
+                    self.sinc.espejo.cargar_estado(estado)
+                    self.sinc.espejo_copiado()
+        return cambio
+
+    def clasificar_placa(self, placa):
+        return self._operar('clasificar_placa', placa)
+
+    def _replicar_residente(self, placa, estado):
+        def aplicar(resultado):
+            if resultado['resultado'] == 'OK' and placa in self.sinc.espejo.residentes:
+                self.sinc.espejo.replicar({'op': 'estado_residente', 'placa': placa, 'estado': estado})
+        return aplicar
+
+    def entrada_residente(self, placa):
+        return self._operar('entrada_residente', placa,
+                            al_aplicar=self._replicar_residente(placa, 'OCUPADO'))
+
+    def salida_residente(self, placa):
+        return self._operar('salida_residente', placa,
+                            al_aplicar=self._replicar_residente(placa, 'LIBRE'))
+
+    def entrada_visitante(self, placa):
+        def aplicar(entrada):
+            espejo = self.sinc.espejo
+            if entrada['resultado'] == 'OK' and placa not in espejo.visitantes:
+                espejo.replicar({'op': 'entrada_visitante', 'id': entrada['registro_id'], 'placa': placa,
+                                 'parqueadero': entrada['parqueadero'],
+                                 'parqueadero_id': entrada['parqueadero_id'],
+                                 'hora_entrada': entrada['hora_entrada']})
+        return self._operar('entrada_visitante', placa, al_aplicar=aplicar)
+
+    def visitante_activo(self, placa):
+        return self._operar('visitante_activo', placa)
+
+    def salida_visitante(self, registro_id, parqueadero_id):
+        def aplicar(salida):
+            if registro_id in self.sinc.espejo.registros:
+                self.sinc.espejo.replicar({'op': 'salida_visitante', 'id': registro_id,
+                                           'hora_salida': salida['hora_salida'],
+                                           'total_horas': float(salida['total_horas']),
+                                           'valor_pagado': float(salida['valor_pagado'])})
+        return self._operar('salida_visitante', registro_id, parqueadero_id, al_aplicar=aplicar)
+
+    def visitantes_activos(self):
+        return self._operar('visitantes_activos')
+
+    def estado_parqueaderos(self):
+        return self._operar('estado_parqueaderos')
+
+    def estadisticas(self):
+        if self._usar_primario():
+            stats = self.primario.estadisticas()
+            if self.primario.verificar_conexion():
+                self.sinc.ultimas_estadisticas = stats
+                return stats
+            self.sinc.desconectar()
+
+        # Sin conexión: ocupación del espejo y recaudo del servidor más lo cobrado localmente
+        with self.sinc.lock:
+            stats = self.sinc.espejo.estadisticas()
+        previas = self.sinc.ultimas_estadisticas
+        if previas:
+            pendiente = self.sinc.cola.recaudo_pendiente()
+            stats['total_recaudado'] = float(previas['total_recaudado']) + pendiente
+            stats['recaudado_hoy'] = float(previas['recaudado_hoy']) + pendiente
+        return stats
+
+    def pagina_historial(self, despues=None, tamano=100, placa=None, desde=None, hasta=None):
+        return self._operar('pagina_historial', despues, tamano, placa, desde, hasta)
+
+    def resumen_diario(self, desde, hasta):
+        # Sin conexión solo hay lo cobrado localmente
+        return self._operar('resumen_diario', desde, hasta)
+
+    def intervalos_visitantes(self, desde, hasta):
+        return self._operar('intervalos_visitantes', desde, hasta)
+
+    def exportar_historial_csv(self, salida, desde=None, hasta=None):
+        # El espejo solo guarda las últimas salidas: exportar sin conexión daría un archivo incompleto
+        if not self._usar_primario():
+            print("⚠️ Sin conexión con PostgreSQL: no se puede exportar el historial")
+            return None
+        return self.primario.exportar_historial_csv(salida, desde, hasta)
+
+    def importar_residentes_csv(self, entrada):
+        if not self._usar_primario():
+            print("⚠️ Sin conexión con PostgreSQL: no se pueden importar residentes")
+            return None
+        resumen = self.primario.importar_residentes_csv(entrada)
+        if resumen is not None:
+            self.refrescar()
+        return resumen
+
+    def guardar_plan_tarifa(self, clase, nombre, definicion):
+        if not self._usar_primario():
+            print("⚠️ Sin conexión con PostgreSQL: no se puede guardar el plan de tarifa")
+            return None
+        return self.primario.guardar_plan_tarifa(clase, nombre, definicion)
+
+    def cerrar(self):
+        self.primario.cerrar()
+        if self.propietario:
+            self.sinc.cerrar()
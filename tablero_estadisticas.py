@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Tablero de estadísticas de solo lectura para pantallas del conjunto.
+
+No carga la interfaz de portería, ni la cámara, ni OCR ni reportes: una
+ventana Tk con las cifras y una sola conexión de solo lectura que no migra
+nada. Las cifras llegan en una consulta (estadisticas_tablero()) y solo se
+piden cuando la base de datos avisa un cambio (LISTEN estadisticas), como
+máximo una vez por `intervalo_minimo`. Sin avisos, se consultan cada
+`intervalo_maximo` segundos para que el recaudo del día cambie a medianoche.
+
+Usuario para cada pantalla (lo crea un administrador una vez):
+    CREATE ROLE pantalla_porteria LOGIN PASSWORD '...' IN ROLE tablero_estadisticas;
+
+Uso (el usuario es obligatorio: --db-usuario o PGUSER):
+    PGPASSWORD=... python tablero_estadisticas.py --db-usuario pantalla_porteria --pantalla-completa
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+import tkinter as tk
+from datetime import datetime
+
+from base_datos import CANAL_ESTADISTICAS, PostgreSQLManager
+
+# =============================================================================
+# FUENTE DE ESTADÍSTICAS
+# =============================================================================
+
+class FuenteEstadisticas:
+    """
+    Hilo que mantiene la conexión de solo lectura, espera avisos y entrega
+    las estadísticas nuevas por una cola. Si se cae la conexión reintenta
+    con espera creciente y entrega None mientras tanto
+    """
+
+    def __init__(self, config, intervalo_minimo=2.0, intervalo_maximo=60.0):
+        """
+        config: configuración de PostgreSQLManager (se fuerza solo_lectura)
+        intervalo_minimo: segundos mínimos entre consultas (agrupa ráfagas de avisos)
+        intervalo_maximo: segundos máximos sin consultar
+        """
+        self.config = dict(config, solo_lectura=True)
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_maximo = intervalo_maximo
+        self.cola = queue.Queue()
+        self.consultas = 0
+        self.avisos = 0
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar, name='tablero-estadisticas', daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+
+    def _conectar(self, manager):
+        return manager.reconectar() and manager.escuchar(CANAL_ESTADISTICAS)
+
+    def _ejecutar(self):
+        manager = PostgreSQLManager(self.config, conectar=False)
+        espera = 1.0
+        ultimas = None
+        try:
+            while not self._detener.is_set():
+                # Suscrito antes de consultar: un cambio entre ambos no se pierde
+                conectado = self._conectar(manager)
+                while conectado and not self._detener.is_set():
+                    stats = manager.obtener_estadisticas_tablero()
+                    if stats is None:
+                        break
+                    espera = 1.0
+                    self.consultas += 1
+                    if stats != ultimas:
+                        ultimas = stats
+                        self.cola.put(stats)
+                    consultada = time.monotonic()
+
+                    canales = manager.esperar_avisos(self.intervalo_maximo)
+                    if canales is None:
+                        break
+                    self.avisos += len(canales)
+                    # Ráfaga de entradas y salidas: una sola consulta cada intervalo_minimo
+                    restante = self.intervalo_minimo - (time.monotonic() - consultada)
+                    if canales and restante > 0:
+                        self._detener.wait(restante)
+                        # Los avisos que llegaron durante la espera ya quedan en la próxima consulta
+                        if manager.esperar_avisos(0) is None:
+                            break
+                if self._detener.is_set():
+                    break
+                ultimas = None
+                self.cola.put(None)
+                self._detener.wait(espera)
+                espera = min(espera * 2, self.intervalo_maximo)
+        finally:
+            manager.cerrar()
+
+# =============================================================================
+# VENTANA DEL TABLERO
+# =============================================================================
+
+class TableroEstadisticas:
+    """Cifras grandes para una pantalla: cupos, ocupación y recaudo del día"""
+
+    TARJETAS = [
+        ('disponibles', '🅿️ Disponibles', '#27ae60'),
+        ('cupos_visitantes_libres', '🚗 Cupos visitantes', '#3498db'),
+        ('visitantes_activos', '👥 Visitantes dentro', '#9b59b6'),
+        ('ocupados', '🔴 Ocupados', '#e74c3c'),
+        ('salidas_hoy', '🚪 Salidas hoy', '#f39c12'),
+        ('recaudado_hoy', '💵 Recaudo hoy', '#16a085'),
+    ]
+
+    def __init__(self, fuente, pantalla_completa=False):
+        self.fuente = fuente
+        self.ventana = tk.Tk()
+        self.ventana.title("📊 Estadísticas - Control de Acceso")
+        self.ventana.geometry("900x500")
+        self.ventana.configure(bg='#2c3e50')
+        if pantalla_completa:
+            self.ventana.attributes('-fullscreen', True)
+            self.ventana.bind('<Escape>', lambda e: self.ventana.attributes('-fullscreen', False))
+
+        tk.Label(self.ventana, text="🚗 CONTROL DE ACCESO VEHICULAR", font=('Arial', 22, 'bold'),
+                 bg='#2c3e50', fg='white').pack(pady=(20, 10))
+
+        grilla = tk.Frame(self.ventana, bg='#2c3e50')
+        grilla.pack(expand=True, fill='both', padx=20, pady=10)
+        self.valores = {}
+        for i, (clave, titulo, color) in enumerate(self.TARJETAS):
+            tarjeta = tk.Frame(grilla, bg=color)
+            tarjeta.grid(row=i // 3, column=i % 3, sticky='nsew', padx=8, pady=8)
+            tk.Label(tarjeta, text=titulo, font=('Arial', 14, 'bold'), bg=color, fg='white').pack(pady=(15, 0))
+            self.valores[clave] = tk.Label(tarjeta, text="-", font=('Arial', 40, 'bold'), bg=color, fg='white')
+            self.valores[clave].pack(expand=True)
+        for columna in range(3):
+            grilla.columnconfigure(columna, weight=1)
+        for fila in range(2):
+            grilla.rowconfigure(fila, weight=1)
+
+        self.label_estado = tk.Label(self.ventana, text="⏳ Conectando...", font=('Arial', 11),
+                                     bg='#2c3e50', fg='#bdc3c7')
+        self.label_estado.pack(pady=(0, 10))
+
+        self.revisar_cola()
+
+    def revisar_cola(self):
+        """Pinta lo que entregó la fuente (Tk no se toca desde otros hilos)"""
+        try:
+            while True:
+                self.pintar(self.fuente.cola.get_nowait())
+        except queue.Empty:
+            pass
+        self.ventana.after(250, self.revisar_cola)
+
+    def pintar(self, stats):
+        if stats is None:
+            self.label_estado.config(text="⚠️ Sin conexión con la base de datos, reintentando...", fg='#f39c12')
+            return
+        cifras = dict(stats, disponibles=stats['total_parqueaderos'] - stats['ocupados'])
+        for clave, label in self.valores.items():
+            valor = cifras[clave]
+            label.config(text=f"${valor:,.0f}" if clave == 'recaudado_hoy' else str(valor))
+        self.label_estado.config(text=f"✅ Actualizado {datetime.now().strftime('%H:%M:%S')}", fg='#bdc3c7')
+
+    def ejecutar(self):
+        self.fuente.iniciar()
+        try:
+            self.ventana.mainloop()
+        finally:
+            self.fuente.detener()
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Tablero de estadísticas de solo lectura")
+    parser.add_argument('--db-host', default='localhost')
+    parser.add_argument('--db-puerto', type=int, default=5432)
+    parser.add_argument('--db-nombre', default='control_acceso')
+    # Sin valor por defecto: cada pantalla entra con su usuario del rol tablero_estadisticas,
+    # no con un superusuario
+    parser.add_argument('--db-usuario', default=os.environ.get('PGUSER'), required=not os.environ.get('PGUSER'),
+                        help="usuario del rol tablero_estadisticas (por defecto PGUSER)")
+    parser.add_argument('--intervalo-minimo', type=float, default=2.0, help="segundos entre consultas")
+    parser.add_argument('--pantalla-completa', action='store_true')
+    args = parser.parse_args()
+
+    config = {'host': args.db_host, 'port': args.db_puerto, 'database': args.db_nombre,
+              'user': args.db_usuario, 'password': os.environ.get('PGPASSWORD', '')}
+    TableroEstadisticas(FuenteEstadisticas(config, args.intervalo_minimo), args.pantalla_completa).ejecutar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+Tarifa de visitantes: única definición del cobro para la aplicación, los
+repositorios, los reportes y los triggers de PostgreSQL y SQLite.
+
+$1,000 por hora o fracción hasta 5 horas, después tarifa plena de $10,000.
+Todo se calcula sobre la duración en microsegundos enteros, la misma
+precisión de TIMESTAMP en PostgreSQL, así el cobro de Python coincide
+exactamente con el del trigger (incluso en el borde de cada hora).
+
+Los planes de tarifa (PlanTarifa) guardados en la base de datos reemplazan
+esa regla por clase de parqueadero: valor por hora según día y franja
+horaria, fracción de cobro, tarifa plena y tope por cada 24 horas.
+"""
+
+import threading
+from datetime import datetime
+
+import numpy as np
+
+VALOR_HORA = 1000
+HORAS_TARIFA_POR_HORA = 5
+TARIFA_PLENA = 10000
+
+US_POR_HORA = 3600 * 1_000_000
+LIMITE_TARIFA_POR_HORA_US = HORAS_TARIFA_POR_HORA * US_POR_HORA
+
+US_POR_MINUTO = 60 * 1_000_000
+US_POR_DIA = 24 * US_POR_HORA
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+# Minuto 0 de la tabla semanal es el lunes 00:00; el 1970-01-01 fue jueves
+DESFASE_EPOCA_MINUTOS = 3 * MINUTOS_DIA
+EPOCA = datetime(1970, 1, 1)
+
+CLASE_GENERAL = 'GENERAL'
+
+# =============================================================================
+# CÁLCULO INDIVIDUAL
+# =============================================================================
+
+def microsegundos(duracion):
+    """timedelta a microsegundos enteros (sin pasar por float)"""
+    return (duracion.days * 86400 + duracion.seconds) * 1_000_000 + duracion.microseconds
+
+def es_tarifa_plena(us):
+    return us > LIMITE_TARIFA_POR_HORA_US
+
+def cobro(us):
+    """Valor a pagar por una estancia de `us` microsegundos"""
+    if es_tarifa_plena(us):
+        return TARIFA_PLENA
+    return -(-us // US_POR_HORA) * VALOR_HORA  # horas iniciadas (techo)
+
+def total_horas(us):
+    """Horas con dos decimales, redondeando la mitad hacia afuera como ROUND(numeric, 2)"""
+    centesimas, resto = divmod(abs(us) * 100, US_POR_HORA)
+    centesimas += 2 * resto >= US_POR_HORA
+    return (centesimas if us >= 0 else -centesimas) / 100
+
+def liquidar(hora_entrada, hora_salida):
+    """Retorna {total_horas, valor_pagado} como los calcula el trigger"""
+    us = microsegundos(hora_salida - hora_entrada)
+    return {'total_horas': total_horas(us), 'valor_pagado': cobro(us)}
+
+def descripcion(us):
+    """Texto de la tarifa aplicada, para la ventana de liquidación"""
+    if es_tarifa_plena(us):
+        return f"Tarifa plena (${TARIFA_PLENA:,})"
+    return f"Tarifa por hora (${VALOR_HORA:,}/hora)"
+
+# =============================================================================
+# CÁLCULO POR LOTES (NUMPY)
+# =============================================================================
+
+def duraciones_lote(entradas, salidas):
+    """
+    Duraciones en microsegundos (int64) a partir de arreglos o listas de horas
+    de entrada y salida (datetime o datetime64)
+    """
+    entradas = np.asarray(entradas, dtype='datetime64[us]')
+    salidas = np.asarray(salidas, dtype='datetime64[us]')
+    return (salidas - entradas).astype(np.int64)
+
+def cobro_lote(us):
+    """Cobro de cada duración de un arreglo de microsegundos (int64)"""
+    us = np.asarray(us, dtype=np.int64)
+    horas = -(-us // US_POR_HORA)
+    return np.where(us > LIMITE_TARIFA_POR_HORA_US, TARIFA_PLENA, horas * VALOR_HORA)
+
+def total_horas_lote(us):
+    """total_horas de cada duración (float64), con el mismo redondeo que total_horas"""
+    us = np.asarray(us, dtype=np.int64)
+    centesimas, resto = np.divmod(np.abs(us) * 100, US_POR_HORA)
+    centesimas = centesimas + (2 * resto >= US_POR_HORA)
+    return np.where(us >= 0, centesimas, -centesimas) / 100
+
+def auditar_cobros(filas, catalogo=None):
+    """
+    Recalcula el cobro de salidas ya liquidadas ({id, parqueadero, hora_entrada,
+    hora_salida, valor_pagado}, p. ej. páginas de Repositorio.pagina_historial)
+    y retorna las que no coinciden, con el valor esperado en 'valor_esperado'.
+    catalogo: CatalogoTarifas con el que se cobró (Repositorio.catalogo_tarifas());
+    sin catálogo se audita con la tarifa por defecto (VALOR_HORA / TARIFA_PLENA)
+    """
+    if not filas:
+        return []
+    entradas = [f['hora_entrada'] for f in filas]
+    salidas = [f['hora_salida'] for f in filas]
+    if catalogo is None:
+        esperado = cobro_lote(duraciones_lote(entradas, salidas))
+    else:
+        # Un lote por plan: las filas de los parqueaderos de cada clase
+        por_plan = {}
+        for i, f in enumerate(filas):
+            plan = catalogo.plan(f['parqueadero'])
+            por_plan.setdefault(id(plan), (plan, []))[1].append(i)
+        esperado = np.zeros(len(filas), dtype=np.int64)
+        for plan, indices in por_plan.values():
+            esperado[indices] = plan.cobro_lote([entradas[i] for i in indices], [salidas[i] for i in indices])
+    cobrado = np.array([float(f['valor_pagado'] or 0) for f in filas])
+    return [dict(filas[i], valor_esperado=int(esperado[i]))
+            for i in np.flatnonzero(cobrado != esperado)]
+
+# =============================================================================
+# PLANES DE TARIFA
+# =============================================================================
+# Definición de un plan (JSON en planes_tarifa.definicion):
+#   valor_hora          valor por hora fuera de las franjas
+#   franjas             [{dias: [0..6] (0 = lunes), desde: 'HH:MM', hasta: 'HH:MM',
+#                         valor_hora}]; si hasta <= desde la franja termina al día
+#                        siguiente. Las franjas posteriores prevalecen
+#   fraccion_minutos    la estancia se cobra en bloques de estos minutos (60 = hora o fracción)
+#   horas_tarifa_plena  si la estancia (o el día, con tope) supera estas horas
+#   tarifa_plena        ... se cobra este valor fijo
+#   tope_diario         máximo por cada 24 horas desde la entrada (estancias de varios días)
+#
+# El plan se compila a la tabla semanal `acumulado`: acumulado[m] es la suma del
+# valor por hora de los minutos 0..m-1 de la semana. El valor de un tramo es
+# (acumulado al final - acumulado al inicio) / 60, con dos búsquedas sin importar
+# cuántas franjas cruce. PostgreSQL guarda la misma tabla en tarifas_minuto.
+
+DEFINICION_POR_DEFECTO = {
+    'valor_hora': VALOR_HORA,
+    'franjas': [],
+    'fraccion_minutos': 60,
+    'horas_tarifa_plena': HORAS_TARIFA_POR_HORA,
+    'tarifa_plena': TARIFA_PLENA,
+    'tope_diario': None,
+}
+
+def _minuto_del_dia(texto):
+    horas, minutos = (int(parte) for parte in texto.split(':'))
+    if not (0 <= horas <= 24 and 0 <= minutos < 60) or horas * 60 + minutos > MINUTOS_DIA:
+        raise ValueError(f"Hora inválida en franja: {texto}")
+    return horas * 60 + minutos
+
+def _entero(definicion, campo, opcional=False):
+    valor = definicion.get(campo)
+    if valor is None and opcional:
+        return None
+    if not isinstance(valor, int) or isinstance(valor, bool) or valor < 0:
+        raise ValueError(f"'{campo}' debe ser un entero no negativo")
+    return valor
+
+def validar_plan(definicion):
+    """
+    Retorna la definición completa y normalizada; ValueError si no es válida.
+    Los campos que falten toman el valor de DEFINICION_POR_DEFECTO
+    """
+    plan = dict(DEFINICION_POR_DEFECTO, **definicion)
+    normalizada = {
+        'valor_hora': _entero(plan, 'valor_hora'),
+        'franjas': [],
+        'fraccion_minutos': _entero(plan, 'fraccion_minutos'),
+        'horas_tarifa_plena': _entero(plan, 'horas_tarifa_plena', opcional=True),
+        'tarifa_plena': _entero(plan, 'tarifa_plena', opcional=True),
+        'tope_diario': _entero(plan, 'tope_diario', opcional=True),
+    }
+    if not 1 <= normalizada['fraccion_minutos'] <= MINUTOS_DIA:
+        raise ValueError("'fraccion_minutos' debe estar entre 1 y 1440")
+    if normalizada['tope_diario'] is not None and MINUTOS_DIA % normalizada['fraccion_minutos']:
+        raise ValueError("Con tope diario, 'fraccion_minutos' debe dividir las 24 horas")
+    if (normalizada['horas_tarifa_plena'] is None) != (normalizada['tarifa_plena'] is None):
+        raise ValueError("'horas_tarifa_plena' y 'tarifa_plena' van juntas")
+
+    for franja in plan['franjas'] or []:
+        dias = sorted(set(franja['dias']))
+        if not dias or any(d not in range(7) for d in dias):
+            raise ValueError(f"Días inválidos en franja: {franja['dias']}")
+        desde, hasta = _minuto_del_dia(franja['desde']), _minuto_del_dia(franja['hasta'])
+        if desde == hasta:
+            raise ValueError(f"Franja vacía: {franja['desde']}-{franja['hasta']}")
+        normalizada['franjas'].append({'dias': dias, 'desde': franja['desde'], 'hasta': franja['hasta'],
+                                       'valor_hora': _entero(franja, 'valor_hora')})
+    return normalizada
+
+def compilar_plan(definicion):
+    """Tabla semanal acumulada (int64, MINUTOS_SEMANA + 1 posiciones) de una definición validada"""
+    valores = np.full(MINUTOS_SEMANA, definicion['valor_hora'], dtype=np.int64)
+    for franja in definicion['franjas']:
+        desde, hasta = _minuto_del_dia(franja['desde']), _minuto_del_dia(franja['hasta'])
+        if hasta <= desde:
+            hasta += MINUTOS_DIA
+        for dia in franja['dias']:
+            valores[np.arange(dia * MINUTOS_DIA + desde, dia * MINUTOS_DIA + hasta) % MINUTOS_SEMANA] = franja['valor_hora']
+    return np.concatenate([[0], np.cumsum(valores)])
+
+class PlanTarifa:
+    """
+    Plan de tarifa compilado. Cobra igual que cobro_plan_tarifa() de
+    PostgreSQL: la estancia se parte en tramos de 24 horas si hay tope diario
+    (uno solo si no), cada tramo se redondea a la fracción de cobro y se valora
+    con la tabla acumulada; después aplican la tarifa plena y el tope
+    """
+
+    def __init__(self, definicion, plan_id=None, nombre='', clase=CLASE_GENERAL):
+        self.definicion = validar_plan(definicion)
+        self.id = plan_id
+        self.nombre = nombre
+        self.clase = clase
+        self.acumulado = compilar_plan(self.definicion)
+        self.total_semana = int(self.acumulado[-1])
+        self.fraccion_us = self.definicion['fraccion_minutos'] * US_POR_MINUTO
+        horas_plena = self.definicion['horas_tarifa_plena']
+        self.limite_plena_us = None if horas_plena is None else horas_plena * US_POR_HORA
+        self.tarifa_plena = self.definicion['tarifa_plena']
+        self.tope_diario = self.definicion['tope_diario']
+
+    def _valor_tramo(self, minuto, minutos):
+        """Valor de `minutos` minutos a partir del minuto absoluto `minuto` (desde 1970)"""
+        semana_a, a = divmod(minuto + DESFASE_EPOCA_MINUTOS, MINUTOS_SEMANA)
+        semana_b, b = divmod(minuto + minutos + DESFASE_EPOCA_MINUTOS, MINUTOS_SEMANA)
+        diferencia = ((semana_b - semana_a) * self.total_semana
+                      + int(self.acumulado[b]) - int(self.acumulado[a]))
+        return -(-diferencia // 60)
+
+    def cobro(self, hora_entrada, hora_salida):
+        """Valor a pagar por la estancia entre hora_entrada y hora_salida (datetime sin zona)"""
+        us = microsegundos(hora_salida - hora_entrada)
+        minuto = microsegundos(hora_entrada - EPOCA) // US_POR_MINUTO
+        bloques = 1 if self.tope_diario is None else max(1, -(-us // US_POR_DIA))
+        total = 0
+        for k in range(bloques):
+            tramo = us if self.tope_diario is None else min(us - k * US_POR_DIA, US_POR_DIA)
+            minutos = -(-tramo // self.fraccion_us) * self.definicion['fraccion_minutos']
+            valor = self._valor_tramo(minuto + k * MINUTOS_DIA, minutos)
+            if self.limite_plena_us is not None and tramo > self.limite_plena_us:
+                valor = self.tarifa_plena
+            if self.tope_diario is not None:
+                valor = min(valor, self.tope_diario)
+            total += valor
+        return total
+
+    def liquidar(self, hora_entrada, hora_salida):
+        """Retorna {total_horas, valor_pagado} como los calcula el trigger con este plan"""
+        us = microsegundos(hora_salida - hora_entrada)
+        return {'total_horas': total_horas(us), 'valor_pagado': self.cobro(hora_entrada, hora_salida)}
+
+    def cobro_lote(self, entradas, salidas):
+        """
+        Cobro de muchas estancias a la vez (arreglos o listas de datetime o
+        datetime64). Los tramos de 24 horas se recorren por índice de día,
+        vectorizados sobre todas las estancias
+        """
+        inicio = np.asarray(entradas, dtype='datetime64[us]').astype(np.int64)
+        us = duraciones_lote(entradas, salidas)
+        minuto = inicio // US_POR_MINUTO
+        total = np.zeros(len(us), dtype=np.int64)
+        bloques = 1 if self.tope_diario is None or not len(us) else max(1, int(-(-us.max() // US_POR_DIA)))
+        for k in range(bloques):
+            tramo = us if self.tope_diario is None else np.minimum(us - k * US_POR_DIA, US_POR_DIA)
+            minutos = -(-tramo // self.fraccion_us) * self.definicion['fraccion_minutos']
+            semana_a, a = np.divmod(minuto + k * MINUTOS_DIA + DESFASE_EPOCA_MINUTOS, MINUTOS_SEMANA)
+            semana_b, b = np.divmod(minuto + k * MINUTOS_DIA + minutos + DESFASE_EPOCA_MINUTOS, MINUTOS_SEMANA)
+            valor = -(-((semana_b - semana_a) * self.total_semana + self.acumulado[b] - self.acumulado[a]) // 60)
+            if self.limite_plena_us is not None:
+                valor = np.where(tramo > self.limite_plena_us, self.tarifa_plena, valor)
+            if self.tope_diario is not None:
+                valor = np.minimum(valor, self.tope_diario)
+            total += np.where((k == 0) | (tramo > 0), valor, 0)
+        return total
+
+    def descripcion(self, hora_entrada, hora_salida):
+        """Texto de la tarifa aplicada, para la ventana de liquidación"""
+        us = microsegundos(hora_salida - hora_entrada)
+        if self.limite_plena_us is not None and us > self.limite_plena_us and self.tope_diario is None:
+            return f"{self.nombre} · tarifa plena (${self.tarifa_plena:,})"
+        if self.tope_diario is not None and us > US_POR_DIA:
+            return f"{self.nombre} · tope de ${self.tope_diario:,} por día"
+        return self.nombre
+
+PLAN_POR_DEFECTO = PlanTarifa(DEFINICION_POR_DEFECTO, nombre=f"Tarifa por hora (${VALOR_HORA:,}/hora)")
+
+# =============================================================================
+# CATÁLOGO DE PLANES
+# =============================================================================
+
+class CatalogoTarifas:
+    """
+    Planes activos por clase de parqueadero y clase de cada parqueadero, en
+    memoria. Como el DirectorioPlacas, se recarga solo cuando cambia el
+    contador tarifas_version (planes nuevos o cambios de clase), así los
+    cambios de tarifa aplican en todas las porterías sin reiniciar. Sin planes
+    (o sin base de datos) cobra con PLAN_POR_DEFECTO, igual que el trigger
+    """
+
+    def __init__(self, db=None):
+        """
+        db: PostgreSQLManager con obtener_planes_tarifa() y obtener_version_tarifas()
+        """
+        self.db = db
+        self.planes = {}  # clase -> PlanTarifa
+        self.clases = {}  # número de parqueadero -> clase (solo las distintas de GENERAL)
+        self.version = None
+        self.cargado = False
+        self._lock = threading.Lock()
+
+    def cargar(self, db=None):
+        """Carga y compila los planes activos; un plan inválido se omite"""
+        datos = (db or self.db).obtener_planes_tarifa()
+        if datos is None:
+            return False
+
+        version, planes, clases = datos
+        compilados = {}
+        for fila in planes:
+            try:
+                compilados[fila['clase']] = PlanTarifa(fila['definicion'], fila['id'], fila['nombre'], fila['clase'])
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Plan de tarifa {fila['id']} ({fila['nombre']}) inválido, se omite: {e}")
+        with self._lock:
+            self.planes = compilados
+            self.clases = dict(clases)
+            self.version = version
+            self.cargado = True
+        return True
+
+    def refrescar_si_cambio(self, db=None):
+        """Consulta el contador de versión y recarga los planes si cambió"""
+        version = (db or self.db).obtener_version_tarifas()
+        if version is None:
+            return False
+        if not self.cargado or version != self.version:
+            return self.cargar(db)
+        return False
+
+    def invalidar(self):
+        """Fuerza la recarga en la próxima verificación"""
+        with self._lock:
+            self.version = None
+
+    def plan(self, parqueadero=None):
+        """Plan que se cobra en el parqueadero (número): el de su clase, el GENERAL o el por defecto"""
+        with self._lock:
+            clase = self.clases.get(parqueadero, CLASE_GENERAL)
+            return self.planes.get(clase) or self.planes.get(CLASE_GENERAL) or PLAN_POR_DEFECTO
+
+    def liquidar(self, parqueadero, hora_entrada, hora_salida):
+        return self.plan(parqueadero).liquidar(hora_entrada, hora_salida)
+
+    def exportar(self):
+        """(version, planes, clases) con la forma de obtener_planes_tarifa, para replicar el catálogo"""
+        with self._lock:
+            planes = [{'id': p.id, 'clase': p.clase, 'nombre': p.nombre, 'definicion': p.definicion}
+                      for p in self.planes.values()]
+            return self.version, planes, dict(self.clases)
+
+# =============================================================================
+# SQL GENERADO
+# =============================================================================
+# Las migraciones guardan el texto que generaron estas funciones (10 y 11), no
+# las llaman: una migración publicada no cambia de significado. Si cambian las
+# constantes, hace falta una migración nueva con el SQL generado de nuevo
+# pegado tal cual (test_tarifas lo verifica) y subir VERSION_ESQUEMA_SQLITE
+
+def sql_funcion_calcular_pago(planes=False):
+    """
+    Función del trigger calcular_pago de PostgreSQL. Con planes=True cobra con
+    el plan activo de la clase del parqueadero (o el GENERAL) y usa la regla de
+    las constantes solo si no hay ninguno
+    """
+    buscar_plan = f"""
+            SELECT pt.id, pt.definicion INTO v_plan, v_definicion
+            FROM parqueaderos p
+            JOIN planes_tarifa pt ON pt.activo AND pt.clase IN (p.clase, '{CLASE_GENERAL}')
+            WHERE p.id = NEW.parqueadero_id
+            ORDER BY pt.clase = p.clase DESC
+            LIMIT 1;
+
+            IF v_plan IS NOT NULL THEN
+                NEW.valor_pagado := cobro_plan_tarifa(v_plan, v_definicion, NEW.hora_entrada, NEW.hora_salida);
+                RETURN NEW;
+            END IF;
+""" if planes else ""
+    variables_plan = """
+            v_plan INTEGER;
+            v_definicion JSONB;""" if planes else ""
+    return f"""
+        CREATE OR REPLACE FUNCTION calcular_pago()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            us BIGINT;{variables_plan}
+        BEGIN
+            us := (EXTRACT(EPOCH FROM (NEW.hora_salida - NEW.hora_entrada)) * 1000000)::BIGINT;
+            NEW.total_horas := ROUND(us / {US_POR_HORA}.0, 2);
+{buscar_plan}
+            -- Primeras {HORAS_TARIFA_POR_HORA} horas a ${VALOR_HORA}/hora (o fracción), después tarifa plena de ${TARIFA_PLENA}
+            IF us <= {LIMITE_TARIFA_POR_HORA_US} THEN
+                NEW.valor_pagado := CEIL(us / {US_POR_HORA}.0) * {VALOR_HORA};
+            ELSE
+                NEW.valor_pagado := {TARIFA_PLENA};
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+
+def sql_funciones_planes():
+    """Funciones de PostgreSQL que cobran con la tabla tarifas_minuto, igual que PlanTarifa.cobro"""
+    return f"""
+        CREATE OR REPLACE FUNCTION valor_tramo_tarifa(p_plan INTEGER, p_minuto BIGINT, p_minutos BIGINT)
+        RETURNS NUMERIC AS $$
+        DECLARE
+            a BIGINT := p_minuto + {DESFASE_EPOCA_MINUTOS};
+            b BIGINT := p_minuto + p_minutos + {DESFASE_EPOCA_MINUTOS};
+            ra INTEGER := ((a % {MINUTOS_SEMANA}) + {MINUTOS_SEMANA}) % {MINUTOS_SEMANA};
+            rb INTEGER := ((b % {MINUTOS_SEMANA}) + {MINUTOS_SEMANA}) % {MINUTOS_SEMANA};
+            semana BIGINT;
+            acumulado_a BIGINT;
+            acumulado_b BIGINT;
+        BEGIN
+            SELECT acumulado INTO semana FROM tarifas_minuto WHERE plan_id = p_plan AND minuto = {MINUTOS_SEMANA};
+            SELECT acumulado INTO acumulado_a FROM tarifas_minuto WHERE plan_id = p_plan AND minuto = ra;
+            SELECT acumulado INTO acumulado_b FROM tarifas_minuto WHERE plan_id = p_plan AND minuto = rb;
+            RETURN CEIL((((b - rb) - (a - ra)) / {MINUTOS_SEMANA} * semana::NUMERIC
+                         + acumulado_b - acumulado_a) / 60.0);
+        END;
+        $$ LANGUAGE plpgsql STABLE;
+
+        CREATE OR REPLACE FUNCTION cobro_plan_tarifa(p_plan INTEGER, p_definicion JSONB,
+                                                     p_entrada TIMESTAMP, p_salida TIMESTAMP)
+        RETURNS NUMERIC AS $$
+        DECLARE
+            us BIGINT := (EXTRACT(EPOCH FROM (p_salida - p_entrada)) * 1000000)::BIGINT;
+            minuto BIGINT := FLOOR(EXTRACT(EPOCH FROM p_entrada) / 60)::BIGINT;
+            fraccion BIGINT := (p_definicion->>'fraccion_minutos')::BIGINT;
+            horas_plena BIGINT := (p_definicion->>'horas_tarifa_plena')::BIGINT;
+            tarifa_plena NUMERIC := (p_definicion->>'tarifa_plena')::NUMERIC;
+            tope NUMERIC := (p_definicion->>'tope_diario')::NUMERIC;
+            bloques BIGINT := 1;
+            tramo BIGINT;
+            valor NUMERIC;
+            total NUMERIC := 0;
+        BEGIN
+            IF tope IS NOT NULL AND us > 0 THEN
+                bloques := CEIL(us / {US_POR_DIA}.0);
+            END IF;
+            FOR k IN 0 .. bloques - 1 LOOP
+                tramo := CASE WHEN tope IS NULL THEN us ELSE LEAST(us - k * {US_POR_DIA}, {US_POR_DIA}) END;
+                valor := valor_tramo_tarifa(p_plan, minuto + k * {MINUTOS_DIA},
+                                            CEIL(tramo / (fraccion * {US_POR_MINUTO}.0))::BIGINT * fraccion);
+                IF horas_plena IS NOT NULL AND tramo > horas_plena * {US_POR_HORA} THEN
+                    valor := tarifa_plena;
+                END IF;
+                IF tope IS NOT NULL THEN
+                    valor := LEAST(valor, tope);
+                END IF;
+                total := total + valor;
+            END LOOP;
+            RETURN total;
+        END;
+        $$ LANGUAGE plpgsql STABLE;
+    """
+
+def sql_cobro_sqlite(us):
+    """
+    Expresiones (total_horas, valor_pagado) de SQLite sobre la expresión entera
+    `us`. SQLite trunca la división entera hacia cero, por eso el techo y el
+    redondeo se arman según el signo; ROUND sobre REAL no daría el mismo
+    redondeo que ROUND(numeric, 2) en los bordes
+    """
+    mitad = US_POR_HORA // 2
+    total_horas = (f"(CASE WHEN {us} >= 0 THEN ({us} * 100 + {mitad}) / {US_POR_HORA} "
+                   f"ELSE -((-{us} * 100 + {mitad}) / {US_POR_HORA}) END) / 100.0")
+    horas = (f"CASE WHEN {us} > 0 THEN ({us} + {US_POR_HORA - 1}) / {US_POR_HORA} "
+             f"ELSE -(-{us} / {US_POR_HORA}) END")
+    valor_pagado = (f"CASE WHEN {us} <= {LIMITE_TARIFA_POR_HORA_US} "
+                    f"THEN ({horas}) * {VALOR_HORA} ELSE {TARIFA_PLENA} END")
+    return total_horas, valor_pagado
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Configuración común de las pruebas: los módulos de la aplicación están en la raíz del repositorio"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Base de datos desechable para las pruebas con PostgreSQL (nunca control_acceso)
+BASE_PRUEBAS = 'control_acceso_pruebas'
+
+@pytest.fixture
+def config_postgresql():
+    """
+    Configuración de una base de datos PostgreSQL vacía, creada de nuevo para
+    cada prueba. El servidor se toma de PGHOST, PGPORT, PGUSER y PGPASSWORD;
+    la prueba se omite si no hay servidor disponible
+    """
+    psycopg2 = pytest.importorskip('psycopg2')
+    config = {
+        'host': os.environ.get('PGHOST', 'localhost'),
+        'port': int(os.environ.get('PGPORT', 5432)),
+        'user': os.environ.get('PGUSER', 'postgres'),
+        'password': os.environ.get('PGPASSWORD', ''),
+        'database': BASE_PRUEBAS,
+    }
+    try:
+        admin = psycopg2.connect(host=config['host'], port=config['port'], user=config['user'],
+                                 password=config['password'], dbname='postgres', connect_timeout=3)
+    except psycopg2.Error as e:
+        pytest.skip(f"PostgreSQL no disponible: {e}")
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS {BASE_PRUEBAS} WITH (FORCE)")
+            cur.execute(f"CREATE DATABASE {BASE_PRUEBAS}")
+        yield config
+    finally:
+        admin.close()
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+Presupuesto de arranque (ver medir_arranque): la importación en frío no excede
+PRESUPUESTO_MS ni carga OpenCV, Tesseract, pandas, matplotlib o PIL
+"""
+
+import pytest
+
+from medir_arranque import PRESUPUESTO_MS, verificar_arranque
+
+@pytest.mark.parametrize('modulo', ['run_app', 'Vehiculo'])
+def test_arranque_dentro_del_presupuesto(modulo):
+    total, problemas, _ = verificar_arranque(modulo, PRESUPUESTO_MS)
+    assert not problemas, f"import {modulo}: {total:.0f} ms\n" + '\n'.join(problemas)
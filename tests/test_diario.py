@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Recuperación del diario en memoria y de la cola sin conexión tras un cierre inesperado"""
+
+import json
+
+from diario_memoria import DiarioMemoria, leer_eventos
+
+def _escribir(diario, *placas):
+    for placa in placas:
+        diario.escribir({'op': 'estado_residente', 'placa': placa, 'estado': 'OCUPADO'}, sincronizar=True)
+
+def _placas(eventos):
+    return [e['placa'] for e in eventos]
+
+def test_linea_sin_salto_se_recorta_antes_de_seguir_escribiendo(tmp_path):
+    ruta = str(tmp_path / 'diario')
+    diario = DiarioMemoria(ruta)
+    diario.recuperar()
+    _escribir(diario, 'A', 'B')
+    diario.cerrar()
+    # Cierre justo antes del último '\n': la línea de B se lee completa pero nunca se confirmó
+    with open(ruta, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 1)
+
+    diario = DiarioMemoria(ruta)
+    _, eventos = diario.recuperar()
+    assert _placas(eventos) == ['A']
+    _escribir(diario, 'C', 'D')
+    diario.cerrar()
+
+    _, eventos = DiarioMemoria(ruta).recuperar()
+    assert _placas(eventos) == ['A', 'C', 'D']
+
+def test_linea_danada_en_medio_se_omite(tmp_path):
+    ruta = tmp_path / 'eventos'
+    lineas = [json.dumps({'seq': 1, 'placa': 'A'}), '{"seq": 2, "pla', json.dumps({'seq': 3, 'placa': 'C'})]
+    ruta.write_text('\n'.join(lineas) + '\n', encoding='utf-8')
+
+    assert _placas(leer_eventos(str(ruta))) == ['A', 'C']
+    # Las líneas completas se conservan; solo se recorta una última línea sin '\n'
+    assert ruta.read_text(encoding='utf-8').count('\n') == 3
+
+def test_cola_sin_conexion_no_pierde_operaciones_posteriores(tmp_path):
+    from sincronizacion import ColaSincronizacion
+
+    ruta = str(tmp_path / 'cola')
+    cola = ColaSincronizacion(ruta)
+    cola.agregar({'op': 'estado_residente', 'placa': 'A', 'estado': 'OCUPADO'})
+    cola.agregar({'op': 'estado_residente', 'placa': 'B', 'estado': 'OCUPADO'})
+    cola.cerrar()
+    with open(ruta, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 1)
+
+    cola = ColaSincronizacion(ruta)
+    assert _placas(cola.lote()) == ['A']
+    cola.agregar({'op': 'estado_residente', 'placa': 'C', 'estado': 'OCUPADO'})
+    cola.cerrar()
+
+    assert _placas(ColaSincronizacion(ruta).lote()) == ['A', 'C']
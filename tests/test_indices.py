@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Las consultas frecuentes usan su índice (solo PostgreSQL, ver
+conftest.config_postgresql). Con datos de un conjunto grande el índice de
+cada consulta es el más barato; el Seq Scan se desactiva dentro de la
+transacción para que el resultado no dependa del volumen exacto
+"""
+
+import pytest
+
+from base_datos import PostgreSQLManager
+
+# Consultas representativas y el índice que cada una debe poder usar
+CONSULTAS_INDEXADAS = [
+    ("idx_registros_activos_placa",
+     "SELECT id FROM registros_visitantes WHERE placa = 'ABC123' AND hora_salida IS NULL "
+     "ORDER BY hora_entrada DESC LIMIT 1"),
+    ("idx_registros_activos_id",
+     "SELECT hora_salida FROM registros_visitantes WHERE id = 1 AND hora_salida IS NULL"),
+    ("idx_registros_hora_salida",
+     "SELECT id FROM registros_visitantes WHERE hora_salida IS NOT NULL "
+     "ORDER BY hora_salida DESC, id DESC LIMIT 100"),
+    ("idx_registros_hora_salida",
+     "SELECT id FROM registros_visitantes WHERE hora_salida IS NOT NULL "
+     "AND (hora_salida, id) < ('2024-01-01', 1000) ORDER BY hora_salida DESC, id DESC LIMIT 100"),
+    ("idx_registros_historial_placa",
+     "SELECT id FROM registros_visitantes WHERE hora_salida IS NOT NULL AND placa LIKE 'ABC%' "
+     "ORDER BY hora_salida DESC, id DESC LIMIT 100"),
+    ("idx_registros_fecha_salida",
+     "SELECT COALESCE(SUM(valor_pagado), 0) FROM registros_visitantes "
+     "WHERE DATE(hora_salida) = CURRENT_DATE"),
+    ("idx_parqueaderos_residente_estado",
+     "SELECT COUNT(*) FROM parqueaderos WHERE residente_id = 1 AND estado = 'OCUPADO'"),
+    ("idx_parqueaderos_visitantes_libres",
+     "SELECT id, numero FROM parqueaderos WHERE residente_id IS NULL AND estado = 'LIBRE' "
+     "ORDER BY numero"),
+]
+
+def _indices_en_plan(nodo):
+    """Recorre un plan de EXPLAIN (FORMAT JSON) y retorna los índices usados"""
+    indices = set()
+    if 'Index Name' in nodo:
+        indices.add(nodo['Index Name'])
+    for hijo in nodo.get('Plans', []):
+        indices |= _indices_en_plan(hijo)
+    return indices
+
+# Datos de un conjunto grande: con tablas vacías cualquier índice sirve de sustituto
+# del Seq Scan. 3.000 parqueaderos de visitantes (un tercio libres), un historial de
+# unos dos meses (20.000 salidas de 5.000 placas) y 300 visitantes dentro
+SQL_PARQUEADEROS_PRUEBA = """
+    INSERT INTO parqueaderos (numero, estado)
+    SELECT g, CASE WHEN g % 3 = 0 THEN 'LIBRE' ELSE 'OCUPADO' END
+    FROM generate_series(100, 3099) g
+"""
+SQL_HISTORIAL_PRUEBA = """
+    INSERT INTO registros_visitantes (placa, parqueadero_id, hora_entrada, hora_salida, total_horas, valor_pagado)
+    SELECT 'P' || lpad((g % 5000)::text, 5, '0'), p.id,
+           LOCALTIMESTAMP - g * INTERVAL '4 minutes' - INTERVAL '2 hours',
+           CASE WHEN g > 300 THEN LOCALTIMESTAMP - g * INTERVAL '4 minutes' END,
+           CASE WHEN g > 300 THEN 2 END, CASE WHEN g > 300 THEN 2000 END
+    FROM generate_series(1, 20300) g
+    JOIN parqueaderos p ON p.numero = 6 + g % 5
+"""
+
+@pytest.fixture
+def conexion(config_postgresql):
+    manager = PostgreSQLManager(config_postgresql)
+    assert manager.conectado
+    with manager.connection.cursor() as cursor:
+        cursor.execute(SQL_PARQUEADEROS_PRUEBA)
+        cursor.execute(SQL_HISTORIAL_PRUEBA)
+        cursor.execute("ANALYZE registros_visitantes")
+        cursor.execute("ANALYZE parqueaderos")
+    manager.connection.commit()
+    yield manager.connection
+    manager.cerrar()
+
+def test_consultas_frecuentes_usan_su_indice(conexion):
+    faltantes = []
+    with conexion.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        for indice, consulta in CONSULTAS_INDEXADAS:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + consulta)
+            plan = cursor.fetchone()[0][0]['Plan']
+            # En una tabla particionada el plan nombra los índices de cada partición
+            cursor.execute("""
+                SELECT COALESCE(pg_partition_root(nombre::regclass)::text, nombre)
+                FROM unnest(%s::text[]) nombre
+            """, (sorted(_indices_en_plan(plan)),))
+            usados = sorted(fila[0] for fila in cursor.fetchall())
+            if indice not in usados:
+                faltantes.append(f"{indice}: {', '.join(usados) or 'Seq Scan'} en {consulta}")
+    conexion.rollback()
+    assert not faltantes, '\n'.join(faltantes)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Esquema PostgreSQL migrado desde cero (se omite sin servidor, ver conftest.config_postgresql)"""
+
+import time
+
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.extras import RealDictCursor
+
+from base_datos import PostgreSQLManager
+from migraciones import VERSION_ESQUEMA
+from repositorio import RepositorioPostgreSQL
+
+@pytest.fixture
+def manager(config_postgresql):
+    manager = PostgreSQLManager(config_postgresql)
+    assert manager.conectado
+    yield manager
+    manager.cerrar()
+
+def _ejecutar(manager, sql, parametros=()):
+    manager.cursor.execute(sql, parametros)
+    manager.connection.commit()
+
+def test_migra_hasta_la_ultima_version(manager):
+    assert manager.obtener_version_esquema() == VERSION_ESQUEMA
+
+def test_estado_de_parqueaderos_no_cambia_la_version_del_directorio(manager):
+    version = manager.obtener_version_directorio()
+    _ejecutar(manager, "UPDATE parqueaderos SET estado = 'OCUPADO' WHERE numero IN (1, 6)")
+    assert manager.obtener_version_directorio() == version
+
+    _ejecutar(manager, "UPDATE parqueaderos SET residente_id = NULL WHERE numero = 5")
+    assert manager.obtener_version_directorio() == version + 1
+    _ejecutar(manager, "UPDATE parqueaderos SET numero = 105 WHERE numero = 4")
+    assert manager.obtener_version_directorio() == version + 2
+
+def test_clasificacion_con_el_estado_cambiado_en_otra_porteria(manager):
+    repo = RepositorioPostgreSQL(manager)
+    repo.refrescar()
+    # Otra portería: su propio directorio (un clon comparte el de repo)
+    otra = RepositorioPostgreSQL(PostgreSQLManager(manager.config))
+    try:
+        assert otra.entrada_residente('ABC123')['resultado'] == 'OK'
+        # El directorio no se recarga: el estado llega por el aviso de estado_residentes
+        limite = time.monotonic() + 5
+        while repo.clasificar_placa('ABC123')['estado'] != 'OCUPADO' and time.monotonic() < limite:
+            assert not repo.refrescar()
+            time.sleep(0.05)
+        assert repo.clasificar_placa('ABC123')['estado'] == 'OCUPADO'
+        metricas = repo.metricas()
+        assert metricas['recargas'] == 1 and metricas['avisos_estado'] >= 1
+    finally:
+        otra.cerrar()
+        repo.directorio.cerrar()
+
+def test_clasificar_residente_no_consulta_la_base_de_datos(manager):
+    repo = RepositorioPostgreSQL(manager)
+    repo.refrescar()
+    manager.cursor = None  # cualquier consulta fallaría
+    try:
+        assert repo.clasificar_placa('ABC123')['tipo'] == 'RESIDENTE'
+    finally:
+        manager.cursor = manager.connection.cursor(cursor_factory=RealDictCursor)
+        repo.directorio.cerrar()
+
+def test_estadisticas_no_acumulan_el_recaudo_mensual(manager):
+    _ejecutar(manager, """
+        INSERT INTO registros_visitantes (placa, parqueadero_id, hora_entrada, hora_salida, total_horas, valor_pagado)
+        SELECT 'MES001', id, date_trunc('month', LOCALTIMESTAMP) - INTERVAL '10 days',
+               date_trunc('month', LOCALTIMESTAMP) - INTERVAL '10 days' + INTERVAL '1 hour', 1, 1000
+        FROM parqueaderos WHERE numero = 6
+    """)
+    _ejecutar(manager, "DELETE FROM recaudo_mensual_meses")
+    _ejecutar(manager, "DELETE FROM recaudo_mensual")
+
+    # El mes cerrado sin acumular se suma en vivo y el refresco no escribe
+    assert manager.obtener_estadisticas()['total_recaudado'] == 1000
+    assert manager.obtener_estadisticas_por_tipo()['visitantes']['ingresos'] == 1000
+    manager.cursor.execute("SELECT COUNT(*) AS meses FROM recaudo_mensual_meses")
+    assert manager.cursor.fetchone()['meses'] == 0
+    manager.connection.commit()
+
+    manager.mes_mantenimiento = None
+    manager.mantenimiento_mensual()
+    manager.cursor.execute("SELECT SUM(recaudo) AS recaudo FROM recaudo_mensual")
+    assert manager.cursor.fetchone()['recaudo'] == 1000
+    manager.connection.commit()
+    assert manager.obtener_estadisticas()['total_recaudado'] == 1000
+    assert manager.obtener_estadisticas_por_tipo()['visitantes']['ingresos'] == 1000
+
+@pytest.mark.parametrize('consulta, argumentos', [
+    ('verificar_placa_residente', ('ABC123',)),
+    ('clasificar_placa', ('XYZ999',)),
+    ('obtener_visitante_activo_por_placa', ('XYZ999',)),
+    ('obtener_visitantes_activos', ()),
+    ('obtener_parqueaderos_libres_visitantes', ()),
+    ('obtener_estado_parqueaderos', ()),
+])
+def test_las_lecturas_no_dejan_la_transaccion_abierta(manager, consulta, argumentos):
+    getattr(manager, consulta)(*argumentos)
+    # Sin "idle in transaction": no retiene bloqueos sobre las particiones
+    assert manager.connection.info.transaction_status == TRANSACTION_STATUS_IDLE
+
+def test_entrada_sin_parqueaderos_de_visitantes_es_conflicto(manager):
+    _ejecutar(manager, "DELETE FROM parqueaderos WHERE residente_id IS NULL")
+    entrada = {'clave': '5f0c6d1e-0000-4000-8000-000000000001', 'op': 'entrada_visitante',
+               'placa': 'OFF001', 'parqueadero': 6, 'hora_entrada': '2026-03-02T08:00:00'}
+    salida = {'clave': '5f0c6d1e-0000-4000-8000-000000000002', 'op': 'salida_visitante',
+              'id': entrada['clave'], 'hora_salida': '2026-03-02T09:00:00'}
+
+    assert manager.aplicar_operaciones_sincronizadas([entrada, salida]) == \
+        {'aplicadas': 2, 'duplicadas': 0, 'conflictos': 2}
+    # Reenviar el lote no vuelve a fallar
+    assert manager.aplicar_operaciones_sincronizadas([entrada, salida])['duplicadas'] == 2
+
+def test_salida_sin_trigger_cobra_el_plan_del_parqueadero(manager):
+    _ejecutar(manager, "UPDATE parqueaderos SET clase = 'MOTOS' WHERE numero = 9")
+    assert manager.guardar_plan_tarifa('MOTOS', 'Motos', {'valor_hora': 300, 'tarifa_plena': 2000})
+    manager.cursor.execute("""
+        INSERT INTO registros_visitantes (placa, parqueadero_id, hora_entrada)
+        SELECT 'MOT001', id, CURRENT_TIMESTAMP - INTERVAL '119 minutes' FROM parqueaderos WHERE numero = 9
+        RETURNING id, parqueadero_id
+    """)
+    registro = manager.cursor.fetchone()
+    manager.connection.commit()
+    # Sin el trigger queda el cálculo manual: debe cobrar como calcular_pago
+    _ejecutar(manager, "ALTER TABLE registros_visitantes DISABLE TRIGGER trigger_calculo_pago")
+
+    resultado = manager.registrar_salida_visitante(registro['id'], registro['parqueadero_id'])
+    # Dos horas del plan de motos, no 2 * VALOR_HORA de la tarifa por defecto
+    assert resultado['valor_pagado'] == 600
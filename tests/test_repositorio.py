@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Reglas de la portería comunes a todos los repositorios: códigos de resultado,
+asignación de parqueaderos con entradas concurrentes, orden de las páginas del
+historial y resumen diario. Todos parten de los mismos datos iniciales:
+residentes ABC123..MNO345 en los parqueaderos 1-5 y visitantes en 6-10
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from repositorio import RepositorioMemoria
+from repositorio_sqlite import RepositorioSQLite
+from tarifas import es_tarifa_plena, microsegundos
+
+PARQUEADEROS_VISITANTES = {6, 7, 8, 9, 10}
+
+@pytest.fixture(params=['memoria', 'sqlite', 'postgresql'])
+def repo(request, tmp_path):
+    if request.param == 'memoria':
+        repo = RepositorioMemoria()
+    elif request.param == 'sqlite':
+        repo = RepositorioSQLite(str(tmp_path / 'control_acceso.db'))
+    else:
+        from base_datos import PostgreSQLManager
+        from repositorio import RepositorioPostgreSQL
+        repo = RepositorioPostgreSQL(PostgreSQLManager(request.getfixturevalue('config_postgresql')))
+    assert repo.conectado
+    yield repo
+    repo.cerrar()
+
+def _visita(repo, placa):
+    """Entrada y salida inmediata de un visitante; retorna la salida liquidada"""
+    entrada = repo.entrada_visitante(placa)
+    assert entrada['resultado'] == 'OK'
+    return repo.salida_visitante(entrada['registro_id'], entrada['parqueadero_id'])
+
+# =============================================================================
+# CÓDIGOS DE RESULTADO
+# =============================================================================
+
+def test_entrada_y_salida_de_residente(repo):
+    assert repo.entrada_residente('ABC123')['resultado'] == 'OK'
+    repetida = repo.entrada_residente('ABC123')
+    assert repetida['resultado'] == 'YA_OCUPADO'
+    assert repetida['parqueadero'] == 1
+    assert repo.clasificar_placa('ABC123')['estado'] == 'OCUPADO'
+
+    assert repo.salida_residente('ABC123')['resultado'] == 'OK'
+    assert repo.salida_residente('ABC123')['resultado'] == 'YA_LIBRE'
+    assert repo.entrada_residente('ZZZ999')['resultado'] == 'NO_RESIDENTE'
+
+def test_entrada_de_visitante(repo):
+    entrada = repo.entrada_visitante('VIS001')
+    assert entrada['resultado'] == 'OK'
+    assert entrada['parqueadero'] == 6
+    assert repo.entrada_visitante('VIS001')['resultado'] == 'ACTIVO'
+    assert repo.entrada_visitante('ABC123')['resultado'] == 'RESIDENTE'
+
+    activo = repo.visitante_activo('VIS001')
+    assert activo['id'] == entrada['registro_id']
+    assert repo.clasificar_placa('VIS001')['tipo'] == 'VISITANTE'
+
+def test_sin_cupo_cuando_todos_estan_ocupados(repo):
+    for i in range(len(PARQUEADEROS_VISITANTES)):
+        assert repo.entrada_visitante(f"VIS{i:03d}")['resultado'] == 'OK'
+    assert repo.entrada_visitante('VIS999')['resultado'] == 'SIN_CUPO'
+    assert repo.estadisticas()['visitantes_activos'] == len(PARQUEADEROS_VISITANTES)
+
+def test_segunda_salida_retorna_none(repo):
+    entrada = repo.entrada_visitante('VIS001')
+    salida = repo.salida_visitante(entrada['registro_id'], entrada['parqueadero_id'])
+    assert salida['valor_pagado'] > 0
+    assert repo.salida_visitante(entrada['registro_id'], entrada['parqueadero_id']) is None
+    assert repo.visitante_activo('VIS001') is None
+    # El parqueadero quedó libre y se vuelve a asignar
+    assert repo.entrada_visitante('VIS002')['parqueadero'] == entrada['parqueadero']
+
+# =============================================================================
+# CONCURRENCIA
+# =============================================================================
+
+def test_entradas_concurrentes_no_comparten_parqueadero(repo):
+    hilos_totales = 12
+    barrera = threading.Barrier(hilos_totales)
+    resultados = [None] * hilos_totales
+    errores = []
+
+    def entrar(i):
+        clon = repo.clonar()
+        try:
+            barrera.wait()
+            resultados[i] = clon.entrada_visitante(f"CON{i:03d}")
+        except Exception as e:
+            errores.append(e)
+        finally:
+            if clon is not repo:
+                clon.cerrar()
+
+    hilos = [threading.Thread(target=entrar, args=(i,)) for i in range(hilos_totales)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert not errores
+    asignados = [r['parqueadero'] for r in resultados if r['resultado'] == 'OK']
+    assert sorted(asignados) == sorted(PARQUEADEROS_VISITANTES)
+    assert [r['resultado'] for r in resultados].count('SIN_CUPO') == hilos_totales - len(asignados)
+
+# =============================================================================
+# HISTORIAL
+# =============================================================================
+
+def test_paginas_del_historial_en_orden(repo):
+    for i in range(7):
+        _visita(repo, f"HIS{i:03d}")
+
+    completo = repo.pagina_historial(tamano=100)
+    assert len(completo) == 7
+    claves = [(r['hora_salida'], r['id']) for r in completo]
+    assert claves == sorted(claves, reverse=True)
+
+    paginas, despues = [], None
+    while True:
+        pagina = repo.pagina_historial(despues, tamano=3)
+        paginas.extend(pagina)
+        if len(pagina) < 3:
+            break
+        despues = (pagina[-1]['hora_salida'], pagina[-1]['id'])
+    assert [r['id'] for r in paginas] == [r['id'] for r in completo]
+
+    por_placa = repo.pagina_historial(placa='HIS00')
+    assert {r['placa'] for r in por_placa} == {f"HIS{i:03d}" for i in range(7)}
+    assert repo.pagina_historial(placa='XYZ') == []
+
+def test_resumen_diario_coincide_con_el_historial(repo):
+    for i in range(4):
+        _visita(repo, f"RES{i:03d}")
+    hoy = datetime.now().date()
+    filas = repo.pagina_historial(tamano=100, desde=hoy, hasta=hoy)
+
+    resumen = repo.resumen_diario(hoy, hoy)
+    assert len(resumen) == 1
+    dia = resumen[0]
+    plenas = [r for r in filas if es_tarifa_plena(microsegundos(r['hora_salida'] - r['hora_entrada']))]
+    por_hora = [r for r in filas if r not in plenas]
+    assert dia['fecha'] == hoy
+    assert dia['salidas'] == len(filas)
+    assert float(dia['horas']) == pytest.approx(sum(float(r['total_horas']) for r in filas))
+    assert float(dia['recaudo']) == pytest.approx(sum(float(r['valor_pagado']) for r in filas))
+    assert dia['salidas_por_hora'] == len(por_hora)
+    assert float(dia['recaudo_por_hora']) == pytest.approx(sum(float(r['valor_pagado']) for r in por_hora))
+    assert dia['salidas_tarifa_plena'] == len(plenas)
+    assert float(dia['recaudo_tarifa_plena']) == pytest.approx(sum(float(r['valor_pagado']) for r in plenas))
+    assert float(repo.estadisticas()['recaudado_hoy']) == pytest.approx(float(dia['recaudo']))
+
+def test_estadisticas_con_el_recaudo_total(repo):
+    cobrado = sum(float(_visita(repo, f"TOT{i:03d}")['valor_pagado']) for i in range(3))
+    stats = repo.estadisticas()
+    assert float(stats['total_recaudado']) == pytest.approx(cobrado)
+    assert stats['visitantes_activos'] == 0
+
+# =============================================================================
+# SQLITE
+# =============================================================================
+
+def test_sqlite_acumula_el_recaudo_desde_la_version_anterior(tmp_path):
+    ruta = str(tmp_path / 'anterior.db')
+    repo = RepositorioSQLite(ruta)
+    _visita(repo, 'ANT001')
+    # Base de datos de la versión 3: sin recaudo_total
+    repo.connection.execute("DROP TABLE recaudo_total")
+    repo.connection.execute("PRAGMA user_version = 3")
+    repo.cerrar()
+
+    repo = RepositorioSQLite(ruta)
+    try:
+        cobrado = float(repo.pagina_historial()[0]['valor_pagado'])
+        assert repo.estadisticas()['total_recaudado'] == pytest.approx(cobrado)
+        with repo._transaccion() as cur:
+            cur.execute("DELETE FROM registros_visitantes")
+        assert repo.estadisticas()['total_recaudado'] == 0
+    finally:
+        repo.cerrar()
+
+def test_sqlite_estadisticas_sin_tabla_retornan_ceros(tmp_path):
+    repo = RepositorioSQLite(str(tmp_path / 'control_acceso.db'))
+    try:
+        repo.connection.execute("DROP TABLE recaudo_total")
+        stats = repo.estadisticas()
+        assert stats == {'total_parqueaderos': 0, 'ocupados': 0, 'visitantes_activos': 0,
+                         'total_recaudado': 0.0, 'recaudado_hoy': 0.0}
+    finally:
+        repo.cerrar()
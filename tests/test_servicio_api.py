@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Autorización y validación de entradas del servicio HTTP (sin abrir sockets)"""
+
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from repositorio import RepositorioMemoria
+from servicio_api import ServicioAPI
+
+TOKEN = 'secreto-de-prueba'
+
+@pytest.fixture
+def servicio():
+    servicio = ServicioAPI(RepositorioMemoria(), hilos=1, hilos_ocr=1, token=TOKEN)
+    yield servicio
+    servicio.cerrar()
+
+def _pedir(servicio, metodo, destino, datos=None, token=TOKEN):
+    cabeceras = {'authorization': f'Bearer {token}'} if token else {}
+    cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b''
+    return asyncio.run(servicio._responder(metodo, destino, cabeceras, cuerpo))
+
+def test_escucha_solo_en_la_maquina_local_por_defecto(servicio):
+    assert servicio.host == '127.0.0.1'
+
+def test_escrituras_exigen_el_token(servicio):
+    estado, _ = _pedir(servicio, 'POST', '/visitantes', {'placa': 'VIS001'}, token=None)
+    assert estado == HTTPStatus.UNAUTHORIZED
+    estado, _ = _pedir(servicio, 'POST', '/visitantes', {'placa': 'VIS001'}, token='otro')
+    assert estado == HTTPStatus.UNAUTHORIZED
+
+    estado, datos = _pedir(servicio, 'POST', '/visitantes', {'placa': 'VIS001'})
+    assert estado == HTTPStatus.OK and datos['resultado'] == 'OK'
+    # Las consultas no necesitan token
+    estado, _ = _pedir(servicio, 'GET', '/visitantes/VIS001', token=None)
+    assert estado == HTTPStatus.OK
+
+def test_sin_token_configurado_el_servicio_es_de_solo_lectura():
+    servicio = ServicioAPI(RepositorioMemoria(), hilos=1, hilos_ocr=1)
+    try:
+        estado, _ = _pedir(servicio, 'POST', '/residentes/ABC123/entrada', token='cualquiera')
+        assert estado == HTTPStatus.FORBIDDEN
+    finally:
+        servicio.cerrar()
+
+@pytest.mark.parametrize('metodo, destino, datos', [
+    ('GET', '/historial?tamano=abc', None),
+    ('GET', '/historial?tamano=0', None),
+    ('GET', '/historial?despues_hora=2026-01-01T10:00:00&despues_id=x', None),
+    ('POST', '/visitantes', ['VIS001']),
+    ('POST', '/registros/1/salida', [1]),
+    ('POST', '/tarifas', 'GENERAL'),
+    ('GET', '/intervalos?desde=2026-01-01', None),
+    ('GET', '/intervalos?desde=2026-13-01&hasta=2026-02-01', None),
+    ('GET', '/intervalos?desde=2026-02-01&hasta=2026-01-01', None),
+])
+def test_entradas_invalidas_son_bad_request(servicio, metodo, destino, datos):
+    estado, respuesta = _pedir(servicio, metodo, destino, datos)
+    assert estado == HTTPStatus.BAD_REQUEST, respuesta
+    assert 'error' in respuesta
+
+def test_intervalos_con_fechas_sin_hora(servicio):
+    _pedir(servicio, 'POST', '/visitantes', {'placa': 'VIS001'})
+    estado, visitas = _pedir(servicio, 'GET', '/intervalos?desde=2000-01-01&hasta=2100-01-01')
+    assert estado == HTTPStatus.OK, visitas
+    assert [parqueadero for parqueadero, _, salida in visitas if salida is None] != []
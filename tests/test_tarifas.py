@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+El cobro de Python (individual, por lotes y por plan) coincide con el trigger
+de SQLite generado por sql_cobro_sqlite, con duraciones aleatorias y en los
+bordes: horas exactas ± 1 µs, el límite de la tarifa plena y estancias de
+menos de un milisegundo. La última migración de PostgreSQL que define
+calcular_pago trae el SQL que generan hoy las constantes
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from migraciones import MIGRACIONES
+from repositorio_sqlite import RepositorioSQLite, _texto_hora
+from tarifas import (LIMITE_TARIFA_POR_HORA_US, PLAN_POR_DEFECTO, TARIFA_PLENA, US_POR_HORA, VALOR_HORA,
+                     CatalogoTarifas, PlanTarifa, auditar_cobros, cobro, cobro_lote, liquidar,
+                     sql_funcion_calcular_pago, sql_funciones_planes, total_horas, total_horas_lote)
+
+SEMILLA = 20260
+ENTRADA_BASE = datetime(2026, 3, 2, 7, 15, 30, 250000)
+
+def _duraciones():
+    """Bordes fijos más duraciones aleatorias (semilla fija) hasta dos días"""
+    azar = random.Random(SEMILLA)
+    bordes = [0, 1, 999, 500_000]
+    for horas in range(0, 7):
+        bordes += [horas * US_POR_HORA - 1, horas * US_POR_HORA, horas * US_POR_HORA + 1]
+    bordes += [LIMITE_TARIFA_POR_HORA_US - 1, LIMITE_TARIFA_POR_HORA_US, LIMITE_TARIFA_POR_HORA_US + 1]
+    # Medias centésimas de hora: el borde del redondeo de total_horas
+    bordes += [k * US_POR_HORA // 200 for k in (1, 3, 99, 101)]
+    submilisegundo = [azar.randrange(1000) for _ in range(50)]
+    aleatorias = [azar.randrange(2 * 24 * US_POR_HORA) for _ in range(500)]
+    return sorted(set(b for b in bordes if b >= 0)) + submilisegundo + aleatorias
+
+DURACIONES = _duraciones()
+
+@pytest.fixture(scope='module')
+def cobros_sqlite(tmp_path_factory):
+    """(total_horas, valor_pagado) que calcula el trigger de SQLite para cada duración"""
+    repo = RepositorioSQLite(str(tmp_path_factory.mktemp('tarifas') / 'tarifas.db'))
+    with repo._transaccion() as cur:
+        parqueadero_id = cur.execute("SELECT id FROM parqueaderos WHERE numero = 6").fetchone()[0]
+        for i, us in enumerate(DURACIONES):
+            cur.execute("INSERT INTO registros_visitantes (id, placa, parqueadero_id, hora_entrada) "
+                        "VALUES (?, 'TAR001', ?, ?)", (i + 1, parqueadero_id, _texto_hora(ENTRADA_BASE)))
+            cur.execute("UPDATE registros_visitantes SET hora_salida = ? WHERE id = ?",
+                        (_texto_hora(ENTRADA_BASE + timedelta(microseconds=us)), i + 1))
+    filas = repo._consultar("SELECT total_horas, valor_pagado FROM registros_visitantes ORDER BY id")
+    repo.cerrar()
+    return [(f['total_horas'], f['valor_pagado']) for f in filas]
+
+def test_cobro_individual_coincide_con_el_trigger(cobros_sqlite):
+    for us, (horas_sqlite, valor_sqlite) in zip(DURACIONES, cobros_sqlite):
+        assert cobro(us) == valor_sqlite, us
+        assert total_horas(us) == horas_sqlite, us
+        salida = ENTRADA_BASE + timedelta(microseconds=us)
+        assert liquidar(ENTRADA_BASE, salida) == {'total_horas': horas_sqlite, 'valor_pagado': valor_sqlite}
+        assert PLAN_POR_DEFECTO.cobro(ENTRADA_BASE, salida) == valor_sqlite, us
+
+def test_cobro_por_lotes_coincide_con_el_trigger(cobros_sqlite):
+    us = np.array(DURACIONES, dtype=np.int64)
+    horas_sqlite = np.array([h for h, _ in cobros_sqlite])
+    valores_sqlite = np.array([v for _, v in cobros_sqlite])
+    assert np.array_equal(cobro_lote(us), valores_sqlite)
+    assert np.array_equal(total_horas_lote(us), horas_sqlite)
+
+    salidas = [ENTRADA_BASE + timedelta(microseconds=int(d)) for d in DURACIONES]
+    assert np.array_equal(PLAN_POR_DEFECTO.cobro_lote([ENTRADA_BASE] * len(salidas), salidas), valores_sqlite)
+
+def test_bordes_de_la_tarifa():
+    assert cobro(0) == 0
+    assert cobro(1) == VALOR_HORA
+    assert cobro(US_POR_HORA) == VALOR_HORA
+    assert cobro(US_POR_HORA + 1) == 2 * VALOR_HORA
+    assert cobro(LIMITE_TARIFA_POR_HORA_US) == 5 * VALOR_HORA
+    assert cobro(LIMITE_TARIFA_POR_HORA_US + 1) == TARIFA_PLENA
+
+# =============================================================================
+# AUDITORÍA
+# =============================================================================
+
+def _salida(registro_id, parqueadero, horas, valor_pagado):
+    return {'id': registro_id, 'parqueadero': parqueadero, 'hora_entrada': ENTRADA_BASE,
+            'hora_salida': ENTRADA_BASE + timedelta(hours=horas), 'valor_pagado': valor_pagado}
+
+def test_auditar_cobros_con_la_tarifa_por_defecto():
+    filas = [_salida(1, 6, 2, 2 * VALOR_HORA), _salida(2, 7, 6, 5000)]
+    diferencias = auditar_cobros(filas)
+    assert [(f['id'], f['valor_esperado']) for f in diferencias] == [(2, TARIFA_PLENA)]
+
+def test_auditar_cobros_con_el_plan_de_cada_parqueadero():
+    catalogo = CatalogoTarifas()
+    catalogo.planes = {
+        'GENERAL': PLAN_POR_DEFECTO,
+        'MOTOS': PlanTarifa({'valor_hora': 300, 'tarifa_plena': 2000}, 1, 'Motos', 'MOTOS'),
+    }
+    catalogo.clases = {9: 'MOTOS'}
+    filas = [_salida(1, 6, 2, 2 * VALOR_HORA), _salida(2, 9, 2, 600), _salida(3, 9, 2, 2 * VALOR_HORA)]
+
+    assert [f['id'] for f in auditar_cobros(filas, catalogo)] == [3]
+    assert auditar_cobros(filas, catalogo)[0]['valor_esperado'] == 600
+    # Sin catálogo todas se auditan con la tarifa por defecto
+    assert [f['id'] for f in auditar_cobros(filas)] == [2]
+
+# =============================================================================
+# MIGRACIONES
+# =============================================================================
+
+def _sin_espacios_finales(sql):
+    return '\n'.join(linea.rstrip() for linea in sql.strip().splitlines())
+
+def test_la_ultima_migracion_de_calcular_pago_trae_el_sql_generado():
+    # Si falla, cambiaron las constantes o el generador: agregar una migración
+    # nueva con este SQL, nunca editar la 10 ni la 11
+    version, _, sql = [m for m in MIGRACIONES if 'FUNCTION calcular_pago()' in m[2]][-1]
+    generado = sql_funciones_planes() + sql_funcion_calcular_pago(planes=True)
+    assert _sin_espacios_finales(generado) in _sin_espacios_finales(sql), f"migración {version}"
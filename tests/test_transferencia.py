@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Exportación a Parquet: los errores de pyarrow no se confunden con fallas del repositorio"""
+
+import pytest
+
+from repositorio import COLUMNAS_EXPORTACION
+from transferencia import exportar_historial
+
+pa = pytest.importorskip('pyarrow')
+
+FILAS = 200_000  # varios lotes de pyarrow: el hilo sigue escribiendo cuando pyarrow falla
+
+class RepositorioCSV:
+    """Escribe un CSV fijo como exportar_historial_csv (None si el archivo falla)"""
+
+    def __init__(self, valor_pagado='2000.00', falla_en=None):
+        self.valor_pagado = valor_pagado
+        self.falla_en = falla_en
+
+    def exportar_historial_csv(self, salida, desde=None, hasta=None):
+        try:
+            salida.write((','.join(COLUMNAS_EXPORTACION) + '\n').encode('utf-8'))
+            for i in range(FILAS):
+                if i == self.falla_en:
+                    return None
+                salida.write(f"{i},VIS{i % 1000:03d},6,2026-03-02 08:00:00,2026-03-02 10:00:00,"
+                             f"2.00,{self.valor_pagado}\n".encode('utf-8'))
+            return FILAS
+        except OSError:
+            return None
+
+def test_exporta_parquet(tmp_path):
+    import pyarrow.parquet as pq
+
+    ruta = str(tmp_path / 'historial.parquet')
+    assert exportar_historial(RepositorioCSV(), ruta) == FILAS
+    assert pq.read_metadata(ruta).num_rows == FILAS
+
+def test_error_de_pyarrow_no_se_reporta_como_falla_del_repositorio(tmp_path):
+    # decimal128(10, 2) no admite este valor
+    with pytest.raises(pa.ArrowException):
+        exportar_historial(RepositorioCSV(valor_pagado='123456789012.00'), str(tmp_path / 'historial.parquet'))
+
+def test_falla_del_repositorio_retorna_none(tmp_path):
+    ruta = tmp_path / 'historial.parquet'
+    assert exportar_historial(RepositorioCSV(falla_en=100), str(ruta)) is None
+    assert not ruta.exists()
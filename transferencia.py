@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Exportación del historial a CSV/Parquet e importación masiva de residentes"""
+
+import csv
+import io
+import os
+import threading
+
+from repositorio import COLUMNAS_EXPORTACION, COLUMNAS_IMPORTACION
+
+TAMANO_BLOQUE_PARQUET = 1 << 20  # bytes de CSV por lote de pyarrow
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+def _pyarrow():
+    """pyarrow es opcional: solo se necesita para archivos Parquet"""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Los archivos Parquet requieren pyarrow (pip install pyarrow)")
+    return pa, pa_csv, pq
+
+def _es_parquet(ruta):
+    return os.path.splitext(ruta)[1].lower() in ('.parquet', '.pq')
+
+def _esquema_historial(pa):
+    """Tipos de las columnas del historial, iguales a los de PostgreSQL"""
+    return pa.schema([
+        ('id', pa.int64()), ('placa', pa.string()), ('parqueadero', pa.int32()),
+        ('hora_entrada', pa.timestamp('us')), ('hora_salida', pa.timestamp('us')),
+        ('total_horas', pa.decimal128(5, 2)), ('valor_pagado', pa.decimal128(10, 2)),
+    ])
+
+# =============================================================================
+# EXPORTACIÓN
+# =============================================================================
+
+def exportar_historial(repo, ruta, desde=None, hasta=None):
+    """
+    Exporta las salidas entre desde y hasta (date, inclusive) a `ruta`; el
+    formato sale de la extensión (.parquet/.pq o CSV). Se escribe en un archivo
+    temporal que reemplaza a `ruta` solo si la exportación termina.
+    Retorna el número de filas o None si el repositorio falla
+    """
+    temporal = ruta + '.tmp'
+    try:
+        if _es_parquet(ruta):
+            filas = _exportar_parquet(repo, temporal, desde, hasta)
+        else:
+            with open(temporal, 'wb') as salida:
+                filas = repo.exportar_historial_csv(salida, desde, hasta)
+        if filas is None:
+            return None
+        os.replace(temporal, ruta)
+        return filas
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def _exportar_parquet(repo, ruta, desde, hasta):
+    """
+    El CSV del repositorio (COPY en PostgreSQL) se escribe en un pipe desde un
+    hilo y pyarrow lo lee por lotes y los agrega al Parquet: nunca está el
+    historial completo en memoria
+    """
+    pa, pa_csv, pq = _pyarrow()
+    esquema = _esquema_historial(pa)
+    lectura, escritura = os.pipe()
+    resultado = {}
+
+    def exportar():
+        try:
+            with os.fdopen(escritura, 'wb') as salida:
+                resultado['filas'] = repo.exportar_historial_csv(salida, desde, hasta)
+        except BrokenPipeError:
+            # pyarrow dejó de leer; su error es el que se reporta
+            resultado['filas'] = None
+
+    hilo = threading.Thread(target=exportar, name='ExportarHistorial', daemon=True)
+    hilo.start()
+    fallo = {}
+    try:
+        with os.fdopen(lectura, 'rb') as entrada:
+            try:
+                lector = pa_csv.open_csv(
+                    entrada,
+                    read_options=pa_csv.ReadOptions(block_size=TAMANO_BLOQUE_PARQUET),
+                    convert_options=pa_csv.ConvertOptions(column_types=esquema,
+                                                          include_columns=COLUMNAS_EXPORTACION))
+                with pq.ParquetWriter(ruta, esquema, compression='zstd') as parquet:
+                    for lote in lector:
+                        parquet.write_batch(lote)
+            except Exception:
+                # Con el hilo aún escribiendo, pyarrow falló primero (esquema, decimales
+                # desbordados...): al cerrar el pipe el repositorio fallará por el pipe roto
+                fallo['pyarrow_primero'] = hilo.is_alive()
+                raise
+    except Exception:
+        # Al cerrarse el pipe el hilo termina. Si el repositorio falló primero, el CSV
+        # cortado es consecuencia de eso y no un error de pyarrow
+        hilo.join()
+        if resultado.get('filas') is None and not fallo.get('pyarrow_primero'):
+            return None
+        raise
+    hilo.join()
+    return resultado.get('filas')
+
+# =============================================================================
+# IMPORTACIÓN
+# =============================================================================
+
+def importar_residentes(repo, ruta):
+    """
+    Carga residentes, placas y parqueaderos desde un CSV o Parquet con las
+    columnas parqueadero, nombre, apartamento, placa
+    Retorna el resumen de Repositorio.importar_residentes_csv o None si falla
+    """
+    if _es_parquet(ruta):
+        return repo.importar_residentes_csv(_parquet_a_csv(ruta))
+
+    with open(ruta, 'rb') as entrada:
+        encabezado = next(csv.reader(io.TextIOWrapper(entrada, encoding='utf-8-sig', newline='')), [])
+        if [c.strip().lower() for c in encabezado] != COLUMNAS_IMPORTACION:
+            raise ValueError(f"El archivo debe tener las columnas: {', '.join(COLUMNAS_IMPORTACION)}")
+    with open(ruta, 'rb') as entrada:
+        return repo.importar_residentes_csv(entrada)
+
+def _parquet_a_csv(ruta):
+    """Convierte el Parquet al CSV que espera el repositorio (en memoria: son pocas columnas)"""
+    pa, pa_csv, pq = _pyarrow()
+    tabla = pq.read_table(ruta)
+    faltantes = [c for c in COLUMNAS_IMPORTACION if c not in tabla.column_names]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+    tabla = tabla.select(COLUMNAS_IMPORTACION).cast(pa.schema(
+        [('parqueadero', pa.int32())] + [(c, pa.string()) for c in COLUMNAS_IMPORTACION[1:]]))
+    salida = io.BytesIO()
+    pa_csv.write_csv(tabla, salida)
+    salida.seek(0)
+    return salida
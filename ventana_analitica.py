@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Ventana de estadísticas detalladas de ocupación de visitantes"""
+
+import io
+import tkinter as tk
+from datetime import datetime, timedelta
+from tkinter import ttk
+
+from PIL import Image, ImageTk
+
+from analitica import analizar_ocupacion, graficar_ocupacion
+
+RANGOS = {'Últimos 7 días': 7, 'Últimos 30 días': 30, 'Últimos 90 días': 90, 'Último año': 365}
+
+# =============================================================================
+# VENTANA DE ANALÍTICA
+# =============================================================================
+
+class VentanaAnalitica:
+    """
+    Pico de visitantes simultáneos, ocupación promedio, estancia y mapas de
+    calor por hora de la semana. La lectura de intervalos, el análisis y el
+    gráfico se calculan en segundo plano.
+    """
+
+    def __init__(self, parent, repo, acceso):
+        """
+        repo: repositorio activo
+        acceso: AccesoDatosAsync de la aplicación
+        """
+        self.repo = repo
+        self.acceso = acceso
+        self.consulta = 0
+        self.imagen = None
+
+        self.ventana = tk.Toplevel(parent)
+        self.ventana.title("📈 Estadísticas de Ocupación")
+        self.ventana.geometry("950x800")
+        self.ventana.configure(bg='#f5f5f5')
+        self.ventana.transient(parent)
+
+        frame = tk.Frame(self.ventana, bg='white', relief='solid', bd=1)
+        frame.pack(fill='x', padx=15, pady=10)
+        tk.Label(frame, text="Rango:", font=('Arial', 10), bg='white').pack(side='left', padx=(10, 4), pady=8)
+        self.rango = ttk.Combobox(frame, values=list(RANGOS), state='readonly', width=16)
+        self.rango.set('Últimos 30 días')
+        self.rango.bind('<<ComboboxSelected>>', lambda e: self.generar())
+        self.rango.pack(side='left', pady=8)
+
+        self.label_resumen = tk.Label(self.ventana, text="", font=('Arial', 10), bg='#f5f5f5',
+                                      fg='#2c3e50', justify='left', anchor='w')
+        self.label_resumen.pack(fill='x', padx=15)
+        self.label_grafico = tk.Label(self.ventana, bg='white', text="⏳ Calculando...")
+        self.label_grafico.pack(fill='both', expand=True, padx=15, pady=10)
+
+        self.generar()
+
+    def generar(self):
+        self.consulta += 1
+        consulta = self.consulta
+        hasta = datetime.now()
+        desde = hasta - timedelta(days=RANGOS[self.rango.get()])
+        callback = lambda resultado, error: self.mostrar(consulta, resultado, error)
+        self.label_grafico.config(image='', text="⏳ Calculando...")
+
+        if self.repo.remoto:
+            self.acceso.enviar(self.calcular, desde, hasta, callback=callback)
+        else:
+            # Repositorio local: se lee aquí y solo el cálculo va al fondo
+            datos = self.leer(self.repo, desde, hasta)
+            self.acceso.ejecutar(self.analizar, datos, desde, hasta, callback=callback)
+
+    @staticmethod
+    def leer(repo, desde, hasta):
+        intervalos = repo.intervalos_visitantes(desde, hasta)
+        if intervalos is None:
+            raise RuntimeError("No se pudieron leer las visitas")
+        parqueaderos = [p['numero'] for p in repo.estado_parqueaderos() if not p['residente']]
+        return intervalos, parqueaderos
+
+    @staticmethod
+    def analizar(datos, desde, hasta):
+        intervalos, parqueaderos = datos
+        analisis = analizar_ocupacion(intervalos, desde, hasta, parqueaderos)
+        return analisis, graficar_ocupacion(analisis)
+
+    def calcular(self, repo, desde, hasta):
+        """Se ejecuta en segundo plano con una conexión del pool"""
+        return self.analizar(self.leer(repo, desde, hasta), desde, hasta)
+
+    def mostrar(self, consulta, resultado, error):
+        """Callback (hilo de Tk) con (análisis, PNG)"""
+        if consulta != self.consulta or not self.ventana.winfo_exists():
+            return
+        if error:
+            self.label_grafico.config(image='', text=f"❌ Error calculando estadísticas: {error}")
+            return
+
+        analisis, png = resultado
+        pico, estancia = analisis['pico'], analisis['estancia']
+        momento = pico['momento'].strftime('%Y-%m-%d %H:%M') if pico['momento'] else '-'
+        self.label_resumen.config(text=(
+            f"Visitas: {analisis['visitas']} · Pico: {pico['visitantes']} visitantes simultáneos ({momento})\n"
+            f"Ocupación promedio: {analisis['ocupacion_promedio']:.2f} visitantes · "
+            f"Utilización de parqueaderos: {100 * analisis['utilizacion_total']:.1f}%\n"
+            f"Estancia: promedio {estancia['promedio']:.2f} h · mediana {estancia['mediana']:.2f} h · "
+            f"p90 {estancia['p90']:.2f} h"))
+
+        self.imagen = ImageTk.PhotoImage(Image.open(io.BytesIO(png)))
+        self.label_grafico.config(image=self.imagen, text='')
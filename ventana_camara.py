@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Captura de placas por cámara y vista de la imagen procesada (OpenCV + Tk)"""
+
+import tkinter as tk
+from tkinter import messagebox
+
+import cv2
+from PIL import Image, ImageTk
+
+import ocr_placas
+
+# =============================================================================
+# CLASE PARA PROCESAR IMÁGENES Y DETECTAR PLACAS (MEJORADA)
+# =============================================================================
+
+class ProcesadorPlacas(ocr_placas.ProcesadorPlacas):
+    """Reconocimiento de ocr_placas más la vista de la imagen procesada en Tk"""
+    
+    @staticmethod
+    def mostrar_imagen_procesada(imagen, placa_detectada, parent):
+        """Muestra la imagen procesada en una ventana"""
+        ventana_img = tk.Toplevel(parent)
+        ventana_img.title("📸 Imagen Procesada")
+        ventana_img.geometry("900x700")
+        ventana_img.configure(bg='#2c3e50')
+        
+        # Frame superior
+        top_frame = tk.Frame(ventana_img, bg='#3498db', height=80)
+        top_frame.pack(fill='x')
+        top_frame.pack_propagate(False)
+        
+        tk.Label(top_frame, text=f"PLACA DETECTADA: {placa_detectada}", 
+                font=('Arial', 18, 'bold'), bg='#3498db', fg='white').pack(expand=True)
+        
+        # Frame para la imagen
+        img_frame = tk.Frame(ventana_img, bg='white', relief='solid', bd=2)
+        img_frame.pack(expand=True, fill='both', padx=20, pady=20)
+        
+        # Convertir imagen para mostrar
+        if len(imagen.shape) == 3:
+            img_rgb = cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB)
+        else:
+            img_rgb = cv2.cvtColor(imagen, cv2.COLOR_GRAY2RGB)
+            
+        img_pil = Image.fromarray(img_rgb)
+        
+        # Redimensionar manteniendo aspecto
+        img_pil.thumbnail((800, 500), Image.Resampling.LANCZOS)
+        
+        img_tk = ImageTk.PhotoImage(img_pil)
+        
+        # Mostrar imagen
+        img_label = tk.Label(img_frame, image=img_tk, bg='white')
+        img_label.image = img_tk
+        img_label.pack(expand=True)
+        
+        # Frame de botones
+        btn_frame = tk.Frame(ventana_img, bg='#2c3e50')
+        btn_frame.pack(fill='x', pady=10)
+        
+        tk.Button(btn_frame, text="✅ Aceptar y Usar", 
+                 command=lambda: [ventana_img.destroy(), parent.focus_force()],
+                 bg='#27ae60', fg='white', font=('Arial', 11, 'bold'),
+                 padx=20, pady=8, cursor='hand2').pack(side='left', expand=True, padx=5)
+        
+        tk.Button(btn_frame, text="❌ Cerrar", 
+                 command=ventana_img.destroy,
+                 bg='#e74c3c', fg='white', font=('Arial', 11, 'bold'),
+                 padx=20, pady=8, cursor='hand2').pack(side='left', expand=True, padx=5)
+
+# =============================================================================
+# CLASE PARA CAPTURA DE CÁMARA Y RECONOCIMIENTO DE PLACAS
+# =============================================================================
+
+class CapturadorPlaca:
+    """Clase para capturar imagen de la cámara y reconocer placas"""
+    
+    def __init__(self, parent):
+        self.parent = parent
+        self.capturando = False
+        self.cap = None
+        self.placa_detectada = None
+        
+    def abrir_ventana_captura(self, callback):
+        """
+        Abre una ventana para capturar imagen de la cámara
+        callback: función que recibe la placa detectada
+        """
+        self.callback = callback
+        
+        # Crear ventana de captura
+        self.ventana_cam = tk.Toplevel(self.parent)
+        self.ventana_cam.title("📸 Capturar Placa con Cámara")
+        self.ventana_cam.geometry("800x650")
+        self.ventana_cam.resizable(False, False)
+        self.ventana_cam.configure(bg='#2c3e50')
+        
+        # Centrar ventana
+        self.ventana_cam.transient(self.parent)
+        self.ventana_cam.grab_set()
+        
+        # Encabezado
+        header = tk.Frame(self.ventana_cam, bg='#3498db', height=60)
+        header.pack(fill='x')
+        header.pack_propagate(False)
+        
+        tk.Label(header, text="📸 CAPTURA DE PLACA CON CÁMARA", 
+                font=('Arial', 16, 'bold'), bg='#3498db', fg='white').pack(pady=15)
+        
+        # Frame principal
+        canvas = tk.Canvas(self.ventana_cam, bg='#2c3e50')
+        scrollbar = tk.Scrollbar(self.ventana_cam, orient="vertical", command=canvas.yview)
+
+        scrollable_frame = tk.Frame(canvas, bg='#2c3e50')
+
+        scrollable_frame.bind(
+            "<Configure>",
+            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+
+        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+
+        canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        main_frame = scrollable_frame
+    
+        # Frame para el video
+        self.video_frame = tk.Frame(main_frame, bg='black', width=640, height=480)
+        self.video_frame.pack(pady=10)
+        self.video_frame.pack_propagate(False)
+        
+        # Label para mostrar el video
+        self.video_label = tk.Label(self.video_frame, bg='black')
+        self.video_label.pack()
+        
+        # Frame para resultados
+        resultado_frame = tk.Frame(main_frame, bg='#34495e', relief='solid', bd=2)
+        resultado_frame.pack(fill='x', pady=10)
+        
+        tk.Label(resultado_frame, text="🔤 PLACA DETECTADA:", 
+                font=('Arial', 11, 'bold'), bg='#34495e', fg='white').pack(pady=(10, 5))
+        
+        self.label_placa_detectada = tk.Label(resultado_frame, text="---", 
+                                             font=('Arial', 18, 'bold'), 
+                                             bg='#34495e', fg='#f39c12', height=2)
+        self.label_placa_detectada.pack()
+        
+        # Frame de botones
+        btn_frame = tk.Frame(main_frame, bg='#2c3e50')
+        btn_frame.pack(fill='x', pady=10)
+        
+        btn_capturar = tk.Button(btn_frame, text="📸 CAPTURAR Y RECONOCER", 
+                                command=self.capturar_y_reconocer,
+                                bg='#27ae60', fg='white', font=('Arial', 11, 'bold'),
+                                relief='flat', bd=0, padx=20, pady=10,
+                                activebackground='#229954', cursor='hand2')
+        btn_capturar.pack(side='left', fill='both', expand=True, padx=5)
+        
+        btn_aceptar = tk.Button(btn_frame, text="✅ ACEPTAR PLACA", 
+                               command=self.aceptar_placa,
+                               bg='#3498db', fg='white', font=('Arial', 11, 'bold'),
+                               relief='flat', bd=0, padx=20, pady=10,
+                               activebackground='#2980b9', cursor='hand2',
+                               state='disabled')
+        btn_aceptar.pack(side='left', fill='both', expand=True, padx=5)
+        self.btn_aceptar = btn_aceptar
+        
+        btn_cancelar = tk.Button(btn_frame, text="❌ CANCELAR", 
+                                command=self.cerrar_ventana,
+                                bg='#e74c3c', fg='white', font=('Arial', 11, 'bold'),
+                                relief='flat', bd=0, padx=20, pady=10,
+                                activebackground='#c0392b', cursor='hand2')
+        btn_cancelar.pack(side='left', fill='both', expand=True, padx=5)
+        
+        # Instrucciones
+        instrucciones = tk.Label(main_frame, 
+                                 text="💡 Instrucciones: Coloque la placa frente a la cámara y presione 'CAPTURAR'",
+                                 font=('Arial', 10), bg='#2c3e50', fg='#bdc3c7')
+        instrucciones.pack(pady=5)
+        
+        # Iniciar captura
+        self.iniciar_captura()
+        
+    def iniciar_captura(self):
+        """Inicia la captura de video"""
+        self.capturando = True
+        self.cap = cv2.VideoCapture(0)
+        
+        if not self.cap.isOpened():
+            messagebox.showerror("Error", "No se pudo abrir la cámara")
+            self.cerrar_ventana()
+            return
+        
+        self.actualizar_video()
+    
+    def actualizar_video(self):
+        """Actualiza el frame de video"""
+        if self.capturando and self.cap is not None:
+            ret, frame = self.cap.read()
+            if ret:
+                # Convertir frame para tkinter
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame_pil = Image.fromarray(frame_rgb)
+                
+                # Redimensionar manteniendo aspecto
+                frame_pil.thumbnail((640, 480), Image.Resampling.LANCZOS)
+                
+                # Convertir a ImageTk
+                img_tk = ImageTk.PhotoImage(frame_pil)
+                
+                # Actualizar label
+                self.video_label.config(image=img_tk)
+                self.video_label.image = img_tk
+            
+            # Programar siguiente actualización
+            if self.capturando:
+                self.ventana_cam.after(30, self.actualizar_video)
+    
+    def capturar_y_reconocer(self):
+        """Captura el frame actual y reconoce la placa"""
+        if self.cap is None:
+            return
+        
+        ret, frame = self.cap.read()
+        if not ret:
+            messagebox.showerror("Error", "No se pudo capturar la imagen")
+            return
+        
+        # Usar el procesador mejorado
+        placa, imagen_procesada = ProcesadorPlacas.procesar_imagen_para_ocr(frame)
+        
+        if placa:
+            self.placa_detectada = placa
+            self.label_placa_detectada.config(text=placa, fg='#27ae60')
+            self.btn_aceptar.config(state='normal')
+            
+            # Mostrar imagen procesada si está disponible
+            if imagen_procesada is not None:
+                ProcesadorPlacas.mostrar_imagen_procesada(imagen_procesada, placa, self.ventana_cam)
+            
+            messagebox.showinfo("Placa Detectada", f"✅ Placa detectada: {placa}")
+        else:
+            self.label_placa_detectada.config(text="No se pudo detectar", fg='#e74c3c')
+            self.btn_aceptar.config(state='disabled')
+            messagebox.showwarning("Sin Detección", "No se pudo detectar una placa válida. Intente de nuevo con mejor iluminación.")
+    
+    def aceptar_placa(self):
+        """Acepta la placa detectada y la envía al callback"""
+        if self.placa_detectada:
+            self.callback(self.placa_detectada)
+            self.cerrar_ventana()
+    
+    def cerrar_ventana(self):
+        """Cierra la ventana de captura"""
+        self.capturando = False
+        if self.cap is not None:
+            self.cap.release()
+        if hasattr(self, 'ventana_cam') and self.ventana_cam:
+            self.ventana_cam.destroy()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Ventana de historial de visitantes con paginación por clave y carga al desplazarse"""
+
+import tkinter as tk
+from datetime import datetime
+from tkinter import messagebox, ttk
+
+# =============================================================================
+# VENTANA DE HISTORIAL
+# =============================================================================
+
+class VentanaHistorial:
+    """
+    Historial de salidas de visitantes. Se piden páginas de `tamano_pagina`
+    filas al repositorio (pagina_historial) a medida que el usuario se acerca
+    al final de la tabla, continuando desde el (hora_salida, id) de la última
+    fila cargada. La tabla conserva como máximo `max_filas`: al pasarse, se
+    descartan las filas más recientes del inicio, así una sesión larga de
+    desplazamiento no acumula el historial completo en memoria.
+    Los filtros de placa y fechas se resuelven en la base de datos.
+    """
+
+    COLUMNAS = [
+        ('id', 'ID', 70), ('placa', 'Placa', 100), ('parqueadero', 'Parq.', 60),
+        ('hora_entrada', 'Entrada', 150), ('hora_salida', 'Salida', 150),
+        ('total_horas', 'Horas', 70), ('valor_pagado', 'Valor', 100),
+    ]
+
+    def __init__(self, parent, repo, acceso, tamano_pagina=200, max_filas=5000):
+        """
+        repo: repositorio activo; si es remoto las páginas se piden por el pool de acceso
+        acceso: AccesoDatosAsync de la aplicación
+        """
+        self.repo = repo
+        self.acceso = acceso
+        self.tamano_pagina = tamano_pagina
+        self.max_filas = max_filas
+        self.filtros = {}
+        self.ultima_clave = None    # (hora_salida, id) de la última fila cargada
+        self.consulta = 0           # descarta respuestas de búsquedas anteriores
+        self.cargando = False
+        self.agotado = False
+        self.descartadas = 0
+        self.total_cargadas = 0
+
+        self.ventana = tk.Toplevel(parent)
+        self.ventana.title("📋 Historial de Visitantes")
+        self.ventana.geometry("850x600")
+        self.ventana.configure(bg='#f5f5f5')
+        self.ventana.transient(parent)
+
+        self.crear_filtros()
+        self.crear_tabla()
+
+        self.label_estado = tk.Label(self.ventana, text="", font=('Arial', 9),
+                                     bg='#f5f5f5', fg='#7f8c8d', anchor='w')
+        self.label_estado.pack(fill='x', padx=15, pady=(0, 10))
+
+        self.buscar()
+
+    # ============= INTERFAZ =============
+
+    def crear_filtros(self):
+        frame = tk.Frame(self.ventana, bg='white', relief='solid', bd=1)
+        frame.pack(fill='x', padx=15, pady=10)
+
+        self.entradas = {}
+        for clave, texto, ancho in (('placa', "Placa:", 12), ('desde', "Desde (AAAA-MM-DD):", 12),
+                                    ('hasta', "Hasta:", 12)):
+            tk.Label(frame, text=texto, font=('Arial', 10), bg='white').pack(side='left', padx=(10, 4), pady=8)
+            entrada = tk.Entry(frame, font=('Arial', 10), width=ancho, relief='solid', bd=1)
+            entrada.pack(side='left', pady=8)
+            entrada.bind('<Return>', lambda e: self.buscar())
+            self.entradas[clave] = entrada
+
+        tk.Button(frame, text="🔍 Buscar", command=self.buscar, font=('Arial', 10, 'bold'),
+                  bg='#3498db', fg='white', relief='flat', padx=12,
+                  cursor='hand2').pack(side='left', padx=(15, 5), pady=8)
+        tk.Button(frame, text="Limpiar", command=self.limpiar_filtros, font=('Arial', 10),
+                  bg='#95a5a6', fg='white', relief='flat', padx=12,
+                  cursor='hand2').pack(side='left', padx=5, pady=8)
+
+    def crear_tabla(self):
+        frame = tk.Frame(self.ventana, bg='#f5f5f5')
+        frame.pack(fill='both', expand=True, padx=15)
+
+        self.tabla = ttk.Treeview(frame, columns=[c[0] for c in self.COLUMNAS], show='headings')
+        for clave, titulo, ancho in self.COLUMNAS:
+            self.tabla.heading(clave, text=titulo)
+            self.tabla.column(clave, width=ancho, anchor='center')
+
+        self.scrollbar = ttk.Scrollbar(frame, orient='vertical', command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=self.al_desplazar)
+        self.tabla.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+    def limpiar_filtros(self):
+        for entrada in self.entradas.values():
+            entrada.delete(0, tk.END)
+        self.buscar()
+
+    def leer_filtros(self):
+        """Retorna los filtros del formulario o None si una fecha no es válida"""
+        filtros = {'placa': self.entradas['placa'].get().strip().upper() or None}
+        for clave in ('desde', 'hasta'):
+            texto = self.entradas[clave].get().strip()
+            try:
+                filtros[clave] = datetime.strptime(texto, '%Y-%m-%d').date() if texto else None
+            except ValueError:
+                messagebox.showerror("Error", f"Fecha inválida: {texto} (use AAAA-MM-DD)", parent=self.ventana)
+                return None
+        return filtros
+
+    # ============= CARGA DE PÁGINAS =============
+
+    def buscar(self):
+        """Reinicia la tabla con los filtros actuales y carga la primera página"""
+        filtros = self.leer_filtros()
+        if filtros is None:
+            return
+        self.filtros = filtros
+        self.consulta += 1
+        self.ultima_clave = None
+        self.cargando = False
+        self.agotado = False
+        self.descartadas = 0
+        self.total_cargadas = 0
+        self.tabla.delete(*self.tabla.get_children())
+        self.cargar_pagina()
+
+    def al_desplazar(self, inicio, fin):
+        """yscrollcommand de la tabla: pide la siguiente página cerca del final"""
+        self.scrollbar.set(inicio, fin)
+        if float(fin) > 0.9:
+            self.cargar_pagina()
+
+    def cargar_pagina(self):
+        if self.cargando or self.agotado:
+            return
+        self.cargando = True
+        consulta = self.consulta
+        argumentos = (self.ultima_clave, self.tamano_pagina, self.filtros['placa'],
+                      self.filtros['desde'], self.filtros['hasta'])
+        self.label_estado.config(text="⏳ Cargando...")
+
+        if self.repo.remoto:
+            self.acceso.enviar('pagina_historial', *argumentos,
+                               callback=lambda filas, error: self.pagina_cargada(consulta, filas, error))
+        else:
+            self.pagina_cargada(consulta, self.repo.pagina_historial(*argumentos), None)
+
+    def pagina_cargada(self, consulta, filas, error):
+        """Callback (hilo de Tk) con una página del historial"""
+        if consulta != self.consulta or not self.ventana.winfo_exists():
+            return
+        self.cargando = False
+        if error or filas is None:
+            self.label_estado.config(text=f"❌ Error cargando historial: {error or 'sin conexión con la base de datos'}")
+            return
+
+        for r in filas:
+            self.tabla.insert('', 'end', values=(
+                r['id'], r['placa'], r['parqueadero'],
+                r['hora_entrada'].strftime('%Y-%m-%d %H:%M'), r['hora_salida'].strftime('%Y-%m-%d %H:%M'),
+                f"{float(r['total_horas'] or 0):.2f}", f"${float(r['valor_pagado'] or 0):,.0f}"))
+        if filas:
+            self.ultima_clave = (filas[-1]['hora_salida'], filas[-1]['id'])
+            self.total_cargadas += len(filas)
+        self.agotado = len(filas) < self.tamano_pagina
+
+        # Límite de filas en la tabla: se descartan las del inicio
+        hijos = self.tabla.get_children()
+        if len(hijos) > self.max_filas:
+            sobrantes = len(hijos) - self.max_filas
+            self.tabla.delete(*hijos[:sobrantes])
+            self.descartadas += sobrantes
+
+        texto = f"{self.total_cargadas} salidas cargadas"
+        if self.descartadas:
+            texto += f" (las {self.descartadas} más recientes se ocultaron; Buscar vuelve al inicio)"
+        if self.agotado:
+            texto += " · fin del historial"
+        self.label_estado.config(text=texto)
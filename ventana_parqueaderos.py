@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Mapa de todos los parqueaderos dibujado en un Canvas y actualizado por diferencias"""
+
+import threading
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk
+
+# =============================================================================
+# ESTADO Y DIFERENCIAS
+# =============================================================================
+
+class MapaParqueaderos:
+    """
+    Último estado conocido de cada parqueadero. Al recibir un estado nuevo
+    indica qué parqueaderos cambiaron; solo si aparecen, desaparecen o pasan de
+    residentes a visitantes (o al revés) hay que volver a distribuir el mapa
+    """
+
+    def __init__(self):
+        self.filas = {}  # número -> fila de Repositorio.estado_parqueaderos()
+        self.residentes = []  # números en orden, por sección
+        self.visitantes = []
+
+    def actualizar(self, filas):
+        """Retorna (distribucion_cambio, números que cambiaron)"""
+        nuevas = {f['numero']: f for f in filas}
+        residentes = [n for n in sorted(nuevas) if nuevas[n]['residente']]
+        visitantes = [n for n in sorted(nuevas) if not nuevas[n]['residente']]
+        distribucion_cambio = residentes != self.residentes or visitantes != self.visitantes
+        cambiados = [n for n, f in nuevas.items() if self.filas.get(n) != f]
+        self.filas, self.residentes, self.visitantes = nuevas, residentes, visitantes
+        return distribucion_cambio, cambiados
+
+    def ocupados(self, numeros):
+        return sum(1 for n in numeros if self.es_ocupado(self.filas[n]))
+
+    @staticmethod
+    def es_ocupado(fila):
+        # En los de visitantes manda el registro activo; el estado puede ir un instante atrás
+        return fila['estado'] == 'OCUPADO' if fila['residente'] else bool(fila['hora_entrada'])
+
+# =============================================================================
+# VENTANA DEL MAPA
+# =============================================================================
+
+class VentanaParqueaderos:
+    """
+    Cada parqueadero es un rectángulo con su texto en un solo Canvas, dibujados
+    una vez; después solo se cambian el color y el texto de los que cambiaron.
+    Con PostgreSQL el estado se vuelve a leer cuando la base de datos avisa un
+    cambio (LISTEN); con otros motores, o si la suscripción falla, cada
+    `recarga_segundos`. Las horas de los visitantes se actualizan cada minuto
+    sin consultar.
+    """
+
+    ANCHO, ALTO, MARGEN = 104, 56, 8
+    ALTO_TITULO = 34
+    COLORES = {'libre': '#27ae60', 'residente': '#e74c3c', 'visitante': '#f39c12'}
+
+    def __init__(self, parent, repo, acceso, recarga_segundos=5, recarga_con_avisos_segundos=60):
+        """
+        repo: repositorio activo
+        acceso: AccesoDatosAsync de la aplicación
+        recarga_con_avisos_segundos: recarga de respaldo mientras llegan avisos de cambios
+        """
+        self.repo = repo
+        self.acceso = acceso
+        self.recarga_segundos = recarga_segundos
+        self.recarga_con_avisos_segundos = recarga_con_avisos_segundos
+        self.mapa = MapaParqueaderos()
+        self.items = {}  # número -> (rectángulo, texto)
+        self.numero_de_item = {}
+        self.columnas = 0
+        self.cargando = False
+        self.ultima_carga = None
+        self.cambio = threading.Event()
+        self.suscrito = threading.Event()
+        self.cerrada = threading.Event()
+
+        self.ventana = tk.Toplevel(parent)
+        self.ventana.title("📊 Estado de Parqueaderos")
+        self.ventana.geometry("750x650")
+        self.ventana.configure(bg='#f5f5f5')
+        self.ventana.transient(parent)
+        # También se cierra con la ventana principal: el hilo de avisos y los ticks se detienen
+        self.ventana.bind('<Destroy>', lambda e: self.cerrada.set() if e.widget is self.ventana else None)
+
+        header = tk.Frame(self.ventana, bg='#9b59b6', height=60)
+        header.pack(fill='x')
+        header.pack_propagate(False)
+        tk.Label(header, text="📊 ESTADO DE TODOS LOS PARQUEADEROS",
+                 font=('Arial', 16, 'bold'), bg='#9b59b6', fg='white').pack(pady=15)
+
+        self.label_resumen = tk.Label(self.ventana, text="⏳ Cargando...", font=('Arial', 10, 'bold'),
+                                      bg='#f5f5f5', fg='#2c3e50', anchor='w')
+        self.label_resumen.pack(fill='x', padx=20, pady=(10, 0))
+
+        frame = tk.Frame(self.ventana, bg='#f5f5f5')
+        frame.pack(fill='both', expand=True, padx=20, pady=10)
+        self.canvas = tk.Canvas(frame, bg='white', relief='solid', bd=1, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        self.canvas.bind('<Configure>', self.redimensionado)
+        self.canvas.bind('<Motion>', self.mostrar_detalle)
+        self.canvas.bind('<MouseWheel>', lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, 'units'))
+        self.canvas.bind('<Button-4>', lambda e: self.canvas.yview_scroll(-1, 'units'))
+        self.canvas.bind('<Button-5>', lambda e: self.canvas.yview_scroll(1, 'units'))
+
+        self.label_detalle = tk.Label(self.ventana, text="Pase el cursor sobre un parqueadero para ver el detalle",
+                                      font=('Arial', 10), bg='#f5f5f5', fg='#7f8c8d', anchor='w')
+        self.label_detalle.pack(fill='x', padx=20, pady=(0, 10))
+
+        if self.repo.remoto:
+            threading.Thread(target=self.escuchar_cambios, name='mapa-parqueaderos', daemon=True).start()
+        self.recargar()
+        self.tick()
+        self.tick_horas()
+
+    # ============= AVISOS DE CAMBIOS =============
+
+    def escuchar_cambios(self):
+        """Hilo propio: la espera de avisos no ocupa conexiones del pool ni el hilo de Tk"""
+        suscripcion = self.repo.suscribir_cambios()
+        if suscripcion is None:
+            return
+        self.suscrito.set()
+        # Un cambio entre la primera lectura y la suscripción no se pierde
+        self.cambio.set()
+        try:
+            while not self.cerrada.is_set():
+                avisos = suscripcion.esperar_avisos(1.0)
+                if avisos is None:
+                    break
+                if avisos:
+                    self.cambio.set()
+        finally:
+            # Sin avisos se vuelve a recargar cada recarga_segundos
+            self.suscrito.clear()
+            suscripcion.cerrar()
+
+    def en_vivo(self):
+        """True si los cambios llegan por avisos; sin conexión la portería opera con el espejo local"""
+        if not self.suscrito.is_set():
+            return False
+        sinc = self.repo.estado_sincronizacion()
+        return sinc is None or (sinc['en_linea'] and not sinc['pendientes'])
+
+    def tick(self):
+        """Recarga si hubo un aviso (una vez por tick aunque lleguen varios) o se cumplió el intervalo"""
+        if self.cerrada.is_set():
+            return
+        intervalo = self.recarga_con_avisos_segundos if self.en_vivo() else self.recarga_segundos
+        vencido = self.ultima_carga is None or (datetime.now() - self.ultima_carga).total_seconds() >= intervalo
+        if (self.cambio.is_set() or vencido) and not self.cargando:
+            self.cambio.clear()
+            self.recargar()
+        self.ventana.after(500, self.tick)
+
+    # ============= CARGA =============
+
+    def recargar(self):
+        self.cargando = True
+        self.ultima_carga = datetime.now()
+        if self.repo.remoto:
+            self.acceso.enviar('estado_parqueaderos', callback=self.cargado)
+        else:
+            self.cargado(self.repo.estado_parqueaderos(), None)
+
+    def cargado(self, filas, error):
+        self.cargando = False
+        if self.cerrada.is_set():
+            return
+        if error or not filas:
+            # Los repositorios retornan [] si falla la lectura: se conserva el último mapa
+            self.label_resumen.config(text="⚠️ No se pudo leer el estado de los parqueaderos, reintentando...")
+            return
+        distribucion_cambio, cambiados = self.mapa.actualizar(filas)
+        if distribucion_cambio:
+            self.dibujar()
+        else:
+            for numero in cambiados:
+                self.pintar(numero)
+        self.pintar_resumen()
+
+    # ============= DIBUJO =============
+
+    def redimensionado(self, event):
+        columnas = max(1, (event.width - self.MARGEN) // (self.ANCHO + self.MARGEN))
+        if columnas != self.columnas:
+            self.columnas = columnas
+            if self.mapa.filas:
+                self.dibujar()
+
+    def dibujar(self):
+        """Crea todos los rectángulos y textos; solo al abrir, redimensionar o cambiar la distribución"""
+        self.canvas.delete('all')
+        self.items.clear()
+        self.numero_de_item.clear()
+        columnas = self.columnas or 1
+        y = self.MARGEN
+        for titulo, color, numeros in (("👨‍💼 PARQUEADEROS RESIDENTES", '#3498db', self.mapa.residentes),
+                                       ("👥 PARQUEADEROS VISITANTES", '#9b59b6', self.mapa.visitantes)):
+            ancho_total = columnas * (self.ANCHO + self.MARGEN) - self.MARGEN
+            self.canvas.create_rectangle(self.MARGEN, y, self.MARGEN + ancho_total, y + self.ALTO_TITULO - 6,
+                                         fill=color, outline='')
+            self.canvas.create_text(self.MARGEN + 12, y + (self.ALTO_TITULO - 6) / 2, text=titulo, anchor='w',
+                                    font=('Arial', 12, 'bold'), fill='white')
+            y += self.ALTO_TITULO
+            for i, numero in enumerate(numeros):
+                x0 = self.MARGEN + (i % columnas) * (self.ANCHO + self.MARGEN)
+                y0 = y + (i // columnas) * (self.ALTO + self.MARGEN)
+                rectangulo = self.canvas.create_rectangle(x0, y0, x0 + self.ANCHO, y0 + self.ALTO,
+                                                          outline='#2c3e50', width=1)
+                texto = self.canvas.create_text(x0 + self.ANCHO / 2, y0 + self.ALTO / 2, justify='center',
+                                                font=('Arial', 9, 'bold'), fill='white')
+                self.items[numero] = (rectangulo, texto)
+                self.numero_de_item[rectangulo] = self.numero_de_item[texto] = numero
+                self.pintar(numero)
+            filas = -(-len(numeros) // columnas)
+            y += filas * (self.ALTO + self.MARGEN) + self.MARGEN
+        self.canvas.configure(scrollregion=(0, 0, self.MARGEN + columnas * (self.ANCHO + self.MARGEN), y))
+
+    def apariencia(self, fila, ahora=None):
+        """(color, texto) de la celda de un parqueadero"""
+        if fila['residente']:
+            if fila['estado'] == 'OCUPADO':
+                return self.COLORES['residente'], f"#{fila['numero']}\n{fila['placa'] or ''}\n🔴 OCUPADO"
+            return self.COLORES['libre'], f"#{fila['numero']}\n{fila['placa'] or ''}\n🟢 LIBRE"
+        if fila['hora_entrada']:
+            horas = ((ahora or datetime.now()) - fila['hora_entrada']).total_seconds() / 3600
+            return self.COLORES['visitante'], f"#{fila['numero']}\n{fila['placa']}\n{horas:.1f}h"
+        return self.COLORES['libre'], f"#{fila['numero']}\n🟢 LIBRE"
+
+    def pintar(self, numero, ahora=None):
+        rectangulo, texto = self.items[numero]
+        color, contenido = self.apariencia(self.mapa.filas[numero], ahora)
+        self.canvas.itemconfigure(rectangulo, fill=color)
+        self.canvas.itemconfigure(texto, text=contenido)
+
+    def tick_horas(self):
+        """Actualiza el tiempo dentro de los visitantes; solo cambia los textos que cambiaron"""
+        if self.cerrada.is_set():
+            return
+        ahora = datetime.now()
+        for numero in self.mapa.visitantes:
+            fila = self.mapa.filas[numero]
+            if fila['hora_entrada'] and numero in self.items:
+                texto = self.items[numero][1]
+                contenido = self.apariencia(fila, ahora)[1]
+                if self.canvas.itemcget(texto, 'text') != contenido:
+                    self.canvas.itemconfigure(texto, text=contenido)
+        self.ventana.after(60000, self.tick_horas)
+
+    def pintar_resumen(self):
+        residentes, visitantes = self.mapa.residentes, self.mapa.visitantes
+        self.label_resumen.config(text=(
+            f"👨‍💼 Residentes: {self.mapa.ocupados(residentes)}/{len(residentes)} ocupados · "
+            f"👥 Visitantes: {self.mapa.ocupados(visitantes)}/{len(visitantes)} ocupados · "
+            f"{'🔔 En vivo' if self.en_vivo() else '🔄 Cada ' + str(self.recarga_segundos) + ' s'} · "
+            f"Actualizado {datetime.now().strftime('%H:%M:%S')}"))
+
+    def mostrar_detalle(self, event):
+        actuales = self.canvas.find_withtag('current')
+        numero = self.numero_de_item.get(actuales[0]) if actuales else None
+        if numero is None:
+            return
+        fila = self.mapa.filas[numero]
+        if fila['residente']:
+            detalle = (f"Parqueadero #{numero} | {'🔴 OCUPADO' if fila['estado'] == 'OCUPADO' else '🟢 LIBRE'} | "
+                       f"Residente: {fila['residente']} (Apto {fila['apartamento'] or ''}) | "
+                       f"Placa: {fila['placa'] or ''}")
+        elif fila['hora_entrada']:
+            detalle = (f"Parqueadero #{numero} | 🔴 OCUPADO | Placa: {fila['placa']} | "
+                       f"Entrada: {fila['hora_entrada'].strftime('%Y-%m-%d %H:%M:%S')}")
+        else:
+            detalle = f"Parqueadero #{numero} | 🟢 LIBRE"
+        self.label_detalle.config(text=detalle, fg='#2c3e50')
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Ventana de reporte de ingresos: tabla por periodo y gráfico"""
+
+import io
+import tkinter as tk
+from datetime import datetime
+from tkinter import messagebox, ttk
+
+from PIL import Image, ImageTk
+
+from reportes import PERIODOS, etiqueta_periodo, generar_reporte, rango_por_defecto
+
+# =============================================================================
+# VENTANA DE REPORTES
+# =============================================================================
+
+class VentanaReportes:
+    """
+    Reporte de ingresos por día, semana o mes. Los resúmenes diarios se
+    leen con la CacheResumenDiario de la aplicación; la agregación con pandas
+    y el gráfico (matplotlib Agg) se calculan fuera del hilo de Tk.
+    """
+
+    COLUMNAS = [
+        ('periodo', 'Periodo', 130), ('salidas', 'Salidas', 70), ('horas', 'Horas', 80),
+        ('recaudo', 'Recaudo', 110), ('recaudo_por_hora', 'Por hora', 110),
+        ('recaudo_tarifa_plena', 'Tarifa plena', 110), ('ticket_promedio', 'Ticket prom.', 100),
+    ]
+
+    def __init__(self, parent, repo, acceso, cache):
+        """
+        repo: repositorio activo; si es remoto la consulta también sale del hilo de Tk
+        acceso: AccesoDatosAsync de la aplicación
+        cache: CacheResumenDiario compartida entre aperturas de la ventana
+        """
+        self.repo = repo
+        self.acceso = acceso
+        self.cache = cache
+        self.consulta = 0
+        self.imagen = None
+
+        self.ventana = tk.Toplevel(parent)
+        self.ventana.title("💰 Reporte de Ingresos")
+        self.ventana.geometry("900x750")
+        self.ventana.configure(bg='#f5f5f5')
+        self.ventana.transient(parent)
+
+        self.crear_controles()
+        self.crear_tabla()
+
+        self.label_totales = tk.Label(self.ventana, text="", font=('Arial', 10, 'bold'),
+                                      bg='#f5f5f5', fg='#2c3e50', anchor='w')
+        self.label_totales.pack(fill='x', padx=15, pady=(5, 0))
+        self.label_grafico = tk.Label(self.ventana, bg='white', text="⏳ Generando reporte...")
+        self.label_grafico.pack(fill='both', expand=True, padx=15, pady=10)
+
+        self.cambiar_periodo()
+
+    # ============= INTERFAZ =============
+
+    def crear_controles(self):
+        frame = tk.Frame(self.ventana, bg='white', relief='solid', bd=1)
+        frame.pack(fill='x', padx=15, pady=10)
+
+        tk.Label(frame, text="Periodo:", font=('Arial', 10), bg='white').pack(side='left', padx=(10, 4), pady=8)
+        self.periodo = ttk.Combobox(frame, values=list(PERIODOS), state='readonly', width=10)
+        self.periodo.set('Diario')
+        self.periodo.bind('<<ComboboxSelected>>', lambda e: self.cambiar_periodo())
+        self.periodo.pack(side='left', pady=8)
+
+        self.entradas = {}
+        for clave, texto in (('desde', "Desde:"), ('hasta', "Hasta:")):
+            tk.Label(frame, text=texto, font=('Arial', 10), bg='white').pack(side='left', padx=(15, 4), pady=8)
+            entrada = tk.Entry(frame, font=('Arial', 10), width=12, relief='solid', bd=1)
+            entrada.pack(side='left', pady=8)
+            entrada.bind('<Return>', lambda e: self.generar())
+            self.entradas[clave] = entrada
+
+        tk.Button(frame, text="📊 Generar", command=self.generar, font=('Arial', 10, 'bold'),
+                  bg='#27ae60', fg='white', relief='flat', padx=12,
+                  cursor='hand2').pack(side='left', padx=15, pady=8)
+
+    def crear_tabla(self):
+        frame = tk.Frame(self.ventana, bg='#f5f5f5')
+        frame.pack(fill='x', padx=15)
+
+        self.tabla = ttk.Treeview(frame, columns=[c[0] for c in self.COLUMNAS], show='headings', height=8)
+        for clave, titulo, ancho in self.COLUMNAS:
+            self.tabla.heading(clave, text=titulo)
+            self.tabla.column(clave, width=ancho, anchor='center')
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=scrollbar.set)
+        self.tabla.pack(side='left', fill='x', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+    def cambiar_periodo(self):
+        """Pone el rango por defecto del periodo elegido y genera el reporte"""
+        desde, hasta = rango_por_defecto(self.periodo.get())
+        for clave, fecha in (('desde', desde), ('hasta', hasta)):
+            self.entradas[clave].delete(0, tk.END)
+            self.entradas[clave].insert(0, fecha.isoformat())
+        self.generar()
+
+    # ============= GENERACIÓN =============
+
+    def generar(self):
+        try:
+            desde = datetime.strptime(self.entradas['desde'].get().strip(), '%Y-%m-%d').date()
+            hasta = datetime.strptime(self.entradas['hasta'].get().strip(), '%Y-%m-%d').date()
+        except ValueError:
+            messagebox.showerror("Error", "Fechas inválidas (use AAAA-MM-DD)", parent=self.ventana)
+            return
+        if desde > hasta:
+            messagebox.showerror("Error", "La fecha inicial es posterior a la final", parent=self.ventana)
+            return
+
+        self.consulta += 1
+        consulta, periodo = self.consulta, self.periodo.get()
+        callback = lambda reporte, error: self.mostrar(consulta, reporte, error)
+        self.label_grafico.config(image='', text="⏳ Generando reporte...")
+
+        if self.repo.remoto:
+            self.acceso.enviar(self.calcular, desde, hasta, periodo, callback=callback)
+        else:
+            # Repositorio local: la lectura es inmediata, el cálculo y el gráfico van al fondo
+            filas = self.cache.obtener(self.repo, desde, hasta)
+            if filas is None:
+                callback(None, RuntimeError("No se pudo leer el resumen diario"))
+                return
+            self.acceso.ejecutar(generar_reporte, filas, desde, hasta, periodo, callback=callback)
+
+    def calcular(self, repo, desde, hasta, periodo):
+        """Se ejecuta en segundo plano con una conexión del pool"""
+        filas = self.cache.obtener(repo, desde, hasta)
+        if filas is None:
+            raise RuntimeError("No se pudo leer el resumen diario")
+        return generar_reporte(filas, desde, hasta, periodo)
+
+    def mostrar(self, consulta, reporte, error):
+        """Callback (hilo de Tk) con (tabla, totales, PNG)"""
+        if consulta != self.consulta or not self.ventana.winfo_exists():
+            return
+        if error:
+            self.label_grafico.config(image='', text=f"❌ Error generando reporte: {error}")
+            return
+
+        tabla, totales, png = reporte
+        self.tabla.delete(*self.tabla.get_children())
+        for periodo, fila in tabla.iterrows():
+            self.tabla.insert('', 'end', values=(
+                etiqueta_periodo(periodo), f"{fila['salidas']:.0f}", f"{fila['horas']:.2f}",
+                f"${fila['recaudo']:,.0f}", f"${fila['recaudo_por_hora']:,.0f}",
+                f"${fila['recaudo_tarifa_plena']:,.0f}", f"${fila['ticket_promedio']:,.0f}"))
+
+        self.label_totales.config(text=(
+            f"Total: ${totales['recaudo']:,.0f} en {totales['salidas']:.0f} salidas "
+            f"({totales['horas']:,.1f} h) · Por hora: ${totales['recaudo_por_hora']:,.0f} "
+            f"({totales['salidas_por_hora']:.0f}) · Tarifa plena: ${totales['recaudo_tarifa_plena']:,.0f} "
+            f"({totales['salidas_tarifa_plena']:.0f})"))
+
+        self.imagen = ImageTk.PhotoImage(Image.open(io.BytesIO(png)))
+        self.label_grafico.config(image=self.imagen, text='')
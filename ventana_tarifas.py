@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""Tablero en vivo del tiempo y la tarifa proyectada de todos los visitantes activos"""
+
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk
+
+import numpy as np
+
+from tarifas import US_POR_MINUTO
+
+# =============================================================================
+# CÁLCULO
+# =============================================================================
+
+class TableroTarifas:
+    """
+    Visitantes activos en arreglos, agrupados por plan de tarifa. Cada tick
+    calcula el tiempo y la tarifa de todos con una pasada vectorizada por plan
+    (cobro_lote); la base de datos solo se consulta al recargar el conjunto
+    """
+
+    def __init__(self, aviso_minutos=15):
+        """
+        aviso_minutos: anticipación con la que se resalta a quien está por pasar a tarifa plena
+        """
+        self.aviso_us = aviso_minutos * US_POR_MINUTO
+        self.visitantes = []
+        self.entradas = np.empty(0, dtype='datetime64[us]')
+        self.limites = np.empty(0, dtype=np.int64)  # microsegundos hasta tarifa plena; -1 si el plan no tiene
+        self.grupos = []  # [(plan, índices)]
+
+    def cargar(self, visitantes, plan_de):
+        """
+        visitantes: Repositorio.visitantes_activos()
+        plan_de: función(parqueadero) -> PlanTarifa (Repositorio.plan_tarifa)
+        """
+        self.visitantes = sorted(visitantes, key=lambda v: v['hora_entrada'])
+        self.entradas = np.array([v['hora_entrada'] for v in self.visitantes], dtype='datetime64[us]')
+        grupos = {}
+        for i, v in enumerate(self.visitantes):
+            plan = plan_de(v['parqueadero'])
+            grupos.setdefault(id(plan), (plan, []))[1].append(i)
+        self.grupos = [(plan, np.array(indices)) for plan, indices in grupos.values()]
+        self.limites = np.full(len(self.visitantes), -1, dtype=np.int64)
+        for plan, indices in self.grupos:
+            if plan.limite_plena_us is not None:
+                self.limites[indices] = plan.limite_plena_us
+
+    def calcular(self, ahora=None):
+        """
+        Estado de todos los visitantes en el instante `ahora`: {us (tiempo dentro),
+        valores (tarifa proyectada), restante (microsegundos hasta tarifa plena),
+        alerta (pasa a tarifa plena dentro del aviso), plena (ya la paga)}
+        """
+        ahora = np.datetime64(ahora or datetime.now(), 'us')
+        us = (ahora - self.entradas).astype(np.int64)
+        valores = np.zeros(len(us), dtype=np.int64)
+        for plan, indices in self.grupos:
+            valores[indices] = plan.cobro_lote(self.entradas[indices], ahora)
+        con_limite = self.limites >= 0
+        restante = self.limites - us
+        return {'us': us, 'valores': valores, 'restante': restante,
+                'alerta': con_limite & (restante >= 0) & (restante < self.aviso_us),
+                'plena': con_limite & (restante < 0)}
+
+# =============================================================================
+# VENTANA DEL TABLERO
+# =============================================================================
+
+def formato_duracion(us):
+    segundos = max(int(us) // 1_000_000, 0)
+    return f"{segundos // 3600}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+
+class VentanaTarifas:
+    """
+    Tiempo dentro y valor a pagar de cada visitante activo, actualizados cada
+    segundo sin consultar la base de datos. El conjunto de visitantes se
+    recarga cada `recarga_segundos` (en segundo plano si el repositorio es
+    remoto). Se resaltan en naranja quienes pasan a tarifa plena en los
+    próximos minutos y en rojo quienes ya la pagan.
+    """
+
+    COLUMNAS = [
+        ('placa', 'Placa', 100), ('parqueadero', 'Parq.', 60), ('hora_entrada', 'Entrada', 150),
+        ('tiempo', 'Tiempo', 90), ('valor', 'Valor', 100), ('plena', 'Tarifa plena en', 110),
+    ]
+
+    def __init__(self, parent, repo, acceso, recarga_segundos=10, aviso_minutos=15):
+        """
+        repo: repositorio activo
+        acceso: AccesoDatosAsync de la aplicación
+        """
+        self.repo = repo
+        self.acceso = acceso
+        self.recarga_ms = recarga_segundos * 1000
+        self.tablero = TableroTarifas(aviso_minutos)
+        self.cargando = False
+        self.filas = None  # iid de cada visitante del tablero, en el mismo orden (None hasta la primera carga)
+
+        self.ventana = tk.Toplevel(parent)
+        self.ventana.title("⏱️ Tablero de Tarifas")
+        self.ventana.geometry("700x500")
+        self.ventana.configure(bg='#f5f5f5')
+        self.ventana.transient(parent)
+
+        frame = tk.Frame(self.ventana, bg='#f5f5f5')
+        frame.pack(fill='both', expand=True, padx=15, pady=10)
+        self.tabla = ttk.Treeview(frame, columns=[c[0] for c in self.COLUMNAS], show='headings')
+        for clave, titulo, ancho in self.COLUMNAS:
+            self.tabla.heading(clave, text=titulo)
+            self.tabla.column(clave, width=ancho, anchor='center')
+        self.tabla.tag_configure('alerta', background='#fdebd0', foreground='#d35400')
+        self.tabla.tag_configure('plena', background='#fadbd8', foreground='#c0392b')
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=scrollbar.set)
+        self.tabla.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        self.label_estado = tk.Label(self.ventana, text="⏳ Cargando...", font=('Arial', 10, 'bold'),
+                                     bg='#f5f5f5', fg='#2c3e50', anchor='w')
+        self.label_estado.pack(fill='x', padx=15, pady=(0, 10))
+
+        self.recargar()
+        self.tick()
+
+    # ============= CONJUNTO DE VISITANTES =============
+
+    def recargar(self):
+        if not self.ventana.winfo_exists():
+            return
+        self.ventana.after(self.recarga_ms, self.recargar)
+        if self.cargando:
+            return
+        self.cargando = True
+        if self.repo.remoto:
+            self.acceso.enviar(self.leer, callback=self.cargado)
+        else:
+            self.cargado(self.leer(self.repo), None)
+
+    @staticmethod
+    def leer(repo):
+        """Visitantes activos y su plan; con el pool se ejecuta en segundo plano"""
+        visitantes = repo.visitantes_activos()
+        return visitantes, {v['parqueadero']: repo.plan_tarifa(v['parqueadero']) for v in visitantes}
+
+    def cargado(self, resultado, error):
+        self.cargando = False
+        if error or resultado is None or not self.ventana.winfo_exists():
+            return
+        visitantes, planes = resultado
+        self.tablero.cargar(visitantes, planes.get)
+
+        self.tabla.delete(*self.tabla.get_children())
+        self.filas = [self.tabla.insert('', 'end', values=(v['placa'], v['parqueadero'],
+                                                           v['hora_entrada'].strftime('%Y-%m-%d %H:%M:%S'),
+                                                           '', '', ''))
+                      for v in self.tablero.visitantes]
+        self.pintar()
+
+    # ============= ACTUALIZACIÓN CADA SEGUNDO =============
+
+    def tick(self):
+        if not self.ventana.winfo_exists():
+            return
+        self.pintar()
+        self.ventana.after(1000, self.tick)
+
+    def pintar(self):
+        if self.filas is None:
+            return
+        if not self.filas:
+            self.label_estado.config(text="✅ No hay visitantes dentro")
+            return
+        estado = self.tablero.calcular()
+        us, valores, restante = estado['us'], estado['valores'], estado['restante']
+        alerta, plena = estado['alerta'], estado['plena']
+        con_limite = self.tablero.limites >= 0
+        for i, iid in enumerate(self.filas):
+            visitante = self.tablero.visitantes[i]
+            self.tabla.item(iid, values=(visitante['placa'], visitante['parqueadero'],
+                                         visitante['hora_entrada'].strftime('%Y-%m-%d %H:%M:%S'),
+                                         formato_duracion(us[i]), f"${int(valores[i]):,}",
+                                         formato_duracion(restante[i]) if con_limite[i] and not plena[i] else ''),
+                            tags=('plena',) if plena[i] else ('alerta',) if alerta[i] else ())
+        self.label_estado.config(text=(
+            f"🚗 {len(self.filas)} visitantes · 💵 Total proyectado: ${int(valores.sum()):,} COP · "
+            f"⚠️ {int(alerta.sum())} por pasar a tarifa plena · 🔴 {int(plena.sum())} en tarifa plena"))